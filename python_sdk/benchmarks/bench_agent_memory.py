@@ -0,0 +1,60 @@
+"""
+Benchmark: memory per agent at 100k agents for the per-request
+CoinCharacterAgent, the slotted CompactCoinAgent (held in an AgentPool) and
+the struct-of-arrays CoinPopulation. Allocations are measured with tracemalloc.
+
+Run from python_sdk/:  python -m benchmarks.bench_agent_memory
+"""
+import gc
+import logging
+import tracemalloc
+
+import numpy as np
+
+from coin_ai.agent import AgentPool, CoinCharacterAgent
+from coin_ai.population import CoinPopulation
+
+
+def bytes_per_agent(build, n):
+    gc.collect()
+    tracemalloc.start()
+    names = [f"Coin {i}" for i in range(n)]
+    baseline = tracemalloc.get_traced_memory()[0]
+    agents = build(names)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del agents
+    return used / n
+
+
+def build_agents(names):
+    return [CoinCharacterAgent(name) for name in names]
+
+
+def build_pool(names):
+    pool = AgentPool(max_agents=len(names))
+    for name in names:
+        pool.get(name)
+    return pool
+
+
+def build_population(names):
+    rng = np.random.default_rng(0)
+    n = len(names)
+    return CoinPopulation(names, rng.integers(0, 4, n), *(rng.integers(1, 11, n) for _ in range(3)))
+
+
+def main(n=100000):
+    logging.disable(logging.CRITICAL)
+    results = {
+        'CoinCharacterAgent': bytes_per_agent(build_agents, n),
+        'CompactCoinAgent (pooled)': bytes_per_agent(build_pool, n),
+        'CoinPopulation': bytes_per_agent(build_population, n),
+    }
+    for name, size in results.items():
+        print(f"{name:28s} {size:8.1f} bytes/agent at {n:,} agents")
+    return results
+
+
+if __name__ == '__main__':
+    main()
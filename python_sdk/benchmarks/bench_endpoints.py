@@ -0,0 +1,421 @@
+"""
+Load test: drive the /spawn (ASGI) and /spawn_coin (Flask) endpoints at
+several concurrency levels, either in-process (test clients, no sockets) or
+over HTTP against a server started in a subprocess.
+
+The behavior model is a small random-weight .npz network, the Web3 provider
+is the local JSON-RPC stub from tests/rpc_stub.py (every wallet holds tokens)
+and spawns go to a throwaway SQLite store, so runs need no network and are
+comparable across commits. Each run reports p50/p95/p99 latency, requests/sec
+and the RSS of the serving process; results are written as JSON.
+
+Run from python_sdk/:
+    python -m benchmarks.bench_endpoints [--mode inprocess|http|both]
+        [--endpoint spawn --endpoint spawn_coin] [--concurrency 1,8,32]
+        [--requests 2000] [--output results.json] [--compare baseline.json]
+
+Closed loop: each of the `concurrency` clients sends its next request as soon
+as the previous one is answered. The clients share the CPU with the server in
+both modes, so compare runs made on the same machine.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from tests.rpc_stub import JsonRpcStub
+
+# Served apps check their AI provider at startup; benchmarks never call a real one
+os.environ.setdefault('AI_PROVIDER', 'stub')
+
+SDK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(SDK_ROOT, 'benchmarks', 'results')
+
+ENDPOINTS = {
+    # name: (path, server that serves it)
+    'spawn': ('/spawn', 'asgi'),
+    'spawn_coin': ('/spawn_coin', 'flask'),
+}
+MOODS = ['happy', 'sad', 'angry', 'excited']
+WALLETS = 1000  # Distinct wallets, so the balance cache sees misses as well as hits
+WORLDS = 50  # Spawns are spread over worlds so placement does not slow down as one world fills
+PAYLOADS = 1024  # Request bodies are encoded up front and reused in a ring
+STUB_BALANCE = 5 * 10 ** 18
+STUB_TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'  # The controller's placeholder address is not valid
+
+
+def spawn_payload(i):
+    return {'coin_features': {'coin_name': f'Coin{i % 500}', 'attributes': {
+        'mood': MOODS[i % 4], 'strength': i % 10 + 1, 'speed': (i * 7) % 10 + 1, 'intelligence': (i * 3) % 10 + 1,
+    }}}
+
+
+def spawn_coin_payload(i):
+    return {
+        'wallet_address': '0x' + format(i % WALLETS + 1, '040x'),
+        'behavior': [[0.7, 0.2, 0.1]] if i % 2 else [[0.3, 0.5, 0.2]],
+        'speed': i % 10,
+        'size': ['small', 'medium', 'large'][i % 3],
+        'world': f'bench-{i % WORLDS}',
+    }
+
+
+PAYLOAD_BUILDERS = {'spawn': spawn_payload, 'spawn_coin': spawn_coin_payload}
+
+
+def encode_payloads(endpoint):
+    return [json.dumps(PAYLOAD_BUILDERS[endpoint](i)).encode() for i in range(PAYLOADS)]
+
+
+def write_stub_model(path, seed=0):
+    """Write a random-weight 4 -> 16 -> 3 behavior network in the NumPy engine format."""
+    from coin_ai.numpy_engine import save_npz
+    rng = np.random.default_rng(seed)
+    save_npz(path, [rng.normal(size=(4, 16)), rng.normal(size=(16, 3))],
+             [np.zeros(16), np.zeros(3)], ['relu', 'softmax'])
+    return path
+
+
+@contextmanager
+def local_backend(tmpdir):
+    """
+    Serve the behavior model, the Web3 provider, the spawn store and the event
+    feed from local stand-ins for the duration of the block, then restore the
+    process-wide instances. Rate limits are lifted (every client looks like one game server
+    hammering a few wallets); stage concurrency limits stay in place. Yields
+    the path of the stub model.
+    """
+    import server.asgi
+    import server.controllers.spawn_controller as spawn_controller
+    import utils.admission as admission
+    import utils.event_feed as event_feed
+    import utils.spawn_store as spawn_store
+    import utils.web3_validator as web3_validator
+    from coin_ai.registry import default_registry
+
+    stub = JsonRpcStub().__enter__()
+    stub.methods['eth_call'] = lambda params: '0x' + format(STUB_BALANCE, '064x')
+    model_path = write_stub_model(os.path.join(tmpdir, 'behavior.npz'))
+    default_registry.preload([model_path])
+
+    saved = (server.asgi.MODEL_PATH, spawn_controller.TOKEN_CONTRACT_ADDRESS,
+             web3_validator._connection_manager, spawn_store._spawn_store, event_feed._event_feed)
+    rates = (admission.wallet_limiter.rate, admission.game_server_limiter.rate)
+    admission.wallet_limiter.rate = admission.game_server_limiter.rate = 0
+    server.asgi.MODEL_PATH = model_path
+    spawn_controller.TOKEN_CONTRACT_ADDRESS = STUB_TOKEN
+    web3_validator._connection_manager = web3_validator.Web3ConnectionManager([stub.url])
+    spawn_store._spawn_store = spawn_store.SpawnStore(os.path.join(tmpdir, 'spawns.sqlite3'))
+    event_feed._event_feed = event_feed.EventFeed(os.path.join(tmpdir, 'events.sqlite3'))
+    web3_validator.balance_cache.clear()
+    try:
+        yield model_path
+    finally:
+        web3_validator._connection_manager.stop()
+        spawn_store._spawn_store.flush()
+        (server.asgi.MODEL_PATH, spawn_controller.TOKEN_CONTRACT_ADDRESS,
+         web3_validator._connection_manager, spawn_store._spawn_store, event_feed._event_feed) = saved
+        admission.wallet_limiter.rate, admission.game_server_limiter.rate = rates
+        web3_validator.balance_cache.clear()
+        stub.__exit__(None, None, None)
+
+
+def rss_mb(pid='self'):
+    """(current, peak) resident set size of a process in MB."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0.0, 0.0, 0.0)
+    counts = {}
+    for status in statuses:
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    return {
+        'requests': len(latencies),
+        'errors': sum(n for status, n in counts.items() if not status.startswith('2')),
+        'status_counts': counts,
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+            'mean': float(latencies_ms.mean()) if len(latencies_ms) else 0.0,
+            'max': float(latencies_ms.max()) if len(latencies_ms) else 0.0,
+        },
+    }
+
+
+def closed_loop(make_sender, concurrency, total):
+    """
+    Run `total` requests from `concurrency` threads. make_sender() is called
+    once per thread and returns send(i) -> status code. Returns (latencies, statuses, elapsed).
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, statuses = [], []
+
+    def client():
+        send = make_sender()
+        mine, codes = [], []
+        while True:
+            with lock:
+                i = next(counter)
+            if i >= total:
+                break
+            start = time.perf_counter()
+            try:
+                status = send(i)
+            except Exception as e:
+                status = type(e).__name__
+            mine.append(time.perf_counter() - start)
+            codes.append(status)
+        with lock:
+            latencies.extend(mine)
+            statuses.extend(codes)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def closed_loop_async(send, concurrency, total):
+    """closed_loop for an async send(i) on one event loop."""
+    counter = itertools.count()
+    latencies, statuses = [], []
+
+    async def client():
+        while True:
+            i = next(counter)
+            if i >= total:
+                break
+            start = time.perf_counter()
+            try:
+                status = await send(i)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def run_inprocess(endpoint, concurrency, total, warmup):
+    """Drive an endpoint through its framework's test client, without sockets."""
+    path, server = ENDPOINTS[endpoint]
+    bodies = encode_payloads(endpoint)
+    headers = {'Content-Type': 'application/json'}
+
+    if server == 'flask':
+        from server.controllers.spawn_controller import app
+
+        def make_sender():
+            client = app.test_client()
+            return lambda i: client.post(path, data=bodies[i % PAYLOADS], headers=headers).status_code
+
+        closed_loop(make_sender, 1, warmup)
+        result = closed_loop(make_sender, concurrency, total)
+    else:
+        import httpx
+        from server.asgi import app
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+                async def send(i):
+                    return (await client.post(path, content=bodies[i % PAYLOADS], headers=headers)).status_code
+
+                await closed_loop_async(send, 1, warmup)
+                return await closed_loop_async(send, concurrency, total)
+
+        result = asyncio.run(run())
+
+    summary = summarize(*result)
+    summary['rss_mb'], summary['peak_rss_mb'] = rss_mb()
+    return summary
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(server, port):
+    """Serve the ASGI or Flask app on 127.0.0.1:port with the local backend (blocks)."""
+    with tempfile.TemporaryDirectory() as tmpdir, local_backend(tmpdir):
+        if server == 'asgi':
+            import uvicorn
+            from server.asgi import app
+            uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', access_log=False)
+        else:
+            from werkzeug.serving import make_server
+            from server.controllers.spawn_controller import app
+            make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+@contextmanager
+def http_server(server, startup_timeout=60):
+    """Start `serve` in a subprocess and yield (base_url, pid) once it answers."""
+    import requests
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_endpoints', '--serve', server, '--port', str(port)],
+        cwd=SDK_ROOT,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{server} server exited with code {process.returncode}")
+            try:
+                requests.get(base_url + '/', timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{server} server did not start within {startup_timeout}s")
+                time.sleep(0.1)
+        yield base_url, process.pid
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def run_http(endpoint, concurrency, total, warmup, base_url, pid):
+    """Drive an endpoint over keep-alive HTTP connections, one per client thread."""
+    import requests
+    path, _ = ENDPOINTS[endpoint]
+    url = base_url + path
+    bodies = encode_payloads(endpoint)
+    headers = {'Content-Type': 'application/json'}
+
+    def make_sender():
+        session = requests.Session()
+        return lambda i: session.post(url, data=bodies[i % PAYLOADS], headers=headers, timeout=30).status_code
+
+    closed_loop(make_sender, 1, warmup)
+    summary = summarize(*closed_loop(make_sender, concurrency, total))
+    summary['rss_mb'], summary['peak_rss_mb'] = rss_mb(pid)
+    return summary
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SDK_ROOT, capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(modes, endpoints, concurrency_levels, total, warmup):
+    """Run every (mode, endpoint, concurrency) combination. Returns the list of run results."""
+    runs = []
+
+    def record(mode, endpoint, concurrency, summary):
+        summary.update({'mode': mode, 'endpoint': endpoint, 'concurrency': concurrency})
+        runs.append(summary)
+        print(f"{mode:9s} {endpoint:10s} c={concurrency:<4d} {summary['rps']:8.1f} req/s  "
+              f"p50 {summary['latency_ms']['p50']:7.2f}  p95 {summary['latency_ms']['p95']:7.2f}  "
+              f"p99 {summary['latency_ms']['p99']:7.2f} ms  errors {summary['errors']}  "
+              f"RSS {summary['rss_mb']:.0f} MB", flush=True)
+
+    if 'inprocess' in modes:
+        with tempfile.TemporaryDirectory() as tmpdir, local_backend(tmpdir):
+            for endpoint in endpoints:
+                for concurrency in concurrency_levels:
+                    record('inprocess', endpoint, concurrency, run_inprocess(endpoint, concurrency, total, warmup))
+    if 'http' in modes:
+        for endpoint in endpoints:
+            with http_server(ENDPOINTS[endpoint][1]) as (base_url, pid):
+                for concurrency in concurrency_levels:
+                    summary = run_http(endpoint, concurrency, total, warmup, base_url, pid)
+                    record('http', endpoint, concurrency, summary)
+    return runs
+
+
+def compare(runs, baseline_path):
+    """Print the change in requests/sec and p99 latency against a saved results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(run['mode'], run['endpoint'], run['concurrency']): run for run in baseline['runs']}
+    print(f"\nCompared with {baseline.get('commit')} ({baseline_path}):")
+    for run in runs:
+        old = before.get((run['mode'], run['endpoint'], run['concurrency']))
+        if old is None:
+            continue
+        rps_change = (run['rps'] / old['rps'] - 1) * 100 if old['rps'] else float('nan')
+        p99_change = (run['latency_ms']['p99'] / old['latency_ms']['p99'] - 1) * 100 if old['latency_ms']['p99'] else float('nan')
+        print(f"{run['mode']:9s} {run['endpoint']:10s} c={run['concurrency']:<4d} "
+              f"req/s {rps_change:+6.1f}%  p99 {p99_change:+6.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--mode', choices=['inprocess', 'http', 'both'], default='both')
+    parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS),
+                        help='Endpoint to drive (repeatable, default: all)')
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per run')
+    parser.add_argument('--warmup', type=int, default=50, help='Unmeasured requests before each run')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>-<time>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--serve', choices=['asgi', 'flask'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return None
+
+    modes = ['inprocess', 'http'] if args.mode == 'both' else [args.mode]
+    endpoints = args.endpoint or sorted(ENDPOINTS)
+    concurrency_levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    runs = run_benchmarks(modes, endpoints, concurrency_levels, args.requests, args.warmup)
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {'requests': args.requests, 'warmup': args.warmup, 'wallets': WALLETS, 'worlds': WORLDS},
+        'runs': runs,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(runs, args.compare)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: behavior model inference with Keras vs the NumPy engine.
+
+Builds the 4 -> 3 behavior network in Keras, exports it to .npz and compares
+per-prediction latency (single row and batches of 32) and the resident memory
+of a fresh process that loads and serves each model.
+
+Run from python_sdk/:  python -m benchmarks.bench_inference
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SDK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_RSS_PROBE = """
+import json, resource
+import numpy as np
+from coin_ai.registry import load_model_file
+model = load_model_file({path!r})
+model.predict(np.zeros((32, 4), dtype=np.float32), verbose=0)
+try:  # ru_maxrss can carry over the forking parent's peak, so prefer the live RSS
+    rss = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmRSS'))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps(rss / 1024))
+"""
+
+
+def build_models(tmpdir):
+    import tensorflow as tf
+    from coin_ai.numpy_engine import export_weights
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(4,)),
+        tf.keras.layers.Dense(16, activation='relu'),
+        tf.keras.layers.Dense(3, activation='softmax'),
+    ])
+    keras_path = os.path.join(tmpdir, 'behavior.keras')
+    model.save(keras_path)
+    return keras_path, export_weights(keras_path, os.path.join(tmpdir, 'behavior.npz'))
+
+
+def latency(fn, x, number):
+    fn(x)  # Warm up
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(x)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def worker_rss_mb(path):
+    result = subprocess.run([sys.executable, '-c', _RSS_PROBE.format(path=path)],
+                            cwd=SDK_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(number=200):
+    from coin_ai.registry import load_model_file
+    with tempfile.TemporaryDirectory() as tmpdir:
+        keras_path, npz_path = build_models(tmpdir)
+        keras_model, numpy_model = load_model_file(keras_path), load_model_file(npz_path)
+        row = np.random.default_rng(0).uniform(0, 10, size=(1, 4)).astype(np.float32)
+        batch = np.repeat(row, 32, axis=0)
+        results = {
+            'keras predict, 1 row (us)': latency(lambda x: keras_model.predict(x, verbose=0), row, number // 4) * 1e6,
+            'keras __call__, 1 row (us)': latency(lambda x: keras_model(x, training=False), row, number) * 1e6,
+            'numpy, 1 row (us)': latency(numpy_model.predict, row, number * 10) * 1e6,
+            'keras predict, 32 rows (us)': latency(lambda x: keras_model.predict(x, verbose=0), batch, number // 4) * 1e6,
+            'numpy, 32 rows (us)': latency(numpy_model.predict, batch, number * 10) * 1e6,
+            'keras worker RSS (MB)': worker_rss_mb(keras_path),
+            'numpy worker RSS (MB)': worker_rss_mb(npz_path),
+        }
+    for name, value in results.items():
+        print(f"{name:30s} {value:12.1f}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
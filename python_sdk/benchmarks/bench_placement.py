@@ -0,0 +1,56 @@
+"""
+Benchmark: placing 10k coins in one world with uniform random locations versus
+Poisson-disk placement, and nearest-neighbour queries through the spatial
+grid versus a full scan.
+
+Run from python_sdk/:  python -m benchmarks.bench_placement
+"""
+import logging
+import time
+
+import numpy as np
+
+from utils.spatial_index import SpatialGrid, poisson_disk_sample
+
+BOUNDS = (-100, 100, -100, 100)
+
+
+def closest_pair(points):
+    grid = SpatialGrid(cell_size=2)
+    for i, (x, z) in enumerate(points):
+        grid.insert(i, {'x': x, 'y': 0, 'z': z})
+    return min(grid.nearest(x, z, k=2)[1]['distance'] for x, z in points)
+
+
+def main(n=10000, min_separation=1.5, queries=2000):
+    logging.disable(logging.CRITICAL)
+    rng = np.random.default_rng(0)
+
+    start = time.perf_counter()
+    uniform = rng.uniform(-100, 100, (n, 2)).tolist()
+    uniform_time = time.perf_counter() - start
+    start = time.perf_counter()
+    poisson = poisson_disk_sample(n, BOUNDS, min_separation, rng=rng)
+    poisson_time = time.perf_counter() - start
+    print(f"uniform:      {uniform_time * 1000:8.1f} ms for {n:,} coins, closest pair {closest_pair(uniform):.3f}")
+    print(f"poisson-disk: {poisson_time * 1000:8.1f} ms for {len(poisson):,} coins, closest pair {closest_pair(poisson):.3f}")
+
+    grid = SpatialGrid()
+    for i, (x, z) in enumerate(poisson):
+        grid.insert(i, {'x': x, 'y': 0, 'z': z})
+    points = np.asarray(poisson)
+    targets = rng.uniform(-100, 100, (queries, 2)).tolist()
+    start = time.perf_counter()
+    for x, z in targets:
+        grid.nearest(x, z, k=5)
+    grid_time = (time.perf_counter() - start) / queries
+    start = time.perf_counter()
+    for x, z in targets:
+        np.argpartition(np.hypot(points[:, 0] - x, points[:, 1] - z), 5)[:5]
+    scan_time = (time.perf_counter() - start) / queries
+    print(f"nearest k=5:  grid {grid_time * 1e6:8.1f} us, full scan {scan_time * 1e6:8.1f} us")
+    return {'uniform': uniform_time, 'poisson': poisson_time, 'nearest_grid': grid_time, 'nearest_scan': scan_time}
+
+
+if __name__ == '__main__':
+    main()
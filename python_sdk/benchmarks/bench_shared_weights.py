@@ -0,0 +1,112 @@
+"""
+Benchmark: per-worker memory of the model weights with preload-then-fork,
+for per-process loading (load_model_file) versus memory-mapped shared
+weights (SharedWeightsLoader).
+
+The parent loads a ~17 MB behavior network and forks the workers, which
+serve predictions and then hot-reload a newly published version of the
+model. Memory private to each worker (Private_Clean + Private_Dirty from
+/proc/<pid>/smaps_rollup) is reported after the fork and after the reload,
+measured once every worker has reached that point (a mapped page only
+counts as shared once a second process maps it).
+
+Run from python_sdk/:  python -m benchmarks.bench_shared_weights [workers]
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from coin_ai.numpy_engine import save_npz
+from coin_ai.registry import ModelRegistry, load_model_file
+from coin_ai.shared_weights import SharedWeightsLoader, publish_model
+
+HIDDEN = 2048
+
+
+def write_model(path, seed):
+    rng = np.random.default_rng(seed)
+    save_npz(path, [rng.normal(size=(4, HIDDEN)), rng.normal(size=(HIDDEN, HIDDEN)), rng.normal(size=(HIDDEN, 3))],
+             [np.zeros(HIDDEN), np.zeros(HIDDEN), np.zeros(3)], ['relu', 'relu', 'softmax'])
+    return path
+
+
+def private_mb():
+    """Memory mapped by this process only, in MB (None where smaps_rollup is unavailable)."""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {line.split(':')[0]: line.split()[1] for line in f if ':' in line}
+    except OSError:
+        return None
+    return (int(fields['Private_Clean']) + int(fields['Private_Dirty'])) / 1024
+
+
+def worker(registry, model_path, barrier, published, reports):
+    x = np.ones((32, 4), dtype=np.float32)
+    registry.get(model_path).predict(x)
+    barrier.wait()
+    reports.put(('after_fork', private_mb()))
+    published.wait()
+    registry.get(model_path).predict(x)
+    barrier.wait()
+    reports.put(('after_reload', private_mb()))
+
+
+def run(loader, workers, tmpdir):
+    model_path = write_model(os.path.join(tmpdir, 'behavior.npz'), seed=0)
+    new_model = write_model(os.path.join(tmpdir, 'behavior_v2.npz'), seed=1)
+    registry = ModelRegistry(loader=loader, check_interval=0, table_builder=None)
+    registry.get(model_path).predict(np.ones((1, 4), dtype=np.float32))
+
+    context = multiprocessing.get_context('fork')
+    barrier, published, reports = context.Barrier(workers), context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(registry, model_path, barrier, published, reports))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    results = {'after_fork': [], 'after_reload': []}
+    for _ in range(workers):
+        stage, value = reports.get()
+        results[stage].append(value)
+    if isinstance(loader, SharedWeightsLoader):
+        publish_model(new_model, model_path, loader)
+    else:
+        os.replace(new_model, model_path)
+    published.set()
+    for _ in range(workers):
+        stage, value = reports.get()
+        results[stage].append(value)
+    for process in processes:
+        process.join()
+    return results['after_fork'], results['after_reload']
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else float('nan')
+
+
+def main(workers=4):
+    logging.disable(logging.CRITICAL)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, 'per-process'))
+        os.makedirs(os.path.join(tmpdir, 'shared'))
+        loaders = {
+            'per-process': load_model_file,
+            'shared': SharedWeightsLoader(os.path.join(tmpdir, 'shared', 'weights')),
+        }
+        for name, loader in loaders.items():
+            after_fork, after_reload = run(loader, workers, os.path.join(tmpdir, name))
+            results[name] = {'after_fork_mb': mean(after_fork), 'after_reload_mb': mean(after_reload)}
+            print(f"{name:12s} private memory per worker: after fork {results[name]['after_fork_mb']:7.1f} MB, "
+                  f"after hot reload {results[name]['after_reload_mb']:7.1f} MB ({workers} workers)")
+    return results
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,147 @@
+"""
+Benchmark: spawn write throughput into SQLite (WAL) with one commit per spawn
+versus the SpawnStore group commit, from several concurrent writer threads;
+and region query latency on a store of --region-rows spawns spread over a
+200 x 200 world, against sorting every match of the region.
+
+Run from python_sdk/:  python -m benchmarks.bench_spawn_store [--region-rows 10000000]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from utils.spatial_index import DEFAULT_WORLD
+from utils.spawn_store import INSERT_SPAWN, SpawnStore
+
+WALLET = '0x5aaeb6053f3e94c9b9a09f33669435e7ef1beaed'
+ATTRIBUTES = {'speed': 7, 'size': 'medium', 'strength': 55, 'color': 'gold', 'rarity': 'common'}
+LOCATION = {'x': 12.5, 'y': 0, 'z': -40.0}
+
+
+def run_threads(target, threads):
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def per_row_commits(path, n, threads):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    SpawnStore._create_schema(conn)
+    conn.close()
+    counter = iter(range(1, n + 1))
+    lock = threading.Lock()
+
+    def write():
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        while True:
+            with lock:
+                character_id = next(counter, None)
+            if character_id is None:
+                break
+            conn.execute(
+                INSERT_SPAWN,
+                (character_id, WALLET, time.time(), LOCATION['x'], LOCATION['y'], LOCATION['z'], json.dumps(ATTRIBUTES),
+                 DEFAULT_WORLD),
+            )
+        conn.close()
+
+    return n / run_threads(write, threads)
+
+
+def group_commit(path, n, threads):
+    store = SpawnStore(path)
+    per_thread = n // threads
+
+    def write():
+        for _ in range(per_thread):
+            store.add(WALLET, ATTRIBUTES, LOCATION)
+
+    start = time.perf_counter()
+    accepted = run_threads(write, threads)
+    store.flush()
+    committed = time.perf_counter() - start
+    total = per_thread * threads
+    return total / accepted, total / committed, store.stats()
+
+
+# The region query before it walked ID windows: every match is read and sorted
+SORT_ALL_MATCHES = (
+    'SELECT s.* FROM spawn_positions r JOIN spawns s ON s.character_id = r.character_id '
+    'WHERE r.max_x >= :min_x AND r.min_x <= :max_x AND r.max_z >= :min_z AND r.min_z <= :max_z '
+    'AND s.x BETWEEN :min_x AND :max_x AND s.z BETWEEN :min_z AND :max_z '
+    'ORDER BY s.character_id DESC LIMIT :limit'
+)
+REGIONS = {'5x5': (0, 5, 0, 5), '50x50': (-25, 25, -25, 25), '200x200 (world)': (-100, 100, -100, 100)}
+
+
+def bulk_load(store, rows, chunk=100000):
+    """Insert `rows` spawns at random (x, z) straight into the tables, bypassing the write queue."""
+    rng = random.Random(0)
+    conn = store._writer_conn
+    for start in range(1, rows + 1, chunk):
+        batch = [(i, WALLET, 1e9 + i, rng.uniform(-100, 100), 0.0, rng.uniform(-100, 100), '{}', DEFAULT_WORLD)
+                 for i in range(start, min(start + chunk, rows + 1))]
+        conn.execute('BEGIN')
+        conn.executemany(INSERT_SPAWN, batch)
+        conn.executemany('INSERT INTO spawn_positions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         [(row[0], row[3], row[3], row[5], row[5], row[0], row[0]) for row in batch])
+        conn.execute('COMMIT')
+
+
+def best_of(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def region_queries(path, rows, limit=100):
+    store = SpawnStore(path)
+    start = time.perf_counter()
+    bulk_load(store, rows)
+    print(f"loaded {rows:,} spawns in {time.perf_counter() - start:.0f} s")
+    results = {}
+    for name, (min_x, max_x, min_z, max_z) in REGIONS.items():
+        params = {'min_x': min_x, 'max_x': max_x, 'min_z': min_z, 'max_z': max_z, 'limit': limit}
+        page = store.in_region(min_x, max_x, min_z, max_z, limit=limit)
+        windowed = best_of(lambda: store.in_region(min_x, max_x, min_z, max_z, limit=limit))
+        deep = best_of(lambda: store.in_region(min_x, max_x, min_z, max_z, limit=limit,
+                                               before_id=page[-1]['character_id'] - rows // 2))
+        sort_all = best_of(lambda: store._reader().execute(SORT_ALL_MATCHES, params).fetchall(), repeat=2)
+        results[name] = {'windowed': windowed, 'windowed_mid_store': deep, 'sort_all_matches': sort_all}
+        print(f"in_region {name:16} limit {limit}: {windowed * 1000:8.2f} ms  "
+              f"(page from the middle of the store {deep * 1000:.2f} ms, sorting every match {sort_all * 1000:.0f} ms)")
+    return results
+
+
+def main(n=20000, threads=8, region_rows=1000000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        baseline = per_row_commits(os.path.join(tmpdir, 'per_row.sqlite3'), n, threads)
+        grouped, durable, stats = group_commit(os.path.join(tmpdir, 'grouped.sqlite3'), n, threads)
+        print(f"per-row commits:  {baseline:10,.0f} spawns/s")
+        print(f"group commit:     {grouped:10,.0f} spawns/s accepted, {durable:,.0f} spawns/s committed "
+              f"({stats['rows_per_commit']:.0f} rows/commit)")
+        regions = region_queries(os.path.join(tmpdir, 'regions.sqlite3'), region_rows) if region_rows else None
+    return {'per_row': baseline, 'group_commit': durable, 'regions': regions}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--spawns', type=int, default=20000, help='Spawns written per write benchmark')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--region-rows', type=int, default=1000000, help='Store size for region queries (0 skips)')
+    args = parser.parse_args()
+    main(args.spawns, args.threads, args.region_rows)
@@ -0,0 +1,77 @@
+"""
+Benchmark: worker cold start. Imports each server entry point in a fresh
+interpreter under `python -X importtime` and reports wall time, resident memory,
+the slowest top-level packages and whether any heavy dependency was pulled in.
+
+Run from python_sdk/:  python -m benchmarks.bench_startup [--json]
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+from utils.lazy_imports import HEAVY_MODULES
+
+ENTRY_POINTS = ['server.asgi', 'server.controllers.spawn_controller', 'coin_ai.agent']
+SDK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+try:  # ru_maxrss can carry over the forking parent's peak, so prefer the live RSS
+    rss = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmRSS'))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'seconds': elapsed,
+    'rss_mb': rss / 1024,
+    'heavy_imported': [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)$')
+
+
+def parse_importtime(stderr):
+    """Self-time microseconds per top-level package from -X importtime output."""
+    totals = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            package = match.group(3).split('.')[0]
+            totals[package] = totals.get(package, 0) + int(match.group(1))
+    return totals
+
+
+def measure_startup(module, env=None):
+    """Import `module` in a fresh interpreter and return its start-up profile."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=SDK_ROOT, env={**os.environ, **(env or {})}, capture_output=True, text=True, check=True,
+    )
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    packages = parse_importtime(result.stderr)
+    profile['module'] = module
+    profile['slowest_packages_ms'] = {
+        name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:10]
+    }
+    return profile
+
+
+def main(as_json=False):
+    results = [measure_startup(module) for module in ENTRY_POINTS]
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return results
+    for profile in results:
+        print(f"{profile['module']:40s} {profile['seconds']:6.2f} s  {profile['rss_mb']:7.1f} MB  "
+              f"heavy: {', '.join(profile['heavy_imported']) or 'none'}")
+        for name, ms in list(profile['slowest_packages_ms'].items())[:5]:
+            print(f"    {name:36s} {ms:8.1f} ms")
+    return results
+
+
+if __name__ == '__main__':
+    main(as_json='--json' in sys.argv)
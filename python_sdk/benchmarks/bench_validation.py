@@ -0,0 +1,128 @@
+"""
+Benchmark: request validation throughput on 10k realistic payloads, comparing
+the previous hand-rolled checks (json.loads + dict walks) with the compiled
+pydantic schemas in utils/schemas.py.
+
+Run from python_sdk/:  python -m benchmarks.bench_validation
+"""
+import json
+import random
+import time
+
+from web3 import Web3
+from utils.schemas import CoinFeaturesRequest, SpawnCoinRequest
+
+WALLETS = [
+    '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed',
+    '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359',
+    '0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB',
+    '0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb',
+]
+
+
+def spawn_payloads(n, seed=7):
+    """Mostly valid /spawn_coin bodies with ~20% bad wallets or out-of-range attributes."""
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(n):
+        body = {'wallet_address': rng.choice(WALLETS), 'behavior': [[rng.random(), rng.random()]]}
+        if rng.random() < 0.7:
+            body['speed'] = rng.uniform(0, 10)
+        if rng.random() < 0.5:
+            body['size'] = rng.choice(['small', 'medium', 'large'])
+        if rng.random() < 0.5:
+            body['strength'] = rng.randint(0, 100)
+        roll = rng.random()
+        if roll < 0.05:
+            body['wallet_address'] = '0x123abc456def'
+        elif roll < 0.10:
+            body['speed'] = 15
+        elif roll < 0.15:
+            body['size'] = 'huge'
+        elif roll < 0.20:
+            body['strength'] = -10
+        payloads.append(json.dumps(body).encode())
+    return payloads
+
+
+def coin_feature_payloads(n, seed=11):
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(n):
+        features = {
+            'name': f"Coin {i}",
+            'appearance': {'color': rng.choice(['gold', 'silver', 'bronze']), 'size': 'medium'},
+            'behavior': {'movement': 'float', 'interactions': 'bouncy'},
+        }
+        if rng.random() < 0.1:
+            features['appearance'] = 'invalid_format'
+        payloads.append(json.dumps({'coin_features': features}).encode())
+    return payloads
+
+
+def legacy_spawn_validation(raw):
+    """The checks spawn_coin_character used to run inline."""
+    data = json.loads(raw)
+    wallet_address = data.get('wallet_address')
+    speed = data.get('speed')
+    size = data.get('size')
+    strength = data.get('strength')
+    if not Web3.is_address(wallet_address):
+        return False
+    if speed is not None and (speed < 0 or speed > 10):
+        return False
+    if size is not None and size not in ['small', 'medium', 'large']:
+        return False
+    if strength is not None and (strength < 0 or strength > 100):
+        return False
+    return True
+
+
+def legacy_coin_features_validation(raw):
+    """The previous validate_request_data / validate_coin_features dict walk."""
+    data = json.loads(raw)
+    if 'coin_features' not in data:
+        return False
+    coin_features = data['coin_features']
+    if not isinstance(coin_features, dict):
+        return False
+    for field in ['name', 'appearance', 'behavior']:
+        if field not in coin_features:
+            return False
+    if not isinstance(coin_features['name'], str) or not coin_features['name'].strip():
+        return False
+    if not isinstance(coin_features['appearance'], dict):
+        return False
+    if not isinstance(coin_features['behavior'], dict):
+        return False
+    return True
+
+
+def throughput(fn, payloads, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for raw in payloads:
+            fn(raw)
+        best = min(best, time.perf_counter() - start)
+    return len(payloads) / best
+
+
+def main(n=10000):
+    results = {}
+    spawn = spawn_payloads(n)
+    features = coin_feature_payloads(n)
+    cases = [
+        ('spawn_coin legacy', legacy_spawn_validation, spawn),
+        ('spawn_coin schema', SpawnCoinRequest.parse_json, spawn),
+        ('coin_features legacy', legacy_coin_features_validation, features),
+        ('coin_features schema', CoinFeaturesRequest.parse_json, features),
+    ]
+    for name, fn, payloads in cases:
+        results[name] = throughput(fn, payloads)
+        print(f"{name:24s} {results[name]:>12,.0f} payloads/s")
+    return results
+
+
+if __name__ == '__main__':
+    main()
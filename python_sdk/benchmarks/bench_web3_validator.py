@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: one wallet's balance check against the local JSON-RPC stub
+from tests/rpc_stub.py, done the old way (Web3 address check, ABI parsing and
+a contract call) and with get_token_balance (offline validation and one raw
+eth_call over the pooled session). Reports the time and the HTTP requests
+per check.
+
+Run from python_sdk/:  python -m benchmarks.bench_web3_validator
+"""
+import json
+import timeit
+
+from web3 import Web3
+from tests.rpc_stub import JsonRpcStub
+from utils.web3_validator import Web3ConnectionManager, get_token_balance, validate_wallet_address
+
+WALLET = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+ABI_JSON = (
+    '[{"constant":true,"inputs":[{"name":"","type":"address"}],'
+    '"name":"balanceOf","outputs":[{"name":"","type":"uint256"}],'
+    '"payable":false,"stateMutability":"view","type":"function"}]'
+)
+
+
+def legacy_check(w3):
+    """What every spawn used to do: validate with Web3, parse the ABI, build the contract and call it."""
+    w3.is_address(WALLET)
+    contract = w3.eth.contract(address=TOKEN, abi=json.loads(ABI_JSON))
+    return contract.functions.balanceOf(Web3.to_checksum_address(WALLET)).call() / 10 ** 18
+
+
+def current_check(w3):
+    """The same check as the spawn routes make it now."""
+    validate_wallet_address(None, WALLET)
+    return get_token_balance(w3, WALLET, TOKEN)
+
+
+def measure(fn, w3, stub, number):
+    fn(w3)  # Warm caches and connections
+    stub.http_requests = 0
+    seconds = min(timeit.repeat(lambda: fn(w3), number=number, repeat=5)) / number
+    return seconds, stub.http_requests / (5 * number)
+
+
+def main(number=200):
+    with JsonRpcStub() as stub:
+        stub.methods['eth_call'] = lambda params: '0x' + f"{5 * 10 ** 18:064x}"
+        manager = Web3ConnectionManager([stub.url], health_check_interval=3600)
+        legacy = Web3(Web3.HTTPProvider(stub.url))
+        before, before_requests = measure(legacy_check, legacy, stub, number)
+        after, after_requests = measure(current_check, manager.endpoints[0].w3, stub, number)
+    print(f"legacy balance check:  {before * 1e6:8.1f} us  {before_requests:.0f} HTTP requests")
+    print(f"current balance check: {after * 1e6:8.1f} us  {after_requests:.0f} HTTP requests")
+    print(f"speedup:               {before / after:8.1f}x")
+    return {'before_us': before * 1e6, 'after_us': after * 1e6,
+            'before_requests': before_requests, 'after_requests': after_requests}
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,83 @@
+import asyncio
 import random
 import logging
-import tensorflow as tf  # Example using TensorFlow; change this if using another ML library
-from time import sleep
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config.settings import AGENT_POOLING, AGENT_POOL_SIZE, AGENT_THINK_TIME, INFERENCE_BATCHING
+from coin_ai.batching import get_batcher
+from coin_ai.registry import default_registry
+from utils.admission import Overloaded, inference_limiter
+
+logger = logging.getLogger(__name__)
+
+MOODS = ["happy", "sad", "angry", "excited"]
+ACTIONS = ["dance", "hide", "run"]
+
+# Enumerated mood codes (indices into MOODS, also the model's mood feature)
+MOOD_CODES = {mood: code for code, mood in enumerate(MOODS)}
+
+# Position of the numeric attributes in the model input row
+FEATURE_INDEX = {"strength": 0, "speed": 1, "intelligence": 2}
+
+# Rule-based behavior (CoinCharacterAgent.decide_behavior) by mood code:
+# happy -> dance, sad -> hide, anything else -> run
+MOOD_TO_ACTION = np.array(
+    [ACTIONS.index({"happy": "dance", "sad": "hide"}.get(mood, "run")) for mood in MOODS],
+    dtype=np.int8,
+)
+
+
+def lookup_action(registry, model_path, features):
+    """Precomputed action for in-range integer features, or None to run the model."""
+    table = registry.get_table(model_path)
+    return table.lookup(features) if table is not None else None
 
 
 # Example of a simple AI logic class
 class CoinCharacterAgent:
-    def __init__(self, coin_name, model_path=None):
+    def __init__(self, coin_name, model_path=None, registry=None):
         self.coin_name = coin_name
         self.model_path = model_path
+        self.registry = registry or default_registry
         self.model = None
+
+        # Shared module logger; handlers are configured once by utils.logger.setup_logging
+        self.logger = logger
+
         if model_path:
             self.load_model()  # Load the model if provided
         self.attributes = self.initialize_attributes()
 
-        # Logger setup
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        ch = logging.StreamHandler()
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        ch.setFormatter(formatter)
-        self.logger.addHandler(ch)
-
     def initialize_attributes(self):
         """Initialize the attributes of the coin character."""
         attributes = {
-            "mood": random.choice(["happy", "sad", "angry", "excited"]),
+            "mood": random.choice(MOODS),
             "strength": random.randint(1, 10),
             "speed": random.randint(1, 10),
             "intelligence": random.randint(1, 10),
         }
-        self.logger.info(f"Initialized attributes for {self.coin_name}: {attributes}")
+        self.logger.debug("Initialized attributes for %s: %s", self.coin_name, attributes)
         return attributes
 
     def load_model(self):
-        """Load the model from the specified path."""
+        """Fetch the model for the specified path from the shared registry."""
         try:
-            self.model = tf.keras.models.load_model(self.model_path)
-            self.logger.info(f"Model loaded successfully from {self.model_path}")
+            self.model = self.registry.get(self.model_path)
         except Exception as e:
-            self.logger.error(f"Error loading model: {str(e)}")
+            self.logger.error("Error loading model: %s", e)
+
+    def model_features(self, attributes):
+        """Build the model input row: [strength, speed, intelligence, mood_index]."""
+        mood_index = MOODS.index(attributes["mood"])
+        return [
+            attributes["strength"],
+            attributes["speed"],
+            attributes["intelligence"],
+            mood_index,
+        ]
 
     def predict_behavior(self, attributes):
         """Use the model to predict behavior based on the attributes."""
@@ -49,26 +85,19 @@ class CoinCharacterAgent:
             self.logger.warning("Model not loaded. Using default behavior.")
             return self.decide_behavior()
 
-        # Preprocess the attributes as needed for the model
-        # Assuming the model takes in a list of values:
-        # [strength, speed, intelligence, mood_index]
-        mood_index = ["happy", "sad", "angry", "excited"].index(
-            attributes["mood"]
-        )
-        input_features = [
-            attributes["strength"],
-            attributes["speed"],
-            attributes["intelligence"],
-            mood_index,
-        ]
-        input_features = tf.convert_to_tensor([input_features])
+        input_features = self.model_features(attributes)
 
-        # Predict behavior
-        prediction = self.model.predict(input_features)
-        action_index = tf.argmax(prediction, axis=1).numpy()[0]
+        # Discrete inputs come from the table precomputed at model load
+        action_index = lookup_action(self.registry, self.model_path, input_features) if self.model_path else None
 
-        actions = ["dance", "hide", "run"]
-        return self.perform_action(actions[action_index])
+        # Otherwise predict, sharing one forward pass with concurrent requests
+        if action_index is None and INFERENCE_BATCHING and self.model_path:
+            action_index = get_batcher(self.registry, self.model_path).predict(input_features)
+        elif action_index is None:
+            prediction = self.model.predict(np.asarray([input_features], dtype=np.float32), verbose=0)
+            action_index = int(np.argmax(prediction, axis=1)[0])
+
+        return self.perform_action(ACTIONS[action_index])
 
     def decide_behavior(self):
         """Determine the behavior based on AI logic."""
@@ -93,26 +122,298 @@ class CoinCharacterAgent:
             )
         return f"{self.coin_name} is standing still."
 
-    def get_behavior(self):
-        """Simulate getting the coin character's behavior."""
-        self.logger.info(f"{self.coin_name} is deciding on its behavior...")
-        sleep(2)  # Simulate some processing time
+    def resolve_behavior(self):
+        """Decide the coin character's behavior without any simulated delay."""
+        self.logger.debug("%s is deciding on its behavior...", self.coin_name)
         behavior = self.predict_behavior(self.attributes)
-        self.logger.info(f"Behavior decided for {self.coin_name}: {behavior}")
+        self.logger.debug("Behavior decided for %s: %s", self.coin_name, behavior)
+        return behavior
+
+    async def get_behavior(self, think_time=None):
+        """
+        Simulate getting the coin character's behavior.
+        The "thinking" delay is awaited so the event loop keeps serving other
+        spawns, and model inference is awaited on the shared batcher.
+        """
+        think_time = AGENT_THINK_TIME if think_time is None else think_time
+        self.logger.debug("%s is deciding on its behavior...", self.coin_name)
+        if think_time > 0:
+            await asyncio.sleep(think_time)  # Simulate some processing time
+        action_index = None
+        if self.model is not None and self.model_path:
+            action_index = lookup_action(self.registry, self.model_path, self.model_features(self.attributes))
+        if action_index is not None:
+            behavior = self.perform_action(ACTIONS[action_index])
+        elif self.model is not None and INFERENCE_BATCHING and self.model_path:
+            future = get_batcher(self.registry, self.model_path).submit(
+                self.model_features(self.attributes)
+            )
+            behavior = self.perform_action(ACTIONS[await asyncio.wrap_future(future)])
+        elif self.model is not None:
+            behavior = await asyncio.to_thread(self.predict_behavior, self.attributes)
+        else:
+            behavior = self.predict_behavior(self.attributes)
+        self.logger.debug("Behavior decided for %s: %s", self.coin_name, behavior)
         return behavior
 
     def update_attributes(self, new_attributes):
         """Update the attributes of the coin character."""
         self.attributes.update(new_attributes)
-        self.logger.info(
-            f"Updated attributes for {self.coin_name}: {self.attributes}"
+        self.logger.debug(
+            "Updated attributes for %s: %s", self.coin_name, self.attributes
         )
 
 
+def describe_action(coin_name, action_type, speed, intelligence):
+    """The text CoinCharacterAgent.perform_action returns for an action."""
+    if action_type == "dance":
+        return f"{coin_name} is dancing with speed {speed}!"
+    if action_type == "hide":
+        return f"{coin_name} is hiding with stealth {intelligence}!"
+    if action_type == "run":
+        return f"{coin_name} is running at speed {speed}!"
+    return f"{coin_name} is standing still."
+
+
+class CompactCoinAgent:
+    """
+    Slotted coin character for long-lived in-memory state.
+
+    Holds no __dict__, attribute dict, model or logger reference: the mood is
+    an enumerated code, the numeric attributes are plain slots, and the model
+    is looked up in the registry by path when a behavior is resolved.
+    Behaviors match CoinCharacterAgent for the same attributes.
+    """
+
+    __slots__ = ("coin_name", "model_path", "mood", "strength", "speed", "intelligence", "extra")
+
+    def __init__(self, coin_name, model_path=None, mood=None, strength=None, speed=None, intelligence=None):
+        self.coin_name = coin_name
+        self.model_path = model_path
+        self.mood = random.randrange(len(MOODS)) if mood is None else mood
+        self.strength = random.randint(1, 10) if strength is None else strength
+        self.speed = random.randint(1, 10) if speed is None else speed
+        self.intelligence = random.randint(1, 10) if intelligence is None else intelligence
+        self.extra = None  # Attributes outside the model's inputs, rarely set
+
+    @property
+    def attributes(self):
+        attributes = {
+            "mood": MOODS[self.mood],
+            "strength": self.strength,
+            "speed": self.speed,
+            "intelligence": self.intelligence,
+        }
+        if self.extra:
+            attributes.update(self.extra)
+        return attributes
+
+    def update_attributes(self, new_attributes):
+        """Update the attributes of the coin character."""
+        for name, value in new_attributes.items():
+            if name == "mood":
+                if value not in MOOD_CODES:
+                    raise ValueError(f"Unknown mood: {value}")
+                self.mood = MOOD_CODES[value]
+            elif name in ("strength", "speed", "intelligence"):
+                setattr(self, name, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[name] = value
+
+    def model_features(self, new_attributes=None):
+        """
+        Model input row: [strength, speed, intelligence, mood_index], with
+        `new_attributes` applied to this row only. The agent is not modified,
+        so a pooled agent serving concurrent requests never mixes their attributes.
+        """
+        features = [self.strength, self.speed, self.intelligence, self.mood]
+        for name, value in (new_attributes or {}).items():
+            if name == "mood":
+                if value not in MOOD_CODES:
+                    raise ValueError(f"Unknown mood: {value}")
+                features[3] = MOOD_CODES[value]
+            elif name in FEATURE_INDEX:
+                features[FEATURE_INDEX[name]] = value
+        return features
+
+    def perform_action(self, action_type):
+        return describe_action(self.coin_name, action_type, self.speed, self.intelligence)
+
+    def decide_behavior(self, new_attributes=None):
+        """Rule-based behavior by mood, as CoinCharacterAgent.decide_behavior."""
+        features = self.model_features(new_attributes)
+        return describe_action(self.coin_name, ACTIONS[MOOD_TO_ACTION[features[3]]], features[1], features[2])
+
+    def load_model(self, registry):
+        if not self.model_path:
+            return None
+        try:
+            return registry.get(self.model_path)
+        except Exception as e:
+            logger.error("Error loading model: %s", e)
+            return None
+
+    def resolve_behavior(self, registry=None, new_attributes=None):
+        """
+        Decide the behavior from the model if one is available, else by mood,
+        for this coin with `new_attributes` applied to this decision only.
+        """
+        registry = registry or default_registry
+        model = self.load_model(registry)
+        features = self.model_features(new_attributes)
+        if model is None:
+            action_index = MOOD_TO_ACTION[features[3]]
+        else:
+            action_index = lookup_action(registry, self.model_path, features)
+        if action_index is None and INFERENCE_BATCHING:
+            action_index = get_batcher(registry, self.model_path).predict(features)
+        elif action_index is None:
+            prediction = model.predict(np.asarray([features], dtype=np.float32), verbose=0)
+            action_index = int(np.argmax(prediction, axis=1)[0])
+        return describe_action(self.coin_name, ACTIONS[action_index], features[1], features[2])
+
+    async def get_behavior(self, registry=None, think_time=None, new_attributes=None):
+        """
+        Async variant of resolve_behavior. Attributes are read before any await,
+        so a concurrent update of the same pooled agent cannot change the result.
+        """
+        registry = registry or default_registry
+        think_time = AGENT_THINK_TIME if think_time is None else think_time
+        features = self.model_features(new_attributes)
+        coin_name, speed, intelligence = self.coin_name, features[1], features[2]
+        if think_time > 0:
+            await asyncio.sleep(think_time)  # Simulate some processing time
+        model = self.load_model(registry)
+        if model is None:
+            action_index = MOOD_TO_ACTION[features[3]]
+        else:
+            action_index = lookup_action(registry, self.model_path, features)
+        if action_index is None and INFERENCE_BATCHING:
+            future = get_batcher(registry, self.model_path).submit(features)
+            action_index = await asyncio.wrap_future(future)
+        elif action_index is None:
+            prediction = await asyncio.to_thread(
+                model.predict, np.asarray([features], dtype=np.float32), verbose=0
+            )
+            action_index = int(np.argmax(prediction, axis=1)[0])
+        return describe_action(coin_name, ACTIONS[action_index], speed, intelligence)
+
+
+class AgentPool:
+    """
+    Long-lived agents keyed by coin name, so repeat requests for the same coin
+    reuse its agent instead of constructing a new one. A request's attributes
+    only apply to its own behavior: the pooled agent keeps the coin's initial
+    attributes. Least recently used agents are evicted beyond `max_agents`.
+    """
+
+    def __init__(self, max_agents=AGENT_POOL_SIZE, agent_factory=CompactCoinAgent):
+        self.max_agents = max_agents
+        self.agent_factory = agent_factory
+        self._agents = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, coin_name, model_path=None):
+        """Return the agent for `coin_name`, creating it on first use."""
+        with self._lock:
+            agent = self._agents.get(coin_name)
+            if agent is not None:
+                self._agents.move_to_end(coin_name)
+                self.hits += 1
+                agent.model_path = model_path
+                return agent
+            self.misses += 1
+            agent = self.agent_factory(coin_name, model_path=model_path)
+            self._agents[coin_name] = agent
+            if len(self._agents) > self.max_agents:
+                self._agents.popitem(last=False)
+                self.evictions += 1
+            return agent
+
+    def remove(self, coin_name):
+        with self._lock:
+            return self._agents.pop(coin_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._agents.clear()
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __contains__(self, coin_name):
+        return coin_name in self._agents
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'agents': len(self._agents),
+            'max_agents': self.max_agents,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+default_agent_pool = AgentPool()
+
+
 # Function to create an agent instance and get the behavior
-def get_coin_behavior(model, coin_features):
-    agent = CoinCharacterAgent(
-        coin_features.get('coin_name', 'DefaultCoin'), model_path=model
-    )
+def get_coin_behavior(model, coin_features, pool=None):
+    coin_name = coin_features.get('coin_name', 'DefaultCoin')
+    if AGENT_POOLING:
+        agent = (default_agent_pool if pool is None else pool).get(coin_name, model_path=model)
+        return agent.resolve_behavior(new_attributes=coin_features.get('attributes', {}))
+    agent = CoinCharacterAgent(coin_name, model_path=model)
     agent.update_attributes(coin_features.get('attributes', {}))
-    return agent.get_behavior()
+    return agent.resolve_behavior()
+
+
+# Async variant for the ASGI server: never blocks the event loop
+async def get_coin_behavior_async(model, coin_features, think_time=None, pool=None):
+    coin_name = coin_features.get('coin_name', 'DefaultCoin')
+    if AGENT_POOLING:
+        agent = (default_agent_pool if pool is None else pool).get(coin_name, model_path=model)
+        return await agent.get_behavior(think_time=think_time, new_attributes=coin_features.get('attributes', {}))
+    agent = CoinCharacterAgent(coin_name, model_path=model)
+    agent.update_attributes(coin_features.get('attributes', {}))
+    return await agent.get_behavior(think_time=think_time)
+
+
+# Rule-based behavior by mood (decide_behavior); the model is not loaded or run
+def get_rule_based_behavior(coin_features, pool=None):
+    coin_name = coin_features.get('coin_name', 'DefaultCoin')
+    if AGENT_POOLING:
+        agent = (default_agent_pool if pool is None else pool).get(coin_name)
+        return agent.decide_behavior(coin_features.get('attributes', {}))
+    agent = CoinCharacterAgent(coin_name)
+    agent.update_attributes(coin_features.get('attributes', {}))
+    return agent.decide_behavior()
+
+
+def get_coin_behavior_or_rules(model, coin_features, limiter=None, pool=None):
+    """
+    get_coin_behavior in one of the limiter's inference slots. If no slot frees
+    up within its queue budget, the rule-based behavior is served instead.
+    Returns (behavior, degraded).
+    """
+    try:
+        with (inference_limiter if limiter is None else limiter).slot():
+            return get_coin_behavior(model, coin_features, pool=pool), False
+    except Overloaded:
+        return get_rule_based_behavior(coin_features, pool=pool), True
+
+
+async def get_coin_behavior_or_rules_async(model, coin_features, think_time=None, limiter=None, pool=None):
+    """Async variant of get_coin_behavior_or_rules; never waits for a slot, so the event loop is not blocked."""
+    try:
+        with (inference_limiter if limiter is None else limiter).slot(budget=0):
+            return await get_coin_behavior_async(model, coin_features, think_time=think_time, pool=pool), False
+    except Overloaded:
+        return get_rule_based_behavior(coin_features, pool=pool), True
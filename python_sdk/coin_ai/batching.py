@@ -0,0 +1,149 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from config.settings import INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT_MS
+
+
+logger = logging.getLogger(__name__)
+
+
+def keras_predict(model, batch):
+    """Default batched forward pass for Keras models."""
+    return model.predict(batch, verbose=0)
+
+
+class MicroBatcher:
+    """
+    Collects single-row inference requests and runs them as one batched
+    forward pass.
+
+    Callers submit a feature row and get a Future for the argmax action index.
+    A background collector flushes when `max_batch_size` rows are queued or
+    `max_wait` seconds after the oldest queued row arrived, whichever is first.
+    The model is fetched through `get_model` on every flush so hot-reloaded
+    models are picked up without restarting the batcher.
+    """
+
+    def __init__(self, get_model, max_batch_size=INFERENCE_BATCH_SIZE,
+                 max_wait=INFERENCE_BATCH_WAIT_MS / 1000.0, predict_fn=keras_predict):
+        self.get_model = get_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.predict_fn = predict_fn
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.errors = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='coin-ai-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, features):
+        """Queue one feature row; returns a Future resolving to the action index."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((features, future, time.perf_counter()))
+        return future
+
+    def predict(self, features):
+        """Blocking helper: submit a row and wait for its action index."""
+        return self.submit(features).result()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._flush(batch)
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        try:
+            inputs = np.asarray([features for features, _, _ in batch], dtype=np.float32)
+            predictions = self.predict_fn(self.get_model(), inputs)
+            action_indices = np.argmax(predictions, axis=1)
+        except Exception as e:
+            logger.error("Batched inference failed for %d requests: %s", len(batch), e)
+            with self._stats_lock:
+                self.errors += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.total_queue_wait += sum(waits)
+            self.max_queue_wait = max(self.max_queue_wait, max(waits))
+        for (_, future, _), action_index in zip(batch, action_indices):
+            future.set_result(int(action_index))
+
+    def stats(self):
+        """Return batch fill ratio and queue wait metrics."""
+        with self._stats_lock:
+            batches, items = self.batches, self.items
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': batches,
+                'items': items,
+                'errors': self.errors,
+                'avg_batch_size': items / batches if batches else 0.0,
+                'fill_ratio': items / (batches * self.max_batch_size) if batches else 0.0,
+                'avg_queue_wait_ms': self.total_queue_wait / items * 1000 if items else 0.0,
+                'max_queue_wait_ms': self.max_queue_wait * 1000,
+                'queue_depth': self._queue.qsize(),
+            }
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(registry, model_path):
+    """Return the shared batcher for a model path, creating it on first use."""
+    key = (id(registry), model_path)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                batcher = MicroBatcher(lambda: registry.get(model_path))
+                _batchers[key] = batcher
+    return batcher
+
+
+def batcher_stats():
+    """Return metrics for every active batcher keyed by model path."""
+    return {model_path: batcher.stats() for (_, model_path), batcher in list(_batchers.items())}
@@ -0,0 +1,93 @@
+import logging
+import threading
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Discrete input space of the behavior models: strength, speed and intelligence
+# are integers in 1..10 (CoinCharacterAgent.initialize_attributes) and the mood
+# is one of the four codes in coin_ai.agent.MOODS.
+ATTRIBUTE_MIN = 1
+ATTRIBUTE_MAX = 10
+MOOD_COUNT = 4
+
+_ATTRIBUTE_VALUES = ATTRIBUTE_MAX - ATTRIBUTE_MIN + 1
+
+
+class BehaviorTable:
+    """
+    Precomputed action for every discrete model input.
+
+    The model is evaluated once over the full grid (10 x 10 x 10 x 4 = 4,000
+    rows) and the argmax actions are kept in a flat list, so a prediction for
+    integer attributes in range is an index computation instead of a forward
+    pass. lookup() returns None for anything outside the grid (floats,
+    out-of-range values), and callers fall back to live inference.
+    """
+
+    def __init__(self, actions):
+        self.actions = np.asarray(actions, dtype=np.int8).reshape(
+            _ATTRIBUTE_VALUES, _ATTRIBUTE_VALUES, _ATTRIBUTE_VALUES, MOOD_COUNT
+        )
+        self._flat = self.actions.ravel().tolist()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def grid():
+        """Every discrete input row, in table order."""
+        values = np.arange(ATTRIBUTE_MIN, ATTRIBUTE_MAX + 1)
+        strength, speed, intelligence, mood = np.meshgrid(
+            values, values, values, np.arange(MOOD_COUNT), indexing='ij'
+        )
+        return np.column_stack([
+            strength.ravel(), speed.ravel(), intelligence.ravel(), mood.ravel()
+        ]).astype(np.float32)
+
+    @classmethod
+    def from_model(cls, model):
+        scores = model.predict(cls.grid(), verbose=0)
+        return cls(np.argmax(scores, axis=1))
+
+    def lookup(self, features):
+        """Return the action index for a feature row, or None if it is not in the table."""
+        strength, speed, intelligence, mood = features
+        if (type(strength) is int and type(speed) is int and type(intelligence) is int and type(mood) is int
+                and ATTRIBUTE_MIN <= strength <= ATTRIBUTE_MAX
+                and ATTRIBUTE_MIN <= speed <= ATTRIBUTE_MAX
+                and ATTRIBUTE_MIN <= intelligence <= ATTRIBUTE_MAX
+                and 0 <= mood < MOOD_COUNT):
+            index = (((strength - ATTRIBUTE_MIN) * _ATTRIBUTE_VALUES + speed - ATTRIBUTE_MIN)
+                     * _ATTRIBUTE_VALUES + intelligence - ATTRIBUTE_MIN) * MOOD_COUNT + mood
+            with self._lock:
+                self.hits += 1
+            return self._flat[index]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._flat),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def build_behavior_table(model):
+    """
+    Registry hook: precompute the table for a freshly loaded model. Models that
+    do not take the 4-feature behavior input get no table (and always run live).
+    """
+    if not hasattr(model, 'predict'):
+        return None
+    try:
+        return BehaviorTable.from_model(model)
+    except Exception as e:
+        logger.warning("Could not build a behavior table for the model: %s", e)
+        return None
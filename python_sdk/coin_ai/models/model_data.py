@@ -1,3 +1,12 @@
+"""
+Torch definitions of the coin behavior networks.
+
+Importing this module only defines the models. Train the served behavior
+model on player telemetry with `python -m coin_ai.training`; running this
+file trains the legacy SimpleNN on dummy data:
+
+    python -m coin_ai.models.model_data
+"""
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -20,29 +29,54 @@ class SimpleNN(nn.Module):
         return x
 
 
-# Create some dummy data to train the model
-X_train = torch.tensor(
-    np.random.rand(100, 10), dtype=torch.float32
-)  # 100 samples, 10 features
+class BehaviorNN(nn.Module):
+    """
+    Behavior classifier served by /spawn: [strength, speed, intelligence,
+    mood_index] to one score per action (dance, hide, run). forward() returns
+    logits; the exported model applies the softmax.
+    """
+
+    def __init__(self, inputs=4, hidden=(32, 16), outputs=3):
+        super(BehaviorNN, self).__init__()
+        self.layer1 = nn.Linear(inputs, hidden[0])
+        self.layer2 = nn.Linear(hidden[0], hidden[1])
+        self.output_layer = nn.Linear(hidden[1], outputs)
+
+    def forward(self, x):
+        x = torch.relu(self.layer1(x))
+        x = torch.relu(self.layer2(x))
+        return self.output_layer(x)
+
+
+def train_dummy_model(path="coin_ai/models/model_data.bin", epochs=5):
+    """Train SimpleNN on 100 random rows and save its state_dict to `path`."""
+    # Create some dummy data to train the model
+    X_train = torch.tensor(
+        np.random.rand(100, 10), dtype=torch.float32
+    )  # 100 samples, 10 features
+
+    y_train = torch.tensor(
+        np.random.randint(0, 2, size=(100, 1)), dtype=torch.float32
+    )  # Random binary labels
 
-y_train = torch.tensor(
-    np.random.randint(0, 2, size=(100, 1)), dtype=torch.float32
-)  # Random binary labels
+    # Create the model, loss function, and optimizer
+    model = SimpleNN()
+    loss_fn = nn.BCELoss()  # Binary Cross Entropy for binary classification
+    optimizer = optim.Adam(model.parameters())
 
-# Create the model, loss function, and optimizer
-model = SimpleNN()
-loss_fn = nn.BCELoss()  # Binary Cross Entropy for binary classification
-optimizer = optim.Adam(model.parameters())
+    # Train the model
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        predictions = model(X_train)
+        loss = loss_fn(predictions, y_train)
+        loss.backward()
+        optimizer.step()
 
-# Train the model
-for epoch in range(5):
-    optimizer.zero_grad()
-    predictions = model(X_train)
-    loss = loss_fn(predictions, y_train)
-    loss.backward()
-    optimizer.step()
+    # Save the model to a binary file (model_data.bin)
+    torch.save(model.state_dict(), path)
+    return model
 
-# Save the model to a binary file (model_data.bin)
-torch.save(model.state_dict(), "coin_ai/models/model_data.bin")
 
-print("Model saved to model_data.bin")
+if __name__ == '__main__':
+    train_dummy_model()
+    print("Model saved to model_data.bin")
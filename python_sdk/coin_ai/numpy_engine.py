@@ -0,0 +1,188 @@
+"""
+Pure-NumPy inference for the coin behavior networks.
+
+The behavior models are small dense MLPs, so serving workers do not need
+TensorFlow or torch: export the trained weights once to a compact .npz file
+and run forward passes with NumPy.
+
+    python -m coin_ai.numpy_engine coin_ai/models/model_data.bin
+    python -m coin_ai.numpy_engine path_to_your_model.h5 behavior.npz
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+
+ACTIVATIONS = ('linear', 'relu', 'sigmoid', 'softmax', 'tanh')
+
+# Extensions exported from a torch state_dict; anything else is read as Keras
+TORCH_EXTENSIONS = ('.bin', '.pt', '.pth')
+
+
+def _apply_activation(name, x):
+    """Apply an activation in place on a float32 buffer."""
+    if name == 'relu':
+        np.maximum(x, 0, out=x)
+    elif name == 'sigmoid':
+        np.negative(x, out=x)
+        with np.errstate(over='ignore'):  # exp overflow -> inf -> sigmoid 0, as intended
+            np.exp(x, out=x)
+        x += 1
+        np.reciprocal(x, out=x)
+    elif name == 'softmax':
+        x -= x.max(axis=1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=1, keepdims=True)
+    elif name == 'tanh':
+        np.tanh(x, out=x)
+    elif name != 'linear':
+        raise ValueError(f"Unsupported activation: {name}")
+
+
+class NumpyMLP:
+    """
+    Dense feed-forward network evaluated with NumPy.
+
+    Weights are float32 matrices of shape (inputs, units). Activation buffers
+    are allocated once for `max_batch_size` rows and reused by every call, so a
+    forward pass does no allocation besides the returned copy. Larger batches
+    are processed in chunks. predict() mirrors Keras' signature, which lets the
+    registry warm-up and the micro-batcher use either kind of model.
+    """
+
+    def __init__(self, weights, biases, activations, max_batch_size=256):
+        if not (len(weights) == len(biases) == len(activations)):
+            raise ValueError("weights, biases and activations must have one entry per layer")
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32).reshape(-1) for b in biases]
+        self.activations = list(activations)
+        self.max_batch_size = max_batch_size
+        self.input_size = self.weights[0].shape[0]
+        self.output_size = self.weights[-1].shape[1]
+        self._buffers = [np.empty((max_batch_size, w.shape[1]), dtype=np.float32) for w in self.weights]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, max_batch_size=256):
+        """Load a network written by save_npz()/export_weights()."""
+        with np.load(path, allow_pickle=False) as data:
+            layers = int(data['layers'])
+            weights = [data[f'W{i}'] for i in range(layers)]
+            biases = [data[f'b{i}'] for i in range(layers)]
+            activations = [str(a) for a in data['activations']]
+        return cls(weights, biases, activations, max_batch_size=max_batch_size)
+
+    def save(self, path):
+        save_npz(path, self.weights, self.biases, self.activations)
+
+    def get_weights(self):
+        """Keras-style flat weight list (used for memory accounting)."""
+        return [array for pair in zip(self.weights, self.biases) for array in pair]
+
+    def _forward(self, x):
+        n = len(x)
+        out = x
+        for weight, bias, activation, buffer in zip(self.weights, self.biases, self.activations, self._buffers):
+            layer_out = buffer[:n]
+            np.matmul(out, weight, out=layer_out)
+            layer_out += bias
+            _apply_activation(activation, layer_out)
+            out = layer_out
+        return out.copy()
+
+    def predict(self, x, verbose=0):
+        """Run a batched forward pass. Accepts a single row or a 2-D batch."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[np.newaxis, :]
+        if x.shape[1] != self.input_size:
+            raise ValueError(f"Expected {self.input_size} input features, got {x.shape[1]}")
+        with self._lock:
+            if len(x) <= self.max_batch_size:
+                return self._forward(x)
+            return np.concatenate([
+                self._forward(x[start:start + self.max_batch_size])
+                for start in range(0, len(x), self.max_batch_size)
+            ])
+
+    __call__ = predict
+
+
+def save_npz(path, weights, biases, activations):
+    arrays = {'layers': np.array(len(weights)), 'activations': np.array(activations)}
+    for i, (weight, bias) in enumerate(zip(weights, biases)):
+        arrays[f'W{i}'] = np.asarray(weight, dtype=np.float32)
+        arrays[f'b{i}'] = np.asarray(bias, dtype=np.float32)
+    np.savez_compressed(path, **arrays)
+
+
+def layers_from_state_dict(state_dict, activations=None):
+    """
+    Extract dense layers from a torch state_dict, in definition order.
+    torch stores Linear weights as (out, in); they are transposed to (in, out).
+    Activations are not part of a state_dict; by default hidden layers use ReLU
+    and the output layer a sigmoid, as in SimpleNN.
+    """
+    weights, biases = [], []
+    for key, tensor in state_dict.items():
+        if key.endswith('.weight'):
+            weights.append(tensor.detach().cpu().numpy().T)
+        elif key.endswith('.bias'):
+            biases.append(tensor.detach().cpu().numpy())
+    if not weights or len(weights) != len(biases):
+        raise ValueError("state_dict does not describe a stack of Linear layers")
+    if activations is None:
+        activations = ['relu'] * (len(weights) - 1) + ['sigmoid']
+    return weights, biases, list(activations)
+
+
+def layers_from_keras(model):
+    """Extract Dense layers (weights and activations) from a Keras model."""
+    weights, biases, activations = [], [], []
+    for layer in model.layers:
+        params = layer.get_weights()
+        if not params:
+            continue  # InputLayer, Dropout, Flatten...
+        if len(params) != 2 or not hasattr(layer, 'activation'):
+            raise ValueError(f"Unsupported layer for NumPy export: {layer.name} ({type(layer).__name__})")
+        weights.append(params[0])
+        biases.append(params[1])
+        activations.append(layer.activation.__name__)
+    return weights, biases, activations
+
+
+def export_weights(source, dest=None, activations=None):
+    """
+    Convert a torch state_dict (.bin/.pt/.pth) or a Keras model (.h5/.keras)
+    into a .npz weight file. Returns the destination path.
+    """
+    if dest is None:
+        dest = os.path.splitext(source)[0] + '.npz'
+    if source.endswith(TORCH_EXTENSIONS):
+        import torch
+        state_dict = torch.load(source, map_location='cpu', weights_only=True)
+        weights, biases, activations = layers_from_state_dict(state_dict, activations)
+    else:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(source, compile=False)
+        weights, biases, keras_activations = layers_from_keras(model)
+        activations = activations or keras_activations
+    save_npz(dest, weights, biases, activations)
+    return dest
+
+
+def load_numpy_model(path):
+    """Registry loader for exported .npz models."""
+    return NumpyMLP.load(path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m coin_ai.numpy_engine <model.bin|model.h5> [output.npz]")
+        sys.exit(1)
+    print(f"Exported weights to {export_weights(*sys.argv[1:])}")
@@ -0,0 +1,152 @@
+import numpy as np
+
+from coin_ai.agent import ACTIONS, MOOD_TO_ACTION, MOODS
+
+
+NUMERIC_ATTRIBUTES = ("strength", "speed", "intelligence")
+
+
+class CoinPopulation:
+    """
+    Struct-of-arrays simulation of many coin characters.
+
+    Attributes of N agents live in NumPy columns (mood codes plus float
+    strength/speed/intelligence) instead of N CoinCharacterAgent objects with
+    attribute dicts. step() decides every agent's action in one vectorized pass,
+    either with the rules of decide_behavior or with one batched model call,
+    and returns action codes (indices into ACTIONS). Action strings are only
+    built on demand and match CoinCharacterAgent.perform_action for any agent.
+    """
+
+    def __init__(self, names, moods, strength, speed, intelligence, model=None):
+        self.names = np.asarray(names, dtype=object)
+        n = len(self.names)
+        self.moods = self._mood_codes(moods, n)
+        self.columns = {}
+        # Attribute values given as Python floats render as floats ("9.5"), ints as ints ("9")
+        self._is_float = {}
+        for name, values in zip(NUMERIC_ATTRIBUTES, (strength, speed, intelligence)):
+            self.columns[name] = np.empty(n, dtype=np.float64)
+            self._is_float[name] = np.zeros(n, dtype=bool)
+            self._assign(name, slice(None), values)
+        self.model = model
+
+    @classmethod
+    def random(cls, n, prefix="Coin", model=None, rng=None):
+        """N agents initialized like CoinCharacterAgent.initialize_attributes."""
+        rng = rng or np.random.default_rng()
+        return cls(
+            [f"{prefix} {i}" for i in range(n)],
+            rng.integers(0, len(MOODS), size=n),
+            rng.integers(1, 11, size=n),
+            rng.integers(1, 11, size=n),
+            rng.integers(1, 11, size=n),
+            model=model,
+        )
+
+    @classmethod
+    def from_agents(cls, agents, model=None):
+        """Copy the attributes of existing CoinCharacterAgent instances."""
+        return cls(
+            [agent.coin_name for agent in agents],
+            [agent.attributes["mood"] for agent in agents],
+            *[[agent.attributes[name] for agent in agents] for name in NUMERIC_ATTRIBUTES],
+            model=model,
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _mood_codes(moods, n=None):
+        if isinstance(moods, str):
+            moods = [moods] * (n or 1)
+        moods = np.asarray(moods)
+        if moods.dtype.kind in "UO":
+            lookup = {mood: code for code, mood in enumerate(MOODS)}
+            try:
+                moods = np.array([lookup[mood] for mood in moods.ravel()]).reshape(moods.shape)
+            except KeyError as e:
+                raise ValueError(f"Unknown mood: {e.args[0]}") from None
+        elif moods.size and (moods.min() < 0 or moods.max() >= len(MOODS)):
+            raise ValueError("Mood codes must be indices into MOODS")
+        return moods.astype(np.int8)
+
+    def _assign(self, name, index, values):
+        if np.isscalar(values):
+            is_float = isinstance(values, (float, np.floating))
+        elif isinstance(values, np.ndarray):
+            is_float = values.dtype.kind == "f"
+        else:
+            values = list(values)
+            is_float = [isinstance(value, (float, np.floating)) for value in values]
+        self._is_float[name][index] = is_float
+        self.columns[name][index] = values
+
+    def update(self, index=slice(None), **attributes):
+        """
+        Bulk attribute update, e.g. update(mask, mood="happy") or
+        update([3, 7], speed=[5, 9]). `index` is anything NumPy accepts:
+        a slice, integer indices or a boolean mask.
+        """
+        for name, values in attributes.items():
+            if name == "mood":
+                self.moods[index] = self._mood_codes(values)
+            elif name in self.columns:
+                self._assign(name, index, values)
+            else:
+                raise ValueError(f"Unknown attribute: {name}")
+
+    def features(self, index=slice(None)):
+        """Model input rows [strength, speed, intelligence, mood_index], as in CoinCharacterAgent."""
+        return np.column_stack([
+            self.columns["strength"][index],
+            self.columns["speed"][index],
+            self.columns["intelligence"][index],
+            self.moods[index],
+        ]).astype(np.float32)
+
+    def decide(self, index=slice(None)):
+        """Rule-based action codes (decide_behavior) for the selected agents."""
+        return MOOD_TO_ACTION[self.moods[index]]
+
+    def predict(self, index=slice(None), model=None):
+        """Model-based action codes from one batched forward pass."""
+        model = model or self.model
+        scores = model.predict(self.features(index), verbose=0)
+        return np.argmax(scores, axis=1).astype(np.int8)
+
+    def step(self, index=slice(None)):
+        """Action codes for the selected agents: model-based if a model is set, else rule-based."""
+        if self.model is not None:
+            return self.predict(index)
+        return self.decide(index)
+
+    def _render(self, name, i):
+        value = self.columns[name][i]
+        return str(float(value)) if self._is_float[name][i] else str(int(value))
+
+    def action_string(self, i, action):
+        """The perform_action text for agent i taking action code `action`."""
+        action = ACTIONS[action] if 0 <= action < len(ACTIONS) else None
+        name = self.names[i]
+        if action == "dance":
+            return f"{name} is dancing with speed {self._render('speed', i)}!"
+        if action == "hide":
+            return f"{name} is hiding with stealth {self._render('intelligence', i)}!"
+        if action == "run":
+            return f"{name} is running at speed {self._render('speed', i)}!"
+        return f"{name} is standing still."
+
+    def behaviors(self, actions, index=slice(None)):
+        """Materialize action strings for the agents selected by `index`."""
+        indices = np.arange(len(self))[index]
+        return [self.action_string(i, action) for i, action in zip(indices, actions)]
+
+    def attributes(self, i):
+        """Agent i's attributes as the dict a CoinCharacterAgent would hold."""
+        attributes = {"mood": MOODS[self.moods[i]]}
+        for name in NUMERIC_ATTRIBUTES:
+            value = self.columns[name][i]
+            attributes[name] = float(value) if self._is_float[name][i] else int(value)
+        return attributes
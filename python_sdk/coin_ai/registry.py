@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from config.settings import BEHAVIOR_TABLE, MODEL_RELOAD_INTERVAL, MODEL_SHARED_WEIGHTS
+from coin_ai.lookup import build_behavior_table
+
+
+logger = logging.getLogger(__name__)
+
+# Number of input features the coin behavior models expect:
+# [strength, speed, intelligence, mood_index]
+MODEL_INPUT_FEATURES = 4
+
+
+def load_keras_model(path):
+    """Default loader: deserialize a Keras model from disk."""
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+
+def load_model_file(path):
+    """
+    Default loader: exported .npz weights run on the NumPy engine (no
+    TensorFlow import); anything else is deserialized with Keras.
+    """
+    if path.endswith('.npz'):
+        from coin_ai.numpy_engine import load_numpy_model
+        return load_numpy_model(path)
+    return load_keras_model(path)
+
+
+def warm_up_model(model):
+    """
+    Run a single dummy inference so the first real request does not pay for
+    graph tracing / kernel selection.
+    """
+    import numpy as np
+    if hasattr(model, 'predict'):
+        model.predict(np.zeros((1, MODEL_INPUT_FEATURES), dtype=np.float32), verbose=0)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_memory_bytes(model):
+    """
+    Estimate the memory held by a model's parameters.
+    Supports Keras models (get_weights) and torch modules (state_dict).
+    Returns None if the size cannot be determined.
+    """
+    try:
+        if hasattr(model, 'get_weights'):
+            return int(sum(w.nbytes for w in model.get_weights()))
+        if hasattr(model, 'state_dict'):
+            return int(sum(t.numel() * t.element_size() for t in model.state_dict().values()))
+    except Exception as e:
+        logger.debug("Could not measure model memory: %s", e)
+    return None
+
+
+class ModelEntry:
+    """A loaded model plus the file fingerprint and load statistics."""
+
+    def __init__(self, path, model, mtime, digest, load_time, table=None):
+        self.path = path
+        self.model = model
+        self.table = table
+        self.mtime = mtime
+        self.digest = digest
+        self.load_time = load_time
+        self.memory_bytes = model_memory_bytes(model)
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+        self.load_count = 1
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'digest': self.digest,
+            'mtime': self.mtime,
+            'load_time_ms': round(self.load_time * 1000, 3),
+            'memory_bytes': self.memory_bytes,
+            'loaded_at': self.loaded_at,
+            'load_count': self.load_count,
+            'shared_weights': getattr(self.model, 'mapped_path', None),
+            'table': self.table.stats() if self.table is not None else None,
+        }
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models keyed by file path.
+
+    Each path is deserialized once per process and shared by every caller.
+    The file is re-checked at most every `check_interval` seconds; when its
+    mtime changes and the content hash differs, the model is reloaded and
+    swapped in atomically (in-flight callers keep the old object).
+
+    `table_builder` precomputes a BehaviorTable for each loaded model; it runs
+    on every (re)load, so the table always matches the model being served.
+    """
+
+    def __init__(self, loader=load_model_file, warmup=warm_up_model, check_interval=5.0,
+                 table_builder=build_behavior_table if BEHAVIOR_TABLE else None):
+        self.loader = loader
+        self.warmup = warmup
+        self.table_builder = table_builder
+        self.check_interval = check_interval
+        self._entries = {}
+        self._failures = {}  # path -> mtime of the file that failed to load
+        self._lock = threading.Lock()
+        self._path_locks = {}
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def _load(self, path, mtime):
+        start = time.perf_counter()
+        model = self.loader(path)
+        if self.warmup:
+            self.warmup(model)
+        table = self.table_builder(model) if self.table_builder else None
+        load_time = time.perf_counter() - start
+        entry = ModelEntry(path, model, mtime, file_digest(path), load_time, table)
+        logger.info("Model loaded from %s in %.1f ms", path, entry.load_time * 1000)
+        return entry
+
+    def get(self, path):
+        """
+        Return the model for `path`, loading it on first use.
+        Raises the loader's exception if the model cannot be loaded.
+        """
+        path = os.path.abspath(path)
+        entry = self._entries.get(path)
+        if entry is not None and time.monotonic() - entry.checked_at < self.check_interval:
+            return entry.model
+
+        with self._path_lock(path):
+            entry = self._entries.get(path)
+            if entry is None:
+                mtime = os.stat(path).st_mtime
+                if self._failures.get(path) == mtime:
+                    raise RuntimeError(f"Model at {path} failed to load; waiting for the file to change")
+                try:
+                    entry = self._load(path, mtime)
+                except Exception:
+                    self._failures[path] = mtime
+                    raise
+                self._failures.pop(path, None)
+                self._entries[path] = entry
+                return entry.model
+            self._refresh(entry)
+            return self._entries[path].model
+
+    def get_table(self, path):
+        """
+        Return the precomputed BehaviorTable for the model at `path`, or None.
+        Goes through get(), so a changed file is reloaded and its table rebuilt.
+        """
+        self.get(path)
+        entry = self._entries.get(os.path.abspath(path))
+        return entry.table if entry is not None else None
+
+    def _refresh(self, entry):
+        """Reload `entry` if its file changed on disk since it was loaded."""
+        entry.checked_at = time.monotonic()
+        try:
+            mtime = os.stat(entry.path).st_mtime
+        except OSError:
+            # Keep serving the last good model if the file disappears.
+            return
+        if mtime == entry.mtime:
+            return
+        if file_digest(entry.path) == entry.digest:
+            entry.mtime = mtime
+            return
+        try:
+            new_entry = self._load(entry.path, mtime)
+        except Exception as e:
+            logger.error("Hot reload of %s failed, keeping previous model: %s", entry.path, e)
+            entry.mtime = mtime
+            return
+        new_entry.load_count = entry.load_count + 1
+        self._entries[entry.path] = new_entry
+
+    def preload(self, paths):
+        """Load (and warm up) the given model paths, logging rather than raising on failure."""
+        for path in paths:
+            try:
+                self.get(path)
+            except Exception as e:
+                logger.error("Error preloading model %s: %s", path, e)
+
+    def reload(self, path):
+        """Force the model at `path` to be reloaded on next access."""
+        path = os.path.abspath(path)
+        with self._path_lock(path):
+            self._entries.pop(path, None)
+            self._failures.pop(path, None)
+
+    def stats(self):
+        """Return load time and memory statistics for every loaded model."""
+        return [entry.stats() for entry in list(self._entries.values())]
+
+
+def default_loader():
+    """Loader for the shared registry: memory-mapped shared weights if MODEL_SHARED_WEIGHTS is on."""
+    if MODEL_SHARED_WEIGHTS:
+        from coin_ai.shared_weights import SharedWeightsLoader
+        return SharedWeightsLoader()
+    return load_model_file
+
+
+# Shared registry used by the agent and the server
+default_registry = ModelRegistry(loader=default_loader(), check_interval=MODEL_RELOAD_INTERVAL)
@@ -0,0 +1,205 @@
+"""
+Model weights shared between serving processes.
+
+The NumPy engine's weights are written once into an uncompressed,
+page-aligned file under MODEL_SHARED_DIR (tmpfs by default) named after the
+model file's content hash, and every process serves them through a read-only
+memory map of that file. All workers therefore read the same physical pages:
+with gunicorn's preload_app the master maps the weights before forking, and a
+worker that hot-reloads a new model maps the file another worker (or
+publish_model) already wrote instead of building its own copy.
+
+Publish a new model atomically, with its shared weights prepared up front:
+
+    python -m coin_ai.shared_weights new_behavior.npz coin_ai/models/behavior.npz
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from config.settings import MODEL_SHARED_DIR
+from coin_ai.numpy_engine import NumpyMLP, export_weights
+from coin_ai.registry import file_digest, load_model_file
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BXW1'
+ALIGNMENT = 64  # Arrays start on cache-line boundaries
+_HEADER_LENGTH = struct.Struct('<Q')
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_weights_file(model, path):
+    """
+    Write a NumpyMLP's weights as a mappable file: magic, header length,
+    JSON header (activations and array offsets), then the aligned float32
+    arrays. The file is written next to `path` and renamed into place, so
+    readers never see a partial file.
+    """
+    arrays = model.get_weights()
+    layout = []
+    offset = 0
+    for array in arrays:
+        layout.append({'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({'activations': model.activations, 'arrays': layout}).encode()
+    data_start = _aligned(len(MAGIC) + _HEADER_LENGTH.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            for array, entry in zip(arrays, layout):
+                f.seek(data_start + entry['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def map_weights_file(path, max_batch_size=256):
+    """Return a NumpyMLP whose weights are read-only views of a memory-mapped weights file."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        buffer.close()
+        raise ValueError(f"{path} is not a shared weights file")
+    (header_length,) = _HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+    header_start = len(MAGIC) + _HEADER_LENGTH.size
+    header = json.loads(buffer[header_start:header_start + header_length])
+    data_start = _aligned(header_start + header_length)
+
+    arrays = []
+    for entry in header['arrays']:
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape']))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + entry['offset'])
+        arrays.append(array.reshape(entry['shape']))
+    # NumpyMLP keeps contiguous float32 arrays as they are, so no copy is made
+    model = NumpyMLP(arrays[0::2], arrays[1::2], header['activations'], max_batch_size=max_batch_size)
+    model.mapped_path = path
+    return model
+
+
+def _source_key(path):
+    """Stable prefix for the shared files of one model path."""
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:12]
+
+
+class SharedWeightsLoader:
+    """
+    ModelRegistry loader that serves NumPy-engine networks from shared,
+    memory-mapped weights.
+
+    .npz files are read directly; Keras and torch files are converted with
+    numpy_engine.export_weights the first time a given file content is seen
+    (later processes map the result and never import the framework). Models
+    that cannot be converted are loaded per process with `fallback`.
+
+    When a new version of a model is mapped, the weights files of its older
+    versions are unlinked; processes still using them keep their mapping until
+    they reload.
+    """
+
+    def __init__(self, directory=MODEL_SHARED_DIR, fallback=load_model_file):
+        self.directory = directory
+        self.fallback = fallback
+
+    def shared_path(self, path, digest=None):
+        digest = digest or file_digest(path)
+        return os.path.join(self.directory, f'{_source_key(path)}-{digest[:16]}.weights')
+
+    def prepare(self, path, source=None):
+        """
+        Write the shared weights of the model served at `path` if missing,
+        reading them from `source` (default: `path`). Returns the shared
+        weights path, or None if the model cannot be shared.
+        """
+        source = source or path
+        shared_path = self.shared_path(path, file_digest(source))
+        if os.path.exists(shared_path):
+            return shared_path
+        try:
+            model = self._read_network(source)
+        except Exception as e:
+            logger.warning("Model %s cannot be shared between workers, loading it per process: %s", path, e)
+            return None
+        write_weights_file(model, shared_path)
+        self._remove_old_versions(shared_path)
+        logger.info("Shared weights for %s written to %s", path, shared_path)
+        return shared_path
+
+    def _read_network(self, path):
+        if path.endswith('.npz'):
+            return NumpyMLP.load(path)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            return NumpyMLP.load(export_weights(path, os.path.join(tmpdir, 'weights.npz')))
+
+    def _remove_old_versions(self, current):
+        prefix = os.path.basename(current).split('-')[0] + '-'
+        for name in os.listdir(self.directory):
+            old = os.path.join(self.directory, name)
+            if name.startswith(prefix) and name.endswith('.weights') and old != current:
+                try:
+                    os.unlink(old)
+                except OSError:
+                    pass
+
+    def __call__(self, path):
+        for attempt in range(2):
+            shared_path = self.prepare(path)
+            if shared_path is None:
+                return self.fallback(path)
+            try:
+                return map_weights_file(shared_path)
+            except FileNotFoundError:
+                # Another process published a newer version in between; hash the file again
+                if attempt:
+                    raise
+
+
+def publish_model(source, model_path, loader=None):
+    """
+    Replace the model at `model_path` with `source` atomically, writing its
+    shared weights first so reloading workers only have to map them. Serving
+    processes pick the new model up within MODEL_RELOAD_INTERVAL.
+    """
+    loader = loader if loader is not None else SharedWeightsLoader()
+    directory = os.path.dirname(os.path.abspath(model_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(model_path)[1])
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp_path)
+        # Shared weights are keyed by the served path, so prepare them under that name first
+        loader.prepare(model_path, source=tmp_path)
+        os.replace(tmp_path, model_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return model_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python -m coin_ai.shared_weights <new_model> <served_model_path>")
+        sys.exit(1)
+    print(f"Published {sys.argv[1]} as {publish_model(*sys.argv[1:])}")
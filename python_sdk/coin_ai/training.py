@@ -0,0 +1,487 @@
+"""
+Training pipeline for the coin behavior model.
+
+Player telemetry (JSON lines, or Parquet when pyarrow is installed) is parsed
+once by TRAINING_WORKERS processes into a feature cache: a flat float32 file
+of [strength, speed, intelligence, mood_index, action] rows that training
+reads through a memory map, so its size is bounded by the disk and not by
+RAM. Later runs on the same files reuse the cache.
+
+Each epoch shuffles the cache's blocks. A torch DataLoader with
+TRAINING_WORKERS processes reads them in groups and shuffles the rows of
+each group, while the main process runs mini-batch Adam steps on BehaviorNN.
+A checkpoint (model, optimizer and position in the epoch) is written every
+TRAINING_CHECKPOINT_INTERVAL seconds, after each epoch and when stopped, and
+the next run resumes from it. The trained model is exported in the NumPy
+engine's .npz format, with the input standardization folded into its first
+layer so that it takes the raw features the served model gets:
+
+    python -m coin_ai.training telemetry/*.jsonl --output coin_ai/models/behavior.npz
+    python -m coin_ai.shared_weights coin_ai/models/behavior.npz <served model path>
+
+Telemetry has one record per line:
+
+    {"strength": 7, "speed": 3, "intelligence": 9, "mood": "sad", "action": "hide"}
+
+The attributes may also be nested under "attributes" as in /spawn requests,
+and mood and action may be given as indices. Other records are skipped.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, Dataset
+
+from config.settings import (
+    TRAINING_BATCH_SIZE, TRAINING_BLOCK_ROWS, TRAINING_CACHE_DIR, TRAINING_CHECKPOINT_INTERVAL,
+    TRAINING_CHECKPOINT_PATH, TRAINING_EPOCHS, TRAINING_GROUP_BLOCKS, TRAINING_HOLDOUT, TRAINING_LEARNING_RATE,
+    TRAINING_THREADS, TRAINING_WORKERS,
+)
+from coin_ai.agent import ACTIONS, MOOD_CODES
+from coin_ai.models.model_data import BehaviorNN
+from coin_ai.numpy_engine import layers_from_state_dict, save_npz
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+FEATURES = ('strength', 'speed', 'intelligence', 'mood')
+COLUMNS = FEATURES + ('action',)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+SPLIT_BYTES = 16 * 1024 * 1024  # JSON lines parsed per cache-building task
+
+
+def _code(value, codes):
+    """Index of a mood or action given by name or by index, or None."""
+    if isinstance(value, str):
+        return codes.get(value)
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(codes):
+        return value
+    return None
+
+
+def parse_record(record):
+    """Cache row of a telemetry record, or None when it is not a usable example."""
+    if not isinstance(record, dict):
+        return None
+    attributes = record.get('attributes', record)
+    if not isinstance(attributes, dict):
+        return None
+    mood = _code(attributes.get('mood'), MOOD_CODES)
+    action = _code(record.get('action'), ACTION_CODES)
+    if mood is None or action is None:
+        return None
+    try:
+        values = [float(attributes[name]) for name in FEATURES[:-1]]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not all(math.isfinite(value) for value in values):
+        return None
+    return values + [mood, action]
+
+
+def _parquet_file(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError(f"Reading {path} requires pyarrow (pip install pyarrow)")
+    return pq.ParquetFile(path)
+
+
+def _tasks(paths, split_bytes):
+    """Independent parsing tasks: byte ranges of JSON lines files, row groups of Parquet files."""
+    for path in paths:
+        if path.endswith('.parquet'):
+            for row_group in range(_parquet_file(path).num_row_groups):
+                yield ('parquet', path, row_group)
+        else:
+            size = os.path.getsize(path)
+            for start in range(0, size, split_bytes):
+                yield ('jsonl', path, start, min(start + split_bytes, size))
+
+
+def _jsonl_records(path, start, end):
+    """Records of the lines starting within [start, end); None for lines that are not JSON."""
+    with open(path, 'rb') as f:
+        position = start
+        if start:
+            f.seek(start - 1)
+            position += len(f.readline()) - 1  # The line running into this range belongs to the previous one
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+
+def _parquet_records(path, row_group):
+    table = _parquet_file(path).read_row_group(row_group, columns=list(COLUMNS))
+    columns = [table.column(name).to_pylist() for name in COLUMNS]
+    for values in zip(*columns):
+        yield dict(zip(COLUMNS, values))
+
+
+def _parse_task(task):
+    """Parse one task into a float32 array of cache rows; returns (rows, skipped records)."""
+    records = _parquet_records(*task[1:]) if task[0] == 'parquet' else _jsonl_records(*task[1:])
+    values, skipped = array('f'), 0
+    for record in records:
+        row = parse_record(record)
+        if row is None:
+            skipped += 1
+        else:
+            values.extend(row)
+    return np.frombuffer(values, dtype=np.float32).reshape(-1, len(COLUMNS)), skipped
+
+
+class FeatureCache:
+    """
+    Telemetry parsed into a flat float32 file of COLUMNS rows, read through a
+    read-only memory map. meta.json next to it holds the row count, the mean
+    and standard deviation of each feature and the source files (path, size,
+    mtime) the cache was built from.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.digest = self.meta['digest']
+        self.rows = self.meta['rows']
+        self.mean = np.array(self.meta['mean'], dtype=np.float32)
+        self.std = np.array(self.meta['std'], dtype=np.float32)
+        self._array = None
+
+    def __len__(self):
+        return self.rows
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_array'] = None  # Each DataLoader worker maps the file itself
+        return state
+
+    def array(self):
+        """The cached rows as a (rows, len(COLUMNS)) memory-mapped array."""
+        if self._array is None:
+            self._array = np.memmap(os.path.join(self.directory, 'rows.f32'), dtype=np.float32, mode='r',
+                                    shape=(self.rows, len(COLUMNS)))
+        return self._array
+
+    @classmethod
+    def build(cls, paths, cache_dir=TRAINING_CACHE_DIR, workers=TRAINING_WORKERS, rebuild=False,
+              split_bytes=SPLIT_BYTES):
+        """
+        The cache of `paths`, parsing them unless a cache of the same files is
+        already in `cache_dir`. Workers parse tasks of split_bytes each and the
+        parent appends their rows in order, so memory stays bounded by the
+        tasks in flight whatever the size of the telemetry.
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        sources = [[path, os.path.getsize(path), os.stat(path).st_mtime_ns] for path in paths]
+        digest = hashlib.sha256(json.dumps([CACHE_VERSION, sources]).encode()).hexdigest()[:16]
+        directory = os.path.join(cache_dir, digest)
+        if not rebuild and os.path.exists(os.path.join(directory, 'meta.json')):
+            logger.info("Reusing feature cache %s", directory)
+            return cls(directory)
+
+        tmp_dir = f'{directory}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        rows, skipped = 0, 0
+        sums, squares = np.zeros(len(FEATURES)), np.zeros(len(FEATURES))
+        start = time.perf_counter()
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        try:
+            results = pool.imap(_parse_task, _tasks(paths, split_bytes)) if pool else map(_parse_task, _tasks(paths, split_bytes))
+            with open(os.path.join(tmp_dir, 'rows.f32'), 'wb') as out:
+                for task_rows, task_skipped in results:
+                    task_rows.tofile(out)
+                    rows += len(task_rows)
+                    skipped += task_skipped
+                    features = task_rows[:, :len(FEATURES)].astype(np.float64)
+                    sums += features.sum(axis=0)
+                    squares += np.square(features).sum(axis=0)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        finally:
+            if pool:
+                pool.terminate()
+        if not rows:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise ValueError(f"No usable telemetry records in {', '.join(paths)}")
+
+        mean = sums / rows
+        std = np.sqrt(np.maximum(squares / rows - np.square(mean), 0))
+        std[std < 1e-6] = 1  # Constant features are only centered
+        meta = {'version': CACHE_VERSION, 'digest': digest, 'sources': sources, 'columns': COLUMNS,
+                'rows': rows, 'skipped': skipped, 'mean': mean.tolist(), 'std': std.tolist()}
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+        logger.info("Cached %d rows (%d records skipped) from %d files in %.1f s",
+                    rows, skipped, len(paths), time.perf_counter() - start)
+        return cls(directory)
+
+
+class BlockGroups(Dataset):
+    """
+    Item g is the g-th group of `group_blocks` cache blocks of the epoch, as
+    standardized features and action labels. With `shuffle` the block order
+    is a permutation seeded by (seed, epoch) and the rows of each group are
+    shuffled as well: every read from the memory map is a sequential block,
+    and an epoch is reproducible, so training can resume at any group.
+    """
+
+    def __init__(self, cache, blocks, block_rows=TRAINING_BLOCK_ROWS, group_blocks=TRAINING_GROUP_BLOCKS,
+                 shuffle=True, seed=0):
+        self.cache = cache
+        self.blocks = np.asarray(blocks)
+        self.block_rows = block_rows
+        self.group_blocks = group_blocks
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self):
+        return -(-len(self.blocks) // self.group_blocks)
+
+    def group(self, index):
+        """Block indices of group `index`, in file order."""
+        order = np.random.default_rng([self.seed, self.epoch]).permutation(self.blocks) if self.shuffle else self.blocks
+        return np.sort(order[index * self.group_blocks:(index + 1) * self.group_blocks])
+
+    def __getitem__(self, index):
+        rows = self.cache.array()
+        chunk = np.concatenate([rows[block * self.block_rows:(block + 1) * self.block_rows]
+                                for block in self.group(index)])
+        if self.shuffle:
+            chunk = chunk[np.random.default_rng([self.seed, self.epoch, index]).permutation(len(chunk))]
+        features = (chunk[:, :len(FEATURES)] - self.cache.mean) / self.cache.std
+        return torch.from_numpy(features), torch.from_numpy(chunk[:, -1].astype(np.int64))
+
+
+def fold_standardization(weights, biases, mean, std):
+    """
+    Turn a network trained on (x - mean) / std into one taking x: the first
+    layer's input rows are divided by std and mean @ W is taken off its bias.
+    """
+    first = weights[0] / std[:, None]
+    return [first] + list(weights[1:]), [biases[0] - mean @ first] + list(biases[1:])
+
+
+class Trainer:
+    """
+    Mini-batch training of BehaviorNN on a FeatureCache, with checkpoints.
+
+    The last `holdout` fraction of the cache's blocks is kept out of training
+    and evaluated after every epoch. The trainer resumes from
+    `checkpoint_path` when it holds a checkpoint of the same cache and data
+    layout; stop() ends train() after the current group, with a checkpoint.
+    """
+
+    def __init__(self, cache, checkpoint_path=TRAINING_CHECKPOINT_PATH, hidden=(32, 16),
+                 batch_size=TRAINING_BATCH_SIZE, learning_rate=TRAINING_LEARNING_RATE, workers=TRAINING_WORKERS,
+                 block_rows=TRAINING_BLOCK_ROWS, group_blocks=TRAINING_GROUP_BLOCKS, holdout=TRAINING_HOLDOUT,
+                 checkpoint_interval=TRAINING_CHECKPOINT_INTERVAL, seed=0, resume=True):
+        self.cache = cache
+        self.checkpoint_path = checkpoint_path
+        self.hidden = list(hidden)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint_interval = checkpoint_interval
+        self.seed = seed
+
+        blocks = -(-len(cache) // block_rows)
+        self.holdout_blocks = min(blocks - 1, math.ceil(blocks * holdout)) if holdout > 0 else 0
+        self.train_groups = BlockGroups(cache, range(blocks - self.holdout_blocks), block_rows, group_blocks,
+                                        shuffle=True, seed=seed)
+        self.eval_groups = BlockGroups(cache, range(blocks - self.holdout_blocks, blocks), block_rows, group_blocks,
+                                       shuffle=False)
+
+        torch.manual_seed(seed)
+        self.model = BehaviorNN(len(FEATURES), hidden, len(ACTIONS))
+        self.optimizer = torch.optim.Adam(self.model.parameters(), lr=learning_rate)
+        self.epoch = 0  # Completed epochs
+        self.group = 0  # Groups of the current epoch trained on
+        self.steps = 0
+        self.history = []
+        self._loss = [0.0, 0]  # Training loss sum and rows of the current epoch
+        self._stop = threading.Event()
+        self._last_checkpoint = time.monotonic()
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            self.load_checkpoint()
+
+    def layout(self):
+        """What a checkpoint must share with this trainer to resume from it."""
+        return {
+            'cache': self.cache.digest, 'hidden': self.hidden, 'batch_size': self.batch_size, 'seed': self.seed,
+            'block_rows': self.train_groups.block_rows, 'group_blocks': self.train_groups.group_blocks,
+            'holdout_blocks': self.holdout_blocks,
+        }
+
+    def save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        state = {
+            'layout': self.layout(), 'epoch': self.epoch, 'group': self.group, 'steps': self.steps,
+            'loss': list(self._loss), 'history': self.history,
+            'model': self.model.state_dict(), 'optimizer': self.optimizer.state_dict(),
+        }
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._last_checkpoint = time.monotonic()
+        logger.info("Checkpoint at epoch %d, group %d/%d (%d steps)",
+                    self.epoch, self.group, len(self.train_groups), self.steps)
+
+    def load_checkpoint(self):
+        state = torch.load(self.checkpoint_path, map_location='cpu', weights_only=True)
+        if state['layout'] != self.layout():
+            raise ValueError(f"{self.checkpoint_path} was written for another feature cache or data layout; "
+                             "remove it or train without resuming")
+        self.model.load_state_dict(state['model'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.epoch, self.group, self.steps = state['epoch'], state['group'], state['steps']
+        self._loss = list(state['loss'])
+        self.history = state['history']
+        logger.info("Resuming from %s at epoch %d, group %d", self.checkpoint_path, self.epoch, self.group)
+
+    def stop(self):
+        self._stop.set()
+
+    def _loader(self, groups, start=0):
+        return DataLoader(groups, batch_size=None, sampler=range(start, len(groups)), num_workers=self.workers,
+                          prefetch_factor=2 if self.workers else None)
+
+    def _train_group(self, features, labels):
+        for start in range(0, len(labels), self.batch_size):
+            batch_labels = labels[start:start + self.batch_size]
+            self.optimizer.zero_grad(set_to_none=True)
+            loss = F.cross_entropy(self.model(features[start:start + self.batch_size]), batch_labels)
+            loss.backward()
+            self.optimizer.step()
+            self.steps += 1
+            self._loss[0] += loss.item() * len(batch_labels)
+            self._loss[1] += len(batch_labels)
+
+    def train(self, epochs=TRAINING_EPOCHS):
+        """Train until `epochs` epochs are complete, resumed ones included; returns the per-epoch history."""
+        self._stop.clear()
+        while self.epoch < epochs and not self._stop.is_set():
+            self.train_groups.epoch = self.epoch
+            self.model.train()
+            for features, labels in self._loader(self.train_groups, self.group):
+                self._train_group(features, labels)
+                self.group += 1
+                if self._stop.is_set() or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                    self.save_checkpoint()
+                if self._stop.is_set():
+                    break
+            else:
+                result = self.evaluate()
+                result['epoch'] = self.epoch + 1
+                self.history.append(result)
+                self.epoch, self.group, self._loss = self.epoch + 1, 0, [0.0, 0]
+                self.save_checkpoint()
+                logger.info("Epoch %d: %s", self.epoch, result)
+        return self.history
+
+    def evaluate(self):
+        """Training loss of the current epoch, and loss and accuracy on the held-out blocks."""
+        result = {'train_loss': self._loss[0] / self._loss[1] if self._loss[1] else None,
+                  'eval_loss': None, 'eval_accuracy': None}
+        if not len(self.eval_groups):
+            return result
+        self.model.eval()
+        loss, correct, rows = 0.0, 0, 0
+        with torch.no_grad():
+            for features, labels in self._loader(self.eval_groups):
+                logits = self.model(features)
+                loss += F.cross_entropy(logits, labels, reduction='sum').item()
+                correct += int((logits.argmax(dim=1) == labels).sum())
+                rows += len(labels)
+        result.update(eval_loss=loss / rows, eval_accuracy=correct / rows)
+        return result
+
+    def export(self, path):
+        """Write the model as a NumPy engine .npz taking raw features, replacing `path` atomically."""
+        weights, biases, activations = layers_from_state_dict(self.model.state_dict(), ['relu', 'relu', 'softmax'])
+        weights, biases = fold_standardization(weights, biases, self.cache.mean, self.cache.std)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                save_npz(f, weights, biases, activations)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the coin behavior model on player telemetry")
+    parser.add_argument('telemetry', nargs='+', help="JSON lines or .parquet telemetry files")
+    parser.add_argument('--output', default='coin_ai/models/behavior.npz', help="Exported .npz model")
+    parser.add_argument('--epochs', type=int, default=TRAINING_EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=TRAINING_BATCH_SIZE)
+    parser.add_argument('--learning-rate', type=float, default=TRAINING_LEARNING_RATE)
+    parser.add_argument('--workers', type=int, default=TRAINING_WORKERS, help="Parsing and data loading processes")
+    parser.add_argument('--threads', type=int, default=TRAINING_THREADS, help="torch threads for the training steps")
+    parser.add_argument('--cache-dir', default=TRAINING_CACHE_DIR)
+    parser.add_argument('--checkpoint', default=TRAINING_CHECKPOINT_PATH)
+    parser.add_argument('--no-resume', action='store_true', help="Ignore an existing checkpoint")
+    parser.add_argument('--rebuild-cache', action='store_true', help="Parse the telemetry even if it is cached")
+    args = parser.parse_args(argv)
+
+    from utils.logger import setup_logging
+    setup_logging()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    cache = FeatureCache.build(args.telemetry, args.cache_dir, args.workers, rebuild=args.rebuild_cache)
+    print(f"Feature cache {cache.directory}: {len(cache)} rows ({cache.meta['skipped']} records skipped)")
+    trainer = Trainer(cache, args.checkpoint, batch_size=args.batch_size, learning_rate=args.learning_rate,
+                      workers=args.workers, resume=not args.no_resume)
+
+    def handle_signal(signum, frame):
+        print("Stopping after the current group...")
+        trainer.stop()
+
+    # Installed before the DataLoader forks its workers, which thereby ignore Ctrl-C too
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    reported = len(trainer.history)
+    trainer.train(args.epochs)
+    for result in trainer.history[reported:]:
+        print(f"Epoch {result['epoch']}: {json.dumps(result)}")
+    if trainer.epoch < args.epochs:
+        print(f"Stopped at epoch {trainer.epoch + 1}, group {trainer.group}; run again to resume from {args.checkpoint}")
+        return 1
+    print(f"Exported the model to {trainer.export(args.output)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,23 +6,157 @@ ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')  # default to 'development
 # Server settings
 SERVER_HOST = os.getenv('SERVER_HOST', 'localhost')
 SERVER_PORT = int(os.getenv('SERVER_PORT', 8000))
+# Request threads per worker: gunicorn runs gthread workers with this many threads, and server/asgi.py
+# runs the Flask routes in a threadpool of this size
+WEB_THREADS = int(os.getenv('WEB_THREADS', 64))
 
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')  # Example: for local SQLite
 DATABASE_USERNAME = os.getenv('DATABASE_USERNAME', '')
 DATABASE_PASSWORD = os.getenv('DATABASE_PASSWORD', '')
 
+# Spawn store: rows queued within SPAWN_STORE_FLUSH_MS (up to SPAWN_STORE_BATCH_SIZE) share one commit
+SPAWN_STORE_BATCH_SIZE = int(os.getenv('SPAWN_STORE_BATCH_SIZE', 1000))
+SPAWN_STORE_FLUSH_MS = float(os.getenv('SPAWN_STORE_FLUSH_MS', 5))
+SPAWN_STORE_ID_BLOCK = int(os.getenv('SPAWN_STORE_ID_BLOCK', 1000))  # Character IDs reserved per process at a time
+SPAWN_QUERY_MAX_LIMIT = int(os.getenv('SPAWN_QUERY_MAX_LIMIT', 1000))  # Max rows per spawn query
+
 # API Keys or Tokens (for external services)
 API_KEY = os.getenv('API_KEY', '')
 SECRET_KEY = os.getenv('SECRET_KEY', 'defaultsecretkey')
 
 # AI Configuration
 AI_MODEL_PATH = os.getenv('AI_MODEL_PATH', 'coin_ai/models/model_data.bin')
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', 5))  # Seconds between model file change checks
+AGENT_THINK_TIME = float(os.getenv('AGENT_THINK_TIME', 0))  # Simulated decision latency (awaited, never slept)
+# Reuse long-lived agents per coin name instead of building one per request
+AGENT_POOLING = os.getenv('AGENT_POOLING', 'true').lower() == 'true'
+AGENT_POOL_SIZE = int(os.getenv('AGENT_POOL_SIZE', 100000))
+# Serve NumPy-engine weights from one memory-mapped copy per model version shared by all worker processes
+MODEL_SHARED_WEIGHTS = os.getenv('MODEL_SHARED_WEIGHTS', 'false').lower() == 'true'
+MODEL_SHARED_DIR = os.getenv('MODEL_SHARED_DIR', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else '/tmp', 'bloxverse-models'))
+# Heavy modules to import at worker start instead of on first use, e.g. "tensorflow,web3"
+PRELOAD_MODULES = os.getenv('PRELOAD_MODULES', '')
+
+# Behavior model training (python -m coin_ai.training): telemetry is parsed once into a memory-mapped
+# feature cache, then read in shuffled groups of TRAINING_BLOCK_ROWS-row blocks by TRAINING_WORKERS processes
+TRAINING_CACHE_DIR = os.getenv('TRAINING_CACHE_DIR', 'training_cache')
+TRAINING_CHECKPOINT_PATH = os.getenv('TRAINING_CHECKPOINT_PATH', 'training_checkpoint.pt')
+TRAINING_WORKERS = int(os.getenv('TRAINING_WORKERS', os.cpu_count() or 1))
+TRAINING_THREADS = int(os.getenv('TRAINING_THREADS', 0))  # torch intra-op threads, 0 keeps torch's default
+TRAINING_BATCH_SIZE = int(os.getenv('TRAINING_BATCH_SIZE', 1024))
+TRAINING_EPOCHS = int(os.getenv('TRAINING_EPOCHS', 5))
+TRAINING_LEARNING_RATE = float(os.getenv('TRAINING_LEARNING_RATE', 0.003))
+TRAINING_BLOCK_ROWS = int(os.getenv('TRAINING_BLOCK_ROWS', 65536))
+TRAINING_GROUP_BLOCKS = int(os.getenv('TRAINING_GROUP_BLOCKS', 4))  # Blocks shuffled together
+TRAINING_HOLDOUT = float(os.getenv('TRAINING_HOLDOUT', 0.02))  # Fraction of the rows (the last blocks) kept for evaluation
+TRAINING_CHECKPOINT_INTERVAL = float(os.getenv('TRAINING_CHECKPOINT_INTERVAL', 300))  # Seconds between checkpoints
+
+# Precompute every model's action for the discrete attribute grid (1-10 x 3, 4 moods) at load
+BEHAVIOR_TABLE = os.getenv('BEHAVIOR_TABLE', 'true').lower() == 'true'
+
+# AI gateway in front of the external AI API used by the Roblox AiIntegration / AIService modules
+# 'http' calls AI_PROVIDER_URL (while it is unset, the /api/ai routes answer 503), 'stub' is a local,
+# deterministic stand-in for tests and benchmarks that is refused when ENVIRONMENT is 'production'
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'http')
+AI_PROVIDER_URL = os.getenv('AI_PROVIDER_URL', '')  # e.g. https://example-ai-service.com/api/generate-response
+AI_API_KEY = os.getenv('AI_API_KEY', API_KEY)
+AI_REQUEST_TIMEOUT = float(os.getenv('AI_REQUEST_TIMEOUT', 30))  # Seconds
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 10000))
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', 300))  # Seconds a completion is reused for the same prompt
+AI_GATEWAY_CONCURRENCY = int(os.getenv('AI_GATEWAY_CONCURRENCY', 8))  # Provider calls in flight per batch
+AI_MAX_TOKENS = int(os.getenv('AI_MAX_TOKENS', 1024))
+AI_BATCH_MAX_ITEMS = int(os.getenv('AI_BATCH_MAX_ITEMS', 64))  # Prompts per /api/ai/complete_batch request
+
+# Inference micro-batching: flush when the batch is full or the oldest request has waited this long
+INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'true').lower() == 'true'
+INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', 32))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv('INFERENCE_BATCH_WAIT_MS', 2))
+
+# Spawn placement: 'poisson' keeps coins SPAWN_MIN_SEPARATION apart (blue noise), 'uniform' ignores other coins
+SPAWN_PLACEMENT = os.getenv('SPAWN_PLACEMENT', 'poisson')
+SPAWN_MIN_SEPARATION = float(os.getenv('SPAWN_MIN_SEPARATION', 1.5))
+SPATIAL_GRID_CELL = float(os.getenv('SPATIAL_GRID_CELL', 5))  # Cell size of the per-world live coin index
+# Seconds between catch-ups of a worker's live coin index with the spawns and despawns of the other workers
+SPATIAL_INDEX_REFRESH = float(os.getenv('SPATIAL_INDEX_REFRESH', 1))
+
+# Event feed for Roblox servers: events kept per world, and long-poll / SSE timing in seconds.
+# The feed is a SQLite file shared by every worker process
+EVENT_FEED_PATH = os.getenv('EVENT_FEED_PATH', 'events.sqlite3')
+EVENT_FEED_SIZE = int(os.getenv('EVENT_FEED_SIZE', 10000))
+EVENT_FEED_POLL_INTERVAL = float(os.getenv('EVENT_FEED_POLL_INTERVAL', 0.05))  # Checks for other workers' events
+EVENT_POLL_MAX_TIMEOUT = float(os.getenv('EVENT_POLL_MAX_TIMEOUT', 25))
+EVENT_STREAM_HEARTBEAT = float(os.getenv('EVENT_STREAM_HEARTBEAT', 15))
+EVENT_STREAM_MAX_SECONDS = float(os.getenv('EVENT_STREAM_MAX_SECONDS', 300))  # Clients reconnect with Last-Event-ID
+# Long-polls and SSE streams open at once per worker; each holds a request thread, so beyond this they get 503
+# and the other WEB_THREADS - EVENT_MAX_SUBSCRIBERS threads stay free for /spawn_coin
+EVENT_MAX_SUBSCRIBERS = int(os.getenv('EVENT_MAX_SUBSCRIBERS', WEB_THREADS // 2))
+# Maximum number of player wallet updates accepted by /api/update_wallets
+WALLET_UPDATE_BATCH_MAX_ITEMS = int(os.getenv('WALLET_UPDATE_BATCH_MAX_ITEMS', 1000))
+
+# Maximum number of spawn specs accepted by /spawn_coin/batch
+SPAWN_BATCH_MAX_ITEMS = int(os.getenv('SPAWN_BATCH_MAX_ITEMS', 500))
+
+# Admission control (per worker process): token buckets of sustained requests per second and burst size
+# per wallet and per game server (GAME_SERVER_HEADER, else the client address); 0 disables a limit
+WALLET_RATE_LIMIT = float(os.getenv('WALLET_RATE_LIMIT', 2))
+WALLET_RATE_BURST = int(os.getenv('WALLET_RATE_BURST', 10))
+GAME_SERVER_RATE_LIMIT = float(os.getenv('GAME_SERVER_RATE_LIMIT', 50))
+GAME_SERVER_RATE_BURST = int(os.getenv('GAME_SERVER_RATE_BURST', 200))
+GAME_SERVER_HEADER = os.getenv('GAME_SERVER_HEADER', 'X-Game-Server-Id')  # e.g. the server's game.JobId
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+# Requests in flight per stage, and seconds a request may queue for a slot before it is shed (503)
+RPC_MAX_IN_FLIGHT = int(os.getenv('RPC_MAX_IN_FLIGHT', 32))
+RPC_QUEUE_BUDGET = float(os.getenv('RPC_QUEUE_BUDGET', 0.5))
+# Beyond the inference budget /spawn serves the rule-based behavior instead of running the model
+INFERENCE_MAX_IN_FLIGHT = int(os.getenv('INFERENCE_MAX_IN_FLIGHT', 64))  # Room for two micro-batches
+INFERENCE_QUEUE_BUDGET = float(os.getenv('INFERENCE_QUEUE_BUDGET', 0.05))
+
+# Metrics served at /metrics: per-stage latency histograms and RPC error counters
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+# Directory shared by all gunicorn workers (emptied at deploy); /metrics sums their totals. Empty = this process only
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))  # Seconds between worker snapshot writes
 
 # Logging Configuration
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')  # Default log level
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # Default log level
 LOG_FILE = os.getenv('LOG_FILE', 'app.log')  # Default log file
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # 'json' (one object per line) or 'text'
+LOG_CONSOLE_LEVEL = os.getenv('LOG_CONSOLE_LEVEL', 'WARNING')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))  # Rotate the log file at this size
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # Records beyond this are dropped, never blocking a request
+# Fraction of DEBUG records kept per logger, e.g. "coin_ai.agent=0.01,utils.web3_validator=0.1"
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', 'coin_ai.agent=0.01')
+# Minimum level of chatty third-party loggers, whatever LOG_LEVEL is
+LOG_LIBRARY_LEVELS = os.getenv('LOG_LIBRARY_LEVELS', 'web3=WARNING,urllib3=WARNING,httpx=WARNING,httpcore=WARNING')
 
 # Web3 Configuration for Blockchain Integration
 WEB3_RPC_URL = os.getenv('WEB3_RPC_URL', 'https://mainnet.infura.io/v3/YOUR_INFURA_PROJECT_ID')  # Example default for Infura
+WEB3_RPC_URLS = [url.strip() for url in WEB3_RPC_URL.split(',') if url.strip()]  # Comma-separated URLs, tried in order
+WEB3_POOL_SIZE = int(os.getenv('WEB3_POOL_SIZE', 10))  # Keep-alive connections per RPC URL
+WEB3_REQUEST_TIMEOUT = float(os.getenv('WEB3_REQUEST_TIMEOUT', 5))  # Seconds
+WEB3_HEALTH_CHECK_INTERVAL = float(os.getenv('WEB3_HEALTH_CHECK_INTERVAL', 15))  # Seconds between background checks
+WEB3_CHAIN_ID = int(os.getenv('WEB3_CHAIN_ID', 1))  # Chain served by WEB3_RPC_URL (1 = Ethereum mainnet)
+
+# Token balance cache
+BALANCE_CACHE_MAX_ENTRIES = int(os.getenv('BALANCE_CACHE_MAX_ENTRIES', 100000))
+BALANCE_CACHE_TTL = float(os.getenv('BALANCE_CACHE_TTL', 30))  # Seconds for wallets holding tokens
+BALANCE_CACHE_NEGATIVE_TTL = float(os.getenv('BALANCE_CACHE_NEGATIVE_TTL', 5))  # Seconds for failed or zero balances
+
+# Multi-wallet balance checks: 'rpc_batch' (JSON-RPC batch) or 'multicall' (Multicall3 aggregate3)
+BALANCE_BATCH_MODE = os.getenv('BALANCE_BATCH_MODE', 'rpc_batch')
+BALANCE_BATCH_MAX_SIZE = int(os.getenv('BALANCE_BATCH_MAX_SIZE', 100))  # balanceOf calls per request
+MULTICALL3_ADDRESS = os.getenv('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
 TOKEN_CONTRACT_ADDRESS = os.getenv('TOKEN_CONTRACT_ADDRESS', '0xTokenContractAddress')  # Example token contract address
+
+# Spawn gate balances: 'rpc' (balanceOf through the balance cache) or 'index' (local Transfer log index, see
+# utils/token_index.py); with 'index', RPC is still used while the index is staler than TOKEN_INDEX_MAX_STALENESS
+BALANCE_SOURCE = os.getenv('BALANCE_SOURCE', 'rpc')
+TOKEN_INDEX_PATH = os.getenv('TOKEN_INDEX_PATH', 'token_index.sqlite3')
+TOKEN_INDEX_START_BLOCK = int(os.getenv('TOKEN_INDEX_START_BLOCK', 0))  # At or before the token's deployment
+TOKEN_INDEX_CHUNK_SIZE = int(os.getenv('TOKEN_INDEX_CHUNK_SIZE', 2000))  # Blocks per eth_getLogs call
+TOKEN_INDEX_REORG_DEPTH = int(os.getenv('TOKEN_INDEX_REORG_DEPTH', 64))  # Recent blocks that can be rolled back
+TOKEN_INDEX_POLL_INTERVAL = float(os.getenv('TOKEN_INDEX_POLL_INTERVAL', 2))  # Seconds between head checks
+TOKEN_INDEX_MAX_STALENESS = float(os.getenv('TOKEN_INDEX_MAX_STALENESS', 30))  # Seconds since the index reached the head
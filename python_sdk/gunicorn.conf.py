@@ -0,0 +1,51 @@
+"""
+gunicorn settings for the Flask server (server/main.py): the app and its
+models are loaded once in the master, then the workers are forked from it.
+
+    cd python_sdk && gunicorn -c gunicorn.conf.py
+
+Model weights are memory-mapped from MODEL_SHARED_DIR, so every worker reads
+the master's copy, and a model published with coin_ai.shared_weights is
+mapped once for all workers when they hot-reload it.
+
+Workers are threaded (gthread, WEB_THREADS threads each): event long-polls
+and SSE streams hold a thread while they wait, and sync workers would give
+each of them a whole worker. At most EVENT_MAX_SUBSCRIBERS of the threads
+serve the event feed; the rest stay free for the spawn routes.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+
+SDK_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SDK_ROOT)
+
+# Must be set before the app (and config.settings) is imported
+os.environ.setdefault('MODEL_SHARED_WEIGHTS', 'true')
+os.environ.setdefault('METRICS_DIR', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else '/tmp', 'bloxverse-metrics'))
+
+from config.settings import METRICS_DIR, SERVER_HOST, SERVER_PORT, WEB_THREADS  # noqa: E402
+
+pythonpath = f"{SDK_ROOT},{os.path.join(SDK_ROOT, 'server')}"
+wsgi_app = 'main:app'
+bind = f'{SERVER_HOST}:{SERVER_PORT}'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = WEB_THREADS
+preload_app = True
+
+
+def on_starting(server):
+    # Refuse to start with a misconfigured AI provider; without AI_PROVIDER_URL only the AI routes are off
+    from utils.ai_gateway import check_ai_provider
+    check_ai_provider()
+    # Counters restart with the server; drop the previous run's worker totals
+    if METRICS_DIR:
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # Each worker runs its own log listener thread; importing the app configures no logging
+    from utils.logger import setup_logging
+    setup_logging()
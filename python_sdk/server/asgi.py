@@ -0,0 +1,130 @@
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from flask import Flask
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.routing import Mount
+from coin_ai.agent import default_agent_pool, get_coin_behavior_or_rules_async
+from coin_ai.batching import batcher_stats
+from coin_ai.registry import default_registry
+from config.settings import PRELOAD_MODULES, WEB_THREADS
+from utils.admission import admission_stats, game_server_key, game_server_limiter, retry_after_header
+from utils.ai_gateway import check_ai_provider
+from utils.lazy_imports import import_stats, preload_modules
+from utils.logger import setup_logging
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, current_endpoint, instrument_flask, metrics
+from utils.schemas import SpawnRequest
+from server.controllers import ai_controller, event_controller, spawn_controller
+import logging
+import time
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Queue-based logging: the event loop only enqueues records
+    setup_logging()
+    # Refuse to start with a misconfigured AI provider; without AI_PROVIDER_URL only the AI routes are off
+    check_ai_provider()
+    # The mounted Flask routes run in this threadpool; event long-polls and SSE streams hold a thread
+    # each (at most EVENT_MAX_SUBSCRIBERS of them)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = WEB_THREADS
+    yield
+
+
+# ASGI entry point: uvicorn server.asgi:app
+app = FastAPI(title="Coin Character AI Server", lifespan=lifespan)
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = "path_to_your_model.h5"
+
+# TensorFlow/torch/web3 load on first use unless the worker asks for them up front
+preload_modules(PRELOAD_MODULES)
+
+# Load and warm up the model once per worker so requests share it
+default_registry.preload([MODEL_PATH])
+
+
+# Request latency and status per route; stages are timed in the handlers
+@app.middleware('http')
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    current_endpoint.set(request.url.path)
+    response = await call_next(request)
+    route = request.scope.get('route')
+    if isinstance(route, Mount):
+        # The mounted Flask routes are recorded by the Flask app
+        return response
+    endpoint = route.path if route is not None else 'unmatched'
+    metrics.observe('request_seconds', time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc('requests_total', endpoint=endpoint, status=str(response.status_code))
+    return response
+
+
+@app.get('/')
+async def home():
+    return "Welcome to the Coin Character AI Server!"
+
+
+# Endpoint to inspect the models loaded by this worker
+@app.get('/models')
+async def models():
+    return {
+        'models': default_registry.stats(),
+        'batchers': batcher_stats(),
+        'imports': import_stats(),
+        'agents': default_agent_pool.stats(),
+        'admission': admission_stats(),
+    }
+
+
+# Prometheus metrics of every worker sharing METRICS_DIR; ?format=json for p50/p95/p99 per series
+@app.get('/metrics')
+async def metrics_endpoint(format: str = None):
+    if format == 'json':
+        return metrics.summary()
+    return Response(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+# Endpoint to resolve a coin character's behavior without blocking the worker
+@app.post('/spawn')
+async def spawn(request: Request):
+    # Per-game-server rate limit, checked before any other work
+    client_address = request.client.host if request.client else None
+    retry_after = game_server_limiter.acquire(game_server_key(request.headers, client_address))
+    if retry_after:
+        metrics.inc('shed_total', endpoint='/spawn', reason='game_server_rate_limit')
+        return JSONResponse({'error': 'Rate limit exceeded for this game server'}, status_code=429,
+                            headers={'Retry-After': retry_after_header(retry_after)})
+
+    # Parse and validate the request body in one pass (same schema as the Flask server)
+    body = await request.body()
+    with metrics.stage('validation'):
+        payload, error = SpawnRequest.parse_json(body)
+    if error:
+        return JSONResponse({'error': 'Invalid input data', 'details': error}, status_code=400)
+
+    try:
+        # Get behavior prediction from the AI model; any thinking delay is awaited.
+        # With every inference slot taken the mood rules answer instead
+        coin_features = payload.coin_features.model_dump(exclude_unset=True)
+        with metrics.stage('inference'):
+            behavior, degraded = await get_coin_behavior_or_rules_async(MODEL_PATH, coin_features)
+        if degraded:
+            metrics.inc('degraded_total', endpoint='/spawn')
+
+        return {'status': 'success', 'behavior': behavior, 'degraded': degraded}
+
+    except Exception as e:
+        logger.exception("Error in /spawn: %s", e)
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+
+# /spawn_coin, the event feed and the AI gateway: the Flask routes run in the threadpool,
+# behind the routes above
+controllers = instrument_flask(Flask(__name__))
+controllers.register_blueprint(spawn_controller.blueprint)
+controllers.register_blueprint(event_controller.blueprint)
+controllers.register_blueprint(ai_controller.blueprint)
+app.mount('/', WSGIMiddleware(controllers))
@@ -0,0 +1,70 @@
+from flask import Blueprint, Flask, request, jsonify
+from utils.ai_gateway import AIProviderError, AIProviderNotConfigured, get_ai_gateway
+from utils.schemas import AICompletionRequest
+from config.settings import AI_BATCH_MAX_ITEMS
+
+# AI gateway routes, registered on the served apps (server/main.py, server/asgi.py)
+blueprint = Blueprint('ai', __name__)
+
+def _gateway():
+    """The AI gateway, or an error while no provider is configured. Returns (gateway, error)."""
+    try:
+        return get_ai_gateway(), None
+    except AIProviderNotConfigured as e:
+        return None, str(e)
+
+# One completion through the gateway cache; identical prompts in flight share one provider call
+@blueprint.route('/api/ai/complete', methods=['POST'])
+def complete():
+    payload, error = AICompletionRequest.parse_json(request.get_data())
+    if error:
+        return jsonify({"error": error}), 400
+    gateway, error = _gateway()
+    if error:
+        return jsonify({"error": error}), 503
+    try:
+        text = gateway.complete(payload.prompt, payload.max_tokens)
+    except AIProviderError as e:
+        return jsonify({"error": str(e)}), 502
+    return jsonify({'text': text})
+
+# Many NPC prompts in one request; duplicates are resolved once and failures are reported per item
+@blueprint.route('/api/ai/complete_batch', methods=['POST'])
+def complete_batch():
+    data = request.get_json(silent=True)
+    items = data.get('requests') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'requests' must be a non-empty list"}), 400
+    if len(items) > AI_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {AI_BATCH_MAX_ITEMS} prompts per batch"}), 400
+    gateway, error = _gateway()
+    if error:
+        return jsonify({"error": error}), 503
+
+    parsed = [AICompletionRequest.parse(item) for item in items]
+    valid = [i for i, (_, error) in enumerate(parsed) if error is None]
+    completions = gateway.complete_many([(parsed[i][0].prompt, parsed[i][0].max_tokens) for i in valid])
+
+    results = [{'index': i, 'error': error} for i, (_, error) in enumerate(parsed)]
+    for i, completion in zip(valid, completions):
+        results[i] = {'index': i, **completion}
+    return jsonify({
+        'results': results,
+        'completed': sum(1 for result in results if 'text' in result),
+        'failed': sum(1 for result in results if 'error' in result),
+    })
+
+# Gateway statistics: provider calls, deduplicated prompts and cache hit rate
+@blueprint.route('/api/ai/stats', methods=['GET'])
+def ai_stats():
+    gateway, error = _gateway()
+    if error:
+        return jsonify({"error": error}), 503
+    return jsonify(gateway.stats())
+
+# Standalone app serving only these routes (python -m server.controllers.ai_controller)
+app = Flask(__name__)
+app.register_blueprint(blueprint)
+
+if __name__ == '__main__':
+    app.run(debug=True, threaded=True)
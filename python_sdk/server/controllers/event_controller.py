@@ -0,0 +1,165 @@
+from flask import Blueprint, Flask, Response, request, jsonify
+from utils.admission import event_limiter, retry_after_header
+from utils.event_feed import format_sse, get_event_feed
+from utils.metrics import current_endpoint, metrics
+from utils.schemas import WalletUpdate, is_valid_world
+from utils.spatial_index import DEFAULT_WORLD
+from config.settings import (
+    EVENT_POLL_MAX_TIMEOUT, EVENT_STREAM_HEARTBEAT, EVENT_STREAM_MAX_SECONDS, WALLET_UPDATE_BATCH_MAX_ITEMS,
+)
+import time
+
+# Event feed and wallet update routes, registered on the served apps (server/main.py, server/asgi.py)
+blueprint = Blueprint('events', __name__)
+
+
+def publish_wallet_updates(updates):
+    """Publish validated WalletUpdates as 'wallet_update' events; the last update per player wins."""
+    latest = {}
+    for update in updates:
+        latest[(update.world, update.player_id)] = update
+    by_world = {}
+    for (world, _), update in latest.items():
+        by_world.setdefault(world, []).append(update.model_dump(exclude={'world'}))
+    feed = get_event_feed()
+    for world, items in by_world.items():
+        feed.publish_many(world, 'wallet_update', items)
+
+# Single player wallet update (kept for older CoinSDK versions)
+@blueprint.route('/api/update_wallet', methods=['POST'])
+def update_wallet():
+    update, error = WalletUpdate.parse_json(request.get_data())
+    if error:
+        return jsonify({"error": error}), 400
+    publish_wallet_updates([update])
+    return jsonify({'status': 'success'})
+
+# Many player wallet updates from one game server in a single request; failures are reported per item
+@blueprint.route('/api/update_wallets', methods=['POST'])
+def update_wallets():
+    data = request.get_json(silent=True)
+    updates = data.get('updates') if isinstance(data, dict) else data
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "'updates' must be a non-empty list"}), 400
+    if len(updates) > WALLET_UPDATE_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {WALLET_UPDATE_BATCH_MAX_ITEMS} updates per batch"}), 400
+    world = data.get('world', DEFAULT_WORLD) if isinstance(data, dict) else DEFAULT_WORLD
+
+    valid = []
+    errors = []
+    for i, item in enumerate(updates):
+        if isinstance(item, dict):
+            # Items belong to the batch's world unless they name their own
+            item = {'world': world, **item}
+        update, error = WalletUpdate.parse(item)
+        if error:
+            errors.append({'index': i, 'error': error})
+        else:
+            valid.append(update)
+    publish_wallet_updates(valid)
+
+    return jsonify({'accepted': len(valid), 'failed': len(errors), 'errors': errors})
+
+def _too_many_subscribers():
+    """503 for a subscriber beyond EVENT_MAX_SUBSCRIBERS, which would take a thread /spawn_coin needs."""
+    metrics.inc('shed_total', endpoint=current_endpoint.get(), reason='event_subscribers')
+    response = jsonify({"error": "Too many event subscribers, retry later"})
+    response.headers['Retry-After'] = retry_after_header(event_limiter.retry_after())
+    return response, 503
+
+def _event_cursor(world):
+    """Check the world and read the ?after= / ?epoch= cursor. Returns (after, error)."""
+    if not is_valid_world(world):
+        return None, "Invalid world, must be a name of 1 to 64 characters"
+    try:
+        after = int(request.args.get('after', request.headers.get('Last-Event-ID', 0)))
+    except ValueError:
+        return None, "'after' must be an integer event ID"
+    # IDs from another epoch (another feed file) mean nothing here
+    epoch = request.args.get('epoch')
+    if epoch and epoch != get_event_feed().epoch:
+        after = 0
+    return max(after, 0), None
+
+# Long-poll: returns as soon as the world has events after ?after=, or empty after ?timeout= seconds
+# (a world nothing was published to is empty). Each waiting poll holds a request thread of the worker,
+# so at most EVENT_MAX_SUBSCRIBERS polls and streams are open at once
+@blueprint.route('/api/events/<world>', methods=['GET'])
+def poll_events(world):
+    after, error = _event_cursor(world)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        timeout = min(max(float(request.args.get('timeout', EVENT_POLL_MAX_TIMEOUT)), 0), EVENT_POLL_MAX_TIMEOUT)
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "'timeout' and 'limit' must be numbers"}), 400
+
+    if not event_limiter.acquire():
+        return _too_many_subscribers()
+    start = time.perf_counter()
+    try:
+        feed = get_event_feed()
+        events, missed = feed.read(world, after=after, limit=limit, timeout=timeout)
+    finally:
+        event_limiter.release(time.perf_counter() - start)
+    return jsonify({
+        'events': events,
+        'last_id': events[-1]['id'] if events else after,
+        'epoch': feed.epoch,
+        'missed': missed,
+    })
+
+# Server-Sent Events stream of a world's events; reconnect with Last-Event-ID to resume.
+# A stream holds a request thread and one of the EVENT_MAX_SUBSCRIBERS slots until it ends
+@blueprint.route('/api/events/<world>/stream', methods=['GET'])
+def stream_events(world):
+    after, error = _event_cursor(world)
+    if error:
+        return jsonify({"error": error}), 400
+    if not event_limiter.acquire():
+        return _too_many_subscribers()
+    feed = get_event_feed()
+    start = time.perf_counter()
+    released = []
+
+    def release():
+        # From the generator when the stream ends, or on close if it never started
+        if not released:
+            released.append(True)
+            event_limiter.release(time.perf_counter() - start)
+
+    def generate(after):
+        try:
+            yield f"retry: 1000\nevent: hello\ndata: {{\"epoch\": \"{feed.epoch}\"}}\n\n"
+            # Streams end after EVENT_STREAM_MAX_SECONDS so a worker thread is never held forever
+            deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                events, _ = feed.read(world, after=after, limit=1000, timeout=EVENT_STREAM_HEARTBEAT)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    yield format_sse(event)
+                after = events[-1]['id']
+        finally:
+            release()
+
+    response = Response(generate(after), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    response.call_on_close(release)
+    return response
+
+# Event feed statistics (events published and kept per world); outside /api/events/ so any world name is pollable
+@blueprint.route('/api/event_stats', methods=['GET'])
+def event_stats():
+    return jsonify(get_event_feed().stats())
+
+# Standalone app serving only these routes (python -m server.controllers.event_controller)
+app = Flask(__name__)
+app.register_blueprint(blueprint)
+
+if __name__ == '__main__':
+    app.run(debug=True, threaded=True)
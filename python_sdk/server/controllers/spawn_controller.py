@@ -1,55 +1,109 @@
-from flask import Flask, request, jsonify
-from utils.web3_validator import connect_to_blockchain, validate_wallet_address, get_token_balance
+from flask import Blueprint, Flask, Response, request, jsonify
+from utils.web3_validator import (
+    RpcUnavailable, get_connection_manager, get_web3, get_cached_token_balance, get_cached_token_balances,
+    balance_cache, is_valid_address,
+)
+from utils.schemas import SpawnCoinRequest, is_valid_world
+from utils.spawn_store import get_spawn_store
+from utils.spatial_index import DEFAULT_WORLD, get_world_index
+from utils.event_feed import get_event_feed
+from utils.token_index import get_token_index
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, current_endpoint, instrument_flask, metrics
+from utils.admission import (
+    Overloaded, admission_stats, game_server_key, game_server_limiter, retry_after_header, wallet_limiter,
+)
+from config.settings import (
+    BALANCE_SOURCE, SPAWN_BATCH_MAX_ITEMS, SPAWN_QUERY_MAX_LIMIT, SPAWN_PLACEMENT, SPAWN_MIN_SEPARATION,
+    TOKEN_INDEX_MAX_STALENESS, WEB3_HEALTH_CHECK_INTERVAL,
+)
+import numpy as np
 import random
 
-# Initialize Flask app
-app = Flask(__name__)
-
-# Blockchain provider URL (e.g., Infura, Alchemy)
-PROVIDER_URL = 'https://mainnet.infura.io/v3/YOUR_INFURA_PROJECT_ID'
+# Spawn routes, registered on the served apps (server/main.py, server/asgi.py)
+blueprint = Blueprint('spawn_coin', __name__)
 
 # Token contract address (e.g., USDT contract address on Ethereum mainnet)
 TOKEN_CONTRACT_ADDRESS = '0xTokenContractAddress'
 
+SIZES = ['small', 'medium', 'large']
+COLORS = ['gold', 'silver', 'bronze']
+
+# Spawn area of every game world: x and z on the ground plane, y is the height
+WORLD_X = (-100, 100)
+WORLD_Y = (0, 50)
+WORLD_Z = (-100, 100)
+
+def shed(error, reason, retry_after, status=429):
+    """Turn a request away at once, telling the client when to retry."""
+    metrics.inc('shed_total', endpoint=current_endpoint.get(), reason=reason)
+    response = jsonify({"error": error})
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response, status
+
+def indexed_balances(wallets):
+    """
+    Token balances (smallest unit) from the local Transfer index when
+    BALANCE_SOURCE is 'index', or None to look them up over RPC: the index is
+    not used, or has not reached the chain head within TOKEN_INDEX_MAX_STALENESS.
+    """
+    if BALANCE_SOURCE != 'index':
+        return None
+    with metrics.stage('balance_index'):
+        balances = get_token_index().balances(wallets, TOKEN_CONTRACT_ADDRESS, TOKEN_INDEX_MAX_STALENESS)
+    metrics.inc('balance_lookups_total', source='rpc' if balances is None else 'index')
+    return balances
+
 # This function simulates spawning a coin character with token ownership validation
-@app.route('/spawn_coin', methods=['POST'])
+@blueprint.route('/spawn_coin', methods=['POST'])
 def spawn_coin_character():
-    # Extract parameters from the request
-    wallet_address = request.json.get('wallet_address')
-    behavior = request.json.get('behavior')
-    speed = request.json.get('speed')
-    size = request.json.get('size')
-    strength = request.json.get('strength')
-    
-    # Connect to the blockchain
-    w3 = connect_to_blockchain(PROVIDER_URL)
-    if not w3:
-        return jsonify({"error": "Failed to connect to the blockchain"}), 500
-    
-    # Validate the wallet address
-    if not validate_wallet_address(w3, wallet_address):
-        return jsonify({"error": "Invalid wallet address"}), 400
-    
-    # Check token ownership (you can define a minimum threshold for the token balance)
-    token_balance = get_token_balance(w3, wallet_address, TOKEN_CONTRACT_ADDRESS)
+    # Per-game-server rate limit, checked before any other work
+    retry_after = game_server_limiter.acquire(game_server_key(request.headers, request.remote_addr))
+    if retry_after:
+        return shed("Rate limit exceeded for this game server", 'game_server_rate_limit', retry_after)
+
+    # Parse and validate the request body in one pass
+    with metrics.stage('validation'):
+        payload, error = SpawnCoinRequest.parse_json(request.get_data())
+    if error:
+        return jsonify({"error": error}), 400
+    wallet_address = payload.wallet_address
+    behavior = payload.behavior
+    speed = payload.speed
+    size = payload.size
+    strength = payload.strength
+
+    retry_after = wallet_limiter.acquire(wallet_address)
+    if retry_after:
+        return shed("Rate limit exceeded for this wallet", 'wallet_rate_limit', retry_after)
+
+    # Check token ownership (you can define a minimum threshold for the token balance),
+    # from the local Transfer index while it is fresh
+    balances = indexed_balances([wallet_address])
+    if balances is not None:
+        token_balance = balances[wallet_address]
+    else:
+        # Get a pooled connection to the blockchain (configured via WEB3_RPC_URL)
+        with metrics.stage('connect'):
+            w3 = get_web3()
+        if not w3:
+            return jsonify({"error": "Failed to connect to the blockchain"}), 500
+
+        # A cache miss waits for an RPC slot no longer than RPC_QUEUE_BUDGET, and fails over
+        # to the next healthy RPC URL; a balance no endpoint could read is not a zero balance
+        try:
+            with metrics.stage('balance'):
+                token_balance = get_cached_token_balance(w3, wallet_address, TOKEN_CONTRACT_ADDRESS)
+        except Overloaded as e:
+            return shed("Blockchain RPC is overloaded, retry later", 'rpc_overloaded', e.retry_after, 503)
+        except RpcUnavailable:
+            return shed("Blockchain RPC is unavailable, retry later", 'rpc_unavailable', WEB3_HEALTH_CHECK_INTERVAL, 503)
     if token_balance is None or token_balance <= 0:
         return jsonify({"error": "Insufficient token balance for spawning a coin character"}), 400
     
     # If validation passes, proceed with spawning the coin character
-    character_id = random.randint(10000, 99999)  # Simulating a unique character ID
-    spawn_location = generate_random_spawn_location()
-
-    # Validate additional attributes
-    if speed is not None and (speed < 0 or speed > 10):
-        return jsonify({"error": "Invalid speed value, must be between 0 and 10"}), 400
-    if size is not None and size not in ['small', 'medium', 'large']:
-        return jsonify({"error": "Invalid size, must be 'small', 'medium', or 'large'"}), 400
-    if strength is not None and (strength < 0 or strength > 100):
-        return jsonify({"error": "Invalid strength value, must be between 0 and 100"}), 400
-
     # Assign default values if attributes are not provided
     speed = speed if speed is not None else random.uniform(0, 10)
-    size = size if size is not None else random.choice(['small', 'medium', 'large'])
+    size = size if size is not None else random.choice(SIZES)
     strength = strength if strength is not None else random.randint(1, 100)
 
     # Simulate the coin character properties
@@ -58,28 +112,374 @@ def spawn_coin_character():
         'speed': speed,
         'size': size,
         'strength': strength,
-        'color': random.choice(['gold', 'silver', 'bronze']),
+        'color': random.choice(COLORS),
         'rarity': 'common' if behavior[0][0] > 0.5 else 'rare',
     }
 
+    # Place, record and index the spawn; the store assigns a unique, increasing character ID
+    [(character_id, spawn_location)] = spawn_in_world(payload.world, [(wallet_address, character_attributes)])
+
     # Simulate the spawn action
     spawn_details = {
         'character_id': character_id,
         'attributes': character_attributes,
         'spawn_location': spawn_location,
+        'world': payload.world,
         'spawned_at': 'Roblox Game World'
     }
 
     return jsonify(spawn_details)
 
+# Spawn a wave of coin characters in one request; failures are reported per item
+@blueprint.route('/spawn_coin/batch', methods=['POST'])
+def spawn_coin_characters_batch():
+    data = request.get_json(silent=True)
+    spawns = data.get('spawns') if isinstance(data, dict) else data
+    if not isinstance(spawns, list) or not spawns:
+        return jsonify({"error": "'spawns' must be a non-empty list"}), 400
+    if len(spawns) > SPAWN_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {SPAWN_BATCH_MAX_ITEMS} spawns per batch"}), 400
+
+    # The game server's rate limit counts the batch as one request
+    retry_after = game_server_limiter.acquire(game_server_key(request.headers, request.remote_addr))
+    if retry_after:
+        return shed("Rate limit exceeded for this game server", 'game_server_rate_limit', retry_after)
+
+    # Validate every spec in one pass before any RPC work
+    specs = [None] * len(spawns)
+    errors = [None] * len(spawns)
+    with metrics.stage('validation'):
+        for i, spec in enumerate(spawns):
+            specs[i], errors[i] = SpawnCoinRequest.parse(spec)
+
+    # Each distinct wallet takes one token from its bucket, as its balance is looked up once
+    limited = {
+        wallet for wallet in dict.fromkeys(spec.wallet_address for spec in specs if spec is not None)
+        if wallet_limiter.acquire(wallet)
+    }
+    for i, spec in enumerate(specs):
+        if errors[i] is None and spec.wallet_address in limited:
+            errors[i] = "Rate limit exceeded for this wallet"
+            metrics.inc('shed_total', endpoint=current_endpoint.get(), reason='wallet_rate_limit')
+
+    # One balance lookup per distinct wallet: from the local Transfer index while it is fresh,
+    # else batched into as few RPC calls as possible
+    wallets = [spec.wallet_address for spec, error in zip(specs, errors) if error is None]
+    balances = indexed_balances(wallets)
+    if balances is None:
+        # Get a pooled connection to the blockchain once for the whole batch
+        with metrics.stage('connect'):
+            w3 = get_web3()
+        if not w3:
+            return jsonify({"error": "Failed to connect to the blockchain"}), 500
+        try:
+            with metrics.stage('balance'):
+                balances = get_cached_token_balances(w3, wallets, TOKEN_CONTRACT_ADDRESS) if wallets else {}
+        except Overloaded as e:
+            return shed("Blockchain RPC is overloaded, retry later", 'rpc_overloaded', e.retry_after, 503)
+    for i, spec in enumerate(specs):
+        if errors[i] is None:
+            token_balance = balances.get(spec.wallet_address)
+            if token_balance is None:
+                errors[i] = "Could not retrieve the token balance, retry later"
+            elif token_balance <= 0:
+                errors[i] = "Insufficient token balance for spawning a coin character"
+
+    valid = [i for i, error in enumerate(errors) if error is None]
+    spawned = dict(zip(valid, build_spawn_details([specs[i] for i in valid])))
+
+    results = []
+    for i, error in enumerate(errors):
+        if error is None:
+            results.append({'index': i, 'status': 'success', 'spawn_details': spawned[i]})
+        else:
+            results.append({'index': i, 'status': 'error', 'error': error})
+
+    return jsonify({
+        'results': results,
+        'spawned': sum(1 for result in results if result['status'] == 'success'),
+        'failed': sum(1 for result in results if result['status'] == 'error'),
+    })
+
+# Connection pool and RPC health statistics
+@blueprint.route('/spawn_coin/rpc_stats', methods=['GET'])
+def rpc_stats():
+    stats = get_connection_manager().stats()
+    stats['balance_cache'] = balance_cache.stats()
+    if BALANCE_SOURCE == 'index':
+        stats['token_index'] = get_token_index().stats()
+    return jsonify(stats)
+
+# Rate limiter and stage concurrency statistics of this worker
+@blueprint.route('/spawn_coin/admission_stats', methods=['GET'])
+def spawn_admission_stats():
+    return jsonify(admission_stats())
+
+def _query_floats(*names, **defaults):
+    """Parse numeric query parameters; names without a default are required. Returns (values, error)."""
+    values = []
+    for name in names + tuple(defaults):
+        raw = request.args.get(name)
+        if raw is None and name not in defaults:
+            return None, f"Missing query parameter: '{name}'"
+        try:
+            value = float(raw) if raw is not None else defaults[name]
+        except ValueError:
+            return None, f"'{name}' must be a number"
+        if value is not None and not np.isfinite(value):
+            return None, f"'{name}' must be a number"
+        values.append(value)
+    return values, None
+
+def _query_limit():
+    """Parse the ?limit= query parameter. Returns (limit, error)."""
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return None, "'limit' must be an integer"
+    if not 1 <= limit <= SPAWN_QUERY_MAX_LIMIT:
+        return None, f"'limit' must be between 1 and {SPAWN_QUERY_MAX_LIMIT}"
+    return limit, None
+
+def _query_world_index():
+    """The live coin index of the ?world= query parameter. Returns (index, error)."""
+    world = request.args.get('world', DEFAULT_WORLD)
+    if not is_valid_world(world):
+        return None, "Invalid world, must be a name of 1 to 64 characters"
+    return world_index(world), None
+
+def _before_id():
+    """The optional 'before_id' paging cursor; returns (before_id, error)."""
+    before_id = request.args.get('before_id')
+    try:
+        return (int(before_id) if before_id is not None else None), None
+    except ValueError:
+        return None, "'before_id' must be a character ID"
+
+# Spawns recorded for a wallet, newest first; page with
+# ?before=<created_at of the last row>&before_id=<character_id of the last row>
+@blueprint.route('/spawn_coin/by_wallet/<wallet_address>', methods=['GET'])
+def spawns_by_wallet(wallet_address):
+    if not is_valid_address(wallet_address):
+        return jsonify({"error": "Invalid wallet address"}), 400
+    limit, error = _query_limit()
+    if error:
+        return jsonify({"error": error}), 400
+    before = request.args.get('before')
+    try:
+        before = float(before) if before is not None else None
+    except ValueError:
+        return jsonify({"error": "'before' must be a timestamp"}), 400
+    before_id, error = _before_id()
+    if error:
+        return jsonify({"error": error}), 400
+    if before_id is not None and before is None:
+        return jsonify({"error": "'before_id' must be sent with 'before'"}), 400
+    spawns = get_spawn_store().by_wallet(wallet_address, limit=limit, before=before, before_id=before_id)
+    return jsonify({'spawns': spawns, 'count': len(spawns)})
+
+# Spawns whose (x, z) position lies inside a rectangle of a game world (?world=), newest first;
+# page with ?before_id=<character_id of the last row>. Despawned coins are listed with their
+# despawned_at; /spawn_coin/within returns only the live ones
+@blueprint.route('/spawn_coin/in_region', methods=['GET'])
+def spawns_in_region():
+    try:
+        bounds = [float(request.args[name]) for name in ('min_x', 'max_x', 'min_z', 'max_z')]
+    except (KeyError, ValueError):
+        return jsonify({"error": "'min_x', 'max_x', 'min_z' and 'max_z' must be numbers"}), 400
+    if bounds[0] > bounds[1] or bounds[2] > bounds[3]:
+        return jsonify({"error": "Region minimums must not exceed maximums"}), 400
+    limit, error = _query_limit()
+    if error:
+        return jsonify({"error": error}), 400
+    before_id, error = _before_id()
+    if error:
+        return jsonify({"error": error}), 400
+    world = request.args.get('world', DEFAULT_WORLD)
+    if not is_valid_world(world):
+        return jsonify({"error": "Invalid world, must be a name of 1 to 64 characters"}), 400
+    spawns = get_spawn_store().in_region(*bounds, world=world, limit=limit, before_id=before_id)
+    return jsonify({'spawns': spawns, 'count': len(spawns)})
+
+# The k live coins closest to (x, z) in a game world, nearest first
+@blueprint.route('/spawn_coin/nearest', methods=['GET'])
+def nearest_coins():
+    values, error = _query_floats('x', 'z', max_radius=None)
+    if error:
+        return jsonify({"error": error}), 400
+    x, z, max_radius = values
+    try:
+        k = int(request.args.get('k', 1))
+    except ValueError:
+        return jsonify({"error": "'k' must be an integer"}), 400
+    if not 1 <= k <= SPAWN_QUERY_MAX_LIMIT:
+        return jsonify({"error": f"'k' must be between 1 and {SPAWN_QUERY_MAX_LIMIT}"}), 400
+    index, error = _query_world_index()
+    if error:
+        return jsonify({"error": error}), 400
+    coins = index.nearest(x, z, k=k, max_radius=max_radius)
+    return jsonify({'coins': coins, 'count': len(coins)})
+
+# Live coins within `radius` of (x, z) in a game world, nearest first
+@blueprint.route('/spawn_coin/within', methods=['GET'])
+def coins_within():
+    values, error = _query_floats('x', 'z', 'radius')
+    if error:
+        return jsonify({"error": error}), 400
+    x, z, radius = values
+    if radius < 0:
+        return jsonify({"error": "'radius' must not be negative"}), 400
+    limit, error = _query_limit()
+    if error:
+        return jsonify({"error": error}), 400
+    index, error = _query_world_index()
+    if error:
+        return jsonify({"error": error}), 400
+    coins = index.within(x, z, radius, limit=limit)
+    return jsonify({'coins': coins, 'count': len(coins)})
+
+# Remove a collected or destroyed coin from its world (the spawn record is kept and marked despawned)
+@blueprint.route('/spawn_coin/<int:character_id>', methods=['DELETE'])
+def despawn_coin(character_id):
+    world = request.args.get('world', DEFAULT_WORLD)
+    if not is_valid_world(world):
+        return jsonify({"error": "Invalid world, must be a name of 1 to 64 characters"}), 400
+    # Marked in the store first so no worker's catch-up brings the coin back
+    despawned = get_spawn_store().despawn(character_id, world)
+    removed = world_index(world).remove(character_id)
+    if not (despawned or removed):
+        return jsonify({"error": "No live coin with this character ID"}), 404
+    get_event_feed().publish(world, 'despawn', {'character_id': character_id})
+    return jsonify({'character_id': character_id, 'status': 'despawned'})
+
+# Spawn store write statistics (group-commit size, queue depth)
+@blueprint.route('/spawn_coin/store_stats', methods=['GET'])
+def store_stats():
+    return jsonify(get_spawn_store().stats())
+
+def build_spawn_details(specs):
+    """
+    Build spawn details for a list of validated SpawnCoinRequest specs.
+    Attribute defaults and spawn locations are drawn for the whole batch at once.
+    """
+    n = len(specs)
+    if n == 0:
+        return []
+    rng = np.random.default_rng()
+
+    default_speeds = rng.uniform(0, 10, n).tolist()
+    default_strengths = rng.integers(1, 101, n).tolist()
+    default_sizes = rng.choice(SIZES, n).tolist()
+    colors = rng.choice(COLORS, n).tolist()
+
+    attributes = []
+    for i, spec in enumerate(specs):
+        attributes.append({
+            'behavior': spec.behavior,
+            'speed': spec.speed if spec.speed is not None else default_speeds[i],
+            'size': spec.size if spec.size is not None else default_sizes[i],
+            'strength': spec.strength if spec.strength is not None else default_strengths[i],
+            'color': colors[i],
+            'rarity': 'common' if spec.behavior[0][0] > 0.5 else 'rare',
+        })
+
+    # Each world places its share of the batch in one pass
+    by_world = {}
+    for i, spec in enumerate(specs):
+        by_world.setdefault(spec.world, []).append(i)
+    spawned = [None] * n
+    for world, indices in by_world.items():
+        placed = spawn_in_world(world, [(specs[i].wallet_address, attributes[i]) for i in indices])
+        for i, (character_id, location) in zip(indices, placed):
+            spawned[i] = (character_id, location)
+
+    return [
+        {
+            'character_id': spawned[i][0],
+            'attributes': attributes[i],
+            'spawn_location': spawned[i][1],
+            'world': specs[i].world,
+            'spawned_at': 'Roblox Game World'
+        }
+        for i in range(n)
+    ]
+
+def world_index(world):
+    """The live coin index of a game world, kept in step with the spawns of the other workers."""
+    return get_world_index(world, get_spawn_store())
+
+def spawn_in_world(world, spawns):
+    """
+    Place, record and index (wallet_address, attributes) spawns in a game world.
+    Returns (character_id, spawn_location) per spawn. The world's index stays
+    locked from placement to insert so concurrent spawns cannot pick the same spot.
+    """
+    index = world_index(world)
+    with index.lock:
+        with metrics.stage('placement'):
+            locations = generate_spawn_locations(len(spawns), index)
+        # The whole batch is queued for the same group commit
+        with metrics.stage('store'):
+            character_ids = get_spawn_store().add_many(
+                [(wallet, attributes, location) for (wallet, attributes), location in zip(spawns, locations)],
+                world=world,
+            )
+        index.insert_many(character_ids, locations)
+    # Roblox servers following the world's event feed learn about the spawns without polling
+    with metrics.stage('publish'):
+        get_event_feed().publish_many(world, 'spawn', [
+            {'character_id': character_id, 'wallet_address': wallet, 'attributes': attributes, 'spawn_location': location}
+            for character_id, (wallet, attributes), location in zip(character_ids, spawns, locations)
+        ])
+    return list(zip(character_ids, locations))
+
+def generate_spawn_locations(n, index):
+    """
+    Spawn locations for n coins in the world indexed by `index`. With
+    SPAWN_PLACEMENT = 'poisson' they keep SPAWN_MIN_SEPARATION from each other
+    and from the live coins; if the world is too crowded, the rest fall back
+    to uniform locations.
+    """
+    if SPAWN_PLACEMENT != 'poisson':
+        return generate_random_spawn_locations(n)
+    rng = np.random.default_rng()
+    points = index.place(n, WORLD_X + WORLD_Z, SPAWN_MIN_SEPARATION, rng)
+    ys = rng.uniform(*WORLD_Y, n).tolist()
+    locations = [{'x': x, 'y': y, 'z': z} for (x, z), y in zip(points, ys)]
+    return locations + generate_random_spawn_locations(n - len(locations))
+
 def generate_random_spawn_location():
     """
     Simulates the generation of a random spawn location within the game world.
     """
-    x = random.uniform(-100, 100)  # Random x coordinate
-    y = random.uniform(0, 50)     # Random y coordinate (height or ground level)
-    z = random.uniform(-100, 100)  # Random z coordinate
+    x = random.uniform(*WORLD_X)  # Random x coordinate
+    y = random.uniform(*WORLD_Y)  # Random y coordinate (height or ground level)
+    z = random.uniform(*WORLD_Z)  # Random z coordinate
     return {'x': x, 'y': y, 'z': z}
 
+def generate_random_spawn_locations(n):
+    """
+    Vectorized variant of generate_random_spawn_location for n coins.
+    """
+    rng = np.random.default_rng()
+    xs = rng.uniform(*WORLD_X, n).tolist()
+    ys = rng.uniform(*WORLD_Y, n).tolist()
+    zs = rng.uniform(*WORLD_Z, n).tolist()
+    return [{'x': x, 'y': y, 'z': z} for x, y, z in zip(xs, ys, zs)]
+
+# Standalone app serving only the spawn routes (python -m server.controllers.spawn_controller)
+app = Flask(__name__)
+
+# Request latency and status per route; stages are timed in the handlers
+instrument_flask(app)
+app.register_blueprint(blueprint)
+
+# Prometheus metrics of every worker sharing METRICS_DIR; ?format=json for p50/p95/p99 per series
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.summary())
+    return Response(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True)
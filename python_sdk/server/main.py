@@ -1,51 +1,110 @@
-from flask import Flask, request, jsonify
-from coin_ai.agent import get_coin_behavior  # Removed unused import
-from controllers.spawn_controller import spawn_coin_character
+from flask import Flask, Response, request, jsonify
+from coin_ai.agent import default_agent_pool, get_coin_behavior_or_rules
+from coin_ai.batching import batcher_stats
+from coin_ai.registry import default_registry
+from utils.schemas import SpawnRequest
+from config.settings import PRELOAD_MODULES
+from utils.lazy_imports import import_stats, preload_modules
+from utils.logger import setup_logging
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, instrument_flask, metrics
+from utils.admission import admission_stats, game_server_key, game_server_limiter, retry_after_header
+from utils.ai_gateway import check_ai_provider
+from controllers.ai_controller import blueprint as ai_blueprint
+from controllers.event_controller import blueprint as event_blueprint
+from controllers.spawn_controller import blueprint as spawn_blueprint, spawn_coin_character
 import logging
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Set up basic logging
-logging.basicConfig(level=logging.DEBUG)
+# Request latency and status per route; stages are timed in the handlers
+instrument_flask(app)
+
+# /spawn_coin, the event feed and the AI gateway are served by every worker
+app.register_blueprint(spawn_blueprint)
+app.register_blueprint(event_blueprint)
+app.register_blueprint(ai_blueprint)
+
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "path_to_your_model.h5"
 
+# TensorFlow/torch/web3 load on first use unless the worker asks for them up front
+preload_modules(PRELOAD_MODULES)
+
+# Load and warm up the model once per worker so requests share it
+default_registry.preload([MODEL_PATH])
+
 
 @app.route('/')
 def home():
     return "Welcome to the Coin Character AI Server!"
 
 
+# Endpoint to inspect the models loaded by this worker
+@app.route('/models', methods=['GET'])
+def models():
+    return jsonify({
+        'models': default_registry.stats(),
+        'batchers': batcher_stats(),
+        'imports': import_stats(),
+        'agents': default_agent_pool.stats(),
+        'admission': admission_stats(),
+    }), 200
+
+
+# Prometheus metrics of every worker sharing METRICS_DIR; ?format=json for p50/p95/p99 per series
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.summary()), 200
+    return Response(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 # Endpoint to spawn a coin character in Roblox
 @app.route('/spawn', methods=['POST'])
 def spawn():
-    try:
-        # Receive data from the request (e.g., features of the coin character)
-        data = request.get_json()
+    # Per-game-server rate limit, checked before any other work
+    retry_after = game_server_limiter.acquire(game_server_key(request.headers, request.remote_addr))
+    if retry_after:
+        metrics.inc('shed_total', endpoint='/spawn', reason='game_server_rate_limit')
+        response = jsonify({'error': 'Rate limit exceeded for this game server'})
+        response.headers['Retry-After'] = retry_after_header(retry_after)
+        return response, 429
 
-        # Validate the incoming data (ensure it matches the expected format)
-        if not data or 'coin_features' not in data:
-            return jsonify({'error': 'Invalid input data'}), 400
+    try:
+        # Parse and validate the request body (e.g., features of the coin character) in one pass
+        with metrics.stage('validation'):
+            payload, error = SpawnRequest.parse_json(request.get_data())
+        if error:
+            return jsonify({'error': 'Invalid input data', 'details': error}), 400
 
         # Extract features for coin behavior prediction
-        coin_features = data['coin_features']
+        coin_features = payload.coin_features.model_dump(exclude_unset=True)
 
-        # Get behavior prediction from the AI model
-        behavior = get_coin_behavior(MODEL_PATH, coin_features)
+        # Get behavior prediction from the AI model; under overload the mood rules answer instead
+        with metrics.stage('inference'):
+            behavior, degraded = get_coin_behavior_or_rules(MODEL_PATH, coin_features)
+        if degraded:
+            metrics.inc('degraded_total', endpoint='/spawn')
 
         # Spawn the coin character (could be an integration with Roblox API)
         spawn_result = spawn_coin_character(behavior)
 
         # Return the result (e.g., details about the spawned character)
-        return jsonify({'status': 'success', 'behavior': behavior, 'spawn_details': spawn_result}), 200
+        return jsonify({
+            'status': 'success', 'behavior': behavior, 'degraded': degraded, 'spawn_details': spawn_result,
+        }), 200
 
     except Exception as e:
-        logger.error(f"Error in /spawn: {str(e)}")
+        logger.exception("Error in /spawn: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 
 # Run the app
 if __name__ == '__main__':
+    # Queue-based logging: request threads only enqueue records (gunicorn workers set it up in post_fork)
+    setup_logging()
+    # Refuse to start with a misconfigured AI provider; without AI_PROVIDER_URL only the AI routes are off
+    check_ai_provider()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,8 @@
+class FakeClock:
+    """Clock for tests: returns `now`, which only moves when a test sets it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
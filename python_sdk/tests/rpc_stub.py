@@ -0,0 +1,79 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class JsonRpcStub:
+    """
+    Minimal local Ethereum JSON-RPC server for tests.
+
+    Register handlers with `stub.methods['eth_call'] = lambda params: ...`.
+    Supports single and batched requests and counts HTTP requests and calls.
+    Set `stub.fail = True` to answer every request with HTTP 500.
+    """
+
+    def __init__(self):
+        self.methods = {
+            'eth_blockNumber': lambda params: hex(self.block_number),
+            'eth_chainId': lambda params: '0x1',
+            'net_version': lambda params: '1',
+        }
+        self.block_number = 100
+        self.fail = False
+        self.http_requests = 0
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; without this, delayed ACKs add ~40 ms per call
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length))
+                stub.http_requests += 1
+                if stub.fail:
+                    self._send(500, {'error': 'stub failure'})
+                    return
+                if isinstance(body, list):
+                    self._send(200, [stub._dispatch(request) for request in body])
+                else:
+                    self._send(200, stub._dispatch(body))
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def _dispatch(self, request):
+        method = request.get('method')
+        self.calls.append(method)
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        handler = self.methods.get(method)
+        if handler is None:
+            response['error'] = {'code': -32601, 'message': f"Method {method} not found"}
+            return response
+        try:
+            response['result'] = handler(request.get('params', []))
+        except Exception as e:
+            response['error'] = {'code': -32000, 'message': str(e)}
+        return response
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
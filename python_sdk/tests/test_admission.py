@@ -0,0 +1,257 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from coin_ai.agent import AgentPool, get_coin_behavior_or_rules, get_coin_behavior_or_rules_async
+from server.controllers.spawn_controller import spawn_coin_character, spawn_coin_characters_batch
+from tests.fake_clock import FakeClock
+from utils.admission import Overloaded, RateLimiter, StageLimiter
+from utils.event_feed import EventFeed
+from utils.spawn_store import SpawnStore
+from utils.web3_validator import RpcUnavailable, balance_cache
+
+ALICE = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+BOB = '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359'
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def test_burst_then_sustained_rate(self):
+        """Test that a key spends its burst at once and then refills at the sustained rate"""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+        self.assertEqual([limiter.acquire('server-1') for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(limiter.acquire('server-1'), 0.5)
+        self.assertEqual(limiter.acquire('server-2'), 0)
+
+        clock.now = 0.5
+        self.assertEqual(limiter.acquire('server-1'), 0)
+        self.assertGreater(limiter.acquire('server-1'), 0)
+        self.assertEqual((limiter.stats()['admitted'], limiter.stats()['limited']), (5, 2))
+
+    def test_zero_rate_disables_the_limit(self):
+        """Test that a rate of 0 admits every request"""
+        limiter = RateLimiter(rate=0, burst=1)
+
+        self.assertFalse(any(limiter.acquire('wallet') for _ in range(100)))
+
+    def test_least_recently_seen_keys_are_evicted(self):
+        """Test that only max_keys buckets are kept and an evicted key starts full"""
+        limiter = RateLimiter(rate=1, burst=1, max_keys=2, clock=FakeClock())
+        limiter.acquire('a')
+        limiter.acquire('b')
+        limiter.acquire('c')
+
+        self.assertEqual(limiter.stats()['keys'], 2)
+        self.assertEqual(limiter.acquire('a'), 0)
+        self.assertGreater(limiter.acquire('c'), 0)
+
+
+class StageLimiterTestCase(unittest.TestCase):
+
+    def test_full_stage_rejects_after_its_budget(self):
+        """Test that a request finding every slot taken is rejected once its queue budget runs out"""
+        limiter = StageLimiter('rpc', max_in_flight=1, queue_budget=0.05)
+        self.assertTrue(limiter.acquire())
+
+        start = time.perf_counter()
+        self.assertFalse(limiter.acquire())
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(limiter.stats()['rejected'], 1)
+
+    def test_queued_request_gets_a_released_slot(self):
+        """Test that a queued request is admitted when a slot is released within its budget"""
+        limiter = StageLimiter('rpc', max_in_flight=1, queue_budget=5)
+        limiter.acquire()
+        threading.Timer(0.05, limiter.release).start()
+
+        self.assertTrue(limiter.acquire())
+        self.assertEqual(limiter.stats()['in_flight'], 1)
+
+    def test_long_queue_is_rejected_without_waiting(self):
+        """Test that a request is rejected at once when the expected queueing time exceeds the budget"""
+        limiter = StageLimiter('inference', max_in_flight=1, queue_budget=2)
+        limiter.acquire()
+        limiter.service_time = 3.0
+
+        start = time.perf_counter()
+        with self.assertRaises(Overloaded) as raised:
+            with limiter.slot():
+                pass
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(raised.exception.stage, 'inference')
+        self.assertEqual(raised.exception.retry_after, 3.0)
+
+    def test_slot_releases_and_tracks_service_time(self):
+        """Test that a slot is released after the block and its duration feeds the service time"""
+        limiter = StageLimiter('rpc', max_in_flight=2, queue_budget=0)
+        with limiter.slot():
+            time.sleep(0.01)
+
+        self.assertEqual(limiter.stats()['in_flight'], 0)
+        self.assertGreater(limiter.service_time, 0)
+
+
+class DegradedBehaviorTestCase(unittest.TestCase):
+
+    features = {'coin_name': 'Golden Coin', 'attributes': {'mood': 'sad', 'intelligence': 6}}
+
+    def test_overloaded_inference_serves_rule_based_behavior(self):
+        """Test that the mood rules answer when no inference slot is free"""
+        limiter = StageLimiter('inference', max_in_flight=1, queue_budget=0)
+        limiter.acquire()
+
+        behavior, degraded = get_coin_behavior_or_rules('missing_model.npz', self.features, limiter, AgentPool())
+
+        self.assertTrue(degraded)
+        self.assertEqual(behavior, "Golden Coin is hiding with stealth 6!")
+
+    def test_free_slot_runs_the_agent(self):
+        """Test that a request with a free inference slot is not degraded"""
+        limiter = StageLimiter('inference', max_in_flight=1, queue_budget=0)
+
+        behavior, degraded = get_coin_behavior_or_rules(None, self.features, limiter, AgentPool())
+
+        self.assertFalse(degraded)
+        self.assertEqual(behavior, "Golden Coin is hiding with stealth 6!")
+        self.assertEqual(limiter.stats()['in_flight'], 0)
+
+    def test_async_variant_never_waits_for_a_slot(self):
+        """Test that the async variant degrades at once when every slot is taken"""
+        limiter = StageLimiter('inference', max_in_flight=1, queue_budget=5)
+        limiter.acquire()
+
+        start = time.perf_counter()
+        behavior, degraded = asyncio.run(
+            get_coin_behavior_or_rules_async('missing_model.npz', self.features, 0, limiter, AgentPool())
+        )
+
+        self.assertTrue(degraded)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(behavior, "Golden Coin is hiding with stealth 6!")
+
+
+class SpawnAdmissionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup a test client with the spawn endpoints, a stubbed blockchain and fresh limits"""
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/spawn_coin', 'spawn_coin', spawn_coin_character, methods=['POST'])
+        self.app.add_url_rule('/spawn_coin/batch', 'spawn_batch', spawn_coin_characters_batch, methods=['POST'])
+        self.client = self.app.test_client()
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.wallet_limiter = RateLimiter(rate=1, burst=2)
+        self.game_server_limiter = RateLimiter(rate=1, burst=10)
+        self.rpc_limiter = StageLimiter('rpc', max_in_flight=1, queue_budget=0)
+        patchers = [
+            patch('server.controllers.spawn_controller.get_web3', return_value=object()),
+            patch('server.controllers.spawn_controller.get_spawn_store',
+                  return_value=SpawnStore(os.path.join(tmpdir.name, 'spawns.sqlite3'))),
+            patch('server.controllers.spawn_controller.get_event_feed',
+                  return_value=EventFeed(os.path.join(tmpdir.name, 'events.sqlite3'))),
+            patch('server.controllers.spawn_controller.wallet_limiter', self.wallet_limiter),
+            patch('server.controllers.spawn_controller.game_server_limiter', self.game_server_limiter),
+            patch('utils.web3_validator.rpc_limiter', self.rpc_limiter),
+            patch('utils.web3_validator.get_token_balance', return_value=5),
+        ]
+        self.mock_balance = [p.start() for p in patchers][-1]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        balance_cache.clear()
+        self.addCleanup(balance_cache.clear)
+
+    def spawn(self, wallet=ALICE, game_server='job-1'):
+        return self.client.post('/spawn_coin', json={'wallet_address': wallet, 'behavior': [[0.9]]},
+                                headers={'X-Game-Server-Id': game_server})
+
+    def test_wallet_over_its_rate_gets_429(self):
+        """Test that a wallet beyond its burst is turned away with 429 and Retry-After"""
+        statuses = [self.spawn().status_code for _ in range(3)]
+
+        response = self.spawn()
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.get_json()['error'], "Rate limit exceeded for this wallet")
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(self.spawn(wallet=BOB).status_code, 200)
+
+    def test_game_server_over_its_rate_gets_429(self):
+        """Test that each game server has its own bucket, keyed by its header"""
+        self.wallet_limiter.rate = 0
+        statuses = [self.spawn().status_code for _ in range(11)]
+
+        self.assertEqual(statuses, [200] * 10 + [429])
+        self.assertIn('Retry-After', self.spawn(wallet=BOB).headers)
+        self.assertEqual(self.spawn(wallet=BOB, game_server='job-2').status_code, 200)
+
+    def test_overloaded_rpc_gets_503_without_calling_the_chain(self):
+        """Test that a balance lookup finding every RPC slot taken returns 503 at once"""
+        self.rpc_limiter.acquire()
+
+        response = self.spawn()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['error'], "Blockchain RPC is overloaded, retry later")
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.mock_balance.assert_not_called()
+
+        # The failure is not cached: the next request reaches the chain
+        self.rpc_limiter.release()
+        self.assertEqual(self.spawn().status_code, 200)
+
+    def test_unreachable_rpc_gets_503_and_is_not_cached(self):
+        """Test that a balance no RPC endpoint could read is a 503, not an insufficient balance"""
+        self.mock_balance.side_effect = RpcUnavailable("No RPC endpoint could complete balance_of")
+
+        response = self.spawn()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['error'], "Blockchain RPC is unavailable, retry later")
+        self.assertIn('Retry-After', response.headers)
+
+        self.mock_balance.side_effect = None
+        self.assertEqual(self.spawn().status_code, 200)
+
+    def test_unreachable_rpc_fails_batch_items_whatever_the_misses(self):
+        """Test that an RPC outage fails the items of one missed wallet as it does for several"""
+        outage = RpcUnavailable("No RPC endpoint could complete the call")
+        self.mock_balance.side_effect = outage
+
+        for wallets in ([ALICE], [ALICE, BOB]):
+            with patch('utils.web3_validator.call_with_failover', side_effect=outage) as mock_failover:
+                response = self.client.post('/spawn_coin/batch', json=[
+                    {'wallet_address': wallet, 'behavior': [[0.9]]} for wallet in wallets
+                ])
+            self.assertEqual(mock_failover.called, len(wallets) > 1)
+            self.assertEqual(response.status_code, 200, wallets)
+            self.assertEqual({result['error'] for result in response.get_json()['results']},
+                             {"Could not retrieve the token balance, retry later"})
+
+    def test_batch_charges_each_wallet_once_and_reports_limited_items(self):
+        """Test that a batch takes one token per distinct wallet and fails the items of limited wallets"""
+        spawns = [{'wallet_address': ALICE, 'behavior': [[0.9]]} for _ in range(5)]
+        self.wallet_limiter.acquire(ALICE)
+
+        with patch('server.controllers.spawn_controller.get_cached_token_balances',
+                   side_effect=lambda w3, wallets, contract: {w: 5 for w in wallets}) as mock_balances:
+            first = self.client.post('/spawn_coin/batch', json=spawns).get_json()
+            second = self.client.post('/spawn_coin/batch', json=spawns + [{'wallet_address': BOB, 'behavior': [[0.9]]}])
+
+        self.assertEqual(first['spawned'], 5)
+        body = second.get_json()
+        self.assertEqual((body['spawned'], body['failed']), (1, 5))
+        self.assertEqual(body['results'][0]['error'], "Rate limit exceeded for this wallet")
+        self.assertEqual(mock_balances.call_args[0][1], [BOB])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+from coin_ai.agent import AgentPool, CoinCharacterAgent, CompactCoinAgent, MOODS, get_coin_behavior, get_coin_behavior_async
+from coin_ai.numpy_engine import save_npz
+from server.asgi import app
+
+
+class CoinCharacterAgentTestCase(unittest.TestCase):
+
+    def test_get_coin_behavior_does_not_sleep(self):
+        """Test that the synchronous path resolves without the simulated delay"""
+        start = time.perf_counter()
+        behavior = get_coin_behavior(None, {'coin_name': 'Golden Coin', 'attributes': {'mood': 'happy', 'speed': 7}})
+
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(behavior, "Golden Coin is dancing with speed 7!")
+
+    def test_async_behaviors_overlap(self):
+        """Test that awaited thinking time lets many agents resolve concurrently"""
+        agents = [CoinCharacterAgent(f"Coin{i}") for i in range(50)]
+
+        async def resolve_all():
+            return await asyncio.gather(*(agent.get_behavior(think_time=0.2) for agent in agents))
+
+        start = time.perf_counter()
+        behaviors = asyncio.run(resolve_all())
+
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(len(behaviors), 50)
+        self.assertTrue(all(behavior.startswith(f"Coin{i} ") for i, behavior in enumerate(behaviors)))
+
+
+class CompactAgentPoolTestCase(unittest.TestCase):
+
+    def test_compact_agent_matches_agent(self):
+        """Test that the slotted agent produces the same behaviors as CoinCharacterAgent"""
+        for mood in MOODS:
+            for attributes in ({'speed': 4, 'intelligence': 8}, {'speed': 6.5, 'intelligence': 2.0}):
+                attributes = {**attributes, 'mood': mood}
+                agent = CoinCharacterAgent('Golden Coin')
+                agent.update_attributes(attributes)
+                compact = CompactCoinAgent('Golden Coin')
+                compact.update_attributes(attributes)
+
+                self.assertEqual(compact.resolve_behavior(), agent.resolve_behavior())
+
+    def test_compact_agent_is_slotted(self):
+        """Test that compact agents have no __dict__ and keep extra attributes aside"""
+        agent = CompactCoinAgent('Golden Coin', mood=1, strength=3, speed=4, intelligence=5)
+        agent.update_attributes({'shine': 'bright'})
+
+        self.assertFalse(hasattr(agent, '__dict__'))
+        self.assertEqual(agent.attributes, {'mood': 'sad', 'strength': 3, 'speed': 4, 'intelligence': 5, 'shine': 'bright'})
+        with self.assertRaises(ValueError):
+            agent.update_attributes({'mood': 'grumpy'})
+
+    def test_repeat_requests_reuse_pooled_agent(self):
+        """Test that requests for the same coin reuse one agent without leaking attributes to each other"""
+        pool = AgentPool(agent_factory=lambda name, model_path=None: CompactCoinAgent(
+            name, model_path, mood=MOODS.index('happy'), strength=3, speed=4, intelligence=5))
+
+        first = get_coin_behavior(None, {'coin_name': 'Golden Coin', 'attributes': {'mood': 'sad', 'intelligence': 9}}, pool=pool)
+        second = get_coin_behavior(None, {'coin_name': 'Golden Coin'}, pool=pool)
+
+        self.assertEqual(first, "Golden Coin is hiding with stealth 9!")
+        self.assertEqual(second, "Golden Coin is dancing with speed 4!")
+        self.assertEqual((len(pool), pool.hits, pool.misses), (1, 1, 1))
+
+    def test_concurrent_pooled_requests_use_their_own_attributes(self):
+        """Test that threads sharing a pooled agent never get another request's speed"""
+        pool = AgentPool()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Always runs; fractional speeds miss the behavior table, so requests wait in the micro-batcher
+            model_path = os.path.join(tmpdir, 'run.npz')
+            save_npz(model_path, [np.zeros((4, 3))], [np.array([0, 0, 1])], ['softmax'])
+            wrong = []
+
+            def spawn(thread):
+                for i in range(100):
+                    speed = thread + i / 100
+                    behavior = get_coin_behavior(model_path, {'coin_name': 'Golden Coin', 'attributes': {'speed': speed}},
+                                                 pool=pool)
+                    if behavior != f"Golden Coin is running at speed {speed}!":
+                        wrong.append(behavior)
+
+            threads = [threading.Thread(target=spawn, args=(thread,)) for thread in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(wrong, [])
+
+    def test_pool_evicts_least_recently_used(self):
+        """Test that the pool stays bounded and evicts the least recently used coin"""
+        pool = AgentPool(max_agents=2)
+        pool.get('A')
+        pool.get('B')
+        pool.get('A')
+        pool.get('C')
+
+        self.assertIn('A', pool)
+        self.assertNotIn('B', pool)
+        self.assertEqual(pool.stats()['evictions'], 1)
+
+    def test_async_pooled_behavior_uses_request_attributes(self):
+        """Test that concurrent requests for one coin each get a behavior from their own attributes"""
+        pool = AgentPool()
+
+        async def spawn_both():
+            return await asyncio.gather(
+                get_coin_behavior_async(None, {'coin_name': 'Golden Coin', 'attributes': {'mood': 'happy', 'speed': 2}}, 0.05, pool),
+                get_coin_behavior_async(None, {'coin_name': 'Golden Coin', 'attributes': {'mood': 'angry', 'speed': 9}}, 0.05, pool),
+            )
+
+        self.assertEqual(asyncio.run(spawn_both()), [
+            "Golden Coin is dancing with speed 2!",
+            "Golden Coin is running at speed 9!",
+        ])
+
+
+class AsgiSpawnTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_spawn_returns_behavior(self):
+        """Test that the ASGI /spawn endpoint resolves a behavior"""
+        response = self.client.post('/spawn', json={
+            'coin_features': {'coin_name': 'Silver Coin', 'attributes': {'mood': 'sad', 'intelligence': 4}}
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(response.json()['behavior'], "Silver Coin is hiding with stealth 4!")
+
+    def test_spawn_rejects_missing_coin_features(self):
+        """Test that a request without 'coin_features' returns an error"""
+        response = self.client.post('/spawn', json={})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid input data')
+
+    def test_spawn_rejects_null_attributes(self):
+        """Test that a null mood or speed is a 400, not a 500 from the agent"""
+        for attributes in ({'mood': None}, {'speed': None}):
+            response = self.client.post('/spawn', json={'coin_features': {'attributes': attributes}})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(f"coin_features.attributes.{next(iter(attributes))}", response.json()['details'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from server.controllers.ai_controller import ai_stats, complete, complete_batch
+from tests.fake_clock import FakeClock
+from utils.ai_gateway import (
+    AIGateway, AIProviderError, AIProviderNotConfigured, HttpProvider, StubProvider, build_provider, check_ai_provider,
+)
+from utils.cache import TTLCache
+
+
+class FlakyProvider(StubProvider):
+    """Fails for prompts containing 'boom' until `healed` is set."""
+
+    healed = False
+
+    def complete(self, prompt, max_tokens):
+        if 'boom' in prompt and not self.healed:
+            self.calls += 1
+            raise AIProviderError("provider unavailable")
+        return super().complete(prompt, max_tokens)
+
+
+class AIGatewayTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.provider = StubProvider()
+        self.gateway = AIGateway(self.provider, cache=TTLCache(maxsize=100, ttl=60, clock=self.clock))
+
+    def test_identical_in_flight_prompts_share_one_call(self):
+        """Test that concurrent identical prompts wait for a single provider call"""
+        self.provider.latency = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.gateway.complete("Where is the treasure?", 50)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.provider.calls, 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.gateway.stats()['cache']['coalesced'], 9)
+
+    def test_cache_is_keyed_by_prompt_and_max_tokens_with_ttl(self):
+        """Test that repeats are served from cache until the TTL elapses"""
+        first = self.gateway.complete("Hello", 100)
+        self.assertEqual(self.gateway.complete("Hello", 100), first)
+        self.gateway.complete("Hello", 3)
+        self.assertEqual(self.provider.calls, 2)
+
+        self.clock.now = 61
+        self.gateway.complete("Hello", 100)
+        self.assertEqual(self.provider.calls, 3)
+
+    def test_batch_dedupes_and_reports_failures(self):
+        """Test that a batch calls the provider once per distinct prompt and isolates failures"""
+        gateway = AIGateway(FlakyProvider())
+        items = [("Hi", 10), ("boom", 10), ("Hi", 10), ("Bye", 10), ("Hi", 10)]
+
+        results = gateway.complete_many(items)
+
+        self.assertEqual(gateway.provider.calls, 3)
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(results[1], {'error': "provider unavailable"})
+        self.assertNotEqual(results[0], results[3])
+        self.assertEqual(gateway.stats()['batched_duplicates'], 2)
+
+        # Failures are not cached
+        gateway.provider.healed = True
+        self.assertIn('Stub reply', gateway.complete("boom", 10))
+
+
+class ProviderConfigTestCase(unittest.TestCase):
+
+    def test_misconfigured_provider_is_refused(self):
+        """Test that unknown names fail, the stub is refused in production and a missing URL only warns"""
+        with self.assertLogs('utils.ai_gateway', level='WARNING'):
+            self.assertFalse(check_ai_provider('http', ''))
+        self.assertTrue(check_ai_provider('http', 'https://ai.example'))
+        with self.assertRaises(ValueError):
+            check_ai_provider('openai', 'https://ai.example')
+        with self.assertRaises(ValueError):
+            check_ai_provider('stub', '', environment='production')
+        check_ai_provider('stub', '', environment='development')
+
+    def test_build_provider(self):
+        """Test that the configured provider is built"""
+        self.assertIsInstance(build_provider('http', 'https://ai.example'), HttpProvider)
+        self.assertIsInstance(build_provider('stub', ''), StubProvider)
+        with self.assertRaises(AIProviderNotConfigured):
+            build_provider('http', '')
+        with self.assertRaises(ValueError):
+            build_provider('stub', '', environment='production')
+
+
+class AIEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup a test client with the AI gateway endpoints and a stub provider"""
+        self.gateway = AIGateway(StubProvider())
+        patcher = patch('server.controllers.ai_controller.get_ai_gateway', return_value=self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/api/ai/complete', 'complete', complete, methods=['POST'])
+        self.app.add_url_rule('/api/ai/complete_batch', 'complete_batch', complete_batch, methods=['POST'])
+        self.client = self.app.test_client()
+
+    def test_batch_endpoint(self):
+        """Test that NPC prompts are answered in one request with per-item validation"""
+        prompts = [{'prompt': "Greet the player"}, {'prompt': ""}, {'prompt': "Greet the player"},
+                   {'prompt': "Warn about the dragon", 'max_tokens': 5}]
+
+        body = self.client.post('/api/ai/complete_batch', json={'requests': prompts}).get_json()
+
+        self.assertEqual((body['completed'], body['failed']), (3, 1))
+        self.assertEqual(body['results'][0]['text'], body['results'][2]['text'])
+        self.assertIn('Invalid prompt', body['results'][1]['error'])
+        self.assertLessEqual(len(body['results'][3]['text'].split()), 5)
+        self.assertEqual(self.gateway.provider.calls, 2)
+
+    def test_single_endpoint(self):
+        """Test that a single completion is served and bad input is rejected"""
+        response = self.client.post('/api/ai/complete', json={'prompt': "Hi", 'max_tokens': 20})
+        self.assertIn('Stub reply', response.get_json()['text'])
+
+        self.assertEqual(self.client.post('/api/ai/complete', json={'prompt': "Hi", 'max_tokens': 0}).status_code, 400)
+        self.assertEqual(self.client.post('/api/ai/complete_batch', json={'requests': []}).status_code, 400)
+
+    def test_unconfigured_provider_gets_503(self):
+        """Test that the AI routes answer 503 while no provider URL is set"""
+        self.app.add_url_rule('/api/ai/stats', 'ai_stats', ai_stats)
+        with patch('server.controllers.ai_controller.get_ai_gateway',
+                   side_effect=lambda: AIGateway(build_provider('http', ''))):
+            responses = [
+                self.client.post('/api/ai/complete', json={'prompt': "Hi"}),
+                self.client.post('/api/ai/complete_batch', json={'requests': [{'prompt': "Hi"}]}),
+                self.client.get('/api/ai/stats'),
+            ]
+
+        self.assertEqual([response.status_code for response in responses], [503] * 3)
+        self.assertIn('AI_PROVIDER_URL', responses[0].get_json()['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
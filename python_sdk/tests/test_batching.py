@@ -0,0 +1,96 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from coin_ai.batching import MicroBatcher
+
+
+def one_hot_model(batch):
+    """Fake model: the predicted action is the mood index column modulo 3."""
+    scores = np.zeros((len(batch), 3), dtype=np.float32)
+    scores[np.arange(len(batch)), batch[:, 3].astype(int) % 3] = 1.0
+    return scores
+
+
+class MicroBatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def predict_fn(model, batch):
+            self.calls.append(len(batch))
+            return one_hot_model(batch)
+
+        self.batcher = MicroBatcher(lambda: None, max_batch_size=16, max_wait=0.05, predict_fn=predict_fn)
+
+    def test_concurrent_requests_share_forward_passes(self):
+        """Test that concurrent submissions are grouped and results scattered back in order"""
+        rows = [[5, 5, 5, i % 4] for i in range(64)]
+        results = [None] * len(rows)
+
+        def worker(i):
+            results[i] = self.batcher.predict(rows[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(rows))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [(i % 4) % 3 for i in range(64)])
+        self.assertEqual(sum(self.calls), 64)
+        self.assertLess(len(self.calls), 64)
+        self.assertTrue(all(size <= 16 for size in self.calls))
+
+    def test_stats_report_fill_ratio_and_queue_wait(self):
+        """Test that batch fill ratio and queue wait metrics are recorded"""
+        futures = [self.batcher.submit([1, 2, 3, 0]) for _ in range(4)]
+        for future in futures:
+            future.result(timeout=5)
+
+        stats = self.batcher.stats()
+
+        self.assertEqual(stats['items'], 4)
+        self.assertGreater(stats['fill_ratio'], 0)
+        self.assertLessEqual(stats['fill_ratio'], 1)
+        self.assertGreaterEqual(stats['max_queue_wait_ms'], stats['avg_queue_wait_ms'])
+
+    def test_model_errors_propagate_to_callers(self):
+        """Test that a failed forward pass fails every request in the batch"""
+        def broken(model, batch):
+            raise ValueError('model exploded')
+
+        self.batcher.predict_fn = broken
+
+        with self.assertRaises(ValueError):
+            self.batcher.predict([1, 2, 3, 0])
+        self.assertEqual(self.batcher.stats()['errors'], 1)
+
+
+class KerasBatchingTestCase(unittest.TestCase):
+
+    def test_agent_predicts_through_batcher(self):
+        """Test that an agent with a Keras model resolves its action via the batcher"""
+        import tensorflow as tf
+        from coin_ai.agent import CoinCharacterAgent
+        from coin_ai.batching import batcher_stats
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'behavior.keras')
+            model = tf.keras.Sequential([tf.keras.Input(shape=(4,)), tf.keras.layers.Dense(3)])
+            model.set_weights([np.eye(4, 3, dtype=np.float32), np.array([0, 0, 100], dtype=np.float32)])
+            model.save(path)
+
+            agent = CoinCharacterAgent('Golden Coin', model_path=path)
+            # A float attribute is outside the precomputed behavior table, so the model runs
+            agent.update_attributes({'mood': 'happy', 'speed': 9.5})
+
+            self.assertEqual(agent.resolve_behavior(), "Golden Coin is running at speed 9.5!")
+            self.assertEqual(batcher_stats()[path]['items'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from benchmarks.bench_endpoints import run_benchmarks, summarize
+
+
+class EndpointBenchmarkTestCase(unittest.TestCase):
+
+    def test_summary_reports_percentiles_and_errors(self):
+        """Test that a run summary has latency percentiles, throughput and error counts"""
+        latencies = [i / 1000 for i in range(1, 101)]
+        statuses = [200] * 98 + [400, 'ConnectionError']
+
+        summary = summarize(latencies, statuses, elapsed=2.0)
+
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['rps'], 50.0)
+        self.assertEqual(summary['errors'], 2)
+        self.assertEqual(summary['status_counts'], {'200': 98, '400': 1, 'ConnectionError': 1})
+        self.assertAlmostEqual(summary['latency_ms']['p50'], 50.5)
+        self.assertAlmostEqual(summary['latency_ms']['p99'], 99.01)
+
+    def test_inprocess_run_succeeds_against_local_backend(self):
+        """Test that both endpoints answer successfully with the stub model and Web3 provider"""
+        runs = run_benchmarks(['inprocess'], ['spawn', 'spawn_coin'], [2], total=10, warmup=2)
+
+        self.assertEqual([(run['endpoint'], run['concurrency']) for run in runs], [('spawn', 2), ('spawn_coin', 2)])
+        for run in runs:
+            self.assertEqual(run['status_counts'], {'200': 10}, run)
+            self.assertGreater(run['rss_mb'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+
+from tests.fake_clock import FakeClock
+from utils.cache import TTLCache
+
+
+class TTLCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=3, ttl=10, clock=self.clock)
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries are served until their TTL elapses"""
+        self.cache.set('a', 1)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get('a'), 1)
+
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache stays bounded by evicting the LRU entry"""
+        for key in 'abc':
+            self.cache.set(key, key)
+        self.cache.get('a')
+        self.cache.set('d', 'd')
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_ttl_can_depend_on_loaded_value(self):
+        """Test that a callable TTL lets negative results expire sooner"""
+        self.cache.get_or_load('empty', lambda: 0, ttl=lambda value: 1 if value <= 0 else 10)
+        self.cache.get_or_load('full', lambda: 5, ttl=lambda value: 1 if value <= 0 else 10)
+        self.clock.now = 2
+
+        self.assertIsNone(self.cache.get('empty'))
+        self.assertEqual(self.cache.get('full'), 5)
+
+    def test_concurrent_misses_share_one_load(self):
+        """Test that concurrent lookups for the same key coalesce into one loader call"""
+        cache = TTLCache(maxsize=10, ttl=10)
+        calls = []
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return 42
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('k', loader))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while cache.stats()['coalesced'] < 7:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_loader_errors_are_not_cached(self):
+        """Test that a failing loader raises and the next lookup retries"""
+        def broken():
+            raise ConnectionError('rpc down')
+
+        with self.assertRaises(ConnectionError):
+            self.cache.get_or_load('k', broken)
+        self.assertEqual(self.cache.get_or_load('k', lambda: 7), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from server.controllers.event_controller import blueprint, poll_events, stream_events, update_wallet, update_wallets
+from utils.admission import StageLimiter
+from utils.event_feed import EventFeed
+
+ALICE = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+BOB = '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359'
+
+
+class EventFeedTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'events.sqlite3')
+        self.feed = EventFeed(self.path, max_events=5)
+
+    def test_long_poll_wakes_on_publish(self):
+        """Test that a waiting reader returns as soon as its world gets an event"""
+        threading.Timer(0.05, self.feed.publish, args=('arena', 'spawn', {'character_id': 1})).start()
+
+        start = time.monotonic()
+        events, missed = self.feed.read('arena', after=0, timeout=5)
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([(e['id'], e['data']) for e in events], [(1, {'character_id': 1})])
+        self.assertFalse(missed)
+        self.assertEqual(self.feed.read('lobby', after=0, timeout=0.01), ([], False))
+
+    def test_cursor_limits_and_overflow(self):
+        """Test that reads resume from a cursor and flag events dropped from the buffer"""
+        self.feed.publish_many('arena', 'wallet_update', [{'n': i} for i in range(3)])
+        events, _ = self.feed.read('arena', after=1)
+        self.assertEqual([e['data']['n'] for e in events], [1, 2])
+        self.assertEqual(len(self.feed.read('arena', after=0, limit=2)[0]), 2)
+
+        self.feed.publish_many('arena', 'wallet_update', [{'n': i} for i in range(3, 10)])
+        events, missed = self.feed.read('arena', after=2)
+        self.assertTrue(missed)
+        self.assertEqual([e['id'] for e in events], [6, 7, 8, 9, 10])
+
+        # A cursor from another feed replays the buffer
+        events, missed = EventFeed(self.path + '.other').read('arena', after=42, timeout=0)
+        self.assertEqual((events, missed), ([], True))
+
+    def test_workers_share_ids_and_wake_on_each_others_events(self):
+        """Test that feeds of two workers on one file share the epoch and IDs, and wake each other's readers"""
+        other = EventFeed(self.path, max_events=5, poll_interval=0.01)
+        self.feed.publish('arena', 'spawn', {'character_id': 1})
+        threading.Timer(0.05, self.feed.publish, args=('arena', 'spawn', {'character_id': 2})).start()
+
+        start = time.monotonic()
+        events, missed = other.read('arena', after=1, timeout=5)
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(other.epoch, self.feed.epoch)
+        self.assertEqual([(e['id'], e['data']) for e in events], [(2, {'character_id': 2})])
+        self.assertFalse(missed)
+        self.assertEqual(other.publish('lobby', 'spawn', {'character_id': 3})['id'], 3)
+
+
+class EventEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup a test client with the event endpoints and a fresh feed"""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.feed = EventFeed(os.path.join(tmpdir.name, 'events.sqlite3'))
+        self.limiter = StageLimiter('events', max_in_flight=1, queue_budget=0)
+        for patcher in (patch('server.controllers.event_controller.get_event_feed', return_value=self.feed),
+                        patch('server.controllers.event_controller.event_limiter', self.limiter)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/api/update_wallet', 'update_wallet', update_wallet, methods=['POST'])
+        self.app.add_url_rule('/api/update_wallets', 'update_wallets', update_wallets, methods=['POST'])
+        self.app.add_url_rule('/api/events/<world>', 'poll_events', poll_events)
+        self.app.add_url_rule('/api/events/<world>/stream', 'stream_events', stream_events)
+        self.client = self.app.test_client()
+
+    def test_batched_wallet_updates(self):
+        """Test that one POST ingests many updates, keeps the latest per player and reports failures"""
+        updates = [
+            {'player_id': 'Player1', 'wallet_address': ALICE, 'balance': 100},
+            {'player_id': 42, 'wallet_address': BOB},
+            {'player_id': 'Player1', 'wallet_address': ALICE, 'balance': 120},
+            {'player_id': 'Player2', 'wallet_address': '0x123abc456def'},
+            {'player_id': 'Player3', 'wallet_address': BOB, 'balance': -1},
+            {'player_id': 'Player4', 'wallet_address': BOB, 'world': 'lobby'},
+        ]
+
+        body = self.client.post('/api/update_wallets', json={'world': 'arena', 'updates': updates}).get_json()
+
+        self.assertEqual((body['accepted'], body['failed']), (4, 2))
+        self.assertEqual([e['index'] for e in body['errors']], [3, 4])
+        self.assertEqual(body['errors'][0]['error'], "Invalid wallet address")
+        events, _ = self.feed.read('arena')
+        self.assertEqual([(e['data']['player_id'], e['data']['balance']) for e in events], [('Player1', 120), (42, None)])
+        events, _ = self.feed.read('lobby')
+        self.assertEqual([e['data']['player_id'] for e in events], ['Player4'])
+        self.assertEqual(self.feed.last_id('lobby'), events[0]['id'])
+
+        self.assertEqual(self.client.post('/api/update_wallets', json={'updates': []}).status_code, 400)
+        single = self.client.post('/api/update_wallet', json={'player_id': 'Player9', 'wallet_address': ALICE})
+        self.assertEqual(single.get_json(), {'status': 'success'})
+
+    def test_long_poll_endpoint(self):
+        """Test that polling returns new events with a cursor and times out empty"""
+        self.feed.publish_many('arena', 'spawn', [{'character_id': 1}, {'character_id': 2}])
+
+        body = self.client.get('/api/events/arena?after=1&timeout=0').get_json()
+        self.assertEqual([e['data']['character_id'] for e in body['events']], [2])
+        self.assertEqual((body['last_id'], body['epoch'], body['missed']), (2, self.feed.epoch, False))
+
+        body = self.client.get(f'/api/events/arena?after=2&timeout=0.01&epoch={self.feed.epoch}').get_json()
+        self.assertEqual((body['events'], body['last_id']), ([], 2))
+        body = self.client.get('/api/events/arena?after=2&timeout=0&epoch=stale').get_json()
+        self.assertEqual(len(body['events']), 2)
+        self.assertEqual(self.client.get('/api/events/arena?after=x').status_code, 400)
+
+    def test_unknown_worlds_are_empty_and_invalid_worlds_rejected(self):
+        """Test that polling a world nothing was published to is empty and leaves no trace, and bad names get 400"""
+        body = self.client.get('/api/events/nowhere?timeout=0').get_json()
+        self.assertEqual((body['events'], body['last_id'], body['missed']), ([], 0, False))
+        self.assertEqual(self.feed.stats()['worlds'], {})
+
+        response = self.client.get('/api/events/' + 'w' * 65 + '?timeout=0')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], "Invalid world, must be a name of 1 to 64 characters")
+        self.assertEqual(self.client.get('/api/events/' + 'w' * 65 + '/stream').status_code, 400)
+
+    @patch('server.controllers.event_controller.EVENT_STREAM_MAX_SECONDS', 0.2)
+    @patch('server.controllers.event_controller.EVENT_STREAM_HEARTBEAT', 0.05)
+    def test_sse_stream_resumes_from_last_event_id(self):
+        """Test that the SSE stream sends events after Last-Event-ID and heartbeats"""
+        self.feed.publish_many('arena', 'spawn', [{'character_id': 1}, {'character_id': 2}])
+
+        response = self.client.get('/api/events/arena/stream', headers={'Last-Event-ID': '1'})
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertIn('event: hello', text)
+        self.assertIn('id: 2\nevent: spawn\n', text)
+        self.assertNotIn('id: 1\n', text)
+        self.assertIn(': keep-alive', text)
+        self.assertEqual(self.limiter.in_flight, 0)
+
+    def test_subscribers_beyond_the_limit_get_503(self):
+        """Test that a poll finding every subscriber slot taken is turned away at once, and slots are given back"""
+        waiting = threading.Thread(target=self.client.get, args=('/api/events/arena?timeout=0.5',))
+        waiting.start()
+        time.sleep(0.1)
+
+        for url in ('/api/events/arena?timeout=0', '/api/events/arena/stream'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 503, url)
+            self.assertIn('Retry-After', response.headers)
+        waiting.join()
+
+        self.assertEqual(self.limiter.in_flight, 0)
+        self.assertEqual(self.client.get('/api/events/arena?timeout=0').status_code, 200)
+
+    def test_stats_route_leaves_every_world_name_pollable(self):
+        """Test that the feed statistics are outside /api/events/, so a world named 'stats' can be polled"""
+        self.feed.publish('stats', 'spawn', {'character_id': 1})
+        app = Flask(__name__)
+        app.register_blueprint(blueprint)
+        client = app.test_client()
+
+        body = client.get('/api/events/stats?timeout=0').get_json()
+
+        self.assertEqual([e['data']['character_id'] for e in body['events']], [1])
+        self.assertIn('stats', client.get('/api/event_stats').get_json()['worlds'])
+
+
+if __name__ == '__main__':
+    unittest.main()
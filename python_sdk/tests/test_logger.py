@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import unittest
+
+from coin_ai.agent import CoinCharacterAgent
+from utils.logger import SamplingFilter, logging_stats, parse_levels, parse_sampling, setup_logging, shutdown_logging
+
+
+class LoggingPipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        shutdown_logging()
+        self.root = logging.getLogger()
+        self.saved_handlers, self.saved_level = list(self.root.handlers), self.root.level
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(self.restore)
+
+    def restore(self):
+        shutdown_logging()
+        self.root.handlers[:] = self.saved_handlers
+        self.root.setLevel(self.saved_level)
+
+    def read_log(self):
+        shutdown_logging()  # Flushes the queue
+        with open(os.path.join(self.log_dir, 'app.log')) as f:
+            return [json.loads(line) for line in f]
+
+    def test_setup_is_idempotent(self):
+        """Test that repeated setup leaves a single queue handler on the root logger"""
+        first = setup_logging(log_dir=self.log_dir, sampling='')
+        second = setup_logging(log_dir=self.log_dir, sampling='')
+
+        self.assertIs(first, second)
+        self.assertEqual(self.root.handlers, [first])
+
+    def test_records_are_written_as_json(self):
+        """Test that records reach the rotating file as one JSON object per line"""
+        setup_logging(log_dir=self.log_dir, level='INFO', sampling='')
+        logging.getLogger('tests.spawn').info("Spawned %s", 'Golden Coin', extra={'wallet': '0xabc'})
+        logging.getLogger('tests.spawn').debug("Below the configured level")
+
+        entries = self.read_log()
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['message'], "Spawned Golden Coin")
+        self.assertEqual((entries[0]['level'], entries[0]['logger'], entries[0]['wallet']), ('INFO', 'tests.spawn', '0xabc'))
+
+    def test_agents_do_not_accumulate_handlers(self):
+        """Test that creating agents adds no handlers and each line is logged once"""
+        setup_logging(log_dir=self.log_dir, level='DEBUG', sampling='')
+        agent_logger = logging.getLogger('coin_ai.agent')
+        before = list(agent_logger.handlers)
+
+        for i in range(20):
+            CoinCharacterAgent(f"Coin {i}")
+
+        self.assertEqual(agent_logger.handlers, before)
+        messages = [e['message'] for e in self.read_log() if e['logger'] == 'coin_ai.agent']
+        self.assertEqual(len(messages), 20)
+
+    def test_debug_lines_are_sampled_per_logger(self):
+        """Test that only DEBUG records of sampled loggers are dropped"""
+        setup_logging(log_dir=self.log_dir, level='DEBUG', sampling='tests.noisy=0')
+        for _ in range(50):
+            logging.getLogger('tests.noisy.child').debug("tick")
+            logging.getLogger('tests.quiet').debug("tock")
+        logging.getLogger('tests.noisy').warning("kept")
+
+        self.assertEqual(logging_stats()['dropped_sampled'], 50)
+        messages = [e['message'] for e in self.read_log()]
+        self.assertEqual(messages.count('tock'), 50)
+        self.assertEqual(messages.count('kept'), 1)
+        self.assertNotIn('tick', messages)
+
+    def test_library_loggers_are_capped(self):
+        """Test that DEBUG and INFO records of capped third-party loggers are not queued"""
+        library = logging.getLogger('tests.library')
+        self.addCleanup(library.setLevel, library.level)
+        setup_logging(log_dir=self.log_dir, level='DEBUG', sampling='', library_levels='tests.library=WARNING')
+        logging.getLogger('tests.library.http').debug("request")
+        logging.getLogger('tests.library.http').info("response")
+        logging.getLogger('tests.library.http').warning("retrying")
+
+        self.assertEqual([e['message'] for e in self.read_log()], ['retrying'])
+        self.assertEqual(parse_levels('web3=warning, bad,urllib3=ERROR'), {'web3': 'WARNING', 'urllib3': 'ERROR'})
+
+    def test_sampling_rates(self):
+        """Test that sampling keeps roughly the configured fraction and prefers the most specific logger"""
+        self.assertEqual(parse_sampling('a=0.5, a.b=2,bad'), {'a': 0.5, 'a.b': 1.0})
+        sampler = SamplingFilter({'a': 0.1, 'a.b': 1.0}, rng=random.Random(3))
+        record = logging.LogRecord('a.c', logging.DEBUG, '', 0, 'x', (), None)
+
+        kept = sum(sampler.filter(record) for _ in range(10000))
+
+        self.assertAlmostEqual(kept / 10000, 0.1, delta=0.02)
+        self.assertEqual(sampler.rate_for('a.b.c'), 1.0)
+        self.assertEqual(sampler.rate_for('other'), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
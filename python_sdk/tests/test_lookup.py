@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from coin_ai.agent import CoinCharacterAgent
+from coin_ai.lookup import BehaviorTable
+from coin_ai.numpy_engine import NumpyMLP
+from coin_ai.registry import ModelRegistry
+
+
+def constant_model(action):
+    """A model that always picks `action`."""
+    bias = np.zeros(3)
+    bias[action] = 100
+    return NumpyMLP([np.zeros((4, 3))], [bias], ['linear'])
+
+
+class BehaviorTableTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        self.model = NumpyMLP([rng.normal(size=(4, 16)), rng.normal(size=(16, 3))], [np.zeros(16), np.zeros(3)], ['relu', 'softmax'])
+        self.table = BehaviorTable.from_model(self.model)
+
+    def test_table_matches_live_inference(self):
+        """Test that every in-range input maps to the model's argmax action"""
+        grid = BehaviorTable.grid()
+        expected = np.argmax(self.model.predict(grid), axis=1)
+
+        actions = [self.table.lookup([int(v) for v in row]) for row in grid]
+
+        self.assertEqual(len(grid), 4000)
+        self.assertEqual(actions, expected.tolist())
+        self.assertEqual(len(set(actions)), 3)
+        self.assertEqual(self.table.stats()['hit_rate'], 1.0)
+
+    def test_inputs_outside_the_grid_miss(self):
+        """Test that floats and out-of-range values fall back to live inference"""
+        for features in ([5.0, 5, 5, 0], [5, 5.5, 5, 0], [0, 5, 5, 0], [5, 11, 5, 0], [5, 5, 5, 4], [True, 5, 5, 0]):
+            self.assertIsNone(self.table.lookup(features), features)
+
+        self.assertEqual((self.table.hits, self.table.misses), (0, 6))
+
+
+class RegistryTableTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'behavior.npz')
+
+    def test_table_is_rebuilt_on_reload(self):
+        """Test that a hot-reloaded model comes with a freshly computed table"""
+        constant_model(0).save(self.path)
+        registry = ModelRegistry(check_interval=0)
+        self.assertEqual(registry.get_table(self.path).lookup([3, 3, 3, 1]), 0)
+
+        constant_model(2).save(self.path)
+        os.utime(self.path, (0, 12345))
+
+        self.assertEqual(registry.get_table(self.path).lookup([3, 3, 3, 1]), 2)
+        self.assertEqual(registry.stats()[0]['load_count'], 2)
+        self.assertEqual(registry.stats()[0]['table']['entries'], 4000)
+
+    @patch('coin_ai.agent.INFERENCE_BATCHING', False)
+    def test_agent_skips_inference_for_discrete_attributes(self):
+        """Test that integer attributes are served from the table and floats run the model"""
+        constant_model(1).save(self.path)
+        registry = ModelRegistry()
+        agent = CoinCharacterAgent('Golden Coin', model_path=self.path, registry=registry)
+        agent.update_attributes({'intelligence': 7})
+
+        with patch.object(agent.model, 'predict', wraps=agent.model.predict) as predict:
+            self.assertEqual(agent.resolve_behavior(), "Golden Coin is hiding with stealth 7!")
+            self.assertEqual(predict.call_count, 0)
+
+            agent.update_attributes({'intelligence': 7.5})
+            self.assertEqual(agent.resolve_behavior(), "Golden Coin is hiding with stealth 7.5!")
+            self.assertEqual(predict.call_count, 1)
+
+        self.assertEqual(registry.get_table(self.path).stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
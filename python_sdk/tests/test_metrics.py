@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import requests
+
+from server.controllers.spawn_controller import app
+from utils.metrics import Metrics, bucket_quantile, metrics
+from utils.web3_validator import _record_rpc_error
+
+SDK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WORKER = """
+from utils.metrics import Metrics
+worker = Metrics(directory={directory!r})
+worker.inc('requests_total', 3, endpoint='/spawn_coin', status='200')
+worker.observe('stage_seconds', 0.2, endpoint='/spawn_coin', stage='balance')
+worker.write_snapshot()
+"""
+
+
+def counter(registry, name, **labels):
+    counters, _ = registry.collect()
+    return counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_quantiles_are_interpolated_within_buckets(self):
+        """Test that p50/p95/p99 are estimated from bucket counts like histogram_quantile"""
+        registry = Metrics(directory='', buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            registry.observe('stage_seconds', 0.005, endpoint='/spawn', stage='inference')
+        for _ in range(10):
+            registry.observe('stage_seconds', 0.5, endpoint='/spawn', stage='inference')
+
+        [series] = registry.summary()['histograms']
+
+        self.assertEqual(series['count'], 100)
+        self.assertAlmostEqual(series['p50_ms'], 0.01 * 50 / 90 * 1000)
+        self.assertAlmostEqual(series['p95_ms'], (0.1 + 0.9 * 5 / 10) * 1000)
+        self.assertEqual(bucket_quantile(0.99, (0.01,), [0, 4]), 0.01)
+        self.assertIsNone(bucket_quantile(0.5, (0.01,), [0, 0]))
+
+    def test_prometheus_text_has_cumulative_buckets(self):
+        """Test that histograms render as cumulative _bucket lines with _sum and _count"""
+        registry = Metrics(directory='', buckets=(0.01, 0.1))
+        registry.observe('rpc_seconds', 0.005, call='balance_of')
+        registry.observe('rpc_seconds', 0.05, call='balance_of')
+        registry.observe('rpc_seconds', 5, call='balance_of')
+        registry.inc('rpc_errors_total', call='batch', kind='timeout')
+
+        text = registry.render_prometheus()
+
+        self.assertIn('# TYPE bloxverse_rpc_seconds histogram', text)
+        self.assertIn('bloxverse_rpc_seconds_bucket{call="balance_of",le="0.01"} 1', text)
+        self.assertIn('bloxverse_rpc_seconds_bucket{call="balance_of",le="0.1"} 2', text)
+        self.assertIn('bloxverse_rpc_seconds_bucket{call="balance_of",le="+Inf"} 3', text)
+        self.assertIn('bloxverse_rpc_seconds_count{call="balance_of"} 3', text)
+        self.assertIn('bloxverse_rpc_errors_total{call="batch",kind="timeout"} 1', text)
+
+    def test_totals_are_summed_across_worker_processes(self):
+        """Test that every worker sharing METRICS_DIR is included in collect()"""
+        with tempfile.TemporaryDirectory() as directory:
+            subprocess.run([sys.executable, '-c', _WORKER.format(directory=directory)], cwd=SDK_ROOT, check=True)
+            registry = Metrics(directory=directory)
+            registry.inc('requests_total', 2, endpoint='/spawn_coin', status='200')
+            registry.observe('stage_seconds', 0.002, endpoint='/spawn_coin', stage='balance')
+
+            counters, histograms = registry.collect()
+
+            self.assertEqual(counters[('requests_total', (('endpoint', '/spawn_coin'), ('status', '200')))], 5)
+            counts, total = histograms[('stage_seconds', (('endpoint', '/spawn_coin'), ('stage', 'balance')))]
+            self.assertEqual(sum(counts), 2)
+            self.assertAlmostEqual(total, 0.202)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_requests_and_stages_are_recorded_per_route(self):
+        """Test that the Flask app records status per route, stage timings and serves /metrics"""
+        client = app.test_client()
+        before = counter(metrics, 'requests_total', endpoint='/spawn_coin', status='400')
+
+        response = client.post('/spawn_coin', data='not json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(counter(metrics, 'requests_total', endpoint='/spawn_coin', status='400'), before + 1)
+        text = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('bloxverse_stage_seconds_count{endpoint="/spawn_coin",stage="validation"}', text)
+        summary = client.get('/metrics?format=json').get_json()
+        self.assertIn('request_seconds', {series['name'] for series in summary['histograms']})
+
+    def test_rpc_errors_are_classified(self):
+        """Test that RPC timeouts and other failures are counted separately"""
+        timeouts = counter(metrics, 'rpc_errors_total', call='balance_of', kind='timeout')
+        errors = counter(metrics, 'rpc_errors_total', call='balance_of', kind='error')
+
+        _record_rpc_error('balance_of', requests.ReadTimeout())
+        _record_rpc_error('balance_of', ValueError('bad response'))
+
+        self.assertEqual(counter(metrics, 'rpc_errors_total', call='balance_of', kind='timeout'), timeouts + 1)
+        self.assertEqual(counter(metrics, 'rpc_errors_total', call='balance_of', kind='error'), errors + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from coin_ai.registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, content):
+        self.content = content
+        self.warmed_up = False
+
+
+class ModelRegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Create a temporary model file and a registry with a counting loader"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'model.h5')
+        self.write_model(b'v1')
+        self.loads = 0
+
+        def loader(path):
+            self.loads += 1
+            with open(path, 'rb') as f:
+                return FakeModel(f.read())
+
+        def warmup(model):
+            model.warmed_up = True
+
+        self.registry = ModelRegistry(loader=loader, warmup=warmup, check_interval=0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_model(self, content, mtime=None):
+        with open(self.path, 'wb') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_model_is_loaded_once_and_shared(self):
+        """Test that repeated lookups reuse the same warmed-up model"""
+        first = self.registry.get(self.path)
+        second = self.registry.get(self.path)
+
+        self.assertIs(first, second)
+        self.assertTrue(first.warmed_up)
+        self.assertEqual(self.loads, 1)
+
+    def test_hot_reload_when_file_changes(self):
+        """Test that a changed model file is reloaded and swapped in"""
+        self.registry.get(self.path)
+        self.write_model(b'v2', mtime=os.stat(self.path).st_mtime + 10)
+
+        model = self.registry.get(self.path)
+
+        self.assertEqual(model.content, b'v2')
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.registry.stats()[0]['load_count'], 2)
+
+    def test_touch_without_content_change_does_not_reload(self):
+        """Test that an mtime change with identical content keeps the loaded model"""
+        self.registry.get(self.path)
+        self.write_model(b'v1', mtime=os.stat(self.path).st_mtime + 10)
+
+        self.registry.get(self.path)
+
+        self.assertEqual(self.loads, 1)
+
+    def test_failed_load_is_not_retried_until_file_changes(self):
+        """Test that a broken model file is not re-deserialized on every request"""
+        def broken_loader(path):
+            self.loads += 1
+            raise ValueError('corrupt model')
+
+        self.registry.loader = broken_loader
+
+        with self.assertRaises(ValueError):
+            self.registry.get(self.path)
+        with self.assertRaises(RuntimeError):
+            self.registry.get(self.path)
+        self.assertEqual(self.loads, 1)
+
+    def test_stats_report_load_time(self):
+        """Test that stats expose per-model load statistics"""
+        self.registry.get(self.path)
+
+        stats = self.registry.stats()
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['path'], os.path.abspath(self.path))
+        self.assertGreaterEqual(stats[0]['load_time_ms'], 0)
+        self.assertIn('memory_bytes', stats[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from coin_ai.agent import CoinCharacterAgent
+from coin_ai.numpy_engine import NumpyMLP, export_weights
+from coin_ai.registry import ModelRegistry
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+class NumpyMLPTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.model = NumpyMLP(
+            [rng.normal(size=(4, 8)), rng.normal(size=(8, 3))],
+            [rng.normal(size=8), rng.normal(size=3)],
+            ['relu', 'softmax'],
+            max_batch_size=16,
+        )
+        self.batch = rng.uniform(0, 10, size=(50, 4)).astype(np.float32)
+
+    def reference(self, x):
+        hidden = np.maximum(x @ self.model.weights[0] + self.model.biases[0], 0)
+        logits = hidden @ self.model.weights[1] + self.model.biases[1]
+        scores = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def test_batches_larger_than_buffers_are_chunked(self):
+        """Test that batches beyond max_batch_size give the same result as row-by-row inference"""
+        batched = self.model.predict(self.batch)
+        rows = np.vstack([self.model.predict(row) for row in self.batch])
+
+        self.assertEqual(batched.shape, (50, 3))
+        np.testing.assert_allclose(batched, self.reference(self.batch), rtol=1e-5)
+        np.testing.assert_allclose(batched, rows, rtol=1e-5, atol=1e-7)
+
+    def test_results_do_not_alias_buffers(self):
+        """Test that a later call does not overwrite an earlier result"""
+        first = self.model.predict(self.batch[:4])
+        expected = first.copy()
+        self.model.predict(self.batch[4:8])
+
+        np.testing.assert_array_equal(first, expected)
+
+    def test_round_trip_and_validation(self):
+        """Test that saved weights reload identically and bad input is rejected"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'behavior.npz')
+            self.model.save(path)
+            loaded = NumpyMLP.load(path)
+
+        np.testing.assert_array_equal(loaded.predict(self.batch), self.model.predict(self.batch))
+        with self.assertRaises(ValueError):
+            self.model.predict(np.zeros((1, 5)))
+        with self.assertRaises(ValueError):
+            NumpyMLP([np.zeros((4, 3))], [np.zeros(3)], ['gelu'])
+
+    @patch('coin_ai.agent.INFERENCE_BATCHING', False)
+    def test_agent_serves_exported_model_from_registry(self):
+        """Test that the registry loads .npz models and agents predict with them"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'behavior.npz')
+            NumpyMLP([np.eye(4, 3)], [np.array([0, 0, 100])], ['linear']).save(path)
+            registry = ModelRegistry()
+
+            agent = CoinCharacterAgent('Golden Coin', model_path=path, registry=registry)
+            agent.update_attributes({'mood': 'happy', 'speed': 9})
+
+            self.assertIsInstance(agent.model, NumpyMLP)
+            self.assertEqual(agent.resolve_behavior(), "Golden Coin is running at speed 9!")
+            self.assertEqual(registry.stats()[0]['memory_bytes'], (12 + 3) * 4)
+
+
+class ExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.x = np.random.default_rng(1).uniform(-1, 1, size=(64, 10)).astype(np.float32)
+
+    @unittest.skipIf(torch is None, "torch is not installed")
+    def test_torch_state_dict_matches_torch(self):
+        """Test that an exported SimpleNN state_dict reproduces torch's outputs"""
+        torch.manual_seed(0)
+        model = torch.nn.Module()
+        model.layer1 = torch.nn.Linear(10, 32)
+        model.layer2 = torch.nn.Linear(32, 16)
+        model.output_layer = torch.nn.Linear(16, 1)
+        path = os.path.join(self.tmpdir, 'model_data.bin')
+        torch.save(model.state_dict(), path)
+
+        exported = NumpyMLP.load(export_weights(path))
+
+        with torch.no_grad():
+            x = torch.from_numpy(self.x)
+            expected = torch.sigmoid(model.output_layer(torch.relu(model.layer2(torch.relu(model.layer1(x))))))
+        self.assertEqual(exported.activations, ['relu', 'relu', 'sigmoid'])
+        np.testing.assert_allclose(exported.predict(self.x), expected.numpy(), rtol=1e-5, atol=1e-6)
+
+    def test_keras_model_matches_keras(self):
+        """Test that an exported Keras .h5 model reproduces Keras' outputs"""
+        import tensorflow as tf
+        tf.keras.utils.set_random_seed(0)
+        model = tf.keras.Sequential([
+            tf.keras.Input(shape=(10,)),
+            tf.keras.layers.Dense(32, activation='relu'),
+            tf.keras.layers.Dense(16, activation='tanh'),
+            tf.keras.layers.Dense(3, activation='softmax'),
+        ])
+        path = os.path.join(self.tmpdir, 'behavior.h5')
+        model.save(path)
+
+        exported = NumpyMLP.load(export_weights(path, os.path.join(self.tmpdir, 'behavior.npz')))
+
+        self.assertEqual(exported.activations, ['relu', 'tanh', 'softmax'])
+        np.testing.assert_allclose(exported.predict(self.x), model.predict(self.x, verbose=0), rtol=1e-5, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
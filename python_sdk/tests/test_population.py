@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from coin_ai.agent import CoinCharacterAgent
+from coin_ai.numpy_engine import NumpyMLP
+from coin_ai.population import CoinPopulation
+from coin_ai.registry import ModelRegistry
+
+
+def agent_like(population, i, model_path=None, registry=None):
+    """A CoinCharacterAgent holding the same attributes as agent i of the population."""
+    agent = CoinCharacterAgent(population.names[i], model_path=model_path, registry=registry)
+    agent.update_attributes(population.attributes(i))
+    return agent
+
+
+class CoinPopulationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.population = CoinPopulation.random(400, rng=np.random.default_rng(5))
+
+    def test_rule_based_step_matches_agents(self):
+        """Test that vectorized rule-based behavior matches decide_behavior for every agent"""
+        behaviors = self.population.behaviors(self.population.step())
+
+        for i in range(len(self.population)):
+            self.assertEqual(behaviors[i], agent_like(self.population, i).resolve_behavior())
+
+    @patch('coin_ai.agent.INFERENCE_BATCHING', False)
+    def test_model_based_step_matches_agents(self):
+        """Test that one batched forward pass gives each agent's predicted behavior"""
+        rng = np.random.default_rng(1)
+        model = NumpyMLP([rng.normal(size=(4, 8)), rng.normal(size=(8, 3))], [np.zeros(8), np.zeros(3)], ['relu', 'softmax'])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'behavior.npz')
+            model.save(path)
+            registry = ModelRegistry()
+            agents = [agent_like(self.population, i, path, registry) for i in range(len(self.population))]
+            self.population.model = registry.get(path)
+
+            behaviors = self.population.behaviors(self.population.step())
+
+        self.assertEqual(len(set(self.population.step())), 3)
+        self.assertEqual(behaviors, [agent.resolve_behavior() for agent in agents])
+
+    def test_bulk_updates_and_rendering(self):
+        """Test that masked and indexed updates apply, and value types render like the agent's"""
+        happy = self.population.moods == 0
+        self.population.update(happy, mood='sad')
+        self.population.update([0, 1], speed=[9.5, 3], mood=['happy', 'excited'])
+
+        self.assertFalse((self.population.moods == 0)[2:].any())
+        self.assertEqual(self.population.attributes(0)['speed'], 9.5)
+        self.assertEqual(self.population.attributes(1)['speed'], 3)
+        self.assertEqual(self.population.behaviors(self.population.step(), [0, 1]), [
+            "Coin 0 is dancing with speed 9.5!",
+            "Coin 1 is running at speed 3!",
+        ])
+        with self.assertRaises(ValueError):
+            self.population.update([0], mood='grumpy')
+        with self.assertRaises(ValueError):
+            self.population.update([0], charisma=4)
+
+    def test_from_agents_round_trip(self):
+        """Test that a population built from agents keeps their attributes"""
+        agents = [CoinCharacterAgent(f"Agent {i}") for i in range(20)]
+
+        population = CoinPopulation.from_agents(agents)
+
+        self.assertEqual([population.attributes(i) for i in range(20)], [agent.attributes for agent in agents])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from coin_ai.numpy_engine import NumpyMLP, save_npz
+from coin_ai.registry import ModelRegistry
+from coin_ai.shared_weights import SharedWeightsLoader, map_weights_file, publish_model, write_weights_file
+
+
+def write_model(path, seed):
+    rng = np.random.default_rng(seed)
+    save_npz(path, [rng.normal(size=(4, 8)), rng.normal(size=(8, 3))],
+             [rng.normal(size=8), rng.normal(size=3)], ['relu', 'softmax'])
+    return path
+
+
+class SharedWeightsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.model_path = write_model(os.path.join(self.tmpdir, 'behavior.npz'), seed=0)
+        self.loader = SharedWeightsLoader(os.path.join(self.tmpdir, 'shared'))
+        self.x = np.random.default_rng(1).uniform(0, 10, size=(5, 4)).astype(np.float32)
+
+    def shared_files(self):
+        return sorted(os.listdir(self.loader.directory))
+
+    def test_mapped_weights_are_read_only_views(self):
+        """Test that a mapped model predicts like the original without copying its weights"""
+        original = NumpyMLP.load(self.model_path)
+        path = write_weights_file(original, os.path.join(self.tmpdir, 'behavior.weights'))
+
+        mapped = map_weights_file(path)
+
+        np.testing.assert_array_equal(mapped.predict(self.x), original.predict(self.x))
+        for array in mapped.weights + mapped.biases:
+            self.assertFalse(array.flags.writeable)
+            base = array
+            while isinstance(base, np.ndarray):
+                base = base.base
+            self.assertIsInstance(base.obj if isinstance(base, memoryview) else base, mmap.mmap)
+
+    def test_processes_share_one_weights_file_per_model_version(self):
+        """Test that loading the same model twice maps the file written by the first load"""
+        first = self.loader(self.model_path)
+        mtime = os.stat(first.mapped_path).st_mtime_ns
+
+        second = self.loader(self.model_path)
+
+        self.assertEqual(second.mapped_path, first.mapped_path)
+        self.assertEqual(os.stat(second.mapped_path).st_mtime_ns, mtime)
+        self.assertEqual(len(self.shared_files()), 1)
+
+    def test_published_model_is_swapped_in_on_reload(self):
+        """Test that publish_model replaces the served model and its shared weights"""
+        registry = ModelRegistry(loader=self.loader, check_interval=0, table_builder=None)
+        old_prediction = registry.get(self.model_path).predict(self.x)
+        old_file = self.shared_files()
+        new_model = write_model(os.path.join(self.tmpdir, 'behavior_v2.npz'), seed=2)
+
+        publish_model(new_model, self.model_path, self.loader)
+        st = os.stat(self.model_path)
+        os.utime(self.model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # Coarse mtime clocks
+
+        np.testing.assert_array_equal(registry.get(self.model_path).predict(self.x),
+                                      NumpyMLP.load(new_model).predict(self.x))
+        self.assertFalse(np.allclose(registry.get(self.model_path).predict(self.x), old_prediction))
+        self.assertEqual(len(self.shared_files()), 1)
+        self.assertNotEqual(self.shared_files(), old_file)
+        self.assertEqual(registry.stats()[0]['shared_weights'], registry.get(self.model_path).mapped_path)
+
+    def test_models_that_cannot_be_converted_use_the_fallback(self):
+        """Test that an unreadable model is loaded per process by the fallback loader"""
+        broken = os.path.join(self.tmpdir, 'broken.npz')
+        with open(broken, 'wb') as f:
+            f.write(b'not a model')
+        loader = SharedWeightsLoader(self.loader.directory, fallback=lambda path: ('fallback', path))
+
+        self.assertEqual(loader(broken), ('fallback', broken))
+        self.assertFalse(os.path.exists(self.loader.directory) and self.shared_files())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from flask import Flask
+
+from server.controllers.spawn_controller import (
+    coins_within, despawn_coin, nearest_coins, spawn_coin_characters_batch,
+)
+from utils.event_feed import EventFeed
+from utils.spatial_index import SpatialGrid, get_world_index, poisson_disk_sample
+from utils.spawn_store import SpawnStore
+
+ALICE = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+BOUNDS = (-100, 100, -100, 100)
+
+
+def min_separation(points):
+    points = np.asarray(points)
+    diff = points[:, None, :] - points[None, :, :]
+    distances = np.sqrt((diff * diff).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    return distances.min()
+
+
+class SpatialGridTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.points = rng.uniform(-100, 100, (2000, 2))
+        self.grid = SpatialGrid(cell_size=5)
+        for i, (x, z) in enumerate(self.points):
+            self.grid.insert(i, {'x': x, 'y': 1.0, 'z': z})
+
+    def brute_force(self, x, z):
+        return np.hypot(self.points[:, 0] - x, self.points[:, 1] - z)
+
+    def test_queries_match_brute_force(self):
+        """Test that nearest and radius queries agree with a full scan"""
+        for x, z in [(0, 0), (99, -99), (250, 40), (-3.7, 12.2)]:
+            distances = self.brute_force(x, z)
+            nearest = self.grid.nearest(x, z, k=5)
+            self.assertEqual([coin['character_id'] for coin in nearest], np.argsort(distances)[:5].tolist())
+            self.assertAlmostEqual(nearest[0]['distance'], distances.min())
+
+            within = self.grid.within(x, z, 12)
+            self.assertEqual(sorted(coin['character_id'] for coin in within), np.flatnonzero(distances <= 12).tolist())
+
+        capped = self.grid.nearest(0, 0, k=50, max_radius=8)
+        self.assertTrue(capped and all(coin['distance'] <= 8 for coin in capped))
+        self.assertEqual(len(capped), int((self.brute_force(0, 0) <= 8).sum()))
+
+    def test_remove_and_move(self):
+        """Test that removed coins disappear and re-inserted coins move"""
+        self.assertTrue(self.grid.remove(0))
+        self.assertFalse(self.grid.remove(0))
+        self.grid.insert(1, {'x': 500, 'y': 2, 'z': 500})
+
+        self.assertNotIn(0, self.grid)
+        self.assertEqual(len(self.grid), 1999)
+        self.assertEqual(self.grid.nearest(501, 501)[0]['spawn_location'], {'x': 500, 'y': 2, 'z': 500})
+        self.assertEqual(SpatialGrid().nearest(0, 0), [])
+
+
+class PoissonDiskTestCase(unittest.TestCase):
+
+    def test_placement_keeps_separation(self):
+        """Test that 10k coins are placed inside the bounds at least the minimum distance apart"""
+        points = poisson_disk_sample(10000, BOUNDS, 1.5, rng=np.random.default_rng(0))
+
+        self.assertEqual(len(points), 10000)
+        self.assertGreaterEqual(min_separation(points), 1.5)
+        xs, zs = np.asarray(points).T
+        self.assertTrue((xs >= -100).all() and (xs <= 100).all() and (zs >= -100).all() and (zs <= 100).all())
+
+    def test_placement_avoids_existing_coins(self):
+        """Test that new coins keep their distance from live ones and stop when the region is full"""
+        rng = np.random.default_rng(1)
+        existing = rng.uniform(-10, 10, (300, 2))
+
+        points = poisson_disk_sample(1000, (-10, 10, -10, 10), 1.0, existing=existing, rng=rng)
+
+        self.assertLess(len(points), 1000)
+        self.assertGreaterEqual(min_separation(points), 1.0)
+        diff = np.asarray(points)[:, None, :] - existing[None, :, :]
+        self.assertGreaterEqual(np.sqrt((diff * diff).sum(axis=2)).min(), 1.0)
+
+    def test_small_placements_use_the_live_index(self):
+        """Test that a few coins are placed clear of the coins already in the grid"""
+        grid = SpatialGrid()
+        for i, (x, z) in enumerate(poisson_disk_sample(200, (0, 20, 0, 20), 1.0, rng=np.random.default_rng(2))):
+            grid.insert(i, {'x': x, 'y': 0, 'z': z})
+
+        points = grid.place(5, (0, 20, 0, 20), 1.0, rng=np.random.default_rng(4), attempts=500)
+
+        self.assertEqual(len(points), 5)
+        for x, z in points:
+            self.assertTrue(grid.is_clear(x, z, 1.0))
+        self.assertGreaterEqual(min_separation(points), 1.0)
+
+
+class WorldIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup two worker-like stores over one file and an empty registry of world indexes"""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'spawns.sqlite3')
+        self.store = SpawnStore(path)
+        self.other_worker = SpawnStore(path)
+        for name in ('_worlds', '_synced_at'):
+            patcher = patch(f'utils.spatial_index.{name}', {})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def spawn(self, store, x, z):
+        character_id = store.add(ALICE, {}, {'x': x, 'y': 0, 'z': z}, world='arena')
+        store.flush()
+        return character_id
+
+    def test_index_is_rebuilt_from_the_store(self):
+        """Test that a world's first index holds the live coins every worker recorded"""
+        kept = self.spawn(self.other_worker, 1, 1)
+        gone = self.spawn(self.other_worker, 2, 2)
+        self.other_worker.despawn(gone, 'arena')
+
+        index = get_world_index('arena', self.store)
+
+        self.assertEqual([coin['character_id'] for coin in index.within(0, 0, 10)], [kept])
+        self.assertEqual(len(get_world_index('default', self.store)), 0)
+
+    def test_index_catches_up_with_other_workers(self):
+        """Test that spawns and despawns of another worker reach the index at the next refresh"""
+        first = self.spawn(self.other_worker, 1, 1)
+        index = get_world_index('arena', self.store)
+        second = self.spawn(self.other_worker, 2, 2)
+        self.other_worker.despawn(first, 'arena')
+
+        self.assertIn(first, get_world_index('arena', self.store, refresh_interval=60))
+        self.assertNotIn(second, index)
+        self.assertIs(get_world_index('arena', self.store, refresh_interval=0), index)
+        self.assertEqual([coin['character_id'] for coin in index.within(0, 0, 10)], [second])
+
+
+class SpatialEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup a test client with the spatial endpoints, a temporary store and a fresh world"""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.store = SpawnStore(os.path.join(tmpdir.name, 'spawns.sqlite3'))
+        self.world = SpatialGrid()
+        self.feed = EventFeed(os.path.join(tmpdir.name, 'events.sqlite3'))
+        patchers = [
+            patch('server.controllers.spawn_controller.get_event_feed', return_value=self.feed),
+            patch('server.controllers.spawn_controller.get_spawn_store', return_value=self.store),
+            patch('server.controllers.spawn_controller.get_world_index', return_value=self.world),
+            patch('server.controllers.spawn_controller.get_web3', return_value=object()),
+            patch('server.controllers.spawn_controller.get_cached_token_balances',
+                  side_effect=lambda w3, wallets, contract: {w: 5 for w in wallets}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/spawn_coin/batch', 'spawn_batch', spawn_coin_characters_batch, methods=['POST'])
+        self.app.add_url_rule('/spawn_coin/nearest', 'nearest', nearest_coins)
+        self.app.add_url_rule('/spawn_coin/within', 'within', coins_within)
+        self.app.add_url_rule('/spawn_coin/<int:character_id>', 'despawn', despawn_coin, methods=['DELETE'])
+        self.client = self.app.test_client()
+
+    def test_spawned_coins_are_spread_and_queryable(self):
+        """Test that a spawn wave is placed apart, indexed, and can be queried and despawned"""
+        spawns = [{'wallet_address': ALICE, 'behavior': [[0.9]], 'world': 'arena'} for _ in range(100)]
+        body = self.client.post('/spawn_coin/batch', json=spawns).get_json()
+        details = [result['spawn_details'] for result in body['results']]
+        self.assertEqual(body['spawned'], 100)
+        self.assertEqual(len(self.world), 100)
+        self.assertEqual({d['world'] for d in details}, {'arena'})
+        self.assertGreaterEqual(min_separation([(d['spawn_location']['x'], d['spawn_location']['z']) for d in details]), 1.5)
+
+        target = details[0]
+        location = target['spawn_location']
+        nearest = self.client.get(f"/spawn_coin/nearest?x={location['x']}&z={location['z']}&k=3&world=arena").get_json()
+        self.assertEqual(nearest['coins'][0]['character_id'], target['character_id'])
+        self.assertEqual(nearest['count'], 3)
+        within = self.client.get(f"/spawn_coin/within?x={location['x']}&z={location['z']}&radius=0.5").get_json()
+        self.assertEqual([coin['character_id'] for coin in within['coins']], [target['character_id']])
+
+        self.assertEqual(self.client.delete(f"/spawn_coin/{target['character_id']}?world=arena").status_code, 200)
+        self.assertEqual(self.client.delete(f"/spawn_coin/{target['character_id']}?world=arena").status_code, 404)
+        self.assertEqual(len(self.world), 99)
+        self.assertNotIn(target['character_id'], [c[0] for c in self.store.world_changes('arena')])
+        self.assertEqual(len(self.store.world_changes('arena')), 99)
+        events, _ = self.feed.read('arena', limit=1000)
+        self.assertEqual([e['type'] for e in events], ['spawn'] * 100 + ['despawn'])
+        self.assertEqual(events[0]['data']['character_id'], details[0]['character_id'])
+
+    def test_query_validation(self):
+        """Test that malformed spatial queries are rejected"""
+        for url in ('/spawn_coin/nearest?x=1', '/spawn_coin/nearest?x=1&z=a', '/spawn_coin/nearest?x=1&z=2&k=0',
+                    '/spawn_coin/within?x=1&z=2', '/spawn_coin/within?x=1&z=2&radius=-1',
+                    '/spawn_coin/within?x=nan&z=2&radius=1', '/spawn_coin/nearest?x=1&z=2&world=',
+                    '/spawn_coin/within?x=1&z=2&radius=1&world=' + 'w' * 65):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+        self.assertEqual(self.client.delete('/spawn_coin/1?world=').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,16 @@
+import os
+import tempfile
 import unittest
 from flask import Flask
-from server.controllers.spawn_controller import spawn_coin_character
+from server.controllers.spawn_controller import spawn_coin_character, spawn_coin_characters_batch
 from unittest.mock import patch
+from utils.admission import RateLimiter
+from utils.event_feed import EventFeed
+from utils.spawn_store import SpawnStore
+
+ALICE = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+BOB = '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359'
+EMPTY = '0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB'
 
 
 class SpawnControllerTestCase(unittest.TestCase):
@@ -164,5 +173,94 @@ class SpawnControllerTestCase(unittest.TestCase):
         self.assertEqual(response.get_json()['error'], "Invalid authentication token format.")
 
 
+class SpawnBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup a test client with the batch endpoint and a stubbed blockchain"""
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/spawn_coin/batch', 'spawn_batch', spawn_coin_characters_batch, methods=['POST'])
+        self.client = self.app.test_client()
+
+        patchers = [
+            patch('server.controllers.spawn_controller.get_web3', return_value=object()),
+            patch('server.controllers.spawn_controller.get_cached_token_balances',
+                  side_effect=lambda w3, wallets, contract: {w: 0 if w == EMPTY else 5 for w in wallets}),
+        ]
+        # Fresh rate limits per test
+        for name in ('wallet_limiter', 'game_server_limiter'):
+            limiter_patcher = patch(f'server.controllers.spawn_controller.{name}', RateLimiter(2, 10))
+            limiter_patcher.start()
+            self.addCleanup(limiter_patcher.stop)
+        self.mock_connect, self.mock_balance = [p.start() for p in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.store = SpawnStore(os.path.join(tmpdir.name, 'spawns.sqlite3'))
+        store_patcher = patch('server.controllers.spawn_controller.get_spawn_store', return_value=self.store)
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+        feed_patcher = patch('server.controllers.spawn_controller.get_event_feed',
+                             return_value=EventFeed(os.path.join(tmpdir.name, 'events.sqlite3')))
+        feed_patcher.start()
+        self.addCleanup(feed_patcher.stop)
+
+    def test_batch_spawn_reports_per_item_results(self):
+        """Test that a batch spawns valid items and reports failures per item"""
+        spawns = [
+            {'wallet_address': ALICE, 'behavior': [[0.9]], 'speed': 8, 'strength': 75, 'size': 'large'},
+            {'wallet_address': ALICE, 'behavior': [[0.1]]},
+            {'wallet_address': 'not-a-wallet', 'behavior': [[0.9]]},
+            {'wallet_address': EMPTY, 'behavior': [[0.9]]},
+            {'wallet_address': BOB, 'behavior': [[0.9]], 'speed': 15},
+            {'wallet_address': BOB, 'behavior': 'dance'},
+        ]
+
+        response = self.client.post('/spawn_coin/batch', json={'spawns': spawns})
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['spawned'], 2)
+        self.assertEqual(body['failed'], 4)
+        self.assertEqual([r['status'] for r in body['results']], ['success', 'success', 'error', 'error', 'error', 'error'])
+
+        first = body['results'][0]['spawn_details']['attributes']
+        self.assertEqual((first['speed'], first['strength'], first['size'], first['rarity']), (8, 75, 'large', 'common'))
+        defaulted = body['results'][1]['spawn_details']['attributes']
+        self.assertTrue(0 <= defaulted['speed'] <= 10)
+        self.assertIn(defaulted['size'], ['small', 'medium', 'large'])
+        self.assertEqual(defaulted['rarity'], 'rare')
+
+        ids = [body['results'][i]['spawn_details']['character_id'] for i in (0, 1)]
+        self.assertEqual(ids[1], ids[0] + 1)
+        self.store.flush()
+        self.assertEqual([s['character_id'] for s in self.store.by_wallet(ALICE)], [ids[1], ids[0]])
+
+        self.assertEqual(body['results'][2]['error'], "Invalid wallet address")
+        self.assertEqual(body['results'][3]['error'], "Insufficient token balance for spawning a coin character")
+        self.assertEqual(body['results'][4]['error'], "Invalid speed value, must be between 0 and 10")
+        self.assertEqual(body['results'][5]['error'], "Invalid behavior, must be a nested list of scores")
+
+    def test_batch_spawn_checks_all_wallets_in_one_lookup(self):
+        """Test that every wallet in the batch is checked with a single batched lookup"""
+        spawns = [{'wallet_address': ALICE, 'behavior': [[0.9]]} for _ in range(10)]
+        spawns.append({'wallet_address': BOB, 'behavior': [[0.9]]})
+
+        response = self.client.post('/spawn_coin/batch', json=spawns)
+
+        self.assertEqual(response.get_json()['spawned'], 11)
+        self.assertEqual(self.mock_connect.call_count, 1)
+        self.assertEqual(self.mock_balance.call_count, 1)
+        self.assertEqual(set(self.mock_balance.call_args[0][1]), {ALICE, BOB})
+
+    def test_batch_spawn_rejects_empty_batch(self):
+        """Test that an empty batch returns an error"""
+        response = self.client.post('/spawn_coin/batch', json={'spawns': []})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], "'spawns' must be a non-empty list")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,247 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from server.controllers.spawn_controller import spawns_by_wallet, spawns_in_region
+from utils.spawn_store import SpawnStore, sqlite_path
+
+ALICE = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+BOB = '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359'
+
+
+def location(x, z):
+    return {'x': x, 'y': 0, 'z': z}
+
+
+class SpawnStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'spawns.sqlite3')
+        self.store = SpawnStore(self.path, id_block=10)
+
+    def test_ids_are_unique_and_increasing_across_stores(self):
+        """Test that concurrent adds and a second process-like store never reuse an ID"""
+        other = SpawnStore(self.path, id_block=10)
+        ids = []
+        lock = threading.Lock()
+
+        def spawn(store):
+            for _ in range(25):
+                character_id = store.add(ALICE, {}, location(0, 0))
+                with lock:
+                    ids.append(character_id)
+
+        threads = [threading.Thread(target=spawn, args=(store,)) for store in (self.store, other) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.store.flush()
+        other.flush()
+
+        self.assertEqual(len(set(ids)), 100)
+        self.assertEqual(self.store.count(), 100)
+        batch = self.store.add_many([(BOB, {}, location(0, 0))] * 3)
+        self.assertEqual(batch, list(range(batch[0], batch[0] + 3)))
+        self.assertGreater(batch[0], max(ids))
+
+    def test_group_commit_and_wallet_paging(self):
+        """Test that queued spawns share commits and by_wallet pages newest first"""
+        for i in range(200):
+            self.store.add(ALICE if i % 2 else BOB, {'n': i}, location(i, i), created_at=1000 + i)
+        self.store.flush()
+
+        self.assertLess(self.store.stats()['commits'], 200)
+        first = self.store.by_wallet(ALICE.lower(), limit=3)
+        self.assertEqual([s['attributes']['n'] for s in first], [199, 197, 195])
+        second = self.store.by_wallet(ALICE, limit=3, before=first[-1]['created_at'])
+        self.assertEqual([s['attributes']['n'] for s in second], [193, 191, 189])
+        self.assertEqual(second[0]['spawn_location'], {'x': 193, 'y': 0, 'z': 193})
+
+    def test_wallet_pages_split_a_batch(self):
+        """Test that paging by (created_at, character_id) returns every row of one batch exactly once"""
+        ids = self.store.add_many([(ALICE, {}, location(0, 0))] * 300, created_at=1000)
+        self.store.flush()
+
+        pages, cursor = [], {}
+        while True:
+            page = self.store.by_wallet(ALICE, limit=100, **cursor)
+            if not page:
+                break
+            pages.append([s['character_id'] for s in page])
+            cursor = {'before': page[-1]['created_at'], 'before_id': page[-1]['character_id']}
+
+        self.assertEqual([len(page) for page in pages], [100, 100, 100])
+        self.assertEqual(sum(pages, []), sorted(ids, reverse=True))
+
+    def test_region_pages_walk_back_through_ids(self):
+        """Test that region pages are newest first, disjoint, and cover every match"""
+        spawns = [(ALICE, {}, location(i % 50, i % 7)) for i in range(1000)]
+        ids = self.store.add_many(spawns)
+        self.store.flush()
+        expected = [i for i, (_, _, loc) in zip(ids, spawns) if loc['x'] <= 10 and loc['z'] <= 3]
+
+        found, before_id = [], None
+        while True:
+            page = self.store.in_region(0, 10, 0, 3, limit=17, before_id=before_id)
+            if not page:
+                break
+            self.assertLessEqual(len(page), 17)
+            found.extend(s['character_id'] for s in page)
+            before_id = page[-1]['character_id']
+
+        self.assertEqual(found, sorted(expected, reverse=True))
+
+    def test_region_index_of_an_older_store_is_migrated(self):
+        """Test that a store with the (x, z)-only R*Tree is reindexed by ID on open"""
+        self.store.add_many([(ALICE, {}, location(1, 1)), (BOB, {}, location(9, 9))])
+        self.store.flush()
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute('DROP TABLE spawn_positions')
+        conn.execute('CREATE VIRTUAL TABLE spawn_locations USING rtree(character_id, min_x, max_x, min_z, max_z)')
+        conn.close()
+
+        store = SpawnStore(self.path)
+
+        self.assertEqual([s['wallet_address'] for s in store.in_region(0, 2, 0, 2)], [ALICE.lower()])
+        self.assertEqual(len(store.in_region(0, 10, 0, 10)), 2)
+
+    def test_worlds_and_despawns_are_recorded(self):
+        """Test that spawns keep their world and despawned coins drop out of the world's live coins"""
+        arena = self.store.add_many([(ALICE, {}, location(1, 1)), (BOB, {}, location(2, 2))], world='arena')
+        home = self.store.add(ALICE, {}, location(3, 3))
+
+        self.assertTrue(self.store.despawn(arena[0], 'arena'))
+        self.assertFalse(self.store.despawn(arena[0], 'arena'))
+        self.assertFalse(self.store.despawn(home, 'arena'))
+
+        self.assertEqual(self.store.world_changes('arena'), [(arena[1], location(2, 2), True)])
+        self.assertEqual([c[0] for c in self.store.world_changes('default')], [home])
+        self.assertEqual(sorted(self.store.world_changes('arena', since=0)),
+                         [(arena[0], location(1, 1), False), (arena[1], location(2, 2), True)])
+        self.assertEqual([s['world'] for s in self.store.by_wallet(ALICE)], ['default', 'arena'])
+
+    def test_world_columns_of_an_older_store_are_added(self):
+        """Test that a store from before worlds were recorded gets the columns, its spawns in the default world"""
+        self.store.add(ALICE, {}, location(1, 1))
+        self.store.flush()
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute('DROP INDEX idx_spawns_world_created')
+        conn.execute('DROP INDEX idx_spawns_world_despawned')
+        conn.execute('ALTER TABLE spawns DROP COLUMN despawned_at')
+        conn.execute('ALTER TABLE spawns DROP COLUMN world')
+        conn.close()
+
+        store = SpawnStore(self.path)
+        character_id = store.add(BOB, {}, location(2, 2), world='arena')
+        store.flush()
+
+        self.assertEqual([c[0] for c in store.world_changes('default')], [1])
+        self.assertEqual([c[0] for c in store.world_changes('arena')], [character_id])
+
+    def test_region_query_is_per_world(self):
+        """Test that worlds sharing coordinates are queried apart, with or without R*Tree, despawns included"""
+        arena = self.store.add_many([(ALICE, {}, location(1, 1)), (ALICE, {}, location(2, 2))], world='arena')
+        home = self.store.add(BOB, {}, location(1, 1))
+        self.store.despawn(arena[1], 'arena')
+
+        for has_rtree in (True, False):
+            self.store.has_rtree = has_rtree
+            found = self.store.in_region(0, 3, 0, 3, world='arena')
+            self.assertEqual([s['character_id'] for s in found], [arena[1], arena[0]], has_rtree)
+            self.assertIsNotNone(found[0]['despawned_at'])
+            self.assertIsNone(found[1]['despawned_at'])
+            self.assertEqual([s['character_id'] for s in self.store.in_region(0, 3, 0, 3)], [home], has_rtree)
+            self.assertEqual(self.store.in_region(0, 3, 0, 3, world='lobby'), [], has_rtree)
+
+    def test_region_query_is_exact(self):
+        """Test that in_region returns exactly the spawns inside the rectangle"""
+        points = [(x + 0.5, z - 0.25) for x in range(-20, 20, 3) for z in range(-20, 20, 4)]
+        self.store.add_many([(ALICE, {}, location(x, z)) for x, z in points])
+        self.store.flush()
+
+        found = self.store.in_region(-5, 5.5, -8.25, 4, limit=1000)
+
+        expected = {(x, z) for x, z in points if -5 <= x <= 5.5 and -8.25 <= z <= 4}
+        self.assertEqual({(s['spawn_location']['x'], s['spawn_location']['z']) for s in found}, expected)
+        self.assertEqual(len(self.store.in_region(-100, 100, -100, 100, limit=7)), 7)
+
+    def test_memory_database_is_rejected(self):
+        """Test that the store refuses URLs it cannot share between processes"""
+        self.assertEqual(sqlite_path('sqlite:///db.sqlite3'), 'db.sqlite3')
+        for url in ('sqlite:///:memory:', 'postgresql://localhost/bloxverse'):
+            with self.assertRaises(ValueError):
+                sqlite_path(url)
+
+
+class SpawnQueryEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup a test client with the spawn query endpoints and a temporary store"""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.store = SpawnStore(os.path.join(tmpdir.name, 'spawns.sqlite3'))
+        patcher = patch('server.controllers.spawn_controller.get_spawn_store', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/spawn_coin/by_wallet/<wallet_address>', 'by_wallet', spawns_by_wallet)
+        self.app.add_url_rule('/spawn_coin/in_region', 'in_region', spawns_in_region)
+        self.client = self.app.test_client()
+
+        self.store.add_many([(ALICE, {'color': 'gold'}, location(1, 1)), (BOB, {}, location(50, 50))])
+        self.store.flush()
+
+    def test_by_wallet_endpoint(self):
+        """Test that spawns are listed per wallet and bad input is rejected"""
+        body = self.client.get(f'/spawn_coin/by_wallet/{ALICE}?limit=10').get_json()
+        self.assertEqual(body['count'], 1)
+        self.assertEqual(body['spawns'][0]['attributes'], {'color': 'gold'})
+
+        self.assertEqual(self.client.get('/spawn_coin/by_wallet/not-a-wallet').status_code, 400)
+        self.assertEqual(self.client.get(f'/spawn_coin/by_wallet/{ALICE}?limit=0').status_code, 400)
+        self.assertEqual(self.client.get(f'/spawn_coin/by_wallet/{ALICE}?before=yesterday').status_code, 400)
+        self.assertEqual(self.client.get(f'/spawn_coin/by_wallet/{ALICE}?before_id=5').status_code, 400)
+
+    def test_by_wallet_endpoint_pages_with_before_id(self):
+        """Test that the endpoint's keyset cursor continues inside a batch sharing one created_at"""
+        self.store.add_many([(ALICE, {'n': n}, location(0, 0)) for n in range(3)], created_at=2000)
+        self.store.flush()
+        first = self.client.get(f'/spawn_coin/by_wallet/{ALICE}?limit=2').get_json()['spawns']
+        last = first[-1]
+
+        second = self.client.get(f"/spawn_coin/by_wallet/{ALICE}?limit=2&before={last['created_at']}"
+                                 f"&before_id={last['character_id']}").get_json()['spawns']
+
+        self.assertEqual([s['attributes'] for s in first + second], [{'color': 'gold'}, {'n': 2}, {'n': 1}, {'n': 0}])
+
+    def test_in_region_endpoint(self):
+        """Test that region queries return matching spawns and validate bounds"""
+        body = self.client.get('/spawn_coin/in_region?min_x=0&max_x=10&min_z=0&max_z=10').get_json()
+        self.assertEqual([s['wallet_address'] for s in body['spawns']], [ALICE.lower()])
+
+        self.assertEqual(self.client.get('/spawn_coin/in_region?min_x=0&max_x=10').status_code, 400)
+        self.assertEqual(self.client.get('/spawn_coin/in_region?min_x=10&max_x=0&min_z=0&max_z=1').status_code, 400)
+        self.assertEqual(self.client.get('/spawn_coin/in_region?min_x=0&max_x=10&min_z=0&max_z=10&before_id=x').status_code, 400)
+
+    def test_in_region_endpoint_is_per_world(self):
+        """Test that ?world= picks the world of the region and bad names are rejected"""
+        self.store.add(BOB, {}, location(1, 1), world='arena')
+        self.store.flush()
+
+        for world, wallet in (('arena', BOB), ('default', ALICE)):
+            body = self.client.get(f'/spawn_coin/in_region?min_x=0&max_x=10&min_z=0&max_z=10&world={world}').get_json()
+            self.assertEqual([(s['wallet_address'], s['world']) for s in body['spawns']], [(wallet.lower(), world)])
+        self.assertEqual(self.client.get('/spawn_coin/in_region?min_x=0&max_x=1&min_z=0&max_z=1&world=').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import subprocess
+import sys
+import unittest
+
+from benchmarks.bench_startup import ENTRY_POINTS, SDK_ROOT, measure_startup
+from utils.lazy_imports import LazyModule, import_stats, preload_modules
+
+# Importing TensorFlow alone takes several seconds; the servers must start well under that
+STARTUP_BUDGET_SECONDS = 3.0
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_entry_points_do_not_import_heavy_modules(self):
+        """Test that importing the servers and agent leaves TensorFlow, torch and web3 unloaded"""
+        for module in ENTRY_POINTS:
+            profile = measure_startup(module)
+            self.assertEqual(profile['heavy_imported'], [], module)
+            self.assertLess(profile['seconds'], STARTUP_BUDGET_SECONDS, profile)
+
+    def test_preload_option_imports_requested_modules(self):
+        """Test that PRELOAD_MODULES warms the listed modules at worker start"""
+        profile = measure_startup('server.asgi', env={'PRELOAD_MODULES': 'web3'})
+
+        self.assertEqual(profile['heavy_imported'], ['web3'])
+
+    def test_fallback_behavior_never_imports_tensorflow(self):
+        """Test that an agent without a model decides its behavior without TensorFlow"""
+        code = (
+            "import sys; from coin_ai.agent import get_coin_behavior; "
+            "get_coin_behavior(None, {'coin_name': 'Lazy'}); print('tensorflow' in sys.modules)"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=SDK_ROOT, capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_importing_the_servers_configures_no_logging(self):
+        """Test that only the entry points, not an import of the apps, set up file logging"""
+        code = (
+            "import sys; sys.path.insert(0, 'server'); import main, server.asgi; "
+            "from utils.logger import logging_stats; print(logging_stats()['configured'])"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=SDK_ROOT, capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_served_apps_mount_every_controller(self):
+        """Test that the Flask and ASGI servers both serve the spawn, event feed and AI gateway routes"""
+        code = (
+            "import sys; sys.path.insert(0, 'server'); import main, server.asgi; "
+            "print(sorted(rule.rule for rule in main.app.url_map.iter_rules())); "
+            "print(sorted(rule.rule for rule in server.asgi.controllers.url_map.iter_rules()))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=SDK_ROOT, capture_output=True, text=True, check=True)
+
+        for rules in result.stdout.splitlines():
+            for rule in ['/spawn_coin', '/spawn_coin/batch', '/api/events/<world>', '/api/update_wallets',
+                         '/api/ai/complete']:
+                self.assertIn(f"'{rule}'", rules)
+
+    def test_lazy_module_loads_on_first_attribute_access(self):
+        """Test that the proxy resolves attributes from the real module"""
+        lazy = LazyModule('colorsys')
+
+        self.assertEqual(lazy.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(lazy.is_loaded)
+        self.assertIn('loaded', repr(lazy))
+
+    def test_preload_skips_missing_modules(self):
+        """Test that preloading logs and skips modules that are not installed"""
+        self.assertEqual(preload_modules('json, not_a_real_module,'), ['json'])
+        self.assertLessEqual({'tensorflow', 'torch', 'web3'}, set(import_stats()))
+
+
+if __name__ == '__main__':
+    unittest.main()
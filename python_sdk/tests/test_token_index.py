@@ -0,0 +1,234 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from server.controllers.spawn_controller import spawn_coin_character, spawn_coin_characters_batch
+from tests.rpc_stub import JsonRpcStub
+from utils.admission import RateLimiter
+from utils.event_feed import EventFeed
+from utils.spawn_store import SpawnStore
+from utils.token_index import TRANSFER_TOPIC, ZERO_ADDRESS, TokenIndex, TransferIndexer, parse_transfer
+
+TOKEN = '0xdac17f958d2ee523a2206206994597c13d831ec7'
+ALICE = '0x5aaeb6053f3e94c9b9a09f33669435e7ef1beaed'
+BOB = '0xfb6916095ca1df60bb79ce92ce3ea74c37c5d359'
+CAROL = '0xdbf03b407c01e7cd3cbea99509d93f8dddc8c6fb'
+
+
+def topic(address):
+    return '0x' + address[2:].rjust(64, '0')
+
+
+class SyntheticChain:
+    """A chain of blocks with Transfer logs of TOKEN, served by a JsonRpcStub."""
+
+    def __init__(self, stub, max_logs=None):
+        self.blocks = [('0xgenesis', [])]
+        self.max_logs = max_logs  # eth_getLogs refuses ranges with more logs than this
+        self.log_queries = []
+        stub.methods.update({
+            'eth_blockNumber': lambda params: hex(len(self.blocks) - 1),
+            'eth_getBlockByNumber': self.get_block,
+            'eth_getLogs': self.get_logs,
+        })
+
+    def mine(self, *transfers, fork='a'):
+        """Append a block with (sender, recipient, value) transfers; returns its number."""
+        number = len(self.blocks)
+        block_hash = f'0x{fork}{number:x}'
+        logs = [{
+            'address': TOKEN, 'topics': [TRANSFER_TOPIC, topic(sender), topic(recipient)], 'data': hex(value),
+            'blockNumber': hex(number), 'blockHash': block_hash, 'logIndex': hex(i), 'removed': False,
+        } for i, (sender, recipient, value) in enumerate(transfers)]
+        self.blocks.append((block_hash, logs))
+        return number
+
+    def reorg(self, keep_up_to):
+        """Drop the blocks after `keep_up_to`; mine replacements with another fork label."""
+        del self.blocks[keep_up_to + 1:]
+
+    def get_block(self, params):
+        number = int(params[0], 16)
+        return {'number': params[0], 'hash': self.blocks[number][0]} if number < len(self.blocks) else None
+
+    def get_logs(self, params):
+        query = params[0]
+        from_block, to_block = int(query['fromBlock'], 16), int(query['toBlock'], 16)
+        self.log_queries.append((from_block, to_block))
+        logs = [log for _, block_logs in self.blocks[from_block:to_block + 1] for log in block_logs
+                if log['address'] == query['address'] and log['topics'][0] == query['topics'][0]]
+        if self.max_logs is not None and len(logs) > self.max_logs:
+            raise ValueError(f"query returned more than {self.max_logs} results")
+        return logs
+
+
+class TransferIndexerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = JsonRpcStub().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        self.chain = SyntheticChain(self.stub)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.index = TokenIndex(os.path.join(tmpdir.name, 'token_index.sqlite3'))
+
+    def indexer(self, **kwargs):
+        options = {'start_block': 1, 'chunk_size': 7, 'reorg_depth': 5}
+        options.update(kwargs)
+        return TransferIndexer(self.index, TOKEN, [self.stub.url], **options)
+
+    def balances(self):
+        return self.index.balances([ALICE, BOB, CAROL], TOKEN)
+
+    def test_backfill_in_chunks_then_tail(self):
+        """Test that the indexer backfills in block-range chunks and then only reads new blocks"""
+        self.chain.mine((ZERO_ADDRESS, ALICE, 100))
+        for _ in range(30):
+            self.chain.mine()
+        self.chain.mine((ALICE, BOB, 30))
+        self.chain.mine((BOB, CAROL, 30), (ALICE, CAROL, 5))
+        indexer = self.indexer()
+
+        self.assertIsNone(self.balances())
+        self.assertEqual(indexer.sync_once(), 33)
+        self.assertEqual(self.balances(), {ALICE: 65, BOB: 0, CAROL: 35})
+        self.assertEqual(len(self.chain.log_queries), 5)
+        self.assertEqual(self.index.stats()['holders'], 2)  # Emptied wallets are dropped
+
+        self.chain.mine((CAROL, BOB, 10 ** 30))
+        self.chain.log_queries.clear()
+        indexer.sync_once()
+
+        self.assertEqual(self.chain.log_queries, [(34, 34)])
+        self.assertEqual(self.balances()[BOB], 10 ** 30)
+
+    def test_reorg_rolls_back_orphaned_blocks(self):
+        """Test that transfers of blocks dropped by a reorg are undone and the new blocks indexed"""
+        self.chain.mine((ZERO_ADDRESS, ALICE, 100))
+        for _ in range(5):
+            self.chain.mine()
+        self.chain.mine((ALICE, BOB, 40))
+        self.chain.mine((BOB, CAROL, 10))
+        indexer = self.indexer()
+        indexer.sync_once()
+        self.assertEqual(self.balances(), {ALICE: 60, BOB: 30, CAROL: 10})
+
+        self.chain.reorg(keep_up_to=6)
+        self.chain.mine((ALICE, CAROL, 1), fork='b')
+        self.chain.mine(fork='b')
+        self.chain.mine(fork='b')
+        indexer.sync_once()
+
+        self.assertEqual(self.balances(), {ALICE: 99, BOB: 0, CAROL: 1})
+        self.assertEqual((indexer.reorgs, indexer.rolled_back), (1, 2))
+        self.assertEqual(self.index.stats()['cursor'], 9)
+
+    def test_reorg_deeper_than_the_kept_blocks_reindexes(self):
+        """Test that a reorg beyond reorg_depth rebuilds the index from the start block"""
+        self.chain.mine((ZERO_ADDRESS, ALICE, 100))
+        for _ in range(10):
+            self.chain.mine((ALICE, BOB, 1))
+        indexer = self.indexer(reorg_depth=3)
+        indexer.sync_once()
+
+        self.chain.reorg(keep_up_to=1)
+        for _ in range(10):
+            self.chain.mine((ALICE, CAROL, 2), fork='b')
+        indexer.sync_once()
+
+        self.assertEqual(self.balances(), {ALICE: 80, BOB: 0, CAROL: 20})
+
+    def test_refused_ranges_are_split(self):
+        """Test that a range eth_getLogs refuses for too many logs is read in smaller chunks"""
+        self.chain.max_logs = 2
+        self.chain.mine((ZERO_ADDRESS, ALICE, 100))
+        for _ in range(9):
+            self.chain.mine((ALICE, BOB, 1))
+        indexer = self.indexer(chunk_size=100)
+
+        indexer.sync_once()
+
+        self.assertEqual(self.balances(), {ALICE: 91, BOB: 9, CAROL: 0})
+        self.assertLessEqual(indexer.chunk_size, 2)
+
+    def test_stale_or_foreign_index_is_not_trusted(self):
+        """Test that balances are only served for the indexed token within the staleness bound"""
+        self.chain.mine((ZERO_ADDRESS, ALICE, 100))
+        self.indexer().sync_once()
+
+        self.assertEqual(self.index.balances([ALICE], TOKEN, max_staleness=60), {ALICE: 100})
+        self.assertIsNone(self.index.balances([ALICE], '0x' + '1' * 40))
+        TokenIndex._set_state(self.index._conn(), synced_at=0)
+        self.assertIsNone(self.index.balances([ALICE], TOKEN, max_staleness=60))
+
+    def test_parse_transfer_skips_other_logs(self):
+        """Test that removed logs and logs with other topics are not transfers"""
+        self.chain.mine((ALICE, BOB, 7))
+        log = self.chain.blocks[1][1][0]
+
+        self.assertEqual(parse_transfer(log), (1, 0, ALICE, BOB, 7))
+        self.assertIsNone(parse_transfer(dict(log, removed=True)))
+        self.assertIsNone(parse_transfer(dict(log, topics=log['topics'] + [topic(CAROL)])))
+
+
+class IndexedSpawnTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Setup the spawn endpoints reading balances from a synced local index"""
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/spawn_coin', 'spawn_coin', spawn_coin_character, methods=['POST'])
+        self.app.add_url_rule('/spawn_coin/batch', 'spawn_batch', spawn_coin_characters_batch, methods=['POST'])
+        self.client = self.app.test_client()
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.index = TokenIndex(os.path.join(tmpdir.name, 'token_index.sqlite3'))
+        self.index.reset(TOKEN, 0)
+        self.index.apply(10, [(5, 0, ZERO_ADDRESS, ALICE, 10 ** 18)], {}, keep_from=10)
+        self.index.mark_synced(10)
+
+        patchers = [
+            patch('server.controllers.spawn_controller.BALANCE_SOURCE', 'index'),
+            patch('server.controllers.spawn_controller.TOKEN_CONTRACT_ADDRESS', TOKEN),
+            patch('server.controllers.spawn_controller.get_token_index', return_value=self.index),
+            patch('server.controllers.spawn_controller.get_spawn_store',
+                  return_value=SpawnStore(os.path.join(tmpdir.name, 'spawns.sqlite3'))),
+            patch('server.controllers.spawn_controller.get_event_feed',
+                  return_value=EventFeed(os.path.join(tmpdir.name, 'events.sqlite3'))),
+            patch('server.controllers.spawn_controller.wallet_limiter', RateLimiter(0, 1)),
+            patch('server.controllers.spawn_controller.game_server_limiter', RateLimiter(0, 1)),
+            patch('server.controllers.spawn_controller.get_web3', return_value=None),
+        ]
+        self.mock_connect = [p.start() for p in patchers][-1]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def test_eligibility_comes_from_the_index(self):
+        """Test that spawns are gated on indexed balances without connecting to the blockchain"""
+        allowed = self.client.post('/spawn_coin', json={'wallet_address': ALICE, 'behavior': [[0.9]]})
+        denied = self.client.post('/spawn_coin', json={'wallet_address': BOB, 'behavior': [[0.9]]})
+        batch = self.client.post('/spawn_coin/batch', json=[
+            {'wallet_address': ALICE, 'behavior': [[0.9]]}, {'wallet_address': BOB, 'behavior': [[0.9]]},
+        ]).get_json()
+
+        self.assertEqual(allowed.status_code, 200)
+        self.assertEqual(denied.status_code, 400)
+        self.assertEqual([r['status'] for r in batch['results']], ['success', 'error'])
+        self.mock_connect.assert_not_called()
+
+    def test_stale_index_falls_back_to_rpc(self):
+        """Test that an index past its staleness bound is bypassed for the RPC lookup"""
+        TokenIndex._set_state(self.index._conn(), synced_at=0)
+
+        response = self.client.post('/spawn_coin', json={'wallet_address': ALICE, 'behavior': [[0.9]]})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()['error'], "Failed to connect to the blockchain")
+        self.mock_connect.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import importlib
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import torch
+import torch._dynamo  # Loaded by the first optimizer; importing triton after TensorFlow (other tests) crashes
+
+from coin_ai.agent import ACTIONS, MOOD_TO_ACTION, MOODS
+from coin_ai.models import model_data
+from coin_ai.numpy_engine import NumpyMLP
+from coin_ai.training import FeatureCache, Trainer, fold_standardization, parse_record
+
+
+def write_telemetry(path, rows, seed=0):
+    """Telemetry of coins acting by the mood rules; returns the expected cache rows."""
+    rng = random.Random(seed)
+    expected = []
+    with open(path, 'w') as f:
+        for _ in range(rows):
+            mood = rng.randrange(len(MOODS))
+            strength, speed, intelligence = (rng.randint(1, 10) for _ in range(3))
+            action = int(MOOD_TO_ACTION[mood])
+            f.write(json.dumps({'strength': strength, 'speed': speed, 'intelligence': intelligence,
+                                'mood': MOODS[mood], 'action': ACTIONS[action]}) + '\n')
+            expected.append([strength, speed, intelligence, mood, action])
+    return np.array(expected, dtype=np.float32)
+
+
+class FeatureCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+
+    def test_parallel_tasks_keep_every_row_in_order(self):
+        """Test that telemetry split into byte ranges mid-line is cached whole, in file order"""
+        first = write_telemetry(os.path.join(self.tmpdir, 'a.jsonl'), 300, seed=1)
+        second = write_telemetry(os.path.join(self.tmpdir, 'b.jsonl'), 200, seed=2)
+        with open(os.path.join(self.tmpdir, 'b.jsonl'), 'a') as f:
+            f.write('not json\n\n{"strength": 1, "mood": "sad", "action": "hide"}\n')
+
+        cache = FeatureCache.build([os.path.join(self.tmpdir, 'a.jsonl'), os.path.join(self.tmpdir, 'b.jsonl')],
+                                   self.cache_dir, workers=2, split_bytes=1000)
+
+        self.assertEqual((len(cache), cache.meta['skipped']), (500, 2))
+        np.testing.assert_array_equal(cache.array(), np.concatenate([first, second]))
+        np.testing.assert_allclose(cache.mean, np.concatenate([first, second])[:, :4].mean(axis=0), rtol=1e-5)
+
+    def test_cache_is_reused_until_the_telemetry_changes(self):
+        """Test that a second build of the same files maps the existing cache without parsing"""
+        path = os.path.join(self.tmpdir, 'telemetry.jsonl')
+        write_telemetry(path, 50)
+        cache = FeatureCache.build([path], self.cache_dir, workers=1)
+
+        with patch('coin_ai.training._parse_task') as mock_parse:
+            self.assertEqual(FeatureCache.build([path], self.cache_dir, workers=1).directory, cache.directory)
+        mock_parse.assert_not_called()
+
+        write_telemetry(path, 60)
+        self.assertEqual(len(FeatureCache.build([path], self.cache_dir, workers=1)), 60)
+
+    def test_parse_record(self):
+        """Test that nested attributes and indices are accepted and incomplete records are not"""
+        self.assertEqual(parse_record({'attributes': {'strength': 2, 'speed': 3, 'intelligence': 4, 'mood': 'angry'},
+                                       'action': 2}), [2.0, 3.0, 4.0, 2, 2])
+        self.assertIsNone(parse_record({'strength': 2, 'speed': 3, 'intelligence': 4, 'mood': 'bored', 'action': 0}))
+        self.assertIsNone(parse_record({'strength': 'x', 'speed': 3, 'intelligence': 4, 'mood': 1, 'action': 0}))
+        self.assertIsNone(parse_record({'strength': 2, 'speed': 3, 'intelligence': 4, 'mood': 1, 'action': 3}))
+        self.assertIsNone(parse_record([1, 2, 3]))
+
+
+class TrainerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+        path = os.path.join(self.tmpdir, 'telemetry.jsonl')
+        write_telemetry(path, 4000)
+        self.cache = FeatureCache.build([path], os.path.join(self.tmpdir, 'cache'), workers=1)
+
+    def trainer(self, checkpoint='checkpoint.pt', **kwargs):
+        options = {'batch_size': 64, 'learning_rate': 0.01, 'workers': 0, 'block_rows': 250, 'group_blocks': 2,
+                   'holdout': 0.1, 'checkpoint_interval': 3600}
+        options.update(kwargs)
+        return Trainer(self.cache, os.path.join(self.tmpdir, checkpoint), **options)
+
+    def test_exported_model_serves_the_learned_behavior(self):
+        """Test that the exported .npz takes raw features and predicts the actions of the telemetry"""
+        trainer = self.trainer(workers=2)
+        history = trainer.train(epochs=3)
+        output = trainer.export(os.path.join(self.tmpdir, 'behavior.npz'))
+
+        self.assertEqual([result['epoch'] for result in history], [1, 2, 3])
+        self.assertGreater(history[-1]['eval_accuracy'], 0.99)
+        grid = np.array([[s, 5, i, mood] for s in (1, 10) for i in (1, 10) for mood in range(len(MOODS))],
+                        dtype=np.float32)
+        predictions = NumpyMLP.load(output).predict(grid).argmax(axis=1)
+        np.testing.assert_array_equal(predictions, MOOD_TO_ACTION[grid[:, 3].astype(int)])
+
+    def test_resumed_run_matches_an_uninterrupted_one(self):
+        """Test that a run stopped mid-epoch resumes from its checkpoint to the same weights"""
+        uninterrupted = self.trainer('uninterrupted.pt')
+        uninterrupted.train(epochs=2)
+
+        stopped = self.trainer()
+        calls = []
+
+        def train_group(features, labels):
+            Trainer._train_group(stopped, features, labels)
+            calls.append(len(labels))
+            if len(calls) == 3:
+                stopped.stop()
+
+        with patch.object(stopped, '_train_group', side_effect=train_group):
+            stopped.train(epochs=2)
+        self.assertEqual((stopped.epoch, stopped.group), (0, 3))
+
+        resumed = self.trainer()
+        self.assertEqual((resumed.epoch, resumed.group, resumed.steps), (0, 3, stopped.steps))
+        history = resumed.train(epochs=2)
+
+        self.assertEqual(history, uninterrupted.history)
+        for name, tensor in uninterrupted.model.state_dict().items():
+            self.assertTrue(torch.equal(tensor, resumed.model.state_dict()[name]), name)
+
+    def test_checkpoint_of_another_layout_is_refused(self):
+        """Test that a checkpoint is not resumed with a different data layout"""
+        self.trainer().save_checkpoint()
+
+        with self.assertRaises(ValueError):
+            self.trainer(block_rows=500)
+        self.assertEqual(self.trainer(block_rows=500, resume=False).epoch, 0)
+
+    def test_fold_standardization(self):
+        """Test that the folded first layer on raw inputs equals the original on standardized inputs"""
+        rng = np.random.default_rng(0)
+        weights, biases = [rng.normal(size=(4, 3))], [rng.normal(size=3)]
+        mean, std = rng.normal(size=4), rng.uniform(0.5, 2, size=4)
+        x = rng.normal(size=(5, 4))
+
+        folded_weights, folded_biases = fold_standardization(weights, biases, mean, std)
+
+        np.testing.assert_allclose(x @ folded_weights[0] + folded_biases[0],
+                                   (x - mean) / std @ weights[0] + biases[0])
+
+
+class ModelDataTestCase(unittest.TestCase):
+
+    def test_import_does_not_train(self):
+        """Test that importing the model definitions neither trains nor writes model_data.bin"""
+        with patch('torch.save') as mock_save:
+            importlib.reload(model_data)
+
+        mock_save.assert_not_called()
+        self.assertTrue(hasattr(model_data, 'BehaviorNN'))
+
+
+if __name__ == '__main__':
+    unittest.main()
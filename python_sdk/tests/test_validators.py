@@ -0,0 +1,77 @@
+import unittest
+
+from flask import Flask
+from utils.schemas import SpawnCoinRequest, SpawnRequest
+from utils.validators import validate_authentication_token, validate_coin_features, validate_request_data
+
+WALLET = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+
+
+class ValidatorsTestCase(unittest.TestCase):
+
+    def test_coin_features_messages(self):
+        """Test that coin feature validation keeps its error messages"""
+        cases = [
+            ([], "Coin features must be a dictionary."),
+            ({'appearance': {}, 'behavior': {}}, "Missing required field: name"),
+            ({'name': '  ', 'appearance': {}, 'behavior': {}}, "'name' must be a non-empty string."),
+            ({'name': 'Golden Coin', 'appearance': 'gold', 'behavior': {}}, "'appearance' must be a dictionary."),
+            ({'name': 'Golden Coin', 'appearance': {}, 'behavior': []}, "'behavior' must be a dictionary."),
+            ({'name': 'Golden Coin', 'appearance': {}, 'behavior': {}, 'speed': 3}, "Valid coin features."),
+        ]
+        for coin_features, message in cases:
+            self.assertEqual(validate_coin_features(coin_features)[1], message)
+
+    def test_request_data_is_validated_from_raw_body(self):
+        """Test that request validation parses the JSON body once and reports the first error"""
+        app = Flask(__name__)
+        cases = [
+            ({}, "Missing 'coin_features' in the request body."),
+            ({'coin_features': {'name': 'Golden Coin', 'appearance': 'x', 'behavior': {}}}, "'appearance' must be a dictionary."),
+            ({'coin_features': {'name': 'Golden Coin', 'appearance': {}, 'behavior': {}}}, "Request data is valid."),
+        ]
+        for body, message in cases:
+            with app.test_request_context('/spawn', method='POST', json=body):
+                self.assertEqual(validate_request_data()[1], message)
+        with app.test_request_context('/spawn', method='POST', data='not json'):
+            self.assertEqual(validate_request_data(), (False, "Request must be in JSON format."))
+
+    def test_authentication_token(self):
+        """Test that tokens must be exactly 32 alphanumeric characters"""
+        self.assertTrue(validate_authentication_token('a' * 32)[0])
+        for token in ['a' * 31, 'a' * 31 + '!', None, 12345]:
+            self.assertEqual(validate_authentication_token(token), (False, "Invalid authentication token format."))
+
+    def test_spawn_coin_request_messages(self):
+        """Test that spawn payload errors map to the endpoint's messages"""
+        base = {'wallet_address': WALLET, 'behavior': [[0.9]]}
+        cases = [
+            ({**base, 'speed': 11}, "Invalid speed value, must be between 0 and 10"),
+            ({**base, 'speed': True}, "Invalid speed value, must be between 0 and 10"),
+            ({**base, 'size': 'huge'}, "Invalid size, must be 'small', 'medium', or 'large'"),
+            ({**base, 'strength': -10}, "Invalid strength value, must be between 0 and 100"),
+            ({**base, 'wallet_address': '0x123abc456def'}, "Invalid wallet address"),
+            ({'behavior': [[0.9]]}, "Invalid wallet address"),
+            ({**base, 'behavior': [[]]}, "Invalid behavior, must be a nested list of scores"),
+        ]
+        for payload, message in cases:
+            self.assertEqual(SpawnCoinRequest.parse(payload), (None, message))
+
+        spec, error = SpawnCoinRequest.parse_json(b'{"wallet_address": "%s", "behavior": [[0.2]], "speed": 8}' % WALLET.encode())
+        self.assertIsNone(error)
+        self.assertEqual((spec.speed, spec.behavior), (8, [[0.2]]))
+
+    def test_spawn_request_attributes(self):
+        """Test that agent attributes are validated and only provided fields are kept"""
+        spec, error = SpawnRequest.parse_json(b'{"coin_features": {"coin_name": "A", "attributes": {"mood": "sad"}}}')
+        self.assertIsNone(error)
+        self.assertEqual(spec.coin_features.model_dump(exclude_unset=True), {'coin_name': 'A', 'attributes': {'mood': 'sad'}})
+
+        _, error = SpawnRequest.parse_json(b'{"coin_features": {"attributes": {"mood": "grumpy"}}}')
+        self.assertIn('coin_features.attributes.mood', error)
+        _, error = SpawnRequest.parse_json(b'{"coin_features": {"attributes": {"mood": null}}}')
+        self.assertIn('coin_features.attributes.mood', error)
+
+
+if __name__ == '__main__':
+    unittest.main()
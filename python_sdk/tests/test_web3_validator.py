@@ -0,0 +1,301 @@
+import unittest
+from unittest.mock import patch
+
+from eth_abi import decode, encode
+from web3 import Web3
+from tests.rpc_stub import JsonRpcStub
+from utils.web3_validator import (
+    RpcUnavailable, Web3ConnectionManager, balance_cache, get_cached_token_balance, get_cached_token_balances,
+    _balance_of_calldata, get_token_balance, get_token_balances, to_checksum_address, validate_wallet_address,
+)
+
+TOKEN = '0x' + '11' * 20
+MULTICALL = '0xcA11bde05977b3631167028862bE2a173976CA11'
+FAILING_WALLET = '0x' + 'ee' * 20
+
+
+def wallet(i):
+    return '0x' + f"{i:040x}"
+
+
+def balance_of(data):
+    """Stub token: wallet N holds N tokens; FAILING_WALLET reverts."""
+    address = data[-40:]
+    if address == FAILING_WALLET[2:]:
+        raise ValueError('execution reverted')
+    return int(address, 16) * 10 ** 18
+
+
+class AddressValidationTestCase(unittest.TestCase):
+
+    # Test vectors from EIP-55
+    CHECKSUMMED = [
+        '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed',
+        '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359',
+        '0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB',
+        '0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb',
+    ]
+
+    def test_checksum_matches_eip55_vectors(self):
+        """Test that checksumming reproduces the EIP-55 test vectors"""
+        for address in self.CHECKSUMMED:
+            self.assertEqual(to_checksum_address(address.lower()), address)
+
+    def test_validation_runs_without_web3(self):
+        """Test that addresses validate offline with no Web3 instance"""
+        for address in self.CHECKSUMMED:
+            self.assertTrue(validate_wallet_address(None, address))
+            self.assertTrue(validate_wallet_address(None, address.lower()))
+            self.assertTrue(validate_wallet_address(None, '0x' + address[2:].upper()))
+
+    def test_invalid_addresses_are_rejected(self):
+        """Test that bad checksums, lengths, characters and types are rejected"""
+        bad_checksum = '0x5AAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+        for address in [bad_checksum, '0x123abc456def', '0x' + 'g' * 40, '', None, 42, ['0x']]:
+            self.assertFalse(validate_wallet_address(None, address), address)
+
+    def test_checksum_agrees_with_web3(self):
+        """Test that mixed-case addresses are accepted exactly when Web3 considers the checksum valid"""
+        samples = self.CHECKSUMMED + ['0x5AAeb6053F3E94C9b9A09f33669435E7Ef1BeAed', '0xFb6916095ca1df60bB79Ce92cE3Ea74c37c5d359']
+        for address in samples:
+            self.assertEqual(validate_wallet_address(None, address), Web3.is_checksum_address(address), address)
+            self.assertEqual(to_checksum_address(address), Web3.to_checksum_address(address))
+
+    def test_balance_of_calldata_agrees_with_web3(self):
+        """Test that the hand-encoded balanceOf call is what a Web3 contract call would send"""
+        contract = Web3().eth.contract(address=to_checksum_address(TOKEN), abi=[{
+            'name': 'balanceOf', 'type': 'function', 'stateMutability': 'view',
+            'inputs': [{'name': '', 'type': 'address'}], 'outputs': [{'name': '', 'type': 'uint256'}],
+        }])
+        for address in self.CHECKSUMMED:
+            expected = contract.functions.balanceOf(address)._encode_transaction_data()
+            self.assertEqual('0x' + _balance_of_calldata(address), expected)
+
+
+class Web3ConnectionManagerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.primary = JsonRpcStub().__enter__()
+        self.backup = JsonRpcStub().__enter__()
+        self.addCleanup(self.primary.__exit__)
+        self.addCleanup(self.backup.__exit__)
+        self.manager = Web3ConnectionManager([self.primary.url, self.backup.url], health_check_interval=60)
+        self.addCleanup(self.manager.stop)
+
+    def test_connection_is_reused_across_requests(self):
+        """Test that repeated lookups return the same pooled Web3 instance"""
+        first = self.manager.get_web3()
+        second = self.manager.get_web3()
+
+        self.assertIs(first, second)
+        self.assertEqual(first.eth.block_number, 100)
+        self.assertEqual(self.manager.stats()['endpoints'][0]['requests'], 2)
+
+    def test_fails_over_when_primary_is_unhealthy(self):
+        """Test that a failed health check moves traffic to the next RPC URL"""
+        self.primary.fail = True
+        self.manager.check_health()
+
+        w3 = self.manager.get_web3()
+
+        self.assertIs(w3, self.manager.endpoints[1].w3)
+        stats = self.manager.stats()['endpoints']
+        self.assertFalse(stats[0]['healthy'])
+        self.assertTrue(stats[1]['healthy'])
+        self.assertEqual(stats[1]['last_block'], 100)
+
+    def test_recovers_after_successful_health_check(self):
+        """Test that an endpoint marked failed is used again once it passes a check"""
+        self.manager.mark_failed(self.manager.endpoints[0].w3, 'timeout')
+        self.assertIs(self.manager.get_web3(), self.manager.endpoints[1].w3)
+
+        self.manager.check_health()
+
+        self.assertIs(self.manager.get_web3(), self.manager.endpoints[0].w3)
+
+    def test_returns_none_when_all_endpoints_are_down(self):
+        """Test that no connection is returned when every RPC URL is unhealthy"""
+        self.primary.fail = True
+        self.backup.fail = True
+        self.manager.check_health()
+
+        self.assertIsNone(self.manager.get_web3())
+
+
+class RequestFailoverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.primary = JsonRpcStub().__enter__()
+        self.backup = JsonRpcStub().__enter__()
+        self.addCleanup(self.primary.__exit__)
+        self.addCleanup(self.backup.__exit__)
+        for stub in (self.primary, self.backup):
+            stub.methods['eth_call'] = lambda params: '0x' + f"{balance_of(params[0]['data']):064x}"
+        self.manager = Web3ConnectionManager([self.primary.url, self.backup.url], health_check_interval=60)
+        self.addCleanup(self.manager.stop)
+        patcher = patch('utils.web3_validator._connection_manager', self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        balance_cache.clear()
+        self.addCleanup(balance_cache.clear)
+
+    def test_balance_fails_over_to_the_next_endpoint(self):
+        """Test that an RPC error on the request path marks the endpoint failed and retries the next one"""
+        self.primary.fail = True
+
+        balance = get_token_balance(self.manager.get_web3(), wallet(4), TOKEN)
+
+        self.assertEqual(balance, 4.0)
+        self.assertFalse(self.manager.endpoints[0].healthy)
+        self.assertIs(self.manager.get_web3(), self.manager.endpoints[1].w3)
+
+    def test_balance_is_one_eth_call(self):
+        """Test that a single balance costs one HTTP request and a revert reads as no balance"""
+        # Not get_web3(): it starts the background health checks, which would add requests
+        w3 = self.manager.endpoints[0].w3
+
+        self.assertEqual(get_token_balance(w3, wallet(4), TOKEN), 4.0)
+        self.assertIsNone(get_token_balance(w3, FAILING_WALLET, TOKEN))
+
+        self.assertEqual(self.primary.http_requests, 2)
+        self.assertEqual(self.primary.calls, ['eth_call', 'eth_call'])
+        self.assertTrue(self.manager.endpoints[0].healthy)
+
+    def test_unreachable_rpc_raises_and_is_not_cached(self):
+        """Test that a balance nobody could fetch raises instead of reading as zero, and is retried next time"""
+        self.primary.fail = True
+        self.backup.fail = True
+
+        with self.assertRaises(RpcUnavailable):
+            get_cached_token_balance(self.manager.get_web3(), wallet(4), TOKEN)
+
+        self.backup.fail = False
+        self.manager.check_health()
+        self.assertEqual(get_cached_token_balance(self.manager.get_web3(), wallet(4), TOKEN), 4.0)
+
+    def test_batch_fails_over_and_failures_are_not_cached(self):
+        """Test that a batch retries on the next endpoint and failed wallets are fetched again"""
+        self.primary.fail = True
+        balances = get_cached_token_balances(self.manager.get_web3(), [wallet(1), wallet(2)], TOKEN)
+        self.assertEqual(balances, {wallet(1): 1.0, wallet(2): 2.0})
+
+        self.backup.fail = True
+        balances = get_cached_token_balances(self.manager.get_web3(), [wallet(3), wallet(5)], TOKEN)
+        self.assertEqual(balances, {wallet(3): None, wallet(5): None})
+        self.backup.fail = False
+        self.manager.check_health()
+        balances = get_cached_token_balances(self.manager.get_web3(), [wallet(3), wallet(5)], TOKEN)
+        self.assertEqual(balances, {wallet(3): 3.0, wallet(5): 5.0})
+
+
+class CachedTokenBalanceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        balance_cache.clear()
+        self.addCleanup(balance_cache.clear)
+
+    @patch('utils.web3_validator.get_token_balance', return_value=3.5)
+    def test_repeat_lookups_hit_the_cache(self, mock_balance):
+        """Test that a wallet's balance is fetched once and then served from cache"""
+        for _ in range(5):
+            balance = get_cached_token_balance(None, '0xAbC', '0xToken')
+
+        self.assertEqual(balance, 3.5)
+        self.assertEqual(mock_balance.call_count, 1)
+        # Address case does not create separate entries
+        get_cached_token_balance(None, '0xabc', '0xTOKEN')
+        self.assertEqual(mock_balance.call_count, 1)
+
+    @patch('utils.web3_validator.BALANCE_CACHE_NEGATIVE_TTL', 0)
+    @patch('utils.web3_validator.get_token_balance', return_value=None)
+    def test_failed_lookups_use_negative_ttl(self, mock_balance):
+        """Test that failed lookups are cached with the (shorter) negative TTL"""
+        get_cached_token_balance(None, '0xAbC', '0xToken')
+        get_cached_token_balance(None, '0xAbC', '0xToken')
+
+        self.assertEqual(mock_balance.call_count, 2)
+
+
+class TokenBalancesBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = JsonRpcStub().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.stub.methods['eth_call'] = self.eth_call
+        self.w3 = Web3(Web3.HTTPProvider(self.stub.url))
+        balance_cache.clear()
+        self.addCleanup(balance_cache.clear)
+
+    def eth_call(self, params):
+        call = params[0]
+        if call['to'] == MULTICALL:
+            (calls,) = decode(['(address,bool,bytes)[]'], bytes.fromhex(call['data'][10:]))
+            results = []
+            for _, _, calldata in calls:
+                try:
+                    results.append((True, balance_of(calldata.hex()).to_bytes(32, 'big')))
+                except ValueError:
+                    results.append((False, b''))
+            return '0x' + encode(['(bool,bytes)[]'], [results]).hex()
+        return hex(balance_of(call['data']))
+
+    def test_balances_are_fetched_in_one_batch_request(self):
+        """Test that many balanceOf calls go out as a single JSON-RPC batch"""
+        wallets = [wallet(i) for i in range(1, 51)]
+
+        results = get_token_balances(self.w3, wallets, TOKEN)
+
+        self.assertEqual(self.stub.http_requests, 1)
+        self.assertEqual([results[w]['balance'] for w in wallets], [float(i) for i in range(1, 51)])
+
+    def test_batches_are_chunked_by_max_size(self):
+        """Test that large wallet lists are split into chunks"""
+        wallets = [wallet(i) for i in range(1, 251)]
+
+        results = get_token_balances(self.w3, wallets, TOKEN, max_batch_size=100)
+
+        self.assertEqual(self.stub.http_requests, 3)
+        self.assertEqual(len(results), 250)
+
+    def test_errors_are_reported_per_wallet(self):
+        """Test that a failing or malformed wallet does not fail the others"""
+        results = get_token_balances(self.w3, [wallet(7), FAILING_WALLET, '0xnotanaddress'], TOKEN)
+
+        self.assertEqual(results[wallet(7)], {'balance': 7.0, 'error': None})
+        self.assertIsNone(results[FAILING_WALLET]['balance'])
+        self.assertIn('reverted', results[FAILING_WALLET]['error'])
+        self.assertIsNone(results['0xnotanaddress']['balance'])
+
+    def test_multicall_mode_uses_single_eth_call(self):
+        """Test that multicall mode aggregates balanceOf calls into one eth_call"""
+        wallets = [wallet(3), wallet(9), FAILING_WALLET]
+
+        results = get_token_balances(self.w3, wallets, TOKEN, mode='multicall')
+
+        self.assertEqual(self.stub.calls, ['eth_call'])
+        self.assertEqual(results[wallet(3)]['balance'], 3.0)
+        self.assertEqual(results[wallet(9)]['balance'], 9.0)
+        self.assertEqual(results[FAILING_WALLET], {'balance': None, 'error': 'balanceOf call reverted'})
+
+    def test_unreachable_provider_fails_every_wallet(self):
+        """Test that transport errors are reported for every wallet in the chunk"""
+        self.stub.fail = True
+
+        results = get_token_balances(self.w3, [wallet(1), wallet(2)], TOKEN)
+
+        self.assertTrue(all(result['balance'] is None and result['error'] for result in results.values()))
+
+    def test_cached_balances_only_fetch_misses(self):
+        """Test that cached wallets are served locally and only misses hit the RPC"""
+        get_cached_token_balances(self.w3, [wallet(1), wallet(2)], TOKEN)
+        self.stub.calls.clear()
+
+        balances = get_cached_token_balances(self.w3, [wallet(1), wallet(2), wallet(3), wallet(4)], TOKEN)
+
+        self.assertEqual(balances, {wallet(i): float(i) for i in range(1, 5)})
+        self.assertEqual(self.stub.calls, ['eth_call', 'eth_call'])
+        self.assertEqual(self.stub.http_requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
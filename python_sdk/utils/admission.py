@@ -0,0 +1,189 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config.settings import (
+    EVENT_MAX_SUBSCRIBERS, GAME_SERVER_HEADER, GAME_SERVER_RATE_BURST, GAME_SERVER_RATE_LIMIT, INFERENCE_MAX_IN_FLIGHT,
+    INFERENCE_QUEUE_BUDGET, RATE_LIMIT_MAX_KEYS, RPC_MAX_IN_FLIGHT, RPC_QUEUE_BUDGET, WALLET_RATE_BURST,
+    WALLET_RATE_LIMIT,
+)
+
+
+def game_server_key(headers, client_address):
+    """Rate limit key of the calling game server: its GAME_SERVER_HEADER, else its address."""
+    return headers.get(GAME_SERVER_HEADER) or client_address or 'unknown'
+
+
+def retry_after_header(seconds):
+    """Retry-After value (whole seconds, at least 1) for a wait of `seconds`."""
+    return str(max(1, math.ceil(seconds)))
+
+
+class Overloaded(Exception):
+    """A pipeline stage has no free slot within its queueing budget."""
+
+    def __init__(self, stage, retry_after):
+        super().__init__(f"Stage '{stage}' is overloaded, retry in {retry_after:.2f}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by client (wallet, game server): each key may spend
+    `burst` requests at once and `rate` per second sustained. Buckets are kept
+    for the `max_keys` most recently seen keys; an evicted key starts full
+    again. A `rate` of 0 disables the limit.
+    """
+
+    def __init__(self, rate, burst, max_keys=RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.limited = 0
+
+    def acquire(self, key, cost=1):
+        """
+        Take `cost` tokens from the bucket of `key`. Returns 0 if the request
+        is admitted, else the seconds until the bucket holds enough tokens.
+        """
+        if self.rate <= 0:
+            return 0
+        cost = min(cost, self.burst)
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                self.admitted += 1
+                return 0
+            self.limited += 1
+            return (cost - bucket[0]) / self.rate
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'keys': len(self._buckets),
+            'admitted': self.admitted,
+            'limited': self.limited,
+        }
+
+
+class StageLimiter:
+    """
+    Bounded number of requests in flight in one pipeline stage (RPC,
+    inference). A request finding every slot taken queues for at most
+    `queue_budget` seconds, and is turned away at once when the queue ahead
+    of it is expected to take longer than that (queue length times the
+    stage's moving-average service time, divided by the slots), so an
+    overloaded stage answers fast instead of timing out.
+    """
+
+    def __init__(self, name, max_in_flight, queue_budget):
+        self.name = name
+        self.max_in_flight = max(max_in_flight, 1)
+        self.queue_budget = queue_budget
+        self.in_flight = 0
+        self.waiting = 0
+        self.service_time = 0.0  # Moving average of the stage's duration, seconds
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _expected_wait(self):
+        """Time until a newly queued request gets a slot; the lock must be held."""
+        return (self.waiting + 1) * self.service_time / self.max_in_flight
+
+    def acquire(self, budget=None):
+        """Take a slot, waiting up to `budget` seconds (default queue_budget). Returns False if rejected."""
+        budget = self.queue_budget if budget is None else budget
+        with self._cond:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            if budget <= 0 or self._expected_wait() > budget:
+                self.rejected += 1
+                return False
+            deadline = time.monotonic() + budget
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self, elapsed=None):
+        with self._cond:
+            self.in_flight -= 1
+            if elapsed is not None:
+                self.service_time += 0.1 * (elapsed - self.service_time)
+            self._cond.notify()
+
+    def retry_after(self):
+        """Seconds a rejected client should wait before retrying."""
+        with self._cond:
+            return max(self._expected_wait(), self.queue_budget)
+
+    @contextmanager
+    def slot(self, budget=None):
+        """Run the enclosed block in a slot of this stage; raises Overloaded if none frees up in time."""
+        if not self.acquire(budget):
+            raise Overloaded(self.name, self.retry_after())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            'max_in_flight': self.max_in_flight,
+            'queue_budget': self.queue_budget,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'service_time_ms': self.service_time * 1000,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+        }
+
+
+# Shared limiters of this process (limits apply per worker)
+wallet_limiter = RateLimiter(WALLET_RATE_LIMIT, WALLET_RATE_BURST)
+game_server_limiter = RateLimiter(GAME_SERVER_RATE_LIMIT, GAME_SERVER_RATE_BURST)
+rpc_limiter = StageLimiter('rpc', RPC_MAX_IN_FLIGHT, RPC_QUEUE_BUDGET)
+inference_limiter = StageLimiter('inference', INFERENCE_MAX_IN_FLIGHT, INFERENCE_QUEUE_BUDGET)
+# Event subscribers never queue: a waiting subscriber would hold a thread just the same
+event_limiter = StageLimiter('events', EVENT_MAX_SUBSCRIBERS, 0)
+
+
+def admission_stats():
+    return {
+        'wallet_rate_limit': wallet_limiter.stats(),
+        'game_server_rate_limit': game_server_limiter.stats(),
+        'rpc': rpc_limiter.stats(),
+        'inference': inference_limiter.stats(),
+        'events': event_limiter.stats(),
+    }
@@ -0,0 +1,201 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import (
+    AI_API_KEY, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL, AI_GATEWAY_CONCURRENCY, AI_PROVIDER, AI_PROVIDER_URL,
+    AI_REQUEST_TIMEOUT, ENVIRONMENT,
+)
+from utils.cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class AIProviderError(Exception):
+    """The AI provider failed or returned an unusable response."""
+
+
+class AIProviderNotConfigured(Exception):
+    """AI_PROVIDER is 'http' but AI_PROVIDER_URL is not set, so the AI routes are unavailable."""
+
+
+class StubProvider:
+    """
+    Local stand-in for the AI API: returns a deterministic completion derived
+    from the prompt after an optional `latency` (seconds). For tests and
+    benchmarks only (AI_PROVIDER 'stub').
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, max_tokens):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        words = f"Stub reply {digest} to: {prompt}".split()
+        return ' '.join(words[:max_tokens])
+
+
+class HttpProvider:
+    """
+    The external AI API, called over a keep-alive session. Expects
+    POST {prompt, max_tokens} and a JSON body with 'text' (or
+    'generated_script', as returned by the script generation API).
+    """
+
+    def __init__(self, url=AI_PROVIDER_URL, api_key=AI_API_KEY, timeout=AI_REQUEST_TIMEOUT,
+                 pool_size=AI_GATEWAY_CONCURRENCY):
+        self.url = url
+        self.timeout = timeout
+        self.calls = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+
+    def complete(self, prompt, max_tokens):
+        self.calls += 1
+        try:
+            response = self.session.post(self.url, json={'prompt': prompt, 'max_tokens': max_tokens}, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise AIProviderError(f"AI provider request failed: {e}") from e
+        text = body.get('text', body.get('generated_script')) if isinstance(body, dict) else None
+        if not isinstance(text, str):
+            raise AIProviderError("AI provider response has no text")
+        return text
+
+
+class AIGateway:
+    """
+    Front for the AI provider shared by every Roblox server.
+
+    Completions are cached in a bounded LRU with TTL keyed by
+    (prompt, max_tokens). Identical prompts arriving while the first is still
+    at the provider wait for that call instead of starting their own
+    (TTLCache.get_or_load), and a batch resolves its distinct prompts
+    concurrently, so NPCs asking the same thing in the same tick cost one
+    provider call. Failures are not cached.
+    """
+
+    def __init__(self, provider, cache=None, concurrency=AI_GATEWAY_CONCURRENCY):
+        self.provider = provider
+        self.cache = cache if cache is not None else TTLCache(maxsize=AI_CACHE_MAX_ENTRIES, ttl=AI_CACHE_TTL)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-gateway')
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batched_duplicates = 0
+        self.errors = 0
+
+    def complete(self, prompt, max_tokens):
+        """Return the completion text; raises AIProviderError if the provider fails."""
+        with self._lock:
+            self.requests += 1
+        return self._resolve((prompt, max_tokens))
+
+    def _resolve(self, key):
+        prompt, max_tokens = key
+        try:
+            return self.cache.get_or_load(key, lambda: self.provider.complete(prompt, max_tokens))
+        except AIProviderError:
+            with self._lock:
+                self.errors += 1
+            raise
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.exception("AI provider call failed: %s", e)
+            raise AIProviderError(str(e)) from e
+
+    def complete_many(self, items):
+        """
+        Resolve (prompt, max_tokens) pairs. Returns one result per item, in
+        order: {'text': ...} or {'error': ...}.
+        """
+        keys = list(dict.fromkeys(items))
+        with self._lock:
+            self.requests += len(items)
+            self.batched_duplicates += len(items) - len(keys)
+
+        results = {}
+        if len(keys) == 1:
+            futures = None
+        else:
+            futures = {key: self._executor.submit(self._resolve, key) for key in keys}
+        for key in keys:
+            try:
+                text = futures[key].result() if futures else self._resolve(key)
+                results[key] = {'text': text}
+            except AIProviderError as e:
+                results[key] = {'error': str(e)}
+        return [results[item] for item in items]
+
+    def stats(self):
+        return {
+            'provider': type(self.provider).__name__,
+            'provider_calls': self.provider.calls,
+            'requests': self.requests,
+            'batched_duplicates': self.batched_duplicates,
+            'errors': self.errors,
+            'cache': self.cache.stats(),
+        }
+
+
+def check_ai_provider(name=AI_PROVIDER, url=AI_PROVIDER_URL, environment=ENVIRONMENT):
+    """
+    Check the AI provider settings at startup. A misconfigured provider
+    raises ValueError and stops the server. An unset AI_PROVIDER_URL is only
+    logged and returns False: the AI gateway is optional, so the rest of the
+    server starts and the /api/ai routes answer 503.
+    """
+    if name == 'http':
+        if not url:
+            logger.warning("AI_PROVIDER_URL is not set; the /api/ai routes answer 503 until it is")
+            return False
+    elif name == 'stub':
+        if environment == 'production':
+            raise ValueError("AI_PROVIDER 'stub' is for tests and benchmarks, not production")
+    else:
+        raise ValueError(f"Unknown AI_PROVIDER: {name}")
+    return True
+
+
+def build_provider(name=AI_PROVIDER, url=AI_PROVIDER_URL, environment=ENVIRONMENT):
+    if name == 'http' and not url:
+        raise AIProviderNotConfigured("AI provider is not configured (AI_PROVIDER_URL is not set)")
+    check_ai_provider(name, url, environment)
+    if name == 'stub':
+        return StubProvider()
+    return HttpProvider(url)
+
+
+_ai_gateway = None
+_ai_gateway_lock = threading.Lock()
+
+
+def get_ai_gateway():
+    """
+    Return the process-wide AIGateway for AI_PROVIDER, creating it on first use.
+
+    :raises AIProviderNotConfigured: If AI_PROVIDER_URL is not set
+    """
+    global _ai_gateway
+    if _ai_gateway is None:
+        with _ai_gateway_lock:
+            if _ai_gateway is None:
+                _ai_gateway = AIGateway(build_provider())
+    return _ai_gateway
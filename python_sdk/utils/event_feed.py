@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from config.settings import EVENT_FEED_PATH, EVENT_FEED_POLL_INTERVAL, EVENT_FEED_SIZE
+
+SCHEMA = [
+    # AUTOINCREMENT: IDs of pruned events are never handed out again
+    """CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        world TEXT NOT NULL,
+        type TEXT NOT NULL,
+        time REAL NOT NULL,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_events_world_id ON events (world, id)",
+    # Highest event ID dropped from each world's buffer
+    "CREATE TABLE IF NOT EXISTS event_worlds (world TEXT PRIMARY KEY, pruned_through INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS event_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+
+class EventFeed:
+    """
+    Feed of server events (spawns, wallet updates) per game world, kept in a
+    SQLite file (WAL mode) that every worker process shares.
+
+    Event IDs increase across the whole feed and each world keeps its last
+    `max_events` events. A Roblox server passes the last ID it has seen and
+    read() blocks until something newer is published or the timeout elapses
+    (long-poll), so one open request replaces per-player polling. A publish in
+    the same process wakes readers at once; events of other workers are
+    picked up within `poll_interval` seconds.
+
+    `epoch` identifies the feed file; a reader holding IDs from another epoch
+    (or IDs the feed never handed out) starts over from the beginning.
+    """
+
+    def __init__(self, path, max_events=EVENT_FEED_SIZE, poll_interval=EVENT_FEED_POLL_INTERVAL):
+        self.path = path
+        self.max_events = max_events
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._published = threading.Condition()
+        self.published = 0
+
+        conn = self._conn()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute('INSERT OR IGNORE INTO event_meta (key, value) VALUES (?, ?)', ('epoch', uuid.uuid4().hex[:12]))
+        self.epoch = conn.execute("SELECT value FROM event_meta WHERE key = 'epoch'").fetchone()[0]
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def publish(self, world, event_type, data):
+        return self.publish_many(world, event_type, [data])[0]
+
+    def publish_many(self, world, event_type, items):
+        """Append one event per item, drop the world's oldest beyond max_events and wake readers. Returns the events."""
+        if not items:
+            return []
+        now = time.time()
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                published = []
+                for data in items:
+                    cursor = conn.execute('INSERT INTO events (world, type, time, data) VALUES (?, ?, ?, ?)',
+                                          (world, event_type, now, json.dumps(data)))
+                    published.append({'id': cursor.lastrowid, 'type': event_type, 'time': now, 'data': data})
+                cutoff = conn.execute('SELECT id FROM events WHERE world = ? ORDER BY id DESC LIMIT 1 OFFSET ?',
+                                      (world, self.max_events)).fetchone()
+                if cutoff:
+                    conn.execute('DELETE FROM events WHERE world = ? AND id <= ?', (world, cutoff[0]))
+                    conn.execute('INSERT OR REPLACE INTO event_worlds (world, pruned_through) VALUES (?, ?)',
+                                 (world, cutoff[0]))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        with self._published:
+            self.published += len(published)
+            self._published.notify_all()
+        return published
+
+    def last_id(self, world):
+        row = self._conn().execute('SELECT MAX(id) FROM events WHERE world = ?', (world,)).fetchone()
+        return row[0] or 0
+
+    def read(self, world, after=0, limit=100, timeout=0):
+        """
+        Events of a world with an ID above `after`, oldest first, waiting up to
+        `timeout` seconds for the first one. Returns (events, missed), where
+        `missed` is True if events after `after` were already dropped from the
+        buffer (or `after` is from another feed) and the reader should resync.
+        Reading never creates anything for a world.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._published:
+                seen = self.published
+            events, missed = self._read(world, after, limit)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events, missed
+            with self._published:
+                if self.published == seen:
+                    self._published.wait(min(remaining, self.poll_interval))
+
+    def _read(self, world, after, limit):
+        conn = self._conn()
+        # One read transaction, so the pruning mark and the events agree
+        conn.execute('BEGIN')
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+            reset = after > (row[0] if row else 0)
+            if reset:
+                # IDs this feed never handed out: replay what it has
+                after = 0
+            row = conn.execute('SELECT pruned_through FROM event_worlds WHERE world = ?', (world,)).fetchone()
+            missed = reset or (row is not None and after < row[0])
+            rows = conn.execute('SELECT id, type, time, data FROM events WHERE world = ? AND id > ? ORDER BY id LIMIT ?',
+                                (world, after, limit)).fetchall()
+        finally:
+            conn.execute('COMMIT')
+        events = [{'id': event_id, 'type': event_type, 'time': at, 'data': json.loads(data)}
+                  for event_id, event_type, at, data in rows]
+        return events, missed
+
+    def stats(self):
+        rows = self._conn().execute('SELECT world, COUNT(*) FROM events GROUP BY world')
+        return {
+            'epoch': self.epoch,
+            'published': self.published,
+            'worlds': dict(rows),
+        }
+
+
+def format_sse(event):
+    """Render an event as a Server-Sent Events message."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+_event_feed = None
+_event_feed_lock = threading.Lock()
+
+
+def get_event_feed():
+    """Return the process-wide EventFeed for EVENT_FEED_PATH, creating it on first use."""
+    global _event_feed
+    if _event_feed is None:
+        with _event_feed_lock:
+            if _event_feed is None:
+                _event_feed = EventFeed(EVENT_FEED_PATH)
+    return _event_feed
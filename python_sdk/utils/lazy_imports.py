@@ -0,0 +1,93 @@
+import importlib
+import logging
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Dependencies that dominate worker start-up time and memory
+HEAVY_MODULES = ('tensorflow', 'torch', 'web3')
+
+_import_lock = threading.Lock()
+_import_times = {}  # module name -> seconds spent importing it
+
+
+def import_module(name):
+    """Import a module (once), recording how long the first import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _import_lock:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        if name not in _import_times:
+            _import_times[name] = time.perf_counter() - start
+            logger.info("Imported %s in %.0f ms", name, _import_times[name] * 1000)
+    return module
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    `tf = LazyModule('tensorflow')` costs nothing at import time; the first
+    `tf.argmax(...)` imports TensorFlow and every later access goes straight
+    to the real module.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = import_module(self._name)
+        return self._module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None or self._name in sys.modules
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a LazyModule proxy for the given module name."""
+    return LazyModule(name)
+
+
+def preload_modules(names):
+    """
+    Import heavy modules up front, for workers that prefer a slower start over
+    paying the import on their first request. Accepts a list or a comma-separated
+    string; modules that are not installed are logged and skipped.
+    """
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',')]
+    loaded = []
+    for name in filter(None, names):
+        try:
+            import_module(name)
+            loaded.append(name)
+        except ImportError as e:
+            logger.warning("Could not preload %s: %s", name, e)
+    return loaded
+
+
+def import_stats():
+    """Which heavy modules are loaded in this process, and what their import cost."""
+    names = sorted(set(HEAVY_MODULES) | set(_import_times))
+    return {
+        name: {
+            'loaded': name in sys.modules,
+            'import_ms': round(_import_times[name] * 1000, 1) if name in _import_times else None,
+        }
+        for name in names
+    }
@@ -1,41 +1,194 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
 
+from config.settings import (
+    LOG_BACKUP_COUNT, LOG_CONSOLE_LEVEL, LOG_DIR, LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_LIBRARY_LEVELS, LOG_MAX_BYTES,
+    LOG_QUEUE_SIZE, LOG_SAMPLING,
+)
 
-# Set up a log directory if it doesn't exist
-log_dir = 'logs'
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
-# Define the log file path
-log_file_path = os.path.join(log_dir, 'app.log')
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
 
-# Create a custom logger
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-# Create a file handler that logs debug messages and higher to a file
-file_handler = logging.FileHandler(log_file_path)
-file_handler.setLevel(logging.DEBUG)
+_setup_lock = threading.Lock()
+_queue_handler = None
+_listener = None
 
-# Create a console handler that logs warnings and higher to the console
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.WARNING)
 
-# Define the log format
-log_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+class JsonFormatter(logging.Formatter):
+    """Format each record as a single JSON object per line."""
 
-# Set the formatter for the handlers
-file_handler.setFormatter(log_format)
-console_handler.setFormatter(log_format)
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str)
 
-# Add the handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG records for the configured loggers.
+    Rates apply to a logger and its children; the most specific name wins.
+    """
+
+    def __init__(self, rates=None, rng=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.random = (rng or random.Random()).random
+        self.dropped = 0
+
+    def rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rates:
+            return True
+        if self.random() < self.rate_for(record.name):
+            return True
+        self.dropped += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of raising or blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sampling(spec):
+    """Parse "logger=rate,logger=rate" into a dict of sampling rates."""
+    rates = {}
+    for item in (spec or '').split(','):
+        name, _, rate = item.strip().partition('=')
+        if name and rate:
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+def parse_levels(spec):
+    """Parse "logger=LEVEL,logger=LEVEL" into a dict of level names."""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level=LOG_LEVEL, log_dir=LOG_DIR, log_file=LOG_FILE, log_format=LOG_FORMAT,
+                  console_level=LOG_CONSOLE_LEVEL, sampling=LOG_SAMPLING, max_bytes=LOG_MAX_BYTES,
+                  backup_count=LOG_BACKUP_COUNT, queue_size=LOG_QUEUE_SIZE, library_levels=LOG_LIBRARY_LEVELS):
+    """
+    Route all logging through a queue so request threads never touch the disk.
+
+    The root logger gets a single QueueHandler; a background QueueListener
+    formats records and writes them to a rotating file and the console.
+    Only entry points (server start-up, gunicorn workers, CLIs) call this:
+    importing the app configures nothing. Safe to call more than once: only
+    the first call configures anything.
+    """
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _queue_handler
+
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+            log_file = os.path.join(log_dir, log_file)
+        formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        rates = parse_sampling(sampling) if isinstance(sampling, str) else sampling
+        _queue_handler.addFilter(SamplingFilter(rates))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        levels = parse_levels(library_levels) if isinstance(library_levels, str) else library_levels
+        for name, library_level in levels.items():
+            logging.getLogger(name).setLevel(library_level)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records, stop the listener and detach the queue handler."""
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+        _listener = None
+
+
+def logging_stats():
+    """Records dropped by sampling and by a full queue since setup."""
+    if _queue_handler is None:
+        return {'configured': False}
+    sampled = sum(f.dropped for f in _queue_handler.filters if isinstance(f, SamplingFilter))
+    return {
+        'configured': True,
+        'queue_depth': _queue_handler.queue.qsize(),
+        'dropped_full': _queue_handler.dropped,
+        'dropped_sampled': sampled,
+    }
 
 
-def get_logger():
+def get_logger(name=None):
     """
-    Function to retrieve the logger instance.
+    Function to retrieve a logger instance, configuring the pipeline on first use.
     """
-    return logger
+    setup_logging()
+    return logging.getLogger(name) if name else logger
@@ -0,0 +1,280 @@
+import bisect
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config.settings import METRICS_DIR, METRICS_ENABLED, METRICS_FLUSH_INTERVAL
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = 'bloxverse_'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DESCRIPTIONS = {
+    'requests_total': ('counter', 'HTTP requests by endpoint and status code.'),
+    'request_seconds': ('histogram', 'HTTP request latency by endpoint.'),
+    'stage_seconds': ('histogram', 'Latency of each request pipeline stage by endpoint.'),
+    'rpc_seconds': ('histogram', 'Latency of blockchain RPC calls.'),
+    'rpc_errors_total': ('counter', 'Failed blockchain RPC calls by call and kind (timeout or error).'),
+    'balance_lookups_total': ('counter', 'Spawn gate balance lookups by source (local index or RPC).'),
+    'shed_total': ('counter', 'Requests turned away by admission control by endpoint and reason.'),
+    'degraded_total': ('counter', 'Behaviors served by the mood rules instead of the model under overload.'),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Route of the request being served; stage timings are labelled with it
+current_endpoint = contextvars.ContextVar('current_endpoint', default='none')
+
+
+def bucket_quantile(q, buckets, counts):
+    """
+    Estimate the q-quantile from per-bucket counts (the last count is +Inf),
+    interpolating linearly inside the bucket like Prometheus' histogram_quantile.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, n in enumerate(counts):
+        if n and cumulative + n >= rank:
+            if i == len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i else 0.0
+            return lower + (buckets[i] - lower) * (rank - cumulative) / n
+        cumulative += n
+    return buckets[-1]
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_bound(bound):
+    return f'{bound:g}'
+
+
+class Metrics:
+    """
+    Process-local counters and latency histograms with fixed buckets.
+
+    Recording is a dict update under one lock (a few microseconds). With
+    several worker processes (gunicorn), give every worker the same
+    `directory`: each one writes its totals there every `flush_interval`
+    seconds, and collect() sums the files of all workers, so /metrics reports
+    the whole server whichever worker answers it. Files of exited workers are
+    kept so counters never go backwards; empty the directory when deploying.
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL, buckets=LATENCY_BUCKETS,
+                 enabled=METRICS_ENABLED):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Start from zero in this process; the lock must be held (or not yet shared)."""
+        self._pid = os.getpid()
+        self._started_at = time.time_ns()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts + [+Inf], sum]
+        self._flusher = None
+
+    def _prepare(self):
+        """Per-record bookkeeping; the lock must be held."""
+        if self._pid != os.getpid():
+            # A forked worker must not report the parent's totals as its own
+            self._reset()
+        if self.directory and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._prepare()
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._prepare()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += seconds
+
+    @contextmanager
+    def stage(self, name, endpoint=None):
+        """Time the enclosed block as pipeline stage `name` of the current endpoint."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start,
+                         endpoint=endpoint or current_endpoint.get(), stage=name)
+
+    def snapshot(self):
+        """This process's totals in a JSON-serializable form."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            return {
+                'pid': self._pid,
+                'buckets': list(self.buckets),
+                'counters': [[name, [list(label) for label in labels], value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, [list(label) for label in labels], list(counts), total]
+                               for (name, labels), (counts, total) in self._histograms.items()],
+            }
+
+    def _snapshot_path(self):
+        return os.path.join(self.directory, f'metrics-{self._pid}-{self._started_at}.json')
+
+    def write_snapshot(self):
+        """Write this process's totals to the shared directory (atomically replaced)."""
+        if not self.directory:
+            return
+        snapshot = self.snapshot()
+        path = self._snapshot_path()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                logger.warning("Could not write metrics snapshot: %s", e)
+
+    def collect(self):
+        """
+        Totals of every worker sharing the directory (or of this process alone).
+        Returns (counters, histograms) keyed by (name, labels).
+        """
+        if self.directory:
+            self.write_snapshot()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.warning("Skipping unreadable metrics snapshot %s: %s", path, e)
+        else:
+            snapshots = [self.snapshot()]
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            if tuple(snapshot['buckets']) != self.buckets:
+                continue
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        return counters, histograms
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        counters, histograms = self.collect()
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                kind, text = DESCRIPTIONS.get(name, ('untyped', name))
+                lines.append(f'# HELP {PREFIX}{name} {text}')
+                lines.append(f'# TYPE {PREFIX}{name} {kind}')
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f'{PREFIX}{name}{_format_labels(labels)} {value}')
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            describe(name)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else _format_bound(bound)
+                lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{PREFIX}{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Counters and per-series count, mean and p50/p95/p99 latency in milliseconds."""
+        counters, histograms = self.collect()
+        series = []
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            count = sum(counts)
+            entry = {'name': name, 'labels': dict(labels), 'count': count,
+                     'mean_ms': total / count * 1000 if count else None}
+            for q in QUANTILES:
+                value = bucket_quantile(q, self.buckets, counts)
+                entry[f'p{int(q * 100)}_ms'] = value * 1000 if value is not None else None
+            series.append(entry)
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items())],
+            'histograms': series,
+        }
+
+
+def instrument_flask(app, registry=None):
+    """Record latency and status of every request to `app` per route."""
+    from flask import g, request
+    if registry is None:
+        registry = metrics
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        current_endpoint.set(request.url_rule.rule if request.url_rule is not None else 'unmatched')
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            endpoint = current_endpoint.get()
+            registry.observe('request_seconds', time.perf_counter() - start, endpoint=endpoint)
+            registry.inc('requests_total', endpoint=endpoint, status=str(response.status_code))
+        return response
+
+    return app
+
+
+# Shared registry of this process
+metrics = Metrics()
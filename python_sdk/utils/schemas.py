@@ -0,0 +1,226 @@
+from typing import Annotated, Any, ClassVar, Dict, List, Literal, Optional, Union
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, StrictFloat, StrictInt, StrictStr, TypeAdapter, ValidationError
+
+from config.settings import AI_MAX_TOKENS
+from utils.spatial_index import DEFAULT_WORLD
+from utils.web3_validator import is_valid_address
+
+
+Number = Union[StrictInt, StrictFloat]
+# Game world (one per Roblox server) that spawns and events belong to
+World = Annotated[StrictStr, Field(min_length=1, max_length=64)]
+
+
+def _check_wallet_address(value):
+    if not is_valid_address(value):
+        raise ValueError("Invalid wallet address")
+    return value
+
+
+def _error_message(errors, messages, missing_messages):
+    """
+    Translate the first pydantic error into the human-readable message the API
+    has always returned. Missing fields are reported before type errors.
+    """
+    error = sorted(errors, key=lambda e: e['type'] != 'missing')[0]
+    if error['type'] == 'json_invalid':
+        return "Request must be in JSON format."
+    loc = [str(part) for part in error['loc']]
+    path = '.'.join(loc)
+    if error['type'] == 'missing':
+        return missing_messages.get(path, f"Missing required field: {loc[-1]}")
+    if not loc:
+        return messages.get('', "Request body must be a JSON object.")
+    # Nested errors (list items, union members) use the message of the closest field
+    for depth in range(len(loc), 0, -1):
+        prefix = '.'.join(loc[:depth])
+        if prefix in messages:
+            return messages[prefix]
+    return f"Invalid value for '{path}': {error['msg']}"
+
+
+class Schema(BaseModel):
+    """
+    Base class for request payloads.
+
+    Validation runs in pydantic-core in a single pass. parse_json() works on the
+    raw request body, so the JSON is parsed exactly once and never re-read
+    through request.get_json().
+    """
+
+    model_config = ConfigDict(extra='ignore')
+
+    # Dotted field path -> message returned for any error on that field
+    error_messages: ClassVar[Dict[str, str]] = {}
+    # Dotted field path -> message returned when that field is missing
+    missing_messages: ClassVar[Dict[str, str]] = {}
+
+    @classmethod
+    def parse(cls, data):
+        """Validate already-decoded data. Returns (instance, None) or (None, error message)."""
+        try:
+            return cls.model_validate(data), None
+        except ValidationError as e:
+            return None, _error_message(e.errors(), cls.error_messages, cls.missing_messages)
+
+    @classmethod
+    def parse_json(cls, raw):
+        """Parse and validate a raw JSON body. Returns (instance, None) or (None, error message)."""
+        try:
+            return cls.model_validate_json(raw or b'null'), None
+        except ValidationError as e:
+            return None, _error_message(e.errors(), cls.error_messages, cls.missing_messages)
+
+
+class CoinFeatures(Schema):
+    """Coin features sent from Roblox: name, appearance and behavior."""
+
+    model_config = ConfigDict(extra='allow')
+
+    name: Annotated[StrictStr, Field(pattern=r'\S')]
+    appearance: Dict[str, Any]
+    behavior: Dict[str, Any]
+
+    error_messages = {
+        '': "Coin features must be a dictionary.",
+        'name': "'name' must be a non-empty string.",
+        'appearance': "'appearance' must be a dictionary.",
+        'behavior': "'behavior' must be a dictionary.",
+    }
+
+
+class CoinFeaturesRequest(Schema):
+    """Request body carrying Roblox coin features."""
+
+    coin_features: CoinFeatures
+
+    error_messages = {
+        'coin_features': "Coin features must be a dictionary.",
+        'coin_features.name': "'name' must be a non-empty string.",
+        'coin_features.appearance': "'appearance' must be a dictionary.",
+        'coin_features.behavior': "'behavior' must be a dictionary.",
+    }
+    missing_messages = {
+        'coin_features': "Missing 'coin_features' in the request body.",
+    }
+
+
+class AgentAttributes(Schema):
+    """
+    Partial attribute update applied to a CoinCharacterAgent. An attribute
+    left out keeps its value; an explicit null is rejected, since the agent
+    has no value to fall back to.
+    """
+
+    model_config = ConfigDict(extra='allow')
+
+    mood: Literal['happy', 'sad', 'angry', 'excited'] = None
+    strength: Number = None
+    speed: Number = None
+    intelligence: Number = None
+
+
+class AgentFeatures(Schema):
+    """Coin features consumed by get_coin_behavior."""
+
+    model_config = ConfigDict(extra='allow')
+
+    coin_name: StrictStr = 'DefaultCoin'
+    attributes: AgentAttributes = Field(default_factory=AgentAttributes)
+
+
+class SpawnRequest(Schema):
+    """Body of POST /spawn on both the Flask and ASGI servers."""
+
+    coin_features: AgentFeatures
+
+    missing_messages = {
+        'coin_features': "Missing 'coin_features' in the request body.",
+    }
+
+
+class SpawnCoinRequest(Schema):
+    """Body of POST /spawn_coin, and each item of POST /spawn_coin/batch."""
+
+    wallet_address: Annotated[StrictStr, AfterValidator(_check_wallet_address)]
+    behavior: Annotated[List[Annotated[List[Number], Field(min_length=1)]], Field(min_length=1)]
+    speed: Optional[Annotated[Number, Field(ge=0, le=10)]] = None
+    size: Optional[Literal['small', 'medium', 'large']] = None
+    strength: Optional[Annotated[Number, Field(ge=0, le=100)]] = None
+    world: World = DEFAULT_WORLD
+
+    error_messages = {
+        '': "Spawn spec must be an object",
+        'wallet_address': "Invalid wallet address",
+        'behavior': "Invalid behavior, must be a nested list of scores",
+        'speed': "Invalid speed value, must be between 0 and 10",
+        'size': "Invalid size, must be 'small', 'medium', or 'large'",
+        'strength': "Invalid strength value, must be between 0 and 100",
+        'world': "Invalid world, must be a name of 1 to 64 characters",
+    }
+    missing_messages = {
+        'wallet_address': "Invalid wallet address",
+        'behavior': "Invalid behavior, must be a nested list of scores",
+    }
+
+
+class WalletUpdate(Schema):
+    """Body of POST /api/update_wallet, and each item of POST /api/update_wallets."""
+
+    player_id: Union[Annotated[StrictStr, Field(min_length=1)], StrictInt]
+    wallet_address: Annotated[StrictStr, AfterValidator(_check_wallet_address)]
+    balance: Optional[Annotated[Number, Field(ge=0)]] = None
+    world: World = DEFAULT_WORLD
+
+    error_messages = {
+        '': "Wallet update must be an object",
+        'player_id': "Invalid player ID, must be a non-empty string or an integer",
+        'wallet_address': "Invalid wallet address",
+        'balance': "Invalid balance, must be a non-negative number",
+        'world': "Invalid world, must be a name of 1 to 64 characters",
+    }
+    missing_messages = {
+        'player_id': "Missing required field: player_id",
+        'wallet_address': "Invalid wallet address",
+    }
+
+
+class AICompletionRequest(Schema):
+    """Body of POST /api/ai/complete, and each item of POST /api/ai/complete_batch."""
+
+    prompt: Annotated[StrictStr, Field(pattern=r'\S', max_length=8000)]
+    max_tokens: Annotated[StrictInt, Field(ge=1, le=AI_MAX_TOKENS)] = 100
+
+    error_messages = {
+        '': "Completion request must be an object",
+        'prompt': "Invalid prompt, must be a non-empty string of at most 8000 characters",
+        'max_tokens': f"Invalid max_tokens, must be an integer between 1 and {AI_MAX_TOKENS}",
+    }
+    missing_messages = {
+        'prompt': "Invalid prompt, must be a non-empty string of at most 8000 characters",
+    }
+
+
+# Authentication tokens: exactly 32 alphanumeric characters
+AuthToken = TypeAdapter(Annotated[StrictStr, Field(pattern=r'^[A-Za-z0-9]{32}$')])
+
+
+def is_valid_auth_token(auth_token):
+    try:
+        AuthToken.validate_python(auth_token)
+        return True
+    except ValidationError:
+        return False
+
+
+# World names taken from a URL path or query string
+WorldName = TypeAdapter(World)
+
+
+def is_valid_world(world):
+    try:
+        WorldName.validate_python(world)
+        return True
+    except ValidationError:
+        return False
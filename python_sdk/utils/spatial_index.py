@@ -0,0 +1,373 @@
+import heapq
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from config.settings import SPATIAL_GRID_CELL, SPATIAL_INDEX_REFRESH
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORLD = 'default'
+# Placements of up to this many coins throw darts against the live index
+# instead of running the Poisson-disk sampler over the whole region
+DART_PLACEMENT_MAX = 16
+
+
+class SpatialGrid:
+    """
+    Uniform-grid index of the live coin positions of one game world.
+
+    Coins are bucketed by their (x, z) ground position into square cells of
+    `cell_size`, so radius and nearest-neighbour queries only visit the cells
+    around the query point instead of every coin. The height (y) is stored but
+    not indexed. All methods are thread-safe; hold `lock` to make a placement
+    and the following inserts atomic.
+    """
+
+    def __init__(self, cell_size=SPATIAL_GRID_CELL):
+        self.cell_size = float(cell_size)
+        self.lock = threading.RLock()
+        self._cells = {}
+        self._positions = {}
+        # Bounding box of the cells ever occupied (never shrinks; only limits nearest())
+        self._extent = None
+
+    def _cell(self, x, z):
+        return int(math.floor(x / self.cell_size)), int(math.floor(z / self.cell_size))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, character_id):
+        return character_id in self._positions
+
+    def insert(self, character_id, location):
+        """Add (or move) a coin; `location` is a {'x', 'y', 'z'} dict."""
+        with self.lock:
+            self.remove(character_id)
+            position = (location['x'], location['y'], location['z'])
+            self._positions[character_id] = position
+            cx, cz = self._cell(position[0], position[2])
+            self._cells.setdefault((cx, cz), {})[character_id] = position
+            if self._extent is None:
+                self._extent = [cx, cx, cz, cz]
+            else:
+                extent = self._extent
+                extent[0], extent[1] = min(extent[0], cx), max(extent[1], cx)
+                extent[2], extent[3] = min(extent[2], cz), max(extent[3], cz)
+
+    def insert_many(self, character_ids, locations):
+        with self.lock:
+            for character_id, location in zip(character_ids, locations):
+                self.insert(character_id, location)
+
+    def remove(self, character_id):
+        """Drop a coin from the index. Returns False if it was not there."""
+        with self.lock:
+            position = self._positions.pop(character_id, None)
+            if position is None:
+                return False
+            key = self._cell(position[0], position[2])
+            cell = self._cells[key]
+            del cell[character_id]
+            if not cell:
+                del self._cells[key]
+            return True
+
+    def points_in_box(self, min_x, max_x, min_z, max_z):
+        """(x, z) of every coin inside the rectangle, as an (m, 2) array."""
+        with self.lock:
+            (cx0, cz0), (cx1, cz1) = self._cell(min_x, min_z), self._cell(max_x, max_z)
+            points = []
+            if (cx1 - cx0 + 1) * (cz1 - cz0 + 1) > len(self._cells):
+                candidates = self._positions.values()
+            else:
+                candidates = [
+                    position
+                    for cx in range(cx0, cx1 + 1) for cz in range(cz0, cz1 + 1)
+                    for position in self._cells.get((cx, cz), {}).values()
+                ]
+            for x, _, z in candidates:
+                if min_x <= x <= max_x and min_z <= z <= max_z:
+                    points.append((x, z))
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+    def is_clear(self, x, z, radius):
+        """True if no coin lies within `radius` of (x, z)."""
+        with self.lock:
+            (cx0, cz0), (cx1, cz1) = self._cell(x - radius, z - radius), self._cell(x + radius, z + radius)
+            for cx in range(cx0, cx1 + 1):
+                for cz in range(cz0, cz1 + 1):
+                    for px, _, pz in self._cells.get((cx, cz), {}).values():
+                        if (px - x) ** 2 + (pz - z) ** 2 < radius * radius:
+                            return False
+        return True
+
+    def place(self, n, bounds, min_separation, rng=None, attempts=30):
+        """
+        Up to `n` (x, z) ground positions inside bounds = (min_x, max_x, min_z,
+        max_z), at least `min_separation` from every live coin and from each
+        other. Hold `lock` until the placed coins are inserted, or a concurrent
+        placement may pick the same spot.
+        """
+        rng = rng or np.random.default_rng()
+        min_x, max_x, min_z, max_z = bounds
+        with self.lock:
+            if n > DART_PLACEMENT_MAX:
+                existing = self.points_in_box(min_x - min_separation, max_x + min_separation,
+                                              min_z - min_separation, max_z + min_separation)
+                return poisson_disk_sample(n, bounds, min_separation, existing, rng, attempts)
+            points = []
+            for _ in range(n):
+                darts = zip(rng.uniform(min_x, max_x, attempts).tolist(), rng.uniform(min_z, max_z, attempts).tolist())
+                for x, z in darts:
+                    if (self.is_clear(x, z, min_separation)
+                            and all((x - px) ** 2 + (z - pz) ** 2 >= min_separation ** 2 for px, pz in points)):
+                        points.append((x, z))
+                        break
+                else:
+                    logger.warning("No free spot %.2f away from other coins after %d tries", min_separation, attempts)
+                    break
+            return points
+
+    @staticmethod
+    def _result(character_id, position, distance):
+        x, y, z = position
+        return {'character_id': character_id, 'spawn_location': {'x': x, 'y': y, 'z': z}, 'distance': distance}
+
+    def within(self, x, z, radius, limit=None):
+        """Coins within `radius` of (x, z) on the ground plane, nearest first."""
+        with self.lock:
+            (cx0, cz0), (cx1, cz1) = self._cell(x - radius, z - radius), self._cell(x + radius, z + radius)
+            found = []
+            for cx in range(cx0, cx1 + 1):
+                for cz in range(cz0, cz1 + 1):
+                    for character_id, position in self._cells.get((cx, cz), {}).items():
+                        distance = math.hypot(position[0] - x, position[2] - z)
+                        if distance <= radius:
+                            found.append((distance, character_id, position))
+        found.sort(key=lambda item: (item[0], item[1]))
+        if limit is not None:
+            found = found[:limit]
+        return [self._result(character_id, position, distance) for distance, character_id, position in found]
+
+    def nearest(self, x, z, k=1, max_radius=None):
+        """
+        The `k` coins closest to (x, z), nearest first. Cells are visited in
+        rings around the query cell until no unvisited cell can hold anything
+        closer than the k-th coin found so far.
+        """
+        with self.lock:
+            if not self._cells:
+                return []
+            qx, qz = self._cell(x, z)
+            # Ring beyond which no occupied cell exists
+            min_cx, max_cx, min_cz, max_cz = self._extent
+            last_ring = max(qx - min_cx, max_cx - qx, qz - min_cz, max_cz - qz)
+            if max_radius is not None:
+                last_ring = min(last_ring, int(math.ceil(max_radius / self.cell_size)) + 1)
+            best = []  # max-heap of (-distance, -character_id, position)
+            for ring in range(last_ring + 1):
+                for cx in range(qx - ring, qx + ring + 1):
+                    step = 1 if abs(cx - qx) == ring else 2 * ring
+                    for cz in range(qz - ring, qz + ring + 1, step):
+                        for character_id, position in self._cells.get((cx, cz), {}).items():
+                            distance = math.hypot(position[0] - x, position[2] - z)
+                            if max_radius is not None and distance > max_radius:
+                                continue
+                            item = (-distance, -character_id, position)
+                            if len(best) < k:
+                                heapq.heappush(best, item)
+                            elif item > best[0]:
+                                heapq.heapreplace(best, item)
+                # Every unvisited cell is at least `ring` whole cells away
+                if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                    break
+        best.sort(reverse=True)
+        return [self._result(-neg_id, position, -neg_distance) for neg_distance, neg_id, position in best]
+
+
+def poisson_disk_sample(n, bounds, min_separation, existing=None, rng=None, attempts=30, batch_size=256):
+    """
+    Up to `n` blue-noise (x, z) points inside bounds = (min_x, max_x, min_z,
+    max_z), at least `min_separation` apart from each other and from the
+    `existing` (m, 2) points.
+
+    A parallel variant of Bridson's algorithm on a background grid of cell size
+    r / sqrt(2), which holds at most one point per cell. Each round grows up to
+    `batch_size` active points at once: every one tries `attempts` candidates
+    in the annulus [r, 2r] around it, all candidates are checked against the
+    21 surrounding cells that can hold a point closer than r with NumPy
+    gathers (inner 3 x 3 first, so most rejections are cheap), and clashes
+    between candidates of the same round are settled by cell (first claim
+    wins). Active
+    points without a single free candidate retire; when none are left, new
+    seeds are thrown uniformly into the remaining free space. Fewer than `n`
+    points are returned only if the region is saturated.
+    """
+    rng = rng or np.random.default_rng()
+    min_x, max_x, min_z, max_z = bounds
+    r = float(min_separation)
+    r2 = r * r
+    cell = r / math.sqrt(2)
+    # Candidates may fall up to 2r outside the bounds; pad so their neighbourhoods stay in the grid
+    pad = 2 + int(math.ceil(2 * r / cell))
+    width = int(math.ceil((max_x - min_x) / cell)) + 1 + 2 * pad
+    height = int(math.ceil((max_z - min_z) / cell)) + 1 + 2 * pad
+    # Flat grids indexed by i * height + j; empty cells hold a far-away
+    # sentinel so the distance test needs no masking
+    grid_x = np.full(width * height, 1e9)
+    grid_z = np.full(width * height, 1e9)
+    # Index of the candidate claiming each cell during a round (-1: none)
+    claims = np.full(width * height, -1, dtype=np.intp)
+    # Cells within two steps, minus the corners (nothing there can be closer than r)
+    di, dj = [offsets.ravel() for offsets in np.mgrid[-2:3, -2:3]]
+    reachable = (abs(di) < 2) | (abs(dj) < 2)
+    core = (di * height + dj)[(abs(di) <= 1) & (abs(dj) <= 1)]
+    rim = (di * height + dj)[reachable & ((abs(di) == 2) | (abs(dj) == 2))]
+    neighbours = np.concatenate([core, rim])
+    # Existing coins closer together than r can share a cell; the extras are checked separately
+    overflow = np.empty((0, 2))
+
+    def cells(xs, zs):
+        i = ((xs - min_x) // cell).astype(np.intp) + pad
+        return i * height + ((zs - min_z) // cell).astype(np.intp) + pad
+
+    def clear(xs, zs, c):
+        """Indices of the candidates at least r from every placed point."""
+        keep = np.flatnonzero(grid_x[c] == 1e9)
+        for offsets in (core, rim):
+            around = c[keep, None] + offsets
+            dx = grid_x.take(around) - xs[keep, None]
+            dz = grid_z.take(around) - zs[keep, None]
+            keep = keep[(dx * dx + dz * dz >= r2).all(axis=1)]
+        if len(overflow) and len(keep):
+            dx = overflow[:, 0] - xs[keep, None]
+            dz = overflow[:, 1] - zs[keep, None]
+            keep = keep[(dx * dx + dz * dz >= r2).all(axis=1)]
+        return keep
+
+    if existing is not None:
+        existing = np.asarray(existing, dtype=np.float64).reshape(-1, 2)
+        margin = 2 * r
+        existing = existing[(existing[:, 0] >= min_x - margin) & (existing[:, 0] <= max_x + margin)
+                            & (existing[:, 1] >= min_z - margin) & (existing[:, 1] <= max_z + margin)]
+        c = cells(existing[:, 0], existing[:, 1])
+        first = np.zeros(len(c), dtype=bool)
+        first[np.unique(c, return_index=True)[1]] = True
+        grid_x[c[first]], grid_z[c[first]] = existing[first, 0], existing[first, 1]
+        overflow = existing[~first]
+
+    placed_x, placed_z = [], []
+    placed = 0
+    active = np.empty((0, 2))
+    seed_failures = 0
+    while placed < n:
+        if len(active):
+            grow = rng.permutation(len(active))[:batch_size]
+            radius = np.sqrt(rng.uniform(r2, 4 * r2, (len(grow), attempts)))
+            angle = rng.uniform(0, 2 * math.pi, (len(grow), attempts))
+            xs = (active[grow, 0][:, None] + radius * np.cos(angle)).ravel()
+            zs = (active[grow, 1][:, None] + radius * np.sin(angle)).ravel()
+        else:
+            # New seeds: uniform darts into whatever free space is left
+            grow = None
+            xs, zs = rng.uniform(min_x, max_x, attempts), rng.uniform(min_z, max_z, attempts)
+        inside = np.flatnonzero((xs >= min_x) & (xs <= max_x) & (zs >= min_z) & (zs <= max_z))
+        c = cells(xs[inside], zs[inside])
+        free = clear(xs[inside], zs[inside], c)
+        free, c = inside[free], c[free]
+
+        if grow is not None:
+            retired = np.ones(len(grow), dtype=bool)
+            retired[free // attempts] = False
+            active = np.delete(active, grow[retired], axis=0)
+        elif not len(free):
+            seed_failures += 1
+            if seed_failures >= 3:
+                break
+            continue
+        else:
+            free, c = free[:1], c[:1]
+
+        # Settle clashes between this round's candidates: one per cell, then
+        # drop any candidate within r of an earlier one
+        order = np.arange(len(free))
+        claims[c[::-1]] = order[::-1]
+        first = claims[c] == order
+        free, c, order = free[first], c[first], order[first]
+        rivals = claims.take(c[:, None] + neighbours)
+        earlier = (rivals >= 0) & (rivals < order[:, None])
+        rival_index = free[np.searchsorted(order, np.where(earlier, rivals, order[:, None]))]
+        dx = xs[rival_index] - xs[free][:, None]
+        dz = zs[rival_index] - zs[free][:, None]
+        keep = ~(earlier & (dx * dx + dz * dz < r2)).any(axis=1)
+        claims[c] = -1
+
+        accepted, c = free[keep][:n - placed], c[keep][:n - placed]
+        ax, az = xs[accepted], zs[accepted]
+        grid_x[c], grid_z[c] = ax, az
+        placed_x.append(ax)
+        placed_z.append(az)
+        placed += len(accepted)
+        active = np.concatenate([active, np.column_stack([ax, az])])
+
+    if placed < n:
+        logger.warning("Region saturated: placed %d of %d coins %.2f apart", placed, n, r)
+    if not placed:
+        return []
+    return list(zip(np.concatenate(placed_x).tolist(), np.concatenate(placed_z).tolist()))
+
+
+# Spawns are stamped when they are queued but other workers only see them once
+# committed, so each catch-up re-reads this many seconds before the previous one
+SYNC_OVERLAP = 5.0
+
+_worlds = {}
+_synced_at = {}
+_worlds_lock = threading.Lock()
+
+
+def _apply(index, changes):
+    with index.lock:
+        for character_id, location, live in changes:
+            if live:
+                index.insert(character_id, location)
+            else:
+                index.remove(character_id)
+
+
+def get_world_index(world, store=None, refresh_interval=SPATIAL_INDEX_REFRESH):
+    """
+    Return the SpatialGrid of live coins for a game world, creating it on first use.
+
+    Each worker process keeps its own grids. Given the SpawnStore, a new grid
+    is built from the live coins the store holds for the world, and at most
+    every `refresh_interval` seconds it catches up with the coins the other
+    workers spawned or despawned since, so every worker sees every coin after
+    at most that delay. Without a store the grid only knows this process's coins.
+    """
+    index = _worlds.get(world)
+    if index is None:
+        with _worlds_lock:
+            index = _worlds.get(world)
+            if index is None:
+                index = SpatialGrid()
+                if store is not None:
+                    _synced_at[world] = time.time()
+                    _apply(index, store.world_changes(world))
+                _worlds[world] = index
+                return index
+    if store is None or time.time() - _synced_at.get(world, 0) < refresh_interval:
+        return index
+    with _worlds_lock:
+        since, now = _synced_at.get(world), time.time()
+        if since is not None and now - since < refresh_interval:
+            return index
+        _synced_at[world] = now
+    _apply(index, store.world_changes(world, None if since is None else since - SYNC_OVERLAP))
+    return index
@@ -0,0 +1,358 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from config.settings import DATABASE_URL, SPAWN_STORE_BATCH_SIZE, SPAWN_STORE_FLUSH_MS, SPAWN_STORE_ID_BLOCK
+from utils.spatial_index import DEFAULT_WORLD
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS spawns (
+        character_id INTEGER PRIMARY KEY,
+        wallet TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        z REAL NOT NULL,
+        attributes TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_spawns_wallet_created ON spawns (wallet, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_spawns_created ON spawns (created_at)",
+    # Next free character ID; each process reserves IDs from it in blocks
+    "CREATE TABLE IF NOT EXISTS id_sequence (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)",
+]
+# Columns added after the first release: every store, new or old, gets them when it is opened
+WORLD_COLUMNS = [
+    ('world', f"TEXT NOT NULL DEFAULT '{DEFAULT_WORLD}'"),
+    ('despawned_at', 'REAL'),  # NULL while the coin is live
+]
+WORLD_SCHEMA = [
+    # Rebuilding a world's live coin index, and catching up with the spawns of other workers
+    "CREATE INDEX IF NOT EXISTS idx_spawns_world_created ON spawns (world, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_spawns_world_despawned ON spawns (world, despawned_at) "
+    "WHERE despawned_at IS NOT NULL",
+]
+COLUMNS = ('character_id', 'wallet', 'created_at', 'x', 'y', 'z', 'attributes', 'world', 'despawned_at')
+# Spawns are written live: despawned_at stays NULL
+INSERT_SPAWN = f"INSERT INTO spawns ({', '.join(COLUMNS[:-1])}) VALUES ({', '.join('?' for _ in COLUMNS[:-1])})"
+# (x, z) and the character ID itself, so region queries can walk newest-first windows of IDs
+RTREE_SCHEMA = ("CREATE VIRTUAL TABLE IF NOT EXISTS spawn_positions "
+                "USING rtree(character_id, min_x, max_x, min_z, max_z, min_id, max_id)")
+FALLBACK_REGION_INDEX = "CREATE INDEX IF NOT EXISTS idx_spawns_x_z ON spawns (x, z)"
+
+
+def sqlite_path(database_url):
+    """
+    Turn a sqlite:/// DATABASE_URL into a file path. The store needs a real
+    file: the writer, the readers and other worker processes share it.
+    """
+    path = database_url[len('sqlite:///'):] if database_url.startswith('sqlite:///') else None
+    if not path or path == ':memory:':
+        raise ValueError(f"The spawn store needs a sqlite:///<file> DATABASE_URL, got {database_url}")
+    return path
+
+
+class SpawnStore:
+    """
+    Durable log of spawned coin characters in SQLite (WAL mode).
+
+    add()/add_many() assign character IDs immediately and hand the rows to a
+    background writer, which commits everything queued within
+    `flush_interval` seconds (or `batch_size` rows) in one transaction, so a
+    burst of spawns costs one fsync rather than one per spawn. flush() waits
+    until everything queued so far is committed.
+
+    IDs are strictly increasing within a process and never collide across
+    processes: each process reserves blocks of `id_block` IDs from the
+    id_sequence table in a write transaction. Queries use their own per-thread
+    connections and never wait for the writer.
+
+    Each spawn records its game world, and despawn() marks a coin as
+    despawned instead of deleting it, so the live coins of a world can be
+    read back with world_changes() by any worker process.
+    """
+
+    def __init__(self, path, batch_size=SPAWN_STORE_BATCH_SIZE, flush_interval=SPAWN_STORE_FLUSH_MS / 1000.0,
+                 id_block=SPAWN_STORE_ID_BLOCK):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block = id_block
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._id_limit = 0
+        self.written = 0
+        self.commits = 0
+        self.errors = 0
+
+        self._writer_conn = self._connect()
+        self.has_rtree = self._create_schema(self._writer_conn)
+        self._writer = threading.Thread(target=self._run, name='spawn-store-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # No fsync per commit: a power loss may drop the last commits but never corrupts the database
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @staticmethod
+    def _create_schema(conn):
+        for statement in SCHEMA:
+            conn.execute(statement)
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(spawns)')}
+        for name, definition in WORLD_COLUMNS:
+            if name not in existing:
+                try:
+                    conn.execute(f'ALTER TABLE spawns ADD COLUMN {name} {definition}')
+                except sqlite3.OperationalError as e:
+                    # Another process opening the same store added it first
+                    if 'duplicate column' not in str(e):
+                        raise
+        for statement in WORLD_SCHEMA:
+            conn.execute(statement)
+        try:
+            conn.execute(RTREE_SCHEMA)
+        except sqlite3.OperationalError:
+            logger.warning("SQLite was built without R*Tree; region queries use a plain (x, z) index")
+            conn.execute(FALLBACK_REGION_INDEX)
+            return False
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'spawn_locations'").fetchone():
+            # Stores created before region queries were paged by ID index (x, z) only
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO spawn_positions SELECT character_id, x, x, z, z, character_id, character_id '
+                         'FROM spawns')
+            conn.execute('DROP TABLE spawn_locations')
+            conn.execute('COMMIT')
+        return True
+
+    def _reserve_block(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute("SELECT next_id FROM id_sequence WHERE name = 'spawns'").fetchone()
+            if row is None:
+                start = (conn.execute('SELECT MAX(character_id) FROM spawns').fetchone()[0] or 0) + 1
+                conn.execute("INSERT INTO id_sequence (name, next_id) VALUES ('spawns', ?)", (start + self.id_block,))
+            else:
+                start = row[0]
+                conn.execute("UPDATE id_sequence SET next_id = ? WHERE name = 'spawns'", (start + self.id_block,))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        self._next_id, self._id_limit = start, start + self.id_block
+
+    def next_ids(self, n):
+        """Reserve `n` consecutive, never reused character IDs."""
+        with self._id_lock:
+            ids = []
+            while len(ids) < n:
+                if self._next_id >= self._id_limit:
+                    self._reserve_block()
+                take = min(n - len(ids), self._id_limit - self._next_id)
+                ids.extend(range(self._next_id, self._next_id + take))
+                self._next_id += take
+            return ids
+
+    def add(self, wallet, attributes, location, created_at=None, world=DEFAULT_WORLD):
+        """Record one spawn and return its character ID."""
+        return self.add_many([(wallet, attributes, location)], created_at, world)[0]
+
+    def add_many(self, spawns, created_at=None, world=DEFAULT_WORLD):
+        """Record (wallet, attributes, location) spawns in `world` and return their character IDs."""
+        created_at = time.time() if created_at is None else created_at
+        ids = self.next_ids(len(spawns))
+        for character_id, (wallet, attributes, location) in zip(ids, spawns):
+            self._queue.put((
+                character_id, wallet.lower(), created_at,
+                location['x'], location['y'], location['z'], json.dumps(attributes), world,
+            ))
+        return ids
+
+    def despawn(self, character_id, world=DEFAULT_WORLD):
+        """Mark a live coin of `world` as despawned. Returns False if there was none."""
+        # The spawn may still be waiting for its group commit
+        self.flush()
+        cursor = self._reader().execute(
+            'UPDATE spawns SET despawned_at = ? WHERE character_id = ? AND world = ? AND despawned_at IS NULL',
+            (time.time(), character_id, world),
+        )
+        return cursor.rowcount == 1
+
+    def world_changes(self, world, since=None):
+        """
+        (character_id, spawn_location, live) of the coins of `world`: every
+        live coin, or with `since`, every coin spawned or despawned at or
+        after that time.
+        """
+        if since is None:
+            rows = self._reader().execute(
+                'SELECT character_id, x, y, z, despawned_at FROM spawns WHERE world = ? AND despawned_at IS NULL',
+                (world,),
+            )
+        else:
+            rows = self._reader().execute(
+                'SELECT character_id, x, y, z, despawned_at FROM spawns '
+                'WHERE world = ? AND (created_at >= ? OR despawned_at >= ?)',
+                (world, since, since),
+            )
+        return [(character_id, {'x': x, 'y': y, 'z': z}, despawned_at is None)
+                for character_id, x, y, z, despawned_at in rows]
+
+    def _run(self):
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._commit(rows)
+            for _ in rows:
+                self._queue.task_done()
+
+    def _commit(self, rows):
+        conn = self._writer_conn
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(INSERT_SPAWN, rows)
+            if self.has_rtree:
+                conn.executemany(
+                    'INSERT INTO spawn_positions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(row[0], row[3], row[3], row[5], row[5], row[0], row[0]) for row in rows],
+                )
+            conn.execute('COMMIT')
+            self.written += len(rows)
+            self.commits += 1
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            self.errors += len(rows)
+            logger.error("Failed to write %d spawns: %s", len(rows), e)
+
+    def flush(self):
+        """Block until every spawn queued so far has been committed."""
+        self._queue.join()
+
+    @staticmethod
+    def _row(row):
+        character_id, wallet, created_at, x, y, z, attributes, world, despawned_at = row
+        return {
+            'character_id': character_id,
+            'wallet_address': wallet,
+            'created_at': created_at,
+            'spawn_location': {'x': x, 'y': y, 'z': z},
+            'attributes': json.loads(attributes),
+            'world': world,
+            'despawned_at': despawned_at,
+        }
+
+    def by_wallet(self, wallet, limit=100, before=None, before_id=None):
+        """
+        Most recent spawns of a wallet, newest first. To page, pass the
+        created_at and character_id of the last row as `before` and
+        `before_id`: rows of one batch share their created_at, so the cursor
+        needs both. `before` alone returns the spawns older than that time.
+        """
+        sql = f"SELECT {', '.join(COLUMNS)} FROM spawns WHERE wallet = ?"
+        params = [wallet.lower()]
+        if before is not None and before_id is not None:
+            # character_id is the rowid, which ends every index entry: this is a range on (wallet, created_at)
+            sql += ' AND (created_at, character_id) < (?, ?)'
+            params.extend([before, before_id])
+        elif before is not None:
+            sql += ' AND created_at < ?'
+            params.append(before)
+        sql += ' ORDER BY created_at DESC, character_id DESC LIMIT ?'
+        params.append(limit)
+        return [self._row(row) for row in self._reader().execute(sql, params)]
+
+    def in_region(self, min_x, max_x, min_z, max_z, world=DEFAULT_WORLD, limit=100, before_id=None):
+        """
+        Spawns of `world` whose (x, z) lies inside the rectangle, newest
+        first. Pass the character_id of the last row as `before_id` to page.
+        Like by_wallet() this reads the spawn log, so despawned coins are
+        included with their `despawned_at`; the world's live coins are in its
+        spatial index.
+
+        Sorting every match of a large region would cost time proportional to
+        the matches, so the rectangle is searched in windows of character IDs
+        going back from the newest, each twice as wide as the previous, until
+        `limit` rows are found. The rows read stay close to `limit` whatever
+        the size of the region or of the store.
+        """
+        conn = self._reader()
+        high = conn.execute('SELECT MAX(character_id) FROM spawns').fetchone()[0] or 0
+        if before_id is not None:
+            high = min(high, before_id - 1)
+        # The world only filters the rows found: CROSS JOIN (the R*Tree stays the outer
+        # loop) and '+' keep SQLite from walking the world's index instead
+        if self.has_rtree:
+            # R*Tree boxes are float32 rounded outwards: search by overlap, then filter exactly
+            sql = (
+                f"SELECT {', '.join('s.' + column for column in COLUMNS)} "
+                'FROM spawn_positions r CROSS JOIN spawns s ON s.character_id = r.character_id '
+                'WHERE r.max_x >= :min_x AND r.min_x <= :max_x AND r.max_z >= :min_z AND r.min_z <= :max_z '
+                'AND r.max_id >= :low AND r.min_id <= :high AND r.character_id BETWEEN :low AND :high '
+                'AND s.x BETWEEN :min_x AND :max_x AND s.z BETWEEN :min_z AND :max_z AND s.world = :world '
+                'ORDER BY s.character_id DESC LIMIT :limit'
+            )
+        else:
+            sql = (
+                f"SELECT {', '.join(COLUMNS)} FROM spawns "
+                'WHERE character_id BETWEEN :low AND :high '
+                'AND x BETWEEN :min_x AND :max_x AND z BETWEEN :min_z AND :max_z AND +world = :world '
+                'ORDER BY character_id DESC LIMIT :limit'
+            )
+        params = {'min_x': min_x, 'max_x': max_x, 'min_z': min_z, 'max_z': max_z, 'world': world}
+        spawns, window = [], limit
+        while high >= 1 and len(spawns) < limit:
+            params.update(low=max(1, high - window + 1), high=high, limit=limit - len(spawns))
+            spawns.extend(self._row(row) for row in conn.execute(sql, params))
+            high, window = params['low'] - 1, window * 2
+        return spawns
+
+    def count(self):
+        return self._reader().execute('SELECT COUNT(*) FROM spawns').fetchone()[0]
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'commits': self.commits,
+            'rows_per_commit': self.written / self.commits if self.commits else 0.0,
+            'errors': self.errors,
+        }
+
+
+_spawn_store = None
+_spawn_store_lock = threading.Lock()
+
+
+def get_spawn_store():
+    """Return the process-wide SpawnStore for DATABASE_URL, creating it on first use."""
+    global _spawn_store
+    if _spawn_store is None:
+        with _spawn_store_lock:
+            if _spawn_store is None:
+                _spawn_store = SpawnStore(sqlite_path(DATABASE_URL))
+    return _spawn_store
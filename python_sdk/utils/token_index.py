@@ -0,0 +1,426 @@
+"""
+Local index of ERC-20 token balances built from the token's Transfer logs.
+
+A TransferIndexer backfills the logs from TOKEN_INDEX_START_BLOCK with
+eth_getLogs in block-range chunks, then follows the chain head, keeping a
+wallet -> balance table in SQLite (WAL mode). The transfers and block hashes
+of the last TOKEN_INDEX_REORG_DEPTH blocks are kept too: when the chain
+reorganizes, the orphaned blocks are undone and the new ones indexed.
+
+Serving processes only read the table (TokenIndex.balances), and only trust
+it while the indexer has caught up with the chain head recently enough. Run
+one indexer per database, next to the server:
+
+    python -m utils.token_index
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+import requests
+
+from config.settings import (
+    TOKEN_CONTRACT_ADDRESS, TOKEN_INDEX_CHUNK_SIZE, TOKEN_INDEX_PATH, TOKEN_INDEX_POLL_INTERVAL,
+    TOKEN_INDEX_REORG_DEPTH, TOKEN_INDEX_START_BLOCK, WEB3_REQUEST_TIMEOUT, WEB3_RPC_URLS,
+)
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+ZERO_ADDRESS = '0x' + '0' * 40
+_MAX_SQL_PARAMS = 500
+
+SCHEMA = [
+    # Balances in the token's smallest unit, as decimal text (uint256 does not fit an SQLite integer)
+    "CREATE TABLE IF NOT EXISTS balances (wallet TEXT PRIMARY KEY, balance TEXT NOT NULL) WITHOUT ROWID",
+    # Transfers and hashes of the recent blocks, kept to undo them on a reorg
+    """CREATE TABLE IF NOT EXISTS recent_transfers (
+        block_number INTEGER NOT NULL,
+        log_index INTEGER NOT NULL,
+        sender TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (block_number, log_index)
+    )""",
+    "CREATE TABLE IF NOT EXISTS recent_blocks (block_number INTEGER PRIMARY KEY, hash TEXT NOT NULL)",
+    # contract, cursor (last indexed block), head and synced_at (when the cursor last reached the head)
+    "CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+
+class RpcError(Exception):
+    """The RPC provider answered with a JSON-RPC error."""
+
+
+def parse_transfer(log):
+    """(block_number, log_index, sender, recipient, value) of a Transfer log, or None if it is not one."""
+    topics = log.get('topics') or []
+    if log.get('removed') or len(topics) != 3 or topics[0].lower() != TRANSFER_TOPIC:
+        return None
+    return (
+        int(log['blockNumber'], 16),
+        int(log['logIndex'], 16),
+        '0x' + topics[1][-40:].lower(),
+        '0x' + topics[2][-40:].lower(),
+        int(log['data'], 16) if log.get('data') not in (None, '0x') else 0,
+    )
+
+
+class TokenIndex:
+    """
+    The SQLite tables of the index. Every thread uses its own connection;
+    only the indexer writes, each chunk of blocks in one transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def state(self):
+        return dict(self._conn().execute('SELECT key, value FROM index_state'))
+
+    @staticmethod
+    def _set_state(conn, **values):
+        conn.executemany('INSERT OR REPLACE INTO index_state VALUES (?, ?)',
+                         [(key, str(value)) for key, value in values.items()])
+
+    def balances(self, wallets, token_contract_address=None, max_staleness=None):
+        """
+        Balances (smallest unit, 0 for wallets never seen) of `wallets`, or
+        None if the index covers another token, has never caught up with the
+        chain head, or last did so more than `max_staleness` seconds ago.
+        """
+        state = self.state()
+        if token_contract_address is not None and state.get('contract') != token_contract_address.lower():
+            return None
+        synced_at = state.get('synced_at')
+        if synced_at is None or (max_staleness is not None and time.time() - float(synced_at) > max_staleness):
+            return None
+        wallets = list(dict.fromkeys(wallets))
+        found = self._read_balances(self._conn(), [wallet.lower() for wallet in wallets])
+        return {wallet: found.get(wallet.lower(), 0) for wallet in wallets}
+
+    @staticmethod
+    def _read_balances(conn, wallets):
+        found = {}
+        for start in range(0, len(wallets), _MAX_SQL_PARAMS):
+            chunk = wallets[start:start + _MAX_SQL_PARAMS]
+            rows = conn.execute(
+                f"SELECT wallet, balance FROM balances WHERE wallet IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((wallet, int(balance)) for wallet, balance in rows)
+        return found
+
+    def _apply_deltas(self, conn, deltas):
+        current = self._read_balances(conn, list(deltas))
+        updates = []
+        emptied = []
+        for wallet, delta in deltas.items():
+            balance = current.get(wallet, 0) + delta
+            if balance:
+                updates.append((wallet, str(balance)))
+            else:
+                emptied.append((wallet,))  # Only holders are kept, so the table stays small
+        conn.executemany('INSERT OR REPLACE INTO balances VALUES (?, ?)', updates)
+        conn.executemany('DELETE FROM balances WHERE wallet = ?', emptied)
+
+    @staticmethod
+    def _deltas(transfers, sign=1):
+        deltas = {}
+        for _, _, sender, recipient, value in transfers:
+            if sender != ZERO_ADDRESS:
+                deltas[sender] = deltas.get(sender, 0) - sign * value
+            if recipient != ZERO_ADDRESS:
+                deltas[recipient] = deltas.get(recipient, 0) + sign * value
+        return deltas
+
+    def apply(self, to_block, transfers, block_hashes, keep_from):
+        """
+        Apply the transfers of the blocks up to `to_block` and move the cursor
+        there. Transfers and hashes of blocks from `keep_from` on are kept for
+        rollback; older ones are pruned.
+        """
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._apply_deltas(conn, self._deltas(transfers))
+            conn.executemany(
+                'INSERT OR REPLACE INTO recent_transfers VALUES (?, ?, ?, ?, ?)',
+                [transfer[:4] + (str(transfer[4]),) for transfer in transfers if transfer[0] >= keep_from],
+            )
+            conn.executemany('INSERT OR REPLACE INTO recent_blocks VALUES (?, ?)',
+                             [(number, block_hash) for number, block_hash in block_hashes.items()
+                              if number >= keep_from and block_hash is not None])
+            conn.execute('DELETE FROM recent_transfers WHERE block_number < ?', (keep_from,))
+            conn.execute('DELETE FROM recent_blocks WHERE block_number < ?', (keep_from,))
+            self._set_state(conn, cursor=to_block)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def rollback(self, block_number):
+        """Undo the transfers of the blocks after `block_number` and move the cursor back to it."""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('SELECT * FROM recent_transfers WHERE block_number > ?', (block_number,)).fetchall()
+            self._apply_deltas(conn, self._deltas([row[:4] + (int(row[4]),) for row in rows], sign=-1))
+            conn.execute('DELETE FROM recent_transfers WHERE block_number > ?', (block_number,))
+            conn.execute('DELETE FROM recent_blocks WHERE block_number > ?', (block_number,))
+            self._set_state(conn, cursor=block_number)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def reset(self, token_contract_address, start_block):
+        """Forget everything and index `token_contract_address` again from `start_block`."""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for table in ('balances', 'recent_transfers', 'recent_blocks', 'index_state'):
+                conn.execute(f'DELETE FROM {table}')
+            self._set_state(conn, contract=token_contract_address.lower(), cursor=start_block - 1)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def recent_blocks(self):
+        """Kept (block_number, hash) pairs, newest first."""
+        return self._conn().execute('SELECT block_number, hash FROM recent_blocks ORDER BY block_number DESC').fetchall()
+
+    def mark_synced(self, head):
+        self._set_state(self._conn(), head=head, synced_at=time.time())
+
+    def stats(self):
+        state = self.state()
+        synced_at = state.get('synced_at')
+        return {
+            'path': self.path,
+            'contract': state.get('contract'),
+            'cursor': int(state['cursor']) if 'cursor' in state else None,
+            'head': int(state['head']) if 'head' in state else None,
+            'seconds_since_sync': time.time() - float(synced_at) if synced_at is not None else None,
+            'holders': self._conn().execute('SELECT COUNT(*) FROM balances').fetchone()[0],
+        }
+
+
+class TransferIndexer:
+    """
+    Keeps a TokenIndex up to date with the Transfer logs of one token.
+
+    sync_once() checks the newest kept block hash against the chain (rolling
+    back to the newest block both agree on if they differ, or re-indexing
+    from the start if the reorg is deeper than `reorg_depth`), then indexes
+    up to the head `chunk_size` blocks per eth_getLogs call. A range the
+    provider refuses (too many logs) is split in half. start() runs it every
+    `poll_interval` seconds on a background thread.
+    """
+
+    def __init__(self, index, token_contract_address=TOKEN_CONTRACT_ADDRESS, rpc_urls=WEB3_RPC_URLS,
+                 start_block=TOKEN_INDEX_START_BLOCK, chunk_size=TOKEN_INDEX_CHUNK_SIZE,
+                 reorg_depth=TOKEN_INDEX_REORG_DEPTH, poll_interval=TOKEN_INDEX_POLL_INTERVAL,
+                 timeout=WEB3_REQUEST_TIMEOUT):
+        if isinstance(rpc_urls, str):
+            rpc_urls = [rpc_urls]
+        self.index = index
+        self.contract = token_contract_address.lower()
+        self.rpc_urls = list(rpc_urls)
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.reorg_depth = reorg_depth
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._thread = None
+        self._stop = threading.Event()
+        self.transfers = 0
+        self.reorgs = 0
+        self.rolled_back = 0
+        self.errors = 0
+
+    def _post(self, payload, method):
+        """POST a JSON-RPC request or batch to the first RPC URL that answers."""
+        last_error = None
+        for url in self.rpc_urls:
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError) as e:
+                kind = 'timeout' if isinstance(e, requests.Timeout) else 'error'
+                metrics.inc('rpc_errors_total', call=method, kind=kind)
+                last_error = e
+            finally:
+                metrics.observe('rpc_seconds', time.perf_counter() - start, call=method)
+        raise ConnectionError(f"No RPC endpoint answered {method}: {last_error}")
+
+    @staticmethod
+    def _result(item, method):
+        if 'error' in item:
+            metrics.inc('rpc_errors_total', call=method, kind='error')
+            error = item['error']
+            raise RpcError(error.get('message', error) if isinstance(error, dict) else error)
+        return item['result']
+
+    def _call(self, method, params):
+        return self._result(self._post({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}, method), method)
+
+    def _block_hash(self, number):
+        block = self._call('eth_getBlockByNumber', [hex(number), False])
+        return block['hash'] if block else None
+
+    def _block_hashes(self, numbers):
+        """Hashes of the blocks `numbers` from one batch request (None for blocks past the head)."""
+        if not numbers:
+            return {}
+        method = 'eth_getBlockByNumber'
+        body = self._post([{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': [hex(number), False]}
+                           for i, number in enumerate(numbers)], method)
+        if not isinstance(body, list):
+            raise RpcError(body.get('error', 'Batch request rejected by RPC provider'))
+        by_id = {item.get('id'): item for item in body}
+        hashes = {}
+        for i, number in enumerate(numbers):
+            block = self._result(by_id.get(i, {'error': 'Missing response in batch'}), method)
+            hashes[number] = block['hash'] if block else None
+        return hashes
+
+    def _get_logs(self, from_block, to_block):
+        return self._call('eth_getLogs', [{
+            'address': self.contract, 'topics': [TRANSFER_TOPIC],
+            'fromBlock': hex(from_block), 'toBlock': hex(to_block),
+        }])
+
+    def _check_reorg(self):
+        """Roll back the blocks the chain no longer agrees with. Returns True if it did."""
+        kept = self.index.recent_blocks()
+        if not kept or self._block_hash(kept[0][0]) == kept[0][1]:
+            return False
+        self.reorgs += 1
+        chain_hashes = self._block_hashes([number for number, _ in kept[1:]])
+        for number, block_hash in kept[1:]:
+            if chain_hashes[number] == block_hash:
+                undone = self.index.rollback(number)
+                self.rolled_back += undone
+                logger.warning("Chain reorganized after block %d: %d transfers rolled back", number, undone)
+                return True
+        logger.error("Chain reorganized deeper than %d blocks, indexing again from block %d",
+                     self.reorg_depth, self.start_block)
+        self.index.reset(self.contract, self.start_block)
+        return True
+
+    def sync_once(self):
+        """Index up to the current chain head. Returns the last indexed block."""
+        if self.index.state().get('contract') != self.contract:
+            self.index.reset(self.contract, self.start_block)
+        self._check_reorg()
+        head = int(self._call('eth_blockNumber', []), 16)
+        cursor = int(self.index.state()['cursor'])
+        if head < cursor:
+            # A lagging provider; wait for it rather than index backwards
+            return cursor
+
+        keep_from = head - self.reorg_depth + 1
+        while cursor < head:
+            to_block = min(cursor + self.chunk_size, head)
+            try:
+                logs = self._get_logs(cursor + 1, to_block)
+            except RpcError as e:
+                if to_block == cursor + 1:
+                    raise
+                self.chunk_size = max(1, (to_block - cursor) // 2)
+                logger.info("eth_getLogs refused %d blocks (%s), trying %d", to_block - cursor, e, self.chunk_size)
+                continue
+            # Hashes of every block that may still be rolled back, which the logs must agree with
+            block_hashes = self._block_hashes(list(range(max(cursor + 1, keep_from), to_block + 1)))
+            if any(block_hashes.get(int(log['blockNumber'], 16), log.get('blockHash')) != log.get('blockHash')
+                   for log in logs):
+                continue  # The chain changed while the range was read; read it again
+
+            transfers = [transfer for transfer in map(parse_transfer, logs) if transfer is not None]
+            self.index.apply(to_block, transfers, block_hashes, keep_from)
+            self.transfers += len(transfers)
+            cursor = to_block
+        self.index.mark_synced(head)
+        return cursor
+
+    def start(self):
+        """Start indexing on a background thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='token-indexer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + self.poll_interval + 1)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Token index sync failed: %s", e)
+            self._stop.wait(self.poll_interval)
+
+    def stats(self):
+        stats = self.index.stats()
+        stats.update({
+            'chunk_size': self.chunk_size,
+            'transfers': self.transfers,
+            'reorgs': self.reorgs,
+            'rolled_back': self.rolled_back,
+            'errors': self.errors,
+        })
+        return stats
+
+
+_token_index = None
+_token_index_lock = threading.Lock()
+
+
+def get_token_index():
+    """Return the process-wide TokenIndex at TOKEN_INDEX_PATH, opening it on first use."""
+    global _token_index
+    if _token_index is None:
+        with _token_index_lock:
+            if _token_index is None:
+                _token_index = TokenIndex(TOKEN_INDEX_PATH)
+    return _token_index
+
+
+if __name__ == '__main__':
+    from utils.logger import setup_logging
+    setup_logging()
+    indexer = TransferIndexer(get_token_index())
+    print(f"Indexing Transfer logs of {indexer.contract} into {TOKEN_INDEX_PATH}")
+    try:
+        indexer.run()
+    except KeyboardInterrupt:
+        print(indexer.stats())
@@ -1,30 +1,16 @@
 from flask import request
 
+from utils.schemas import CoinFeatures, CoinFeaturesRequest, is_valid_auth_token
+
 
 def validate_coin_features(coin_features):
     """
     Validates the coin_features data sent from Roblox.
     Checks for required attributes like name, appearance, and behavior.
     """
-    if not isinstance(coin_features, dict):
-        return False, "Coin features must be a dictionary."
-    
-    required_fields = ['name', 'appearance', 'behavior']
-    for field in required_fields:
-        if field not in coin_features:
-            return False, f"Missing required field: {field}"
-
-    # Example: Validate 'name' should be a non-empty string
-    if not isinstance(coin_features['name'], str) or not coin_features['name'].strip():
-        return False, "'name' must be a non-empty string."
-
-    # Example: Validate 'appearance' should be a dictionary
-    if not isinstance(coin_features['appearance'], dict):
-        return False, "'appearance' must be a dictionary."
-
-    # Example: Validate 'behavior' should be a dictionary
-    if not isinstance(coin_features['behavior'], dict):
-        return False, "'behavior' must be a dictionary."
+    _, error = CoinFeatures.parse(coin_features)
+    if error:
+        return False, error
 
     return True, "Valid coin features."
 
@@ -32,19 +18,15 @@ def validate_coin_features(coin_features):
 def validate_request_data():
     """
     Validate the data sent in the request body.
+    The raw body is parsed and validated in a single pass.
     Returns a tuple of (is_valid, message).
     """
     if not request.is_json:
         return False, "Request must be in JSON format."
 
-    data = request.get_json()
-
-    if 'coin_features' not in data:
-        return False, "Missing 'coin_features' in the request body."
-
-    is_valid, message = validate_coin_features(data['coin_features'])
-    if not is_valid:
-        return is_valid, message
+    _, error = CoinFeaturesRequest.parse_json(request.get_data(cache=True))
+    if error:
+        return False, error
 
     return True, "Request data is valid."
 
@@ -54,7 +36,7 @@ def validate_authentication_token(auth_token):
     Validate the format of an authentication token (e.g., length and characters).
     """
     # Example: token should be a string with exactly 32 alphanumeric characters
-    if not isinstance(auth_token, str) or len(auth_token) != 32 or not auth_token.isalnum():
+    if not is_valid_auth_token(auth_token):
         return False, "Invalid authentication token format."
 
     return True, "Authentication token is valid."
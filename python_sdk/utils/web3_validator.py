@@ -1,6 +1,41 @@
-import json
-from web3 import Web3
-from web3.exceptions import InvalidAddress
+import logging
+import threading
+import time
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+from eth_hash.auto import keccak
+from config.settings import (
+    WEB3_RPC_URLS, WEB3_POOL_SIZE, WEB3_REQUEST_TIMEOUT, WEB3_HEALTH_CHECK_INTERVAL, WEB3_CHAIN_ID,
+    BALANCE_CACHE_MAX_ENTRIES, BALANCE_CACHE_TTL, BALANCE_CACHE_NEGATIVE_TTL,
+    BALANCE_BATCH_MODE, BALANCE_BATCH_MAX_SIZE, MULTICALL3_ADDRESS,
+)
+from utils.admission import rpc_limiter
+from utils.cache import TTLCache
+from utils.lazy_imports import lazy_import
+from utils.metrics import metrics
+
+# web3 and eth_abi take most of a second to import; load them on first RPC use
+web3 = lazy_import('web3')
+eth_abi = lazy_import('eth_abi')
+
+
+logger = logging.getLogger(__name__)
+
+
+def _record_rpc_error(call, error):
+    """Count a failed RPC call as a timeout or an error."""
+    kind = 'timeout' if isinstance(error, requests.Timeout) else 'error'
+    metrics.inc('rpc_errors_total', call=call, kind=kind)
+
+
+class RpcUnavailable(ConnectionError):
+    """Raised when no RPC endpoint could complete a call."""
+
+
+# Failures of the endpoint itself (unreachable, timed out, HTTP error, batch refused),
+# as opposed to errors of the call such as a reverted balanceOf
+TRANSPORT_ERRORS = (requests.RequestException, ConnectionError)
 
 
 # Connect to a blockchain provider (e.g., Infura, Alchemy, or local node)
@@ -13,61 +48,533 @@ def connect_to_blockchain(provider_url):
     """
     try:
         # Initialize the Web3 connection
-        w3 = Web3(Web3.HTTPProvider(provider_url))
+        w3 = web3.Web3(web3.Web3.HTTPProvider(provider_url))
 
         # Check if connected successfully
         if not w3.isConnected():
             raise ConnectionError("Unable to connect to the blockchain.")
         return w3
     except Exception as e:
-        print(f"Error connecting to the blockchain: {e}")
+        _record_rpc_error('connect', e)
+        logger.error("Error connecting to the blockchain: %s", e)
+        return None
+
+
+class RpcEndpoint:
+    """
+    A single RPC provider with its own pooled HTTP session.
+    The Web3 instance reuses the session, so keep-alive connections are shared
+    across requests instead of being rebuilt per call.
+    """
+
+    def __init__(self, url, pool_size=WEB3_POOL_SIZE, timeout=WEB3_REQUEST_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool_size = pool_size
+        self.w3 = web3.Web3(web3.Web3.HTTPProvider(url, session=self.session, request_kwargs={'timeout': timeout}))
+
+        self.healthy = True  # Optimistic until the first health check says otherwise
+        self.checks = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.last_latency = None
+        self.last_block = None
+        self.last_error = None
+        self.last_checked_at = None
+
+    def ping(self):
+        """Issue an eth_blockNumber call and return the latest block number."""
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []}
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        if 'error' in body:
+            raise ConnectionError(body['error'])
+        return int(body['result'], 16)
+
+    def stats(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'pool_size': self.pool_size,
+            'requests': self.requests,
+            'checks': self.checks,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_latency_ms': round(self.last_latency * 1000, 3) if self.last_latency is not None else None,
+            'last_block': self.last_block,
+            'last_error': self.last_error,
+            'last_checked_at': self.last_checked_at,
+        }
+
+
+class Web3ConnectionManager:
+    """
+    Holds one pooled connection per configured RPC URL and hands out the
+    first healthy one, in configuration order.
+
+    Health checks run on a background thread, so the request path never pays
+    for a connectivity round trip. Endpoints that fail a check (or that a caller
+    reports via mark_failed) are skipped until a later check succeeds.
+    """
+
+    def __init__(self, provider_urls, pool_size=WEB3_POOL_SIZE, timeout=WEB3_REQUEST_TIMEOUT,
+                 health_check_interval=WEB3_HEALTH_CHECK_INTERVAL):
+        if isinstance(provider_urls, str):
+            provider_urls = [provider_urls]
+        if not provider_urls:
+            raise ValueError("At least one RPC URL is required.")
+        self.endpoints = [RpcEndpoint(url, pool_size, timeout) for url in provider_urls]
+        self.health_check_interval = health_check_interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the background health checker (idempotent)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='web3-health-check', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.health_check_interval + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_health()
+            self._stop.wait(self.health_check_interval)
+
+    def check_health(self):
+        """Ping every endpoint once and update its health state."""
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                endpoint.last_block = endpoint.ping()
+                endpoint.last_latency = time.perf_counter() - start
+                metrics.observe('rpc_seconds', endpoint.last_latency, call='health_check')
+                endpoint.healthy = True
+                endpoint.consecutive_failures = 0
+                endpoint.last_error = None
+            except Exception as e:
+                _record_rpc_error('health_check', e)
+                if endpoint.healthy:
+                    logger.warning("RPC endpoint %s failed its health check: %s", endpoint.url, e)
+                endpoint.healthy = False
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                endpoint.last_error = str(e)
+            endpoint.checks += 1
+            endpoint.last_checked_at = time.time()
+
+    def get_web3(self):
+        """Return the Web3 instance of the first healthy endpoint, or None if all are down."""
+        self.start()
+        for endpoint in self.endpoints:
+            if endpoint.healthy:
+                endpoint.requests += 1
+                return endpoint.w3
         return None
 
+    def mark_failed(self, w3, error=None):
+        """Report a request-path failure so subsequent calls fail over to the next endpoint."""
+        for endpoint in self.endpoints:
+            if endpoint.w3 is w3:
+                endpoint.healthy = False
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                endpoint.last_error = str(error) if error else endpoint.last_error
+                logger.warning("RPC endpoint %s marked unhealthy: %s", endpoint.url, error)
+
+    def manages(self, w3):
+        return any(endpoint.w3 is w3 for endpoint in self.endpoints)
+
+    def call(self, fn, w3=None, call='call'):
+        """
+        Run fn(w3) on `w3`, or on the first healthy endpoint, failing over on
+        transport errors: each endpoint that fails is marked unhealthy and the
+        call is retried on the next healthy one.
+
+        :raises RpcUnavailable: Once every endpoint has failed
+        """
+        w3 = w3 if w3 is not None else self.get_web3()
+        tried = set()
+        error = None
+        while w3 is not None and id(w3) not in tried:
+            tried.add(id(w3))
+            try:
+                return fn(w3)
+            except TRANSPORT_ERRORS as e:
+                _record_rpc_error(call, e)
+                self.mark_failed(w3, e)
+                error = e
+            w3 = self.get_web3()
+        raise RpcUnavailable(f"No RPC endpoint could complete {call}: {error}")
+
+    def stats(self):
+        """Return per-endpoint pool and health statistics."""
+        return {
+            'health_check_interval': self.health_check_interval,
+            'endpoints': [endpoint.stats() for endpoint in self.endpoints],
+        }
+
+
+_connection_manager = None
+_connection_manager_lock = threading.Lock()
+
+
+def get_connection_manager():
+    """Return the process-wide connection manager built from WEB3_RPC_URL."""
+    global _connection_manager
+    if _connection_manager is None:
+        with _connection_manager_lock:
+            if _connection_manager is None:
+                _connection_manager = Web3ConnectionManager(WEB3_RPC_URLS)
+    return _connection_manager
+
+
+def get_web3():
+    """
+    Return a pooled, health-checked Web3 instance.
+    Prefer this over connect_to_blockchain on the request path.
+    """
+    return get_connection_manager().get_web3()
+
+
+def call_with_failover(w3, fn, call='call'):
+    """
+    Run fn(w3), failing over to the next healthy endpoint on transport errors
+    when `w3` is one of the pooled connections. A standalone Web3 instance
+    gets a single attempt.
+
+    :raises RpcUnavailable: If no endpoint could complete the call
+    """
+    if _connection_manager is not None and _connection_manager.manages(w3):
+        return _connection_manager.call(fn, w3, call)
+    try:
+        return fn(w3)
+    except TRANSPORT_ERRORS as e:
+        _record_rpc_error(call, e)
+        raise RpcUnavailable(f"RPC endpoint could not complete {call}: {e}") from e
+
+
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+
+@lru_cache(maxsize=65536)
+def to_checksum_address(address):
+    """
+    Return the EIP-55 mixed-case checksum form of a hex address (offline).
+    Results are memoized since the same wallets are checked over and over.
+
+    :param address: 40 hex characters, with or without the 0x prefix
+    :return: Checksummed address string
+    """
+    lower = address[2:].lower() if address[:2] in ('0x', '0X') else address.lower()
+    if len(lower) != 40 or not _HEX_DIGITS.issuperset(lower):
+        raise ValueError(f"Invalid address: {address}")
+    address_hash = keccak(lower.encode()).hex()
+    return '0x' + ''.join(
+        char.upper() if int(address_hash[i], 16) >= 8 else char
+        for i, char in enumerate(lower)
+    )
+
+
+@lru_cache(maxsize=65536)
+def is_valid_address(address):
+    """
+    Validate an Ethereum address without a Web3 instance.
+    All-lowercase and all-uppercase addresses are accepted as-is; mixed-case
+    addresses must carry a valid EIP-55 checksum.
+    """
+    if not isinstance(address, str):
+        return False
+    body = address[2:] if address[:2] in ('0x', '0X') else address
+    if len(body) != 40 or not _HEX_DIGITS.issuperset(body):
+        return False
+    if body == body.lower() or body == body.upper():
+        return True
+    return to_checksum_address(address) == '0x' + body
+
 
 def validate_wallet_address(w3, wallet_address):
     """
     Validate if the given wallet address is a valid Ethereum address.
+    The check runs offline; `w3` is accepted for backwards compatibility and may be None.
 
-    :param w3: Web3 instance
+    :param w3: Web3 instance (unused)
     :param wallet_address: The wallet address to validate
     :return: Boolean indicating if the address is valid
     """
     try:
-        # Check if the address is valid
-        return w3.isAddress(wallet_address)
-    except InvalidAddress:
+        return is_valid_address(wallet_address)
+    except TypeError:
+        # Unhashable input (e.g. a list from a malformed JSON body)
         return False
 
 
 def get_token_balance(w3, wallet_address, token_contract_address, decimals=18):
     """
     Get the token balance of the specified wallet.
+    RPC failures fail over to the next healthy endpoint instead of reading as no balance.
 
     :param w3: Web3 instance
     :param wallet_address: The wallet address to check
     :param token_contract_address: The contract address of the token
     :param decimals: The number of decimals of the token (default is 18 for most ERC20 tokens)
-    :return: Token balance (in the smallest unit)
+    :return: Token balance, or None if the balanceOf call itself failed (e.g. reverted)
+    :raises RpcUnavailable: If no RPC endpoint could be reached
     """
+    def fetch(w3):
+        # One raw eth_call over the pooled session: a contract call would also send eth_chainId twice
+        item = _rpc_call(w3, 'eth_call', [
+            {'to': token_contract_address, 'data': '0x' + _balance_of_calldata(wallet_address)}, 'latest',
+        ])
+        if 'error' in item:
+            raise ValueError(item['error'].get('message', item['error']))
+        return int(item['result'], 16)
+
+    start = time.perf_counter()
     try:
-        # ABI for ERC-20 token contract
-        abi = json.loads(
-            '[{"constant":true,"inputs":[{"name":"","type":"address"}],'
-            '"name":"balanceOf","outputs":[{"name":"","type":"uint256"}],'
-            '"payable":false,"stateMutability":"view","type":"function"}]'
-        )
+        balance = call_with_failover(w3, fetch, 'balance_of')
+    except RpcUnavailable:
+        raise
+    except Exception as e:
+        _record_rpc_error('balance_of', e)
+        logger.warning("Error getting token balance: %s", e)
+        return None
+    finally:
+        metrics.observe('rpc_seconds', time.perf_counter() - start, call='balance_of')
 
-        # Initialize contract
-        contract = w3.eth.contract(address=token_contract_address, abi=abi)
+    # Convert balance to a human-readable format (assuming 18 decimals for most tokens)
+    return balance / (10 ** decimals)
 
-        # Call the balanceOf function to get the balance
-        balance = contract.functions.balanceOf(wallet_address).call()
 
-        # Convert balance to a human-readable format (assuming 18 decimals for most tokens)
-        return balance / (10 ** decimals)
-    except Exception as e:
-        print(f"Error getting token balance: {e}")
-        return None
+# 4-byte selectors for balanceOf(address) and Multicall3 aggregate3((address,bool,bytes)[])
+BALANCE_OF_SELECTOR = '70a08231'
+AGGREGATE3_SELECTOR = '82ad56cb'
+
+_fallback_session = requests.Session()
+
+
+def _session_for(w3):
+    """Return the pooled session behind a managed Web3 instance, or a shared fallback."""
+    if _connection_manager is not None:
+        for endpoint in _connection_manager.endpoints:
+            if endpoint.w3 is w3:
+                return endpoint.session
+    return _fallback_session
+
+
+def _balance_of_calldata(wallet_address):
+    address = wallet_address[2:] if wallet_address.startswith(('0x', '0X')) else wallet_address
+    if len(address) != 40:
+        raise ValueError(f"Invalid wallet address: {wallet_address}")
+    int(address, 16)  # Raises ValueError for non-hex characters
+    return BALANCE_OF_SELECTOR + address.lower().rjust(64, '0')
+
+
+def _rpc_call(w3, method, params, timeout=WEB3_REQUEST_TIMEOUT):
+    """POST a single JSON-RPC request and return its response."""
+    response = _session_for(w3).post(
+        w3.provider.endpoint_uri, json={'jsonrpc': '2.0', 'id': 0, 'method': method, 'params': params}, timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _rpc_batch(w3, requests_payload, timeout=WEB3_REQUEST_TIMEOUT):
+    """POST a JSON-RPC batch and return the responses keyed by request id."""
+    start = time.perf_counter()
+    try:
+        response = _session_for(w3).post(w3.provider.endpoint_uri, json=requests_payload, timeout=timeout)
+    finally:
+        metrics.observe('rpc_seconds', time.perf_counter() - start, call='batch')
+    response.raise_for_status()
+    body = response.json()
+    if not isinstance(body, list):
+        raise ConnectionError(body.get('error', 'Batch request rejected by RPC provider'))
+    return {item.get('id'): item for item in body}
+
+
+def _fetch_balances_rpc_batch(w3, wallets, token_contract_address, decimals):
+    results = {}
+    payload = []
+    for i, wallet_address in enumerate(wallets):
+        try:
+            data = '0x' + _balance_of_calldata(wallet_address)
+        except (AttributeError, ValueError) as e:
+            results[wallet_address] = {'balance': None, 'error': str(e)}
+            continue
+        payload.append({
+            'jsonrpc': '2.0', 'id': i, 'method': 'eth_call',
+            'params': [{'to': token_contract_address, 'data': data}, 'latest'],
+        })
+    if not payload:
+        return results
+
+    responses = _rpc_batch(w3, payload)
+    for request_item in payload:
+        wallet_address = wallets[request_item['id']]
+        item = responses.get(request_item['id'])
+        if item is None:
+            results[wallet_address] = {'balance': None, 'error': 'Missing response in batch'}
+        elif 'error' in item:
+            results[wallet_address] = {'balance': None, 'error': str(item['error'].get('message', item['error']))}
+        else:
+            results[wallet_address] = {'balance': int(item['result'], 16) / (10 ** decimals), 'error': None}
+    return results
+
+
+def _fetch_balances_multicall(w3, wallets, token_contract_address, decimals):
+    results = {}
+    calls = []
+    call_wallets = []
+    for wallet_address in wallets:
+        try:
+            calldata = bytes.fromhex(_balance_of_calldata(wallet_address))
+        except (AttributeError, ValueError) as e:
+            results[wallet_address] = {'balance': None, 'error': str(e)}
+            continue
+        calls.append((token_contract_address, True, calldata))
+        call_wallets.append(wallet_address)
+    if not calls:
+        return results
+
+    data = '0x' + AGGREGATE3_SELECTOR + eth_abi.encode(['(address,bool,bytes)[]'], [calls]).hex()
+    payload = [{
+        'jsonrpc': '2.0', 'id': 0, 'method': 'eth_call',
+        'params': [{'to': MULTICALL3_ADDRESS, 'data': data}, 'latest'],
+    }]
+    item = _rpc_batch(w3, payload).get(0)
+    if item is None or 'error' in item:
+        error = 'Missing response' if item is None else str(item['error'].get('message', item['error']))
+        raise ValueError(f"Multicall failed: {error}")
+    (call_results,) = eth_abi.decode(['(bool,bytes)[]'], bytes.fromhex(item['result'][2:]))
+    for wallet_address, (success, return_data) in zip(call_wallets, call_results):
+        if success and len(return_data) >= 32:
+            results[wallet_address] = {'balance': int.from_bytes(return_data[:32], 'big') / (10 ** decimals), 'error': None}
+        else:
+            results[wallet_address] = {'balance': None, 'error': 'balanceOf call reverted'}
+    return results
+
+
+def get_token_balances(w3, wallets, token_contract_address, decimals=18,
+                       mode=BALANCE_BATCH_MODE, max_batch_size=BALANCE_BATCH_MAX_SIZE):
+    """
+    Get token balances for many wallets with as few RPC round trips as possible.
+
+    All balanceOf calls are packed into JSON-RPC batch requests, or into
+    Multicall3 aggregate3 calls when mode is 'multicall', chunked by
+    max_batch_size. A chunk that hits a transport error is retried on the
+    next healthy endpoint. Errors are reported per wallet; a failed chunk
+    marks only its own wallets as failed.
+
+    :param w3: Web3 instance (HTTP provider)
+    :param wallets: Iterable of wallet addresses
+    :param token_contract_address: The contract address of the token
+    :param decimals: The number of decimals of the token
+    :param mode: 'rpc_batch' or 'multicall'
+    :param max_batch_size: Maximum number of balanceOf calls per request
+    :return: Dict mapping wallet address to {'balance': float or None, 'error': str or None}
+    """
+    wallets = list(dict.fromkeys(wallets))
+    fetch = _fetch_balances_multicall if mode == 'multicall' else _fetch_balances_rpc_batch
+    results = {}
+    for start in range(0, len(wallets), max_batch_size):
+        chunk = wallets[start:start + max_batch_size]
+        try:
+            results.update(call_with_failover(
+                w3, lambda w3: fetch(w3, chunk, token_contract_address, decimals), 'batch'
+            ))
+        except Exception as e:
+            if not isinstance(e, RpcUnavailable):  # Transport failures were counted per endpoint
+                _record_rpc_error('batch', e)
+            logger.error("Error getting token balances for %d wallets: %s", len(chunk), e)
+            for wallet_address in chunk:
+                results.setdefault(wallet_address, {'balance': None, 'error': str(e)})
+    return results
+
+
+# Shared cache of token balances keyed by (chain, contract, wallet)
+balance_cache = TTLCache(BALANCE_CACHE_MAX_ENTRIES, BALANCE_CACHE_TTL)
+_MISSING = object()
+
+
+def _balance_ttl(balance):
+    """Reverted lookups and empty wallets are cached for a shorter time."""
+    if balance is None or balance <= 0:
+        return BALANCE_CACHE_NEGATIVE_TTL
+    return BALANCE_CACHE_TTL
+
+
+def get_cached_token_balance(w3, wallet_address, token_contract_address, decimals=18, chain_id=WEB3_CHAIN_ID):
+    """
+    Get the token balance of the specified wallet through the shared balance cache.
+    Concurrent lookups for the same wallet share a single balanceOf call.
+
+    :param w3: Web3 instance used on a cache miss
+    :param wallet_address: The wallet address to check
+    :param token_contract_address: The contract address of the token
+    :param decimals: The number of decimals of the token
+    :param chain_id: Chain the contract lives on (part of the cache key)
+    :return: Token balance, or None if the balanceOf call failed
+    :raises Overloaded: On a miss, if no RPC slot frees up within RPC_QUEUE_BUDGET
+    :raises RpcUnavailable: On a miss, if no RPC endpoint could be reached (nothing is cached)
+    """
+    key = (chain_id, token_contract_address.lower(), wallet_address.lower())
+
+    def load():
+        with rpc_limiter.slot():
+            return get_token_balance(w3, wallet_address, token_contract_address, decimals)
+
+    return balance_cache.get_or_load(key, load, ttl=_balance_ttl)
+
+
+def get_cached_token_balances(w3, wallets, token_contract_address, decimals=18, chain_id=WEB3_CHAIN_ID):
+    """
+    Get balances for many wallets, serving what it can from the balance cache
+    and fetching the misses with a single batched lookup. Wallets whose lookup
+    failed are not cached, so the next request retries them. An RPC outage
+    reads as None for every missed wallet, whether one or many missed.
+
+    :return: Dict mapping wallet address to its balance, or None if it could not be retrieved
+    :raises Overloaded: If the misses need RPC and no slot frees up within RPC_QUEUE_BUDGET
+    """
+    balances = {}
+    misses = []
+    for wallet_address in dict.fromkeys(wallets):
+        key = (chain_id, token_contract_address.lower(), wallet_address.lower())
+        balance = balance_cache.get(key, _MISSING)
+        if balance is _MISSING:
+            misses.append(wallet_address)
+        else:
+            balances[wallet_address] = balance
+
+    if len(misses) == 1:
+        try:
+            balances[misses[0]] = get_cached_token_balance(w3, misses[0], token_contract_address, decimals, chain_id)
+        except RpcUnavailable as e:
+            logger.warning("Error getting token balance: %s", e)
+            balances[misses[0]] = None
+    elif misses:
+        with rpc_limiter.slot():
+            fetched = get_token_balances(w3, misses, token_contract_address, decimals)
+        for wallet_address, result in fetched.items():
+            balance = result['balance']
+            if result['error'] is None:
+                key = (chain_id, token_contract_address.lower(), wallet_address.lower())
+                balance_cache.set(key, balance, ttl=_balance_ttl(balance))
+            balances[wallet_address] = balance
+    return balances
 
 
 # Example usage:
@@ -90,7 +597,10 @@ if __name__ == "__main__":
             print(f"Wallet address {wallet_address} is valid.")
 
             # Get token balance
-            token_balance = get_token_balance(w3, wallet_address, token_contract_address)
+            try:
+                token_balance = get_token_balance(w3, wallet_address, token_contract_address)
+            except RpcUnavailable:
+                token_balance = None
             if token_balance is not None:
                 print(f"Token balance: {token_balance}")
             else:
@@ -2,15 +2,37 @@ local HttpService = game:GetService("HttpService")
 
 local AIService = {}
 
+-- AI gateway on the game backend: caches completions and dedupes identical prompts
+local GATEWAY_URL = "http://localhost:8000/api/ai" -- Replace with your backend URL
+local SCRIPT_MAX_TOKENS = 300
+
 function AIService.GenerateScript(prompt)
-    local apiUrl = "https://api.example.com/generate" -- Replace with actual AI API
-    local requestData = { prompt = prompt, max_tokens = 300 }
+    local requestData = { prompt = prompt, max_tokens = SCRIPT_MAX_TOKENS }
     local jsonRequest = HttpService:JSONEncode(requestData)
 
-    local response = HttpService:PostAsync(apiUrl, jsonRequest, Enum.HttpContentType.ApplicationJson)
+    local response = HttpService:PostAsync(GATEWAY_URL .. "/complete", jsonRequest, Enum.HttpContentType.ApplicationJson)
+    local result = HttpService:JSONDecode(response)
+
+    return result.text
+end
+
+-- Generate scripts for several prompts with one request; returns the scripts in prompt order
+-- (nil for any prompt the gateway could not complete)
+function AIService.GenerateScripts(prompts)
+    local requests = {}
+    for i, prompt in ipairs(prompts) do
+        requests[i] = { prompt = prompt, max_tokens = SCRIPT_MAX_TOKENS }
+    end
+    local jsonRequest = HttpService:JSONEncode({ requests = requests })
+
+    local response = HttpService:PostAsync(GATEWAY_URL .. "/complete_batch", jsonRequest, Enum.HttpContentType.ApplicationJson)
     local result = HttpService:JSONDecode(response)
 
-    return result.generated_script
+    local scripts = {}
+    for i = 1, #prompts do
+        scripts[i] = result.results[i] and result.results[i].text
+    end
+    return scripts
 end
 
 return AIService
@@ -5,23 +5,24 @@
 local HttpService = game:GetService("HttpService")
 local AiIntegration = {}
 
--- Configuration for AI service
-local AI_API_URL = "https://example-ai-service.com/api"  -- Replace with your actual API endpoint
-local API_KEY = "your-api-key"  -- Replace with your actual API key
+-- Configuration for the AI gateway on the game backend. The gateway holds the AI
+-- API key, caches completions and answers identical prompts with one AI call.
+local AI_GATEWAY_URL = "http://localhost:8000/api/ai"  -- Replace with your backend URL
+local BATCH_WINDOW = 0.05  -- Seconds to collect prompts from NPCs before sending them together
+local MAX_BATCH_SIZE = 64  -- Send right away once this many prompts are waiting
+local NPC_MAX_TOKENS = 100  -- Limit response length
 
--- Function to send a request to the AI API
-local function sendRequest(endpoint, payload)
-    local url = AI_API_URL .. endpoint
+local pendingPrompts = {}  -- Prompts waiting for the next batch: {prompt, maxTokens, thread}
+local flushScheduled = false
 
-    local headers = {
-        ["Content-Type"] = "application/json",
-        ["Authorization"] = "Bearer " .. API_KEY
-    }
+-- Function to send a request to the AI gateway
+local function sendRequest(endpoint, payload)
+    local url = AI_GATEWAY_URL .. endpoint
 
     local requestBody = HttpService:JSONEncode(payload)
 
     local success, response = pcall(function()
-        return HttpService:PostAsync(url, requestBody, Enum.HttpContentType.ApplicationJson, false, headers)
+        return HttpService:PostAsync(url, requestBody, Enum.HttpContentType.ApplicationJson, false)
     end)
 
     if success then
@@ -32,12 +33,48 @@ local function sendRequest(endpoint, payload)
     end
 end
 
+-- Send every waiting prompt in one request and resume the threads waiting for them
+local function flushPrompts()
+    flushScheduled = false
+    local batch = pendingPrompts
+    pendingPrompts = {}
+    if #batch == 0 then
+        return
+    end
+
+    local requests = {}
+    for i, item in ipairs(batch) do
+        requests[i] = { prompt = item.prompt, max_tokens = item.maxTokens }
+    end
+
+    local response = sendRequest("/complete_batch", { requests = requests })
+    for i, item in ipairs(batch) do
+        local result = response and response.results and response.results[i]
+        task.spawn(item.thread, result and result.text)
+    end
+end
+
+-- Queue a prompt for the next batch and yield until its completion arrives (nil on failure).
+-- Prompts from all NPCs within BATCH_WINDOW share one HTTP request.
+local function requestCompletion(prompt, maxTokens)
+    table.insert(pendingPrompts, { prompt = prompt, maxTokens = maxTokens, thread = coroutine.running() })
+    if #pendingPrompts >= MAX_BATCH_SIZE then
+        task.spawn(flushPrompts)
+    elseif not flushScheduled then
+        flushScheduled = true
+        task.delay(BATCH_WINDOW, flushPrompts)
+    end
+    return coroutine.yield()
+end
+
 -- Initialize the AI Integration
 function AiIntegration:init()
     print("Initializing AI Integration...")
-    -- Optional: Perform any setup or health check for the AI service
-    local healthCheck = sendRequest("/health", {})
-    if healthCheck and healthCheck.status == "ok" then
+    -- Optional: Perform any setup or health check for the AI gateway
+    local success = pcall(function()
+        return HttpService:GetAsync(AI_GATEWAY_URL .. "/stats")
+    end)
+    if success then
         print("AI Service is online.")
     else
         warn("Failed to connect to AI Service.")
@@ -50,34 +87,42 @@ function AiIntegration:generateNpcResponse(prompt)
         return "Invalid prompt provided."
     end
 
-    local payload = {
-        prompt = prompt,
-        max_tokens = 100  -- Limit response length
-    }
-
-    local response = sendRequest("/generate-response", payload)
-    if response and response.text then
-        print("AI Response: " .. response.text)
-        return response.text
+    local text = requestCompletion(prompt, NPC_MAX_TOKENS)
+    if text then
+        print("AI Response: " .. text)
+        return text
     else
         return "Failed to generate response."
     end
 end
 
+-- Generate responses for many NPCs in one request; returns the responses in prompt order
+function AiIntegration:generateNpcResponses(prompts)
+    local requests = {}
+    for i, prompt in ipairs(prompts) do
+        requests[i] = { prompt = prompt, max_tokens = NPC_MAX_TOKENS }
+    end
+
+    local responses = {}
+    local response = #requests > 0 and sendRequest("/complete_batch", { requests = requests })
+    for i = 1, #prompts do
+        local result = response and response.results and response.results[i]
+        responses[i] = (result and result.text) or "Failed to generate response."
+    end
+    return responses
+end
+
 -- Recommend game actions using AI
 function AiIntegration:recommendAction(gameState)
     if not gameState then
         return "Invalid game state provided."
     end
 
-    local payload = {
-        state = gameState
-    }
-
-    local response = sendRequest("/recommend-action", payload)
-    if response and response.action then
-        print("Recommended Action: " .. response.action)
-        return response.action
+    local prompt = "Recommend the next action for this game state: " .. HttpService:JSONEncode(gameState)
+    local action = requestCompletion(prompt, NPC_MAX_TOKENS)
+    if action then
+        print("Recommended Action: " .. action)
+        return action
     else
         return "Failed to recommend action."
     end
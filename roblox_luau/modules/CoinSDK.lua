@@ -5,6 +5,25 @@ local CoinSDK = {}
 local playerData = {} -- A table to store player coin data (in a real application, use a database or persistent storage)
 local HttpService = game:GetService("HttpService") -- Use HttpService to send HTTP requests
 
+-- Backend connection settings. Roblox limits HTTP requests per server, so wallet
+-- updates are buffered and sent in batches, and backend events arrive over one
+-- long-poll request instead of per-player polling.
+CoinSDK.config = {
+    backendUrl = "http://localhost:8000", -- Replace with your backend URL
+    world = "default", -- Game world hosted by this server; events and spawns are scoped to it
+    flushInterval = 5, -- Seconds between wallet update flushes
+    maxBatchSize = 100, -- Flush early once this many players have pending updates
+    pollTimeout = 25, -- Seconds the backend may hold an event long-poll open
+    retryDelay = 5 -- Seconds to wait after a failed event poll
+}
+
+local pendingWalletUpdates = {} -- playerId -> latest wallet update not yet sent
+local pendingCount = 0
+local eventHandlers = {} -- event type -> list of handler functions
+local flushLoopRunning = false
+local eventLoopRunning = false
+local closeHandlerBound = false
+
 -- Initialize a player with a starting balance and character attributes
 function CoinSDK:initPlayer(playerId, startingBalance, characterAttributes, walletAddress)
     if not playerId then
@@ -52,7 +71,9 @@ function CoinSDK:updateCharacterAttributes(playerId, attributes)
     end
 end
 
--- Function to send wallet address and character data to the backend
+-- Queue a player's wallet address and balance for the next batched send to the backend.
+-- Only the latest update per player is kept; the batch is sent by the flush loop
+-- (see startFlushLoop) or right away once maxBatchSize players are waiting.
 function CoinSDK:sendWalletDataToBackend(playerId)
     local player = playerData[playerId]
     if not player then
@@ -65,28 +86,148 @@ function CoinSDK:sendWalletDataToBackend(playerId)
         return
     end
 
-    -- Prepare the data for the HTTP request
+    -- Prepare the data for the batched HTTP request
     local requestData = {
         wallet_address = walletAddress,
         player_id = playerId,
         balance = player.balance
     }
 
-    local url = "http://localhost:8000/api/update_wallet" -- Replace with your backend URL
-    local headers = {
-        ["Content-Type"] = "application/json"
-    }
+    if pendingWalletUpdates[playerId] == nil then
+        pendingCount = pendingCount + 1
+    end
+    pendingWalletUpdates[playerId] = requestData
+
+    if pendingCount >= self.config.maxBatchSize then
+        self:flushWalletUpdates()
+    end
+end
+
+-- Number of players whose wallet updates are waiting to be sent
+function CoinSDK:getPendingWalletUpdateCount()
+    return pendingCount
+end
+
+-- Send every pending wallet update to the backend in one request.
+-- Returns the number of updates sent (0 if there was nothing to send or the request failed).
+function CoinSDK:flushWalletUpdates()
+    if pendingCount == 0 then
+        return 0
+    end
+
+    local batch = pendingWalletUpdates
+    local updates = {}
+    for _, update in pairs(batch) do
+        table.insert(updates, update)
+    end
+    pendingWalletUpdates = {}
+    pendingCount = 0
 
-    local response
-    -- Send the HTTP request to the backend
-    pcall(function()
-        response = HttpService:PostAsync(url, HttpService:JSONEncode(requestData), Enum.HttpContentType.ApplicationJson, false, headers)
-        print("Sent wallet data to backend for player " .. playerId)
+    local url = self.config.backendUrl .. "/api/update_wallets"
+    local body = HttpService:JSONEncode({ world = self.config.world, updates = updates })
+    local success, response = pcall(function()
+        return HttpService:PostAsync(url, body, Enum.HttpContentType.ApplicationJson, false)
     end)
 
-    if response then
-        print("Backend response: " .. response)
+    if not success then
+        -- Keep the batch for the next flush, unless a newer update for the player arrived meanwhile
+        for playerId, update in pairs(batch) do
+            if pendingWalletUpdates[playerId] == nil then
+                pendingWalletUpdates[playerId] = update
+                pendingCount = pendingCount + 1
+            end
+        end
+        warn("Failed to send wallet updates to backend: " .. tostring(response))
+        return 0
     end
+
+    print("Sent " .. #updates .. " wallet updates to backend")
+    return #updates
+end
+
+-- Flush pending wallet updates every config.flushInterval seconds, and once more on shutdown
+function CoinSDK:startFlushLoop()
+    if flushLoopRunning then
+        return
+    end
+    flushLoopRunning = true
+
+    task.spawn(function()
+        while flushLoopRunning do
+            task.wait(self.config.flushInterval)
+            self:flushWalletUpdates()
+        end
+    end)
+
+    if not closeHandlerBound then
+        closeHandlerBound = true
+        game:BindToClose(function()
+            self:flushWalletUpdates()
+        end)
+    end
+end
+
+function CoinSDK:stopFlushLoop()
+    flushLoopRunning = false
+end
+
+-- Register a handler for backend events of one type ("spawn", "despawn", "wallet_update").
+-- Handlers are called with the event data and the full event.
+function CoinSDK:onEvent(eventType, handler)
+    eventHandlers[eventType] = eventHandlers[eventType] or {}
+    table.insert(eventHandlers[eventType], handler)
+end
+
+-- Run one long-poll against the world's event feed and dispatch what it returns.
+-- `cursor` ({lastId, epoch}) is advanced in place. Returns false if the request failed.
+function CoinSDK:pollEvents(cursor)
+    local url = string.format(
+        "%s/api/events/%s?after=%d&epoch=%s&timeout=%d",
+        self.config.backendUrl,
+        HttpService:UrlEncode(self.config.world),
+        cursor.lastId,
+        cursor.epoch or "",
+        self.config.pollTimeout
+    )
+    local success, response = pcall(function()
+        return HttpService:GetAsync(url, true)
+    end)
+    if not success then
+        warn("Failed to poll backend events: " .. tostring(response))
+        return false
+    end
+
+    local body = HttpService:JSONDecode(response)
+    cursor.lastId = body.last_id
+    cursor.epoch = body.epoch
+    for _, event in ipairs(body.events) do
+        for _, handler in ipairs(eventHandlers[event.type] or {}) do
+            task.spawn(handler, event.data, event)
+        end
+    end
+    return true
+end
+
+-- Follow the world's event feed in the background. The backend holds each request
+-- open until an event arrives, so this costs a few requests per minute when idle.
+function CoinSDK:startEventListener()
+    if eventLoopRunning then
+        return
+    end
+    eventLoopRunning = true
+
+    task.spawn(function()
+        local cursor = { lastId = 0, epoch = nil }
+        while eventLoopRunning do
+            if not self:pollEvents(cursor) then
+                task.wait(self.config.retryDelay)
+            end
+        end
+    end)
+end
+
+function CoinSDK:stopEventListener()
+    eventLoopRunning = false
 end
 
 -- Function to spawn or respawn a character with attributes
@@ -105,7 +246,7 @@ function CoinSDK:spawnCharacter(playerId)
         -- Apply character attributes
         self:updateCharacterAttributes(playerId, characterAttributes)
 
-        -- Send wallet data to the backend
+        -- Queue wallet data for the next batched send to the backend
         self:sendWalletDataToBackend(playerId)
 
         print("Character for player " .. playerId .. " has been spawned with updated attributes.")
@@ -119,8 +260,11 @@ end
 CoinSDK:initPlayer("Player1", 100, {walkSpeed = 16, size = 1}, "0x123abc456def")  -- Default walk speed, size, and wallet address
 CoinSDK:initPlayer("Player2", 200, {walkSpeed = 20, size = 1.5}, "0x789ghi012jkl") -- Faster and larger player with a wallet address
 
+-- Send buffered wallet updates in batches
+CoinSDK:startFlushLoop()
+
 -- Spawn players with their character attributes
-CoinSDK:spawnCharacter("Player1") -- Apply attributes and send wallet data for Player1
-CoinSDK:spawnCharacter("Player2") -- Apply attributes and send wallet data for Player2
+CoinSDK:spawnCharacter("Player1") -- Apply attributes and queue wallet data for Player1
+CoinSDK:spawnCharacter("Player2") -- Apply attributes and queue wallet data for Player2
 
 return CoinSDK
@@ -1,16 +1,23 @@
 local AiIntegration = require(game.ServerScriptService.AiIntegration)  -- Assuming the AiIntegration script is in ServerScriptService
 
 local function mockHttpService()
-    local HttpServiceMock = {}
+    local HttpServiceMock = { posts = {} }
     
+    function HttpServiceMock:GetAsync(url)
+        if url == "http://localhost:8000/api/ai/stats" then
+            return '{"provider": "StubProvider"}'
+        end
+        error("HTTP 404")
+    end
+
     function HttpServiceMock:PostAsync(url, body, contentType, retry, headers)
+        table.insert(self.posts, { url = url, body = body })
         -- Mock the response based on the URL requested
-        if url == "https://example-ai-service.com/api/health" then
-            return '{"status": "ok"}'
-        elseif url == "https://example-ai-service.com/api/generate-response" then
-            return '{"text": "The best way to find treasure is by exploring hidden caves."}'
-        elseif url == "https://example-ai-service.com/api/recommend-action" then
-            return '{"action": "Attack the nearest enemy."}'
+        if url == "http://localhost:8000/api/ai/complete_batch" then
+            if string.find(body, "game state") then
+                return '{"results": [{"index": 0, "text": "Attack the nearest enemy."}]}'
+            end
+            return '{"results": [{"index": 0, "text": "The best way to find treasure is by exploring hidden caves."}]}'
         else
             return '{"error": "Invalid endpoint."}'
         end
@@ -36,8 +43,8 @@ describe("AiIntegration", function()
 
     it("should initialize AI Integration successfully", function()
         -- The test here would ensure that the connection to the AI service works.
-        local healthCheck = mockHttp:PostAsync("https://example-ai-service.com/api/health", {}, nil, nil, nil)
-        assert.equal(healthCheck, '{"status": "ok"}', "Failed to initialize AI service.")
+        local healthCheck = mockHttp:GetAsync("http://localhost:8000/api/ai/stats")
+        assert.equal(healthCheck, '{"provider": "StubProvider"}', "Failed to initialize AI service.")
     end)
 
     it("should return valid NPC response", function()
@@ -47,6 +54,20 @@ describe("AiIntegration", function()
         assert.is_equal(npcResponse, "The best way to find treasure is by exploring hidden caves.", "NPC response was incorrect.")
     end)
 
+    it("should send prompts from NPCs in the same tick as one batch", function()
+        mockHttp.posts = {}
+        local responses = {}
+        for i = 1, 3 do
+            task.spawn(function()
+                responses[i] = AiIntegration:generateNpcResponse("What is the best way to find treasure in this game?")
+            end)
+        end
+        task.wait(0.1)
+
+        assert.is_equal(#mockHttp.posts, 1, "NPC prompts should share a single request.")
+        assert.is_equal(mockHttp.posts[1].url, "http://localhost:8000/api/ai/complete_batch")
+    end)
+
     it("should return default response if no prompt is provided for NPC", function()
         local npcResponse = AiIntegration:generateNpcResponse("")
         
@@ -2,12 +2,15 @@ local CoinSDK = require(game.ServerScriptService.CoinSDK)  -- Assuming the CoinS
 
 -- Mock HttpService to simulate network requests
 local function mockHttpService()
-    local HttpServiceMock = {}
+    local HttpServiceMock = { posts = {} }
     
     function HttpServiceMock:PostAsync(url, body, contentType, retry, headers)
+        table.insert(self.posts, { url = url, body = body })
         -- Simulating different responses based on URL
         if url == "http://localhost:8000/api/update_wallet" then
             return '{"status": "success"}'
+        elseif url == "http://localhost:8000/api/update_wallets" then
+            return '{"accepted": 1, "failed": 0, "errors": []}'
         else
             return '{"error": "Invalid endpoint."}'
         end
@@ -62,6 +65,37 @@ describe("CoinSDK", function()
         assert.is_equal(response, '{"status": "success"}', "Failed to send wallet data to backend.")
     end)
 
+    it("should buffer wallet updates and send them in one request", function()
+        mockHttp.posts = {}
+        CoinSDK:initPlayer("Player3", 50, {walkSpeed = 16, size = 1}, "0x456def789abc")
+
+        -- Repeated updates for a player are coalesced until the next flush
+        CoinSDK:sendWalletDataToBackend("Player1")
+        CoinSDK:sendWalletDataToBackend("Player1")
+        CoinSDK:sendWalletDataToBackend("Player3")
+        assert.is_equal(#mockHttp.posts, 0, "Wallet updates should wait for the flush.")
+        assert.is_equal(CoinSDK:getPendingWalletUpdateCount(), 2, "One pending update per player.")
+
+        local sent = CoinSDK:flushWalletUpdates()
+        assert.is_equal(sent, 2, "Both players' updates should be sent.")
+        assert.is_equal(#mockHttp.posts, 1, "The batch should be sent in a single request.")
+        assert.is_equal(mockHttp.posts[1].url, "http://localhost:8000/api/update_wallets")
+        assert.is_equal(CoinSDK:getPendingWalletUpdateCount(), 0, "Nothing should be pending after a flush.")
+    end)
+
+    it("should flush early when the batch is full", function()
+        mockHttp.posts = {}
+        local originalBatchSize = CoinSDK.config.maxBatchSize
+        CoinSDK.config.maxBatchSize = 2
+        CoinSDK:initPlayer("Player3", 50, {walkSpeed = 16, size = 1}, "0x456def789abc")
+
+        CoinSDK:sendWalletDataToBackend("Player1")
+        CoinSDK:sendWalletDataToBackend("Player3")
+
+        CoinSDK.config.maxBatchSize = originalBatchSize
+        assert.is_equal(#mockHttp.posts, 1, "A full batch should be sent without waiting for the interval.")
+    end)
+
     it("should spawn character and apply character attributes", function()
         local playerId = "Player1"
         